@@ -174,13 +174,19 @@ class FacebookAPI:
         if page_id in self._page_token_cache:
             return self._page_token_cache[page_id]
         
-        resp = self._make_request("GET", "/me/accounts",
-                                  params={"fields": "id,access_token", "limit": 100})
-        
-        for p in resp["data"]:
-            self._page_token_cache[p["id"]] = p["access_token"]
+        params = {"fields": "id,access_token", "limit": 100}
+        while True:
+            resp = self._make_request("GET", "/me/accounts", params=dict(params))
+            for p in resp.get("data", []):
+                self._page_token_cache[p["id"]] = p["access_token"]
+            
+            paging = resp.get("paging", {})
+            after = paging.get("cursors", {}).get("after")
+            if not paging.get("next") or not after:
+                break
+            params["after"] = after
         
-        return self._page_token_cache.get(page_id)
+        return self._page_token_cache.get(page_id, self.access_token)  # Fallback to system token
     
     # Graph API Methods
     
@@ -633,29 +639,6 @@ class FacebookAPI:
             access_token=page_access_token
         )
     
-    # --- Helper method for page tokens -----------------------------------
-    def _get_page_token(self, page_id: str) -> Optional[str]:
-        """
-        Get the access token for a specific page
-        
-        Args:
-            page_id: ID of the Facebook page
-            
-        Returns:
-            Page access token or None if not found
-        """
-        try:
-            # Load pages from config to get page tokens
-            from utils import config
-            pages_data = config.load_pages()
-            for page in pages_data.get("pages", []):
-                if page.get("id") == page_id:
-                    return page.get("access_token")
-        except Exception as e:
-            logger.warning(f"Could not get page token for {page_id}: {e}")
-        
-        return self.access_token  # Fallback to system token
-    
     def get_recent_posts(self, page_id: str, limit: int = 10) -> List[Dict]:
         """
         Return last *limit* posts with id, message, created_time
@@ -0,0 +1,118 @@
+"""
+Page sync benchmark
+
+Measures the wall-clock time of a page synchronization against a simulated
+Graph API (fixed latency per HTTP call) for an increasing number of pages,
+comparing three ways of getting the recent posts of each page:
+
+- n_plus_one: one GET /{page_id}/posts per page after /me/accounts
+- batch:      per-page probes sent as batch requests (50 per call)
+- expansion:  posts.limit(5){...} expanded inline on /me/accounts
+
+Usage:
+    python benchmarks/bench_page_sync.py [--latency 0.03] [--pages 10 66 250 1000]
+"""
+
+import os
+import re
+import io
+import sys
+import json
+import time
+import logging
+import argparse
+import contextlib
+from urllib.parse import urlsplit, parse_qs
+
+import responses
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from graph_session import GraphSessionPool
+from rate_limit import RateLimitGovernor
+from services.page_sync import GRAPH_URL, fetch_all_pages, attach_recent_posts
+
+MODES = ('n_plus_one', 'batch', 'expansion')
+POSTS = {'data': [{'created_time': '2025-06-20T10:00:00+0000', 'message': 'Post'}] * 5}
+
+
+def register_fake_graph(mock: responses.RequestsMock, page_total: int, latency: float):
+    """Register simulated Graph endpoints with a fixed latency per call"""
+
+    def accounts(request):
+        time.sleep(latency)
+        query = parse_qs(urlsplit(request.url).query)
+        start = int(query.get('after', ['0'])[0])
+        fields = query.get('fields', [''])[0]
+        pages = []
+        for i in range(start, min(start + 100, page_total)):
+            page = {'id': str(i), 'name': f'Page {i}', 'access_token': f'token_{i}'}
+            if 'posts.limit' in fields:
+                page['posts'] = POSTS
+            pages.append(page)
+        body = {'data': pages}
+        if start + 100 < page_total:
+            body['paging'] = {'next': f"{GRAPH_URL}/me/accounts?fields={fields}&limit=100&after={start + 100}"}
+        return (200, {}, json.dumps(body))
+
+    def posts(request):
+        time.sleep(latency)
+        return (200, {}, json.dumps(POSTS))
+
+    def batch(request):
+        time.sleep(latency)
+        items = json.loads(parse_qs(request.body)['batch'][0])
+        return (200, {}, json.dumps([{'code': 200, 'body': json.dumps(POSTS)} for _ in items]))
+
+    mock.add_callback(responses.GET, f"{GRAPH_URL}/me/accounts", callback=accounts)
+    mock.add_callback(responses.GET, re.compile(rf"{re.escape(GRAPH_URL)}/\d+/posts"), callback=posts)
+    mock.add_callback(responses.POST, f"{GRAPH_URL}/", callback=batch)
+
+
+def sync(mode: str, http: GraphSessionPool):
+    """Run one sync in the given mode"""
+    pages, _, _ = fetch_all_pages('user_token', http=http, expand_posts=(mode == 'expansion'))
+    if mode == 'n_plus_one':
+        for page in pages:
+            response = http.get(f"{GRAPH_URL}/{page['id']}/posts",
+                                params={'access_token': page['access_token'], 'limit': 5})
+            page['posts'] = response.json()
+    else:
+        attach_recent_posts(pages, 'user_token', http=http)
+    return pages
+
+
+def run(page_counts, latency: float):
+    """Print wall-clock time and request count per mode and page count"""
+    print(f"Simulated Graph latency: {latency * 1000:.0f} ms per HTTP call")
+    print(f"{'pages':>6} | {'mode':<11} | {'requests':>8} | {'wall-clock':>10}")
+    print("-" * 46)
+
+    for count in page_counts:
+        for mode in MODES:
+            with responses.RequestsMock(assert_all_requests_are_fired=False) as mock:
+                register_fake_graph(mock, count, latency)
+                # No pacing: the benchmark measures request count and latency only
+                http = GraphSessionPool(governor=RateLimitGovernor(app_rate=1e6, page_rate=1e6))
+
+                # fetch_all_pages logs its progress on stdout
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    pages = sync(mode, http)
+                    elapsed = time.perf_counter() - start
+                http.close()
+
+                assert len(pages) == count and all(page['posts']['data'] for page in pages)
+                print(f"{count:>6} | {mode:<11} | {len(mock.calls):>8} | {elapsed * 1000:>8.0f} ms")
+        print("-" * 46)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Page sync wall-clock benchmark")
+    parser.add_argument('--latency', type=float, default=0.03, help='Seconds per simulated HTTP call')
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 66, 250, 1000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    run(args.pages, args.latency)
@@ -0,0 +1,141 @@
+"""
+Facebook Client Registry Module
+
+This module keeps long-lived FacebookAPI clients instead of building a new
+one per request. Clients are keyed by (app_id, app_secret, access_token)
+so each credential set gets one client. All clients share the process-wide
+HTTP session pool, the persistent page token store and the response
+cache. The registry is
+bounded (least recently used clients are dropped) and is cleared when the
+credentials change.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from facebook_api import FacebookAPI
+from page_tokens import PageTokenStore, get_page_token_store
+from response_cache import ResponseCache, get_response_cache
+
+logger = logging.getLogger("facebook_api.clients")
+
+DEFAULT_MAX_CLIENTS = 32
+
+
+class FacebookClientRegistry:
+    """
+    Thread-safe registry of FacebookAPI clients
+
+    Handles:
+    - One client per credential set, created on first use
+    - LRU bound on the number of clients
+    - Invalidation of one token or of every client
+    - Hit/miss counters
+    """
+
+    def __init__(self, max_clients: Optional[int] = None, page_token_store: Optional[PageTokenStore] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        """
+        Initialize the registry
+
+        Args:
+            max_clients: Maximum number of clients kept (FACEBOOK_CLIENT_REGISTRY_SIZE if not provided)
+            page_token_store: Page token store of the clients (persistent process-wide store if not provided)
+            response_cache: Response cache of the clients (process-wide cache if not provided)
+        """
+        self.max_clients = max_clients or int(os.getenv("FACEBOOK_CLIENT_REGISTRY_SIZE", DEFAULT_MAX_CLIENTS))
+        self.page_tokens = page_token_store or get_page_token_store()
+        self.response_cache = response_cache or get_response_cache()
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[tuple, FacebookAPI]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, access_token: str, app_id: Optional[str] = None,
+            app_secret: Optional[str] = None) -> FacebookAPI:
+        """
+        Get the client for a set of credentials, creating it if needed
+
+        Args:
+            access_token: User access token
+            app_id: Facebook App ID (from .env if not provided)
+            app_secret: Facebook App Secret (from .env if not provided)
+
+        Returns:
+            Shared FacebookAPI instance
+
+        Raises:
+            ValueError: If credentials are missing (from FacebookAPI)
+        """
+        app_id = app_id or os.getenv("FACEBOOK_APP_ID") or os.getenv("APP_ID")
+        app_secret = app_secret or os.getenv("FACEBOOK_APP_SECRET") or os.getenv("APP_SECRET")
+        key = (app_id, app_secret, access_token)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self._stats["hits"] += 1
+                return client
+
+            client = FacebookAPI(app_id=app_id, app_secret=app_secret, access_token=access_token,
+                                 page_token_store=self.page_tokens, response_cache=self.response_cache)
+            self._stats["misses"] += 1
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self._stats["evictions"] += 1
+            return client
+
+    def invalidate(self, access_token: Optional[str] = None):
+        """
+        Drop clients so the next call builds fresh ones
+
+        Args:
+            access_token: Only drop the clients of this token (all clients if not provided)
+        """
+        with self._lock:
+            keys = [key for key in self._clients if access_token is None or key[2] == access_token]
+            for key in keys:
+                del self._clients[key]
+            self._stats["invalidations"] += 1
+        if keys:
+            logger.info(f"Dropped {len(keys)} Facebook API clients")
+
+    def clear(self):
+        """Drop every client (e.g. after a settings update)"""
+        self.invalidate()
+
+    def stats(self) -> Dict:
+        """
+        Get registry statistics
+
+        Returns:
+            Dictionary with cached clients, hits, misses, evictions and invalidations
+        """
+        with self._lock:
+            return dict(self._stats, clients=len(self._clients), max_clients=self.max_clients)
+
+
+# Process-wide registry shared by the app and its blueprints
+_default_registry: Optional[FacebookClientRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> FacebookClientRegistry:
+    """Get or create the process-wide client registry"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = FacebookClientRegistry()
+    return _default_registry
+
+
+def reset_client_registry():
+    """Drop the process-wide registry so the next call builds a fresh one"""
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = None
@@ -9,13 +9,23 @@ Date: June 19, 2025
 """
 
 import os
+import copy
 import json
 import time
 import logging
 import requests
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterator, List, Any, Optional, Union
+from urllib.parse import parse_qsl, urlsplit
 from dotenv import load_dotenv
 
+from graph_session import GraphSessionPool, get_session_pool
+from rate_limit import RateLimitExceeded
+from media_registry import MediaRegistry, get_media_registry
+from page_tokens import PageTokenStore
+from response_cache import ResponseCache
+from single_flight import SingleFlight, endpoint_label, get_single_flight
+from fanout import get_fanout_executor
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -50,7 +60,10 @@ class FacebookAPI:
     
     BASE_URL = "https://graph.facebook.com/v18.0"  # Using latest stable version
     
-    def __init__(self, app_id: Optional[str] = None, app_secret: Optional[str] = None, access_token: Optional[str] = None):
+    def __init__(self, app_id: Optional[str] = None, app_secret: Optional[str] = None, access_token: Optional[str] = None,
+                 session_pool: Optional[GraphSessionPool] = None, media_registry: Optional[MediaRegistry] = None,
+                 page_token_store: Optional[PageTokenStore] = None, single_flight: Optional[SingleFlight] = None,
+                 response_cache: Optional[ResponseCache] = None):
         """
         Initialize the Facebook API wrapper
         
@@ -58,11 +71,22 @@ class FacebookAPI:
             app_id: Facebook App ID (from .env if not provided)
             app_secret: Facebook App Secret (from .env if not provided)
             access_token: Access token (optional)
+            session_pool: HTTP session pool (shared process-wide pool if not provided)
+            media_registry: Uploaded media registry (shared process-wide registry if not provided)
+            page_token_store: Page token store (in-memory store of this client if not provided)
+            single_flight: Coalescing layer for concurrent identical GETs (shared process-wide layer if not provided)
+            response_cache: Cache of GET responses (no caching if not provided)
         """
         self.access_token = access_token
+        self.http = session_pool or get_session_pool()
+        self.media = media_registry or get_media_registry()
         self.app_id = app_id or os.getenv("FACEBOOK_APP_ID") or os.getenv("APP_ID")
         self.app_secret = app_secret or os.getenv("FACEBOOK_APP_SECRET") or os.getenv("APP_SECRET")
         
+        self.page_tokens = page_token_store or PageTokenStore()
+        self.single_flight = single_flight or get_single_flight()
+        self.response_cache = response_cache
+        
         # Validate required parameters
         if not self.access_token or not self.app_id or not self.app_secret:
             logger.error("Missing FACEBOOK_ACCESS_TOKEN, FACEBOOK_APP_ID or FACEBOOK_APP_SECRET in environment variables")
@@ -72,7 +96,7 @@ class FacebookAPI:
     
     def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, 
                      data: Optional[Dict] = None, files: Optional[Dict] = None, 
-                     access_token: Optional[str] = None, max_retries: int = 3) -> Dict:
+                     access_token: Optional[str] = None, max_retries: int = 3, cache: bool = True) -> Dict:
         """
         Make a request to the Facebook API with retry logic
         
@@ -84,6 +108,7 @@ class FacebookAPI:
             files: Files to upload
             access_token: Override default access token
             max_retries: Maximum number of retries for 5xx errors
+            cache: Serve GETs from the response cache (writes always invalidate it)
             
         Returns:
             API response as dictionary
@@ -99,6 +124,43 @@ class FacebookAPI:
         if token:
             params["access_token"] = token
         
+        # Concurrent identical reads share one request
+        if method.upper() == "GET":
+            key = (url, json.dumps(params, sort_keys=True, default=str))
+            fetch = lambda: self.single_flight.do(
+                key, lambda: self._send_request(method, url, params, data, files, max_retries),
+                label=endpoint_label(endpoint))
+            if not cache or self.response_cache is None:
+                return fetch()
+            # Callers may mutate the response, the cached copy must not change
+            return copy.deepcopy(self.response_cache.get_or_fetch(
+                ResponseCache.scope(self.app_id, self.access_token), endpoint, params, fetch))
+        
+        response = self._send_request(method, url, params, data, files, max_retries)
+        self._invalidate_cache(endpoint)
+        return response
+    
+    def _invalidate_cache(self, endpoint: str):
+        """Drop the cached reads of the object a write went to"""
+        if self.response_cache is not None:
+            self.response_cache.invalidate(endpoint)
+    
+    def _send_request(self, method: str, url: str, params: Dict, data: Optional[Dict],
+                      files: Optional[Dict], max_retries: int) -> Dict:
+        """
+        Send a request with retries on server and connection errors
+        
+        Args:
+            method: HTTP method (GET, POST, DELETE)
+            url: Full request URL
+            params: URL parameters (with access token)
+            data: POST data
+            files: Files to upload
+            max_retries: Maximum number of retries for 5xx errors
+            
+        Returns:
+            API response as dictionary
+        """
         # Log request (without sensitive data)
         safe_params = {k: v for k, v in params.items() if k != "access_token"}
         logger.info(f"API Request: {method} {url} - Params: {safe_params}")
@@ -107,11 +169,11 @@ class FacebookAPI:
         while True:
             try:
                 if method.upper() == "GET":
-                    response = requests.get(url, params=params)
+                    response = self.http.get(url, params=params)
                 elif method.upper() == "POST":
-                    response = requests.post(url, params=params, data=data, files=files)
+                    response = self.http.post(url, params=params, data=data, files=files)
                 elif method.upper() == "DELETE":
-                    response = requests.delete(url, params=params)
+                    response = self.http.delete(url, params=params)
                 else:
                     raise ValueError(f"Unsupported HTTP method: {method}")
                 
@@ -145,6 +207,8 @@ class FacebookAPI:
                 
                 return response_data
                 
+            except RateLimitExceeded as e:
+                raise FacebookAPIError(str(e), 4)
             except requests.RequestException as e:
                 logger.error(f"Request error: {str(e)}")
                 
@@ -158,6 +222,20 @@ class FacebookAPI:
                 
                 raise FacebookAPIError(f"Request failed: {str(e)}")
     
+    def batch(self, access_token: Optional[str] = None):
+        """
+        Start a Graph API batch request
+        
+        Args:
+            access_token: Fallback token for queued operations (default token if not provided)
+            
+        Returns:
+            GraphBatch builder sharing this instance's session pool
+        """
+        from graph_batch import GraphBatch  # Imported here to avoid a circular import
+        return GraphBatch(access_token or self.access_token, session_pool=self.http,
+                          base_url=self.BASE_URL)
+    
     # Graph API Methods
     
     def get_user_pages(self) -> List[Dict]:
@@ -177,6 +255,26 @@ class FacebookAPI:
             return response["data"]
         return []
     
+    def get_all_pages(self, fields: str = "id,name,category,fan_count,access_token,picture") -> List[Dict]:
+        """
+        Get all pages managed by the user, following pagination
+        
+        Args:
+            fields: Page fields to request
+            
+        Returns:
+            List of page objects
+        """
+        pages = []
+        params = {"fields": fields, "limit": 100}
+        while True:
+            response = self._make_request("GET", "/me/accounts", params=dict(params))
+            pages.extend(response.get("data", []))
+            after = response.get("paging", {}).get("cursors", {}).get("after")
+            if not after or not response.get("paging", {}).get("next"):
+                return pages
+            params["after"] = after
+    
     def publish_post(self, page_id: str, message: str, link: Optional[str] = None, 
                     page_access_token: Optional[str] = None) -> Dict:
         """
@@ -221,15 +319,14 @@ class FacebookAPI:
         if caption:
             params["caption"] = caption
             
-        with open(photo_path, "rb") as photo_file:
-            files = {"source": photo_file}
-            return self._make_request(
-                "POST",
-                f"/{page_id}/photos",
-                params=params,
-                files=files,
-                access_token=page_access_token
-            )
+        files = {"source": self.media.load(photo_path).as_upload()}
+        return self._make_request(
+            "POST",
+            f"/{page_id}/photos",
+            params=params,
+            files=files,
+            access_token=page_access_token
+        )
     
     # Old publish_post_with_photos function removed - replaced with new implementation below
     
@@ -545,23 +642,78 @@ class FacebookAPI:
             page_id: ID of the Facebook page
             
         Returns:
-            Page access token or None if not found
+            Page access token, or the user token if not found
         """
-        try:
-            # Get pages from Facebook API to get page tokens
-            pages = self.get_user_pages()
-            for page in pages:
-                if page.get("id") == page_id:
-                    page_token = page.get("access_token")
-                    logger.info(f"Found page token for page {page_id}")
-                    return page_token
+        page_token = self._find_page_token(page_id)
+        if page_token:
+            return page_token
+        
+        logger.warning(f"Falling back to user token for page {page_id}")
+        return self.access_token  # Fallback to system token
+    
+    def _find_page_token(self, page_id: str) -> Optional[str]:
+        """
+        Look up a page token in the page token store
+        
+        Args:
+            page_id: ID of the Facebook page
             
-            logger.warning(f"No page token found for page {page_id}")
+        Returns:
+            Page access token or None if the user does not manage the page
+        """
+        try:
+            page_token = self.page_tokens.get(self, page_id)
         except Exception as e:
             logger.warning(f"Could not get page token for {page_id}: {e}")
+            return None
+        if page_token is None:
+            logger.warning(f"No page token found for page {page_id}")
+        return page_token
+    
+    def _get_page_tokens(self, refresh: bool = False) -> Dict[str, str]:
+        """
+        Get the access tokens of all pages managed by the user
         
-        logger.warning(f"Falling back to user token for page {page_id}")
-        return self.access_token  # Fallback to system token
+        Args:
+            refresh: Fetch the tokens again even if they are fresh
+        
+        Returns:
+            Dictionary mapping page ID to page access token (empty on error)
+        """
+        try:
+            return self.page_tokens.get_all(self, refresh=refresh)
+        except Exception as e:
+            logger.warning(f"Could not prefetch page tokens: {e}")
+            return {}
+    
+    def _resolve_page_tokens(self, page_ids: List[str]) -> Dict[str, str]:
+        """
+        Get the access tokens of several pages with at most two /me/accounts passes
+        
+        Pages missing from the stored tokens go through the store's throttled
+        miss path, so they share at most one refresh per miss interval; pages
+        still unknown fall back to the user token.
+        
+        Args:
+            page_ids: List of Facebook page IDs
+        
+        Returns:
+            Dictionary mapping each page ID to its access token
+        """
+        page_tokens = self._get_page_tokens()
+        
+        resolved = {}
+        for page_id in dict.fromkeys(page_ids):
+            if page_id in page_tokens:
+                resolved[page_id] = page_tokens[page_id]
+            else:
+                # The first miss may refresh every token; later misses hit that refresh
+                resolved[page_id] = self._get_page_token(page_id)
+        return resolved
+    
+    def invalidate_page_tokens(self):
+        """Drop the stored page tokens of this user (e.g. after a token was revoked)"""
+        self.page_tokens.invalidate(self)
     
     def _publish_feed(self, page_id, message, **extra):
         """
@@ -570,21 +722,24 @@ class FacebookAPI:
         Args:
             page_id: ID of the Facebook page
             message: Post message text
-            **extra: Additional parameters (like attached_media)
+            **extra: Additional parameters (like attached_media, or
+                access_token to skip the page token lookup)
             
         Returns:
             Post ID
         """
+        access_token = extra.pop("access_token", None) or self._get_page_token(page_id)
         params = {"message": message,
-                  "access_token": self._get_page_token(page_id),
+                  "access_token": access_token,
                   **extra}
-        r = requests.post(f"{self.BASE_URL}/{page_id}/feed", data=params, timeout=20)
+        r = self.http.post(f"{self.BASE_URL}/{page_id}/feed", data=params, timeout=20)
         
         # Debug logs as specified in the prompt
         logger.debug("REQUEST %s params=%s files=%s", r.request.url, r.request.body, r.request.files if hasattr(r.request,'files') else None)
         logger.debug("RESPONSE %s %s", r.status_code, r.text)
         
         r.raise_for_status()
+        self._invalidate_cache(f"/{page_id}/feed")
         return r.json()["id"]
 
     def publish_post_with_photos(self, page_id, message, paths):
@@ -599,22 +754,8 @@ class FacebookAPI:
         Returns:
             Post ID
         """
-        media = []
-        for p in paths:
-            up = requests.post(f"{self.BASE_URL}/{page_id}/photos",
-                               params={"published":"false",
-                                       "access_token": self._get_page_token(page_id)},
-                               files={"source": open(p,"rb")}, timeout=30)
-            
-            # Debug logs as specified in the prompt
-            logger.debug("REQUEST %s params=%s files=%s", up.request.url, up.request.body, up.request.files if hasattr(up.request,'files') else None)
-            logger.debug("RESPONSE %s %s", up.status_code, up.text)
-            
-            up.raise_for_status()
-            media.append({"media_fbid": up.json()["id"]})
-        
-        return self._publish_feed(page_id, message,
-                                  attached_media=json.dumps(media))
+        page_token = self._get_page_token(page_id)
+        return self._publish_feed_with_media(page_id, message, paths, page_token)
 
     def publish_post_with_video(self, page_id, path, message):
         """
@@ -628,118 +769,322 @@ class FacebookAPI:
         Returns:
             Post ID
         """
-        up = requests.post(f"{self.BASE_URL}/{page_id}/videos",
-                           params={"description": message,
-                                   "access_token": self._get_page_token(page_id)},
-                           files={"source": open(path,"rb")}, timeout=120)
+        if os.path.getsize(path) >= self._video_chunked_threshold():
+            return self.video_uploader().upload(page_id, path, description=message,
+                                                page_access_token=self._get_page_token(page_id))["id"]
+        
+        with open(path, "rb") as video_file:
+            up = self.http.post(f"{self.BASE_URL}/{page_id}/videos",
+                                params={"description": message,
+                                        "access_token": self._get_page_token(page_id)},
+                                files={"source": video_file}, timeout=120)
         
         # Debug logs as specified in the prompt
         logger.debug("REQUEST %s params=%s files=%s", up.request.url, up.request.body, up.request.files if hasattr(up.request,'files') else None)
         logger.debug("RESPONSE %s %s", up.status_code, up.text)
         
         up.raise_for_status()
+        self._invalidate_cache(f"/{page_id}/videos")
         return up.json()["id"]
     
+    def _upload_photo_once(self, page_id: str, photo_path: str, page_token: Optional[str]) -> tuple:
+        """
+        Upload an unpublished photo to a page unless identical content already was
+        
+        Args:
+            page_id: ID of the Facebook page
+            photo_path: Path to the photo file
+            page_token: Page-specific access token
+            
+        Returns:
+            Tuple of (media_fbid, content hash, True if taken from the registry)
+        """
+        blob = self.media.load(photo_path)
+        media_fbid = self.media.get_uploaded(page_id, blob.sha256, "media_fbid")
+        if media_fbid:
+            logger.info(f"Reusing media {media_fbid} for {blob.filename} on page {page_id}")
+            return media_fbid, blob.sha256, True
+        
+        response = self._make_request(
+            "POST",
+            f"/{page_id}/photos",
+            params={"published": "false"},
+            files={"source": blob.as_upload()},
+            access_token=page_token
+        )
+        self.media.remember(page_id, blob.sha256, "media_fbid", response["id"])
+        return response["id"], blob.sha256, False
+    
+    def _publish_feed_with_media(self, page_id: str, message: str, photo_paths: List[str],
+                                 page_token: Optional[str], **extra) -> str:
+        """
+        Publish a post with attached photos, uploading each content once per page
+        
+        If Facebook rejects media IDs taken from the registry, they are
+        forgotten and the photos are uploaded again once.
+        
+        Args:
+            page_id: ID of the Facebook page
+            message: Post message text
+            photo_paths: List of photo file paths
+            page_token: Page-specific access token
+            **extra: Additional feed parameters (like link)
+            
+        Returns:
+            Post ID
+        """
+        uploads = [self._upload_photo_once(page_id, path, page_token) for path in photo_paths]
+        attached_media = json.dumps([{"media_fbid": media_fbid} for media_fbid, _, _ in uploads])
+        try:
+            return self._publish_feed(page_id, message, attached_media=attached_media,
+                                      access_token=page_token, **extra)
+        except requests.HTTPError:
+            reused = [sha256 for _, sha256, cached in uploads if cached]
+            if not reused:
+                raise
+            logger.warning(f"Cached media rejected by page {page_id}, uploading again")
+            for sha256 in reused:
+                self.media.forget(page_id, sha256)
+            return self._publish_feed_with_media(page_id, message, photo_paths, page_token, **extra)
+    
     def get_recent_posts(self, page_id: str, limit: int = 10) -> List[Dict]:
         """
         Return last *limit* posts with id, message, created_time
         
         Args:
             page_id: ID of the Facebook page
-            limit: Number of posts to retrieve
+            limit: Number of posts to retrieve (more than one Graph page is followed)
             
         Returns:
             List of post objects with id, message, created_time fields
         """
-        params = {
-            "fields": "id,message,created_time",
-            "limit": str(limit),
-            "access_token": self._get_page_token(page_id)
-        }
+        return list(self.iter_posts(page_id, edge="feed", fields="id,message,created_time", max_items=limit))
+    
+    def iter_posts(self, page_id: str, edge: str = "posts", fields: str = "id,message,created_time",
+                   since: Optional[Union[str, int]] = None, until: Optional[Union[str, int]] = None,
+                   max_items: Optional[int] = None, page_size: int = 100,
+                   page_access_token: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield the posts of a page, following paging.next lazily
         
-        response = self._make_request(
-            "GET",
-            f"/{page_id}/feed",
-            params=params
-        )
+        The next Graph page is only requested once the caller has consumed
+        the current one, so stopping early (or max_items) saves requests.
         
-        return response.get("data", [])
+        Args:
+            page_id: ID of the Facebook page
+            edge: Page edge (posts, feed, published_posts)
+            fields: Post fields (e.g. with insights.metric(...))
+            since: Only posts created after this time (date string or Unix timestamp)
+            until: Only posts created before this time
+            max_items: Maximum number of posts yielded (all if not provided)
+            page_size: Posts per Graph request
+            page_access_token: Page-specific access token (looked up if not provided)
+            
+        Yields:
+            Post objects, newest first
+        """
+        params = {"fields": fields, "limit": min(page_size, max_items) if max_items else page_size}
+        if since is not None:
+            params["since"] = since
+        if until is not None:
+            params["until"] = until
+        token = page_access_token or self._get_page_token(page_id)
+        
+        yielded = 0
+        while True:
+            response = self._make_request("GET", f"/{page_id}/{edge}", params=dict(params), access_token=token)
+            posts = response.get("data", [])
+            for post in posts:
+                yield post
+                yielded += 1
+                if max_items and yielded >= max_items:
+                    return
+            
+            # Cursor (after) or time-based (until, __paging_token) pagination
+            next_url = response.get("paging", {}).get("next")
+            if not posts or not next_url:
+                return
+            params = {key: value for key, value in parse_qsl(urlsplit(next_url).query) if key != "access_token"}
+    
+    def get_recent_posts_for_pages(self, page_ids: List[str], limit: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Return the last *limit* posts of several pages using batch requests
+        
+        Args:
+            page_ids: List of Facebook page IDs
+            limit: Number of posts to retrieve per page
+            
+        Returns:
+            Dictionary with page_id as key and list of posts as value
+            (empty list for pages whose request failed)
+        """
+        page_tokens = self._get_page_tokens()
+        batch = self.batch()
+        operations = {
+            page_id: batch.add(
+                "GET",
+                f"/{page_id}/feed",
+                params={"fields": "id,message,created_time", "limit": str(limit)},
+                access_token=page_tokens.get(page_id) or self.access_token
+            )
+            for page_id in dict.fromkeys(page_ids)
+        }
+        batch.execute()
+        
+        posts = {}
+        for page_id, operation in operations.items():
+            if operation.ok:
+                posts[page_id] = (operation.data or {}).get("data", [])
+            else:
+                logger.error(f"Failed to get recent posts for page {page_id}: {operation.error}")
+                posts[page_id] = []
+        return posts
 
 
     # --- Multi-Page Publishing Methods (v3.0.0) -------------------------
     
     def publish_to_multiple_pages(self, page_ids: List[str], message: str, 
                                  media_paths: Optional[List[str]] = None,
-                                 link: Optional[str] = None) -> Dict[str, Dict]:
+                                 link: Optional[str] = None,
+                                 use_batch: bool = True) -> Dict[str, Dict]:
         """
         Publish a post to multiple Facebook pages simultaneously
         
+        Text/link posts are sent as Graph API batch requests (50 pages per
+        call); posts with media are fanned out concurrently per page.
+        
         Args:
             page_ids: List of Facebook page IDs
             message: Post message text
             media_paths: Optional list of media file paths (images/videos)
             link: Optional link to include
+            use_batch: Use batch requests for text/link posts
             
         Returns:
-            Dictionary with page_id as key and API response as value
+            Dictionary with page_id as key and API response as value,
+            in the order of page_ids, each with a "duration_ms" timing
         """
+        # Resolve all page tokens up front, not one lookup per page
+        page_tokens = self._resolve_page_tokens(page_ids)
+        
+        if use_batch and not media_paths:
+            return self._publish_batch(page_ids, message, link, page_tokens)
+        
+        def publish_one(page_id: str) -> Dict:
+            logger.info(f"Publishing to page {page_id}")
+            return self._publish_to_page(page_id, message, media_paths, link, page_tokens[page_id])
+        
+        fanout = get_fanout_executor(self.app_id).run(publish_one, page_ids)
+        
         results = {}
+        for page_id, outcome in fanout.items():
+            if outcome["error"] is None:
+                results[page_id] = {
+                    "success": True,
+                    "data": outcome["result"],
+                    "message": "Post published successfully",
+                    "duration_ms": outcome["duration_ms"]
+                }
+                logger.info(f"Successfully published to page {page_id}")
+            else:
+                logger.error(f"Failed to publish to page {page_id}: {str(outcome['error'])}")
+                results[page_id] = {
+                    "success": False,
+                    "error": str(outcome["error"]),
+                    "message": f"Failed to publish to page {page_id}",
+                    "duration_ms": outcome["duration_ms"]
+                }
         
-        for page_id in page_ids:
-            try:
-                logger.info(f"Publishing to page {page_id}")
-                
-                # Get page-specific access token
-                page_token = self._get_page_token(page_id)
-                
-                if media_paths:
-                    # Upload media first, then publish with media
-                    media_ids = []
-                    for media_path in media_paths:
-                        if self._is_video_file(media_path):
-                            media_response = self.upload_video(page_id, media_path, 
-                                                             description=message, 
-                                                             page_access_token=page_token)
-                        else:
-                            media_response = self.upload_photo(page_id, media_path, 
-                                                             caption=message, 
-                                                             published=False,
-                                                             page_access_token=page_token)
-                        
-                        if "id" in media_response:
-                            media_ids.append(media_response["id"])
-                    
-                    # Publish post with attached media
-                    if media_ids:
-                        result = self.publish_post_with_photos(page_id, message, media_ids, 
-                                                             page_access_token=page_token)
-                    else:
-                        # Fallback to text post if media upload failed
-                        result = self.publish_post(page_id, message, link, 
-                                                 page_access_token=page_token)
-                else:
-                    # Publish text/link post
-                    result = self.publish_post(page_id, message, link, 
-                                             page_access_token=page_token)
-                
+        return results
+    
+    def _publish_batch(self, page_ids: List[str], message: str, link: Optional[str],
+                       page_tokens: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Publish a text/link post to several pages with batch requests
+        
+        Args:
+            page_ids: List of Facebook page IDs
+            message: Post message text
+            link: Optional link to include
+            page_tokens: Access token of every page (see _resolve_page_tokens)
+            
+        Returns:
+            Dictionary with page_id as key, same shape as publish_to_multiple_pages
+        """
+        post_data = {"message": message}
+        if link:
+            post_data["link"] = link
+        
+        batch = self.batch()
+        operations = {
+            page_id: batch.add("POST", f"/{page_id}/feed", data=post_data, access_token=page_tokens[page_id])
+            for page_id in dict.fromkeys(page_ids)
+        }
+        batch.execute()
+        
+        results = {}
+        for page_id, operation in operations.items():
+            if operation.ok:
+                self._invalidate_cache(f"/{page_id}/feed")
                 results[page_id] = {
                     "success": True,
-                    "data": result,
-                    "message": "Post published successfully"
+                    "data": operation.data,
+                    "message": "Post published successfully",
+                    "duration_ms": operation.duration_ms
                 }
-                
                 logger.info(f"Successfully published to page {page_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to publish to page {page_id}: {str(e)}")
+            else:
+                logger.error(f"Failed to publish to page {page_id}: {str(operation.error)}")
                 results[page_id] = {
                     "success": False,
-                    "error": str(e),
-                    "message": f"Failed to publish to page {page_id}"
+                    "error": str(operation.error),
+                    "message": f"Failed to publish to page {page_id}",
+                    "duration_ms": operation.duration_ms
                 }
         
         return results
     
+    def _publish_to_page(self, page_id: str, message: str, media_paths: Optional[List[str]],
+                         link: Optional[str], page_token: Optional[str]) -> Dict:
+        """
+        Publish a single post (with optional media) to one page
+        
+        Args:
+            page_id: ID of the Facebook page
+            message: Post message text
+            media_paths: Optional list of media file paths (images/videos)
+            link: Optional link to include
+            page_token: Page-specific access token
+            
+        Returns:
+            API response with post ID
+        """
+        if not media_paths:
+            # Publish text/link post
+            return self.publish_post(page_id, message, link, page_access_token=page_token)
+        
+        # Videos are posted on their own, photos are attached to one feed post
+        photo_paths = [path for path in media_paths if not self._is_video_file(path)]
+        video_ids = []
+        for media_path in media_paths:
+            if self._is_video_file(media_path):
+                media_response = self.upload_video(page_id, media_path, 
+                                                 description=message, 
+                                                 page_access_token=page_token)
+                if "id" in media_response:
+                    video_ids.append(media_response["id"])
+        
+        if photo_paths:
+            extra = {"link": link} if link else {}
+            post_id = self._publish_feed_with_media(page_id, message, photo_paths, page_token, **extra)
+            return {"id": post_id}
+        
+        if not video_ids:
+            # Fallback to text post if media upload failed
+            return self.publish_post(page_id, message, link, page_access_token=page_token)
+        
+        return {"id": video_ids[0]}
+    
     def upload_video(self, page_id: str, video_path: str, title: Optional[str] = None,
                     description: Optional[str] = None, page_access_token: Optional[str] = None) -> Dict:
         """
@@ -752,9 +1097,16 @@ class FacebookAPI:
             description: Optional video description
             page_access_token: Page-specific access token
             
+        Large videos (FACEBOOK_VIDEO_CHUNKED_THRESHOLD) are sent with the
+        resumable chunked upload protocol.
+            
         Returns:
             API response with video ID
         """
+        if os.path.getsize(video_path) >= self._video_chunked_threshold():
+            return self.video_uploader().upload(page_id, video_path, title=title, description=description,
+                                                page_access_token=page_access_token)
+        
         params = {}
         if title:
             params["title"] = title
@@ -771,6 +1123,21 @@ class FacebookAPI:
                 access_token=page_access_token
             )
     
+    def video_uploader(self):
+        """
+        Get a resumable chunked video uploader
+        
+        Returns:
+            ResumableVideoUploader sending its requests through this instance
+        """
+        from video_upload import ResumableVideoUploader  # Imported here to avoid a circular import
+        return ResumableVideoUploader(self)
+    
+    def _video_chunked_threshold(self) -> int:
+        """File size from which videos use the resumable upload protocol"""
+        from video_upload import get_chunked_threshold
+        return get_chunked_threshold()
+    
     def _is_video_file(self, file_path: str) -> bool:
         """
         Check if a file is a video based on its extension
@@ -973,6 +1340,48 @@ class FacebookAPI:
             logger.error(f"Error getting saved audiences: {str(e)}")
             return []
     
+    def search_interests(self, queries: List[str], limit: int = 25,
+                         locale: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Search targeting interests (GET /search?type=adinterest) for several queries
+        
+        One query is sent as a plain GET, several as one batch request.
+        
+        Args:
+            queries: Search texts
+            limit: Maximum interests per query
+            locale: Locale of the interest names (e.g. fr_FR)
+            
+        Returns:
+            Dictionary with query as key and list of interests (id, name,
+            audience_size_upper_bound, path, topic) as value; queries whose
+            request failed are left out
+        """
+        queries = list(dict.fromkeys(queries))
+        params = {"type": "adinterest", "limit": str(limit)}
+        if locale:
+            params["locale"] = locale
+        
+        if len(queries) == 1:
+            try:
+                response = self._make_request("GET", "/search", params=dict(params, q=queries[0]))
+            except FacebookAPIError as e:
+                logger.error(f"Failed to search interests for {queries[0]!r}: {e.message}")
+                return {}
+            return {queries[0]: response.get("data", [])}
+        
+        batch = self.batch()
+        operations = {query: batch.add("GET", "/search", params=dict(params, q=query)) for query in queries}
+        batch.execute()
+        
+        results = {}
+        for query, operation in operations.items():
+            if operation.ok:
+                results[query] = (operation.data or {}).get("data", [])
+            else:
+                logger.error(f"Failed to search interests for {query!r}: {operation.error}")
+        return results
+    
     def get_ad_accounts(self) -> List[Dict]:
         """
         Get all ad accounts accessible by the user
@@ -1191,30 +1600,39 @@ class FacebookAPI:
             API response with image hash
         """
         try:
-            with open(image_path, 'rb') as image_file:
-                files = {'filename': image_file}
-                data = {'access_token': self.access_token}
-                
-                response = requests.post(
-                    f"{self.base_url}/act_{ad_account_id}/adimages",
-                    files=files,
-                    data=data
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'images' in result:
-                        image_hash = list(result['images'].keys())[0]
-                        return {
-                            'success': True,
-                            'image_hash': image_hash
-                        }
-                
+            blob = self.media.load(image_path)
+            target = f"act_{ad_account_id}"
+            image_hash = self.media.get_uploaded(target, blob.sha256, "image_hash")
+            if image_hash:
                 return {
-                    'success': False,
-                    'error': 'Failed to upload image'
+                    'success': True,
+                    'image_hash': image_hash
                 }
-                
+            
+            files = {'filename': blob.as_upload()}
+            data = {'access_token': self.access_token}
+            
+            response = self.http.post(
+                f"{self.BASE_URL}/act_{ad_account_id}/adimages",
+                files=files,
+                data=data
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                if 'images' in result:
+                    image_hash = list(result['images'].values())[0]['hash']
+                    self.media.remember(target, blob.sha256, "image_hash", image_hash)
+                    return {
+                        'success': True,
+                        'image_hash': image_hash
+                    }
+            
+            return {
+                'success': False,
+                'error': 'Failed to upload image'
+            }
+            
         except Exception as e:
             logger.error(f"Error uploading image: {str(e)}")
             return {
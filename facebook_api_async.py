@@ -0,0 +1,674 @@
+"""
+Async Facebook API Client
+
+This module provides AsyncFacebookAPI, an asyncio variant of FacebookAPI
+built on httpx. Calls are non-blocking and share one pooled async HTTP
+client, so a single process can keep hundreds of Graph API calls in flight
+(multi-page publishing, per-page analytics crawls) without pinning a thread
+per call. Outgoing calls go through the same rate-limit governor as the
+blocking client.
+
+Blocking code (Flask routes) drives the client through `api.sync`, which
+runs each coroutine on a shared background event loop:
+
+    api = AsyncFacebookAPI(access_token=token)
+    results = api.sync.publish_to_multiple_pages(page_ids, "Hello")
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import functools
+import weakref
+from typing import Any, Coroutine, Dict, List, Optional
+
+import httpx
+
+from facebook_api import FacebookAPI, FacebookAPIError
+from fanout import DEFAULT_MAX_IN_FLIGHT, _env_int
+from graph_session import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_MAXSIZE, DEFAULT_READ_TIMEOUT,
+                           _env_number)
+from page_tokens import DEFAULT_MISS_REFRESH_INTERVAL, DEFAULT_TTL as DEFAULT_PAGE_TOKEN_TTL
+from rate_limit import RateLimitExceeded, RateLimitGovernor, get_rate_governor
+
+logger = logging.getLogger("facebook_api.async")
+
+
+# Background event loop used by the sync wrappers
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get or start the shared background event loop"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="facebook-api-async", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the background event loop and wait for its result
+
+    Args:
+        coro: Coroutine to run
+        timeout: Maximum seconds to wait (no limit if not provided)
+
+    Returns:
+        Result of the coroutine
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    return future.result(timeout)
+
+
+class _SyncProxy:
+    """Blocking view of an AsyncFacebookAPI, coroutine methods run via run_sync"""
+
+    def __init__(self, api: "AsyncFacebookAPI"):
+        self._api = api
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._api, name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def wrapper(*args, **kwargs):
+            return run_sync(attribute(*args, **kwargs))
+        return wrapper
+
+
+class AsyncFacebookAPI:
+    """
+    Async Facebook API wrapper for Graph API and Marketing API
+
+    Handles:
+    - Non-blocking API calls with error handling and retries
+    - One pooled httpx.AsyncClient per event loop
+    - Rate-limit pacing shared with the blocking client
+    - Concurrent multi-page publishing
+    - Page tokens memoized per client, refreshed for unknown pages
+    - Blocking wrappers through the `sync` property
+    """
+
+    BASE_URL = FacebookAPI.BASE_URL
+
+    def __init__(self, app_id: Optional[str] = None, app_secret: Optional[str] = None,
+                 access_token: Optional[str] = None, governor: Optional[RateLimitGovernor] = None,
+                 max_connections: Optional[int] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the async Facebook API wrapper
+
+        Args:
+            app_id: Facebook App ID (from .env if not provided)
+            app_secret: Facebook App Secret (from .env if not provided)
+            access_token: Access token
+            governor: Rate-limit governor (process-wide governor if not provided)
+            max_connections: Maximum pooled connections (FACEBOOK_HTTP_POOL_MAXSIZE if not provided)
+            transport: Optional httpx transport (used by tests)
+        """
+        self.access_token = access_token
+        self.app_id = app_id or os.getenv("FACEBOOK_APP_ID") or os.getenv("APP_ID")
+        self.app_secret = app_secret or os.getenv("FACEBOOK_APP_SECRET") or os.getenv("APP_SECRET")
+        self.governor = governor or get_rate_governor()
+        self.max_connections = max_connections or int(
+            _env_number("FACEBOOK_HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE, int))
+        self.timeout = httpx.Timeout(
+            _env_number("FACEBOOK_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT, float),
+            connect=_env_number("FACEBOOK_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT, float))
+        self.transport = transport
+
+        if not self.access_token or not self.app_id or not self.app_secret:
+            logger.error("Missing FACEBOOK_ACCESS_TOKEN, FACEBOOK_APP_ID or FACEBOOK_APP_SECRET in environment variables")
+            raise ValueError("Missing FACEBOOK_ACCESS_TOKEN, FACEBOOK_APP_ID or FACEBOOK_APP_SECRET in environment variables")
+
+        # An AsyncClient is bound to the loop it was first used on
+        self._clients = weakref.WeakKeyDictionary()
+
+        # Page tokens of the user, fetched once per TTL (one refresh in flight per loop)
+        self.page_token_ttl = DEFAULT_PAGE_TOKEN_TTL
+        self.miss_refresh_interval = DEFAULT_MISS_REFRESH_INTERVAL
+        self._page_tokens: Dict[str, str] = {}
+        self._page_tokens_fetched_at: Optional[float] = None
+        self._token_refreshes = weakref.WeakKeyDictionary()
+
+        logger.info("AsyncFacebookAPI initialized")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport
+            )
+            self._clients[loop] = client
+        return client
+
+    @property
+    def sync(self) -> _SyncProxy:
+        """Blocking wrappers: api.sync.<method>(...) runs on the background loop"""
+        return _SyncProxy(self)
+
+    async def aclose(self):
+        """Close the HTTP client of the running event loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                            data: Optional[Dict] = None, files: Optional[Dict] = None,
+                            access_token: Optional[str] = None, max_retries: int = 3) -> Dict:
+        """
+        Make a request to the Facebook API with retry logic
+
+        Args:
+            method: HTTP method (GET, POST, DELETE)
+            endpoint: API endpoint (without base URL)
+            params: URL parameters
+            data: POST data
+            files: Files to upload
+            access_token: Override default access token
+            max_retries: Maximum number of retries for 5xx errors
+
+        Returns:
+            API response as dictionary
+        """
+        url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
+        token = access_token or self.access_token
+
+        if params is None:
+            params = {}
+        if token:
+            params["access_token"] = token
+
+        if method.upper() not in ("GET", "POST", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        safe_params = {k: v for k, v in params.items() if k != "access_token"}
+        logger.info(f"API Request: {method} {url} - Params: {safe_params}")
+
+        scopes = self.governor.scopes_for_url(url)
+        retry_count = 0
+        while True:
+            try:
+                await self.governor.acquire_async(scopes)
+                response = await self.client.request(method.upper(), url, params=params,
+                                                     data=data, files=files)
+                self.governor.observe(response, scopes)
+
+                logger.info(f"API Response: {response.status_code}")
+                response_data = response.json()
+
+                if isinstance(response_data, dict) and "error" in response_data:
+                    error = response_data["error"]
+                    error_msg = error.get("message", "Unknown Facebook API error")
+                    error_code = error.get("code")
+                    error_subcode = error.get("error_subcode")
+                    logger.error(f"Facebook API error: {error_msg} (Code: {error_code}, Subcode: {error_subcode})")
+
+                    if 500 <= response.status_code < 600 and retry_count < max_retries:
+                        retry_count += 1
+                        wait_time = 2 ** retry_count
+                        logger.info(f"Retrying in {wait_time} seconds... (Attempt {retry_count}/{max_retries})")
+                        await asyncio.sleep(wait_time)
+                        continue
+
+                    raise FacebookAPIError(error_msg, error_code, error_subcode)
+
+                return response_data
+
+            except RateLimitExceeded as e:
+                raise FacebookAPIError(str(e), 4)
+            except httpx.HTTPError as e:
+                logger.error(f"Request error: {str(e)}")
+
+                if retry_count < max_retries:
+                    retry_count += 1
+                    wait_time = 2 ** retry_count
+                    logger.info(f"Retrying in {wait_time} seconds... (Attempt {retry_count}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                raise FacebookAPIError(f"Request failed: {str(e)}")
+
+    @staticmethod
+    async def _read_file(path: str):
+        """Read a file off the event loop, as an httpx upload tuple"""
+        def read():
+            with open(path, "rb") as f:
+                return f.read()
+        return (os.path.basename(path), await asyncio.to_thread(read))
+
+    def _is_video_file(self, file_path: str) -> bool:
+        """Check if a file is a video based on its extension"""
+        video_extensions = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv']
+        return any(file_path.lower().endswith(ext) for ext in video_extensions)
+
+    # Graph API Methods
+
+    async def get_user_pages(self) -> List[Dict]:
+        """
+        Get the first page of pages managed by the user
+
+        Returns:
+            List of page objects with id, name, access_token
+        """
+        response = await self._make_request("GET", "/me/accounts", params={"fields": "name,access_token"})
+        return response.get("data", [])
+
+    async def get_all_pages(self, fields: str = "id,name,category,fan_count,access_token,picture") -> List[Dict]:
+        """
+        Get all pages managed by the user, following pagination
+
+        Args:
+            fields: Page fields to request
+
+        Returns:
+            List of page objects
+        """
+        pages = []
+        params = {"fields": fields, "limit": 100}
+        while True:
+            response = await self._make_request("GET", "/me/accounts", params=params)
+            pages.extend(response.get("data", []))
+            after = response.get("paging", {}).get("cursors", {}).get("after")
+            if not after or not response.get("paging", {}).get("next"):
+                return pages
+            params = {"fields": fields, "limit": 100, "after": after}
+
+    async def _fetch_page_tokens(self) -> Dict[str, str]:
+        """Fetch every page token with /me/accounts and memoize them"""
+        try:
+            tokens = {page["id"]: page.get("access_token")
+                      for page in await self.get_all_pages("id,access_token") if "id" in page}
+        except Exception as e:
+            logger.warning(f"Could not prefetch page tokens: {e}")
+            return dict(self._page_tokens)
+        self._page_tokens = tokens
+        self._page_tokens_fetched_at = time.monotonic()
+        logger.info(f"Fetched {len(tokens)} page tokens")
+        return dict(tokens)
+
+    async def _get_page_tokens(self, refresh: bool = False) -> Dict[str, str]:
+        """
+        Get the access tokens of all pages managed by the user
+
+        Tokens are fetched once per page_token_ttl; concurrent callers on
+        the same event loop share one fetch.
+
+        Args:
+            refresh: Fetch the tokens again even if they are fresh
+
+        Returns:
+            Dictionary mapping page ID to page access token (empty on error)
+        """
+        fetched_at = self._page_tokens_fetched_at
+        if not refresh and fetched_at is not None and time.monotonic() - fetched_at < self.page_token_ttl:
+            return dict(self._page_tokens)
+
+        loop = asyncio.get_running_loop()
+        task = self._token_refreshes.get(loop)
+        if task is None or task.done():
+            task = self._token_refreshes[loop] = loop.create_task(self._fetch_page_tokens())
+        return await task
+
+    async def _get_page_token(self, page_id: str) -> Optional[str]:
+        """
+        Get the access token for a specific page
+
+        An unknown page refreshes the tokens, at most once per
+        miss_refresh_interval (the page may have been added since).
+
+        Args:
+            page_id: ID of the Facebook page
+
+        Returns:
+            Page access token, or the user token if not found
+        """
+        page_token = (await self._get_page_tokens()).get(page_id)
+        if not page_token and time.monotonic() - (self._page_tokens_fetched_at or 0) >= self.miss_refresh_interval:
+            page_token = (await self._get_page_tokens(refresh=True)).get(page_id)
+        if page_token:
+            return page_token
+        logger.warning(f"Falling back to user token for page {page_id}")
+        return self.access_token
+
+    def invalidate_page_tokens(self):
+        """Drop the memoized page tokens (e.g. after a token was revoked)"""
+        self._page_tokens = {}
+        self._page_tokens_fetched_at = None
+
+    async def publish_post(self, page_id: str, message: str, link: Optional[str] = None,
+                           page_access_token: Optional[str] = None) -> Dict:
+        """
+        Publish a text/link post to a Facebook page
+
+        Args:
+            page_id: ID of the Facebook page
+            message: Post message text
+            link: Optional link to include
+            page_access_token: Page-specific access token
+
+        Returns:
+            API response with post ID
+        """
+        data = {"message": message}
+        if link:
+            data["link"] = link
+        return await self._make_request("POST", f"/{page_id}/feed", data=data,
+                                        access_token=page_access_token)
+
+    async def upload_photo(self, page_id: str, photo_path: str, caption: Optional[str] = None,
+                           published: bool = False, page_access_token: Optional[str] = None) -> Dict:
+        """
+        Upload a photo to a Facebook page
+
+        Args:
+            page_id: ID of the Facebook page
+            photo_path: Path to the photo file
+            caption: Optional photo caption
+            published: Whether to publish immediately (default: False)
+            page_access_token: Page-specific access token
+
+        Returns:
+            API response with photo ID
+        """
+        params = {"published": "true" if published else "false"}
+        if caption:
+            params["caption"] = caption
+        files = {"source": await self._read_file(photo_path)}
+        return await self._make_request("POST", f"/{page_id}/photos", params=params, files=files,
+                                        access_token=page_access_token)
+
+    async def upload_video(self, page_id: str, video_path: str, title: Optional[str] = None,
+                           description: Optional[str] = None, page_access_token: Optional[str] = None) -> Dict:
+        """
+        Upload a video to a Facebook page
+
+        Args:
+            page_id: ID of the Facebook page
+            video_path: Path to the video file
+            title: Optional video title
+            description: Optional video description
+            page_access_token: Page-specific access token
+
+        Returns:
+            API response with video ID
+        """
+        params = {}
+        if title:
+            params["title"] = title
+        if description:
+            params["description"] = description
+        files = {"source": await self._read_file(video_path)}
+        return await self._make_request("POST", f"/{page_id}/videos", params=params, files=files,
+                                        access_token=page_access_token)
+
+    async def get_page_insights(self, page_id: str, since: int, until: int,
+                                page_access_token: Optional[str] = None) -> Dict:
+        """
+        Get insights for a Facebook page
+
+        Args:
+            page_id: ID of the Facebook page
+            since: Start timestamp (Unix timestamp)
+            until: End timestamp (Unix timestamp)
+            page_access_token: Page-specific access token
+
+        Returns:
+            API response with insights data
+        """
+        params = {
+            "metric": "page_impressions,page_engaged_users",
+            "since": str(since),
+            "until": str(until)
+        }
+        return await self._make_request("GET", f"/{page_id}/insights", params=params,
+                                        access_token=page_access_token or await self._get_page_token(page_id))
+
+    async def get_post_insights(self, post_id: str, page_access_token: Optional[str] = None) -> Dict:
+        """
+        Get insights for a specific post
+
+        Args:
+            post_id: ID of the post
+            page_access_token: Page-specific access token
+
+        Returns:
+            API response with insights data
+        """
+        params = {"metric": "post_impressions,post_engaged_users,post_reactions_by_type_total"}
+        return await self._make_request("GET", f"/{post_id}/insights", params=params,
+                                        access_token=page_access_token)
+
+    async def get_recent_posts(self, page_id: str, limit: int = 10,
+                               page_access_token: Optional[str] = None) -> List[Dict]:
+        """
+        Return last *limit* posts with id, message, created_time
+
+        Args:
+            page_id: ID of the Facebook page
+            limit: Number of posts to retrieve
+            page_access_token: Page-specific access token
+
+        Returns:
+            List of post objects
+        """
+        response = await self._make_request(
+            "GET", f"/{page_id}/feed",
+            params={"fields": "id,message,created_time", "limit": str(limit)},
+            access_token=page_access_token or await self._get_page_token(page_id)
+        )
+        return response.get("data", [])
+
+    async def get_ad_accounts(self) -> List[Dict]:
+        """
+        Return a list of ad accounts with id & name
+
+        Returns:
+            List of ad account objects with id and name
+        """
+        response = await self._make_request("GET", "/me/adaccounts", params={"fields": "id,name"})
+        return response.get("data", [])
+
+    # --- Multi-Page Methods ---------------------------------------------
+
+    async def _publish_to_page(self, page_id: str, message: str, media_paths: Optional[List[str]],
+                               link: Optional[str], page_token: Optional[str]) -> Dict:
+        """
+        Publish a single post (with optional media) to one page
+
+        Returns:
+            API response with post ID
+        """
+        if not media_paths:
+            return await self.publish_post(page_id, message, link, page_access_token=page_token)
+
+        media_ids = []
+        for media_path in media_paths:
+            if self._is_video_file(media_path):
+                media_response = await self.upload_video(page_id, media_path, description=message,
+                                                         page_access_token=page_token)
+            else:
+                media_response = await self.upload_photo(page_id, media_path, caption=message,
+                                                         published=False, page_access_token=page_token)
+            if "id" in media_response:
+                media_ids.append(media_response["id"])
+
+        if not media_ids:
+            return await self.publish_post(page_id, message, link, page_access_token=page_token)
+
+        attached_media = [{"media_fbid": media_id} for media_id in media_ids]
+        return await self._make_request("POST", f"/{page_id}/feed",
+                                        data={"message": message, "attached_media": json.dumps(attached_media)},
+                                        access_token=page_token)
+
+    async def publish_to_multiple_pages(self, page_ids: List[str], message: str,
+                                        media_paths: Optional[List[str]] = None,
+                                        link: Optional[str] = None,
+                                        max_in_flight: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Publish a post to multiple Facebook pages concurrently
+
+        Args:
+            page_ids: List of Facebook page IDs
+            message: Post message text
+            media_paths: Optional list of media file paths (images/videos)
+            link: Optional link to include
+            max_in_flight: Maximum concurrent pages (FACEBOOK_FANOUT_MAX_IN_FLIGHT if not provided)
+
+        Returns:
+            Dictionary with page_id as key and result as value, in the
+            order of page_ids, each with a "duration_ms" timing (same shape
+            as FacebookAPI.publish_to_multiple_pages)
+        """
+        page_tokens = await self._get_page_tokens()
+        semaphore = asyncio.Semaphore(max_in_flight or _env_int("FACEBOOK_FANOUT_MAX_IN_FLIGHT",
+                                                                DEFAULT_MAX_IN_FLIGHT))
+
+        async def publish_one(page_id: str) -> Dict:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    data = await self._publish_to_page(page_id, message, media_paths, link,
+                                                       page_tokens.get(page_id) or self.access_token)
+                    logger.info(f"Successfully published to page {page_id}")
+                    return {
+                        "success": True,
+                        "data": data,
+                        "message": "Post published successfully",
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+                    }
+                except Exception as e:
+                    logger.error(f"Failed to publish to page {page_id}: {str(e)}")
+                    return {
+                        "success": False,
+                        "error": str(e),
+                        "message": f"Failed to publish to page {page_id}",
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+                    }
+
+        unique_ids = list(dict.fromkeys(page_ids))
+        outcomes = await asyncio.gather(*(publish_one(page_id) for page_id in unique_ids))
+        return dict(zip(unique_ids, outcomes))
+
+    async def get_page_insights_for_pages(self, page_ids: List[str], since: int, until: int,
+                                          max_in_flight: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Get insights of several pages concurrently
+
+        Args:
+            page_ids: List of Facebook page IDs
+            since: Start timestamp (Unix timestamp)
+            until: End timestamp (Unix timestamp)
+            max_in_flight: Maximum concurrent pages (FACEBOOK_FANOUT_MAX_IN_FLIGHT if not provided)
+
+        Returns:
+            Dictionary with page_id as key and insights response as value
+            ({"error": message} for pages whose request failed)
+        """
+        page_tokens = await self._get_page_tokens()
+        semaphore = asyncio.Semaphore(max_in_flight or _env_int("FACEBOOK_FANOUT_MAX_IN_FLIGHT",
+                                                                DEFAULT_MAX_IN_FLIGHT))
+
+        async def fetch_one(page_id: str) -> Dict:
+            async with semaphore:
+                try:
+                    return await self.get_page_insights(page_id, since, until,
+                                                        page_tokens.get(page_id) or self.access_token)
+                except FacebookAPIError as e:
+                    logger.error(f"Failed to get insights for page {page_id}: {e.message}")
+                    return {"error": e.message}
+
+        unique_ids = list(dict.fromkeys(page_ids))
+        return dict(zip(unique_ids, await asyncio.gather(*(fetch_one(page_id) for page_id in unique_ids))))
+
+    # --- Marketing API Methods ------------------------------------------
+
+    async def create_boosted_post_ad(self, ad_account_id: str, page_id: str, post_id: str,
+                                     targeting: dict, budget: int, start_date: str, end_date: str) -> dict:
+        """
+        Create a boosted post ad campaign
+
+        The campaign and the creative do not depend on each other and are
+        created concurrently; the ad set and the ad follow.
+
+        Args:
+            ad_account_id: Facebook Ad Account ID
+            page_id: Facebook Page ID
+            post_id: Post ID to boost
+            targeting: Targeting dictionary
+            budget: Daily budget in euros
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+
+        Returns:
+            Dictionary with campaign, adset, and ad IDs
+        """
+        try:
+            campaign_response, creative_response = await asyncio.gather(
+                self._make_request("POST", f"/act_{ad_account_id}/campaigns", data={
+                    'name': f"Boost Post {post_id}",
+                    'objective': 'POST_ENGAGEMENT',
+                    'status': 'ACTIVE'
+                }),
+                self._make_request("POST", f"/act_{ad_account_id}/adcreatives", data={
+                    'name': f"Creative for Post {post_id}",
+                    'object_story_id': f"{page_id}_{post_id}"
+                })
+            )
+            campaign_id = campaign_response.get('id')
+            creative_id = creative_response.get('id')
+
+            adset_response = await self._make_request("POST", f"/act_{ad_account_id}/adsets", data={
+                'name': f"AdSet for Post {post_id}",
+                'campaign_id': campaign_id,
+                'daily_budget': budget * 100,  # Convert to cents
+                'start_time': f"{start_date}T00:00:00+0000",
+                'end_time': f"{end_date}T23:59:59+0000",
+                'targeting': json.dumps(targeting),
+                'status': 'ACTIVE'
+            })
+            adset_id = adset_response.get('id')
+
+            ad_response = await self._make_request("POST", f"/act_{ad_account_id}/ads", data={
+                'name': f"Boost Ad for Post {post_id}",
+                'adset_id': adset_id,
+                'creative': json.dumps({'creative_id': creative_id}),
+                'status': 'ACTIVE'
+            })
+
+            return {
+                'campaign_id': campaign_id,
+                'adset_id': adset_id,
+                'creative_id': creative_id,
+                'ad_id': ad_response.get('id'),
+                'success': True
+            }
+
+        except Exception as e:
+            logger.error(f"Error creating boosted post ad: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
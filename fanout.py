@@ -0,0 +1,182 @@
+"""
+Concurrent Fan-out Executor
+
+This module runs the same Graph API operation against many pages at once
+with bounded concurrency. One executor is shared per Facebook app so the
+total number of in-flight calls for that app stays capped even when several
+HTTP requests fan out at the same time, and a per-page limit keeps a single
+page from receiving too many simultaneous calls.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("facebook_api.fanout")
+
+DEFAULT_MAX_IN_FLIGHT = 8   # Concurrent Graph calls per app
+DEFAULT_MAX_PER_PAGE = 2    # Concurrent Graph calls per page
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default"""
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+class FanoutExecutor:
+    """
+    Bounded-concurrency executor for per-page operations
+
+    Handles:
+    - A fixed-size worker pool (max in-flight calls per app)
+    - Per-key semaphores (max in-flight calls per page)
+    - Result collection in input order with per-key timing
+    - Optional wall-clock deadline with partial results
+
+    Note: functions run by the executor must not fan out through the same
+    executor and wait on it, or they can exhaust the worker pool.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_per_key: Optional[int] = None,
+                 name: str = "default"):
+        """
+        Initialize the executor
+
+        Args:
+            max_in_flight: Maximum concurrent calls across all keys
+            max_per_key: Maximum concurrent calls for a single key (page)
+            name: Name used for worker threads and logs
+        """
+        self.max_in_flight = max_in_flight or _env_int("FACEBOOK_FANOUT_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)
+        self.max_per_key = max_per_key or _env_int("FACEBOOK_FANOUT_MAX_PER_PAGE", DEFAULT_MAX_PER_PAGE)
+        self.name = name
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                        thread_name_prefix=f"fb-fanout-{name}")
+        self._key_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot_for(self, key: str) -> threading.BoundedSemaphore:
+        """Get the semaphore limiting concurrency for a key"""
+        with self._lock:
+            slot = self._key_slots.get(key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_key)
+                self._key_slots[key] = slot
+            return slot
+
+    def _run_one(self, func: Callable[[str], Any], key: str) -> Dict:
+        """Run func(key) under the key's semaphore and time it"""
+        with self._slot_for(key):
+            start = time.perf_counter()
+            try:
+                value = func(key)
+                error = None
+            except Exception as e:
+                value = None
+                error = e
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        return {"result": value, "error": error, "duration_ms": duration_ms}
+
+    def run(self, func: Callable[[str], Any], keys: Iterable[str],
+            timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Run func once per key concurrently
+
+        Args:
+            func: Callable receiving a key (e.g. page ID)
+            keys: Keys to process; duplicates are processed once
+            timeout: Wall-clock budget in seconds (wait for every key if not provided)
+
+        Returns:
+            Dictionary keyed by key, in input order, with "result", "error"
+            (exception or None) and "duration_ms" for each key. Keys not
+            finished within the budget have a TimeoutError, a None duration
+            and "timed_out" set to True.
+        """
+        ordered_keys = list(dict.fromkeys(keys))
+        start = time.perf_counter()
+
+        futures = {key: self._pool.submit(self._run_one, func, key) for key in ordered_keys}
+        if timeout is not None:
+            wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for key in ordered_keys:
+            future = futures[key]
+            if future.done() or timeout is None:
+                results[key] = future.result()
+            else:
+                # Calls not started yet are dropped, running ones finish in the background
+                future.cancel()
+                results[key] = {"result": None, "error": TimeoutError(f"No result within {timeout}s"),
+                                "duration_ms": None, "timed_out": True}
+
+        logger.info(f"Fan-out '{self.name}' completed {len(ordered_keys)} calls in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms "
+                    f"(max_in_flight={self.max_in_flight})")
+        return results
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        self._pool.shutdown(wait=wait)
+
+
+# One executor per Facebook app, shared by every FacebookAPI instance and route
+_executors: Dict[str, FanoutExecutor] = {}
+_executors_lock = threading.Lock()
+
+# Pool of the analytics crawls, whose calls left running past their budget
+# must not hold the workers used for publishing
+ANALYTICS_POOL = "analytics"
+
+
+def get_fanout_executor(app_id: Optional[str] = None, pool: Optional[str] = None) -> FanoutExecutor:
+    """
+    Get or create the shared executor for an app
+
+    Args:
+        app_id: Facebook App ID (a default executor is used when missing)
+        pool: Separate worker pool of the app (e.g. ANALYTICS_POOL), the
+            publishing pool if not provided
+
+    Returns:
+        FanoutExecutor instance
+    """
+    name = app_id or "default"
+    if pool:
+        name = f"{name}-{pool}"
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = FanoutExecutor(name=name)
+            _executors[name] = executor
+        return executor
+
+
+def summarize_timings(results: Dict[str, Dict]) -> Dict:
+    """
+    Build a timing summary from FanoutExecutor.run results
+
+    Args:
+        results: Output of FanoutExecutor.run
+
+    Returns:
+        Dictionary with per-page durations and aggregate figures in ms
+        (timed-out keys have a None duration and are left out of the figures)
+    """
+    durations = {key: item["duration_ms"] for key, item in results.items()}
+    values = [value for value in durations.values() if value is not None]
+    return {
+        "per_page_ms": durations,
+        "max_ms": max(values) if values else 0,
+        "avg_ms": round(sum(values) / len(values), 1) if values else 0
+    }
@@ -0,0 +1,291 @@
+"""
+Graph API Batch Requests
+
+This module provides a builder for Graph API batch calls. Operations are
+queued on a GraphBatch and sent as POST / requests holding up to 50
+sub-requests each, so N independent calls cost ceil(N/50) HTTP round trips.
+Each queued operation gets its own response or error back, and named
+operations can be referenced by later ones through depends_on and JSONPath
+expressions such as {result=create:$.id}.
+"""
+
+import re
+import json
+import time
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from facebook_api import FacebookAPI, FacebookAPIError
+from graph_session import GraphSessionPool, get_session_pool
+from rate_limit import RateLimitExceeded
+
+logger = logging.getLogger("facebook_api.batch")
+
+MAX_BATCH_SIZE = 50  # Graph API limit of sub-requests per batch call
+
+# Characters left unescaped in relative URLs so JSONPath references survive URL encoding
+_SAFE_CHARS = "{}$:=,()"
+_REFERENCE_RE = re.compile(r"\{result=([^:}]+):")
+
+
+class BatchOperation:
+    """
+    A single queued sub-request and, once executed, its outcome
+    """
+
+    def __init__(self, method: str, relative_url: str, body: Optional[str] = None,
+                 name: Optional[str] = None, depends_on: Optional[str] = None,
+                 omit_response_on_success: Optional[bool] = None):
+        self.method = method.upper()
+        self.relative_url = relative_url
+        self.body = body
+        self.name = name
+        self.depends_on = depends_on
+        self.omit_response_on_success = omit_response_on_success
+
+        # Filled in by GraphBatch.add / GraphBatch.execute
+        self.position = 0
+        self.executed = False
+        self.status: Optional[int] = None
+        self.data = None
+        self.error: Optional[FacebookAPIError] = None
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the operation ran and succeeded"""
+        return self.executed and self.error is None
+
+    @property
+    def references(self) -> List[str]:
+        """Names of other operations this one depends on"""
+        names = set(_REFERENCE_RE.findall(self.relative_url))
+        if self.body:
+            names.update(_REFERENCE_RE.findall(self.body))
+        if self.depends_on:
+            names.add(self.depends_on)
+        return sorted(names)
+
+    def to_request(self) -> Dict:
+        """Serialize as an entry of the batch parameter"""
+        entry = {"method": self.method, "relative_url": self.relative_url}
+        if self.body:
+            entry["body"] = self.body
+        if self.name:
+            entry["name"] = self.name
+        if self.depends_on:
+            entry["depends_on"] = self.depends_on
+        if self.omit_response_on_success is not None:
+            entry["omit_response_on_success"] = self.omit_response_on_success
+        return entry
+
+    def result(self):
+        """
+        Get the parsed response body
+
+        Returns:
+            Parsed JSON body of the sub-response
+
+        Raises:
+            FacebookAPIError: If the sub-request failed or was not executed
+        """
+        if not self.executed:
+            raise FacebookAPIError("Batch operation has not been executed")
+        if self.error is not None:
+            raise self.error
+        return self.data
+
+
+class GraphBatch:
+    """
+    Builder for Graph API batch requests
+
+    Handles:
+    - Queuing GET/POST/DELETE operations with per-operation access tokens
+    - Splitting into chunks of 50 without separating dependent operations
+    - Mapping each sub-response or error back to its operation
+    """
+
+    def __init__(self, access_token: str, session_pool: Optional[GraphSessionPool] = None,
+                 base_url: str = FacebookAPI.BASE_URL):
+        """
+        Initialize the batch
+
+        Args:
+            access_token: Fallback token for operations without their own
+            session_pool: HTTP session pool (shared process-wide pool if not provided)
+            base_url: Graph API base URL including version
+        """
+        self.access_token = access_token
+        self.http = session_pool or get_session_pool()
+        self.base_url = base_url
+        self.operations: List[BatchOperation] = []
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def add(self, method: str, endpoint: str, params: Optional[Dict] = None,
+            data: Optional[Dict] = None, access_token: Optional[str] = None,
+            name: Optional[str] = None, depends_on: Optional[str] = None,
+            omit_response_on_success: Optional[bool] = None) -> BatchOperation:
+        """
+        Queue an operation
+
+        Args:
+            method: HTTP method (GET, POST, DELETE)
+            endpoint: API endpoint (without base URL)
+            params: URL parameters (may hold JSONPath references)
+            data: POST body parameters (sent as literal text)
+            access_token: Token for this operation (batch token if not provided)
+            name: Name other operations can reference
+            depends_on: Name of an operation that must run first
+            omit_response_on_success: Drop the response body of a named operation
+
+        Returns:
+            BatchOperation handle holding the outcome after execute()
+        """
+        params = dict(params or {})
+        body_params = dict(data or {})
+        if access_token:
+            if method.upper() == "POST":
+                body_params["access_token"] = access_token
+            else:
+                params["access_token"] = access_token
+
+        relative_url = endpoint.lstrip("/")
+        if params:
+            relative_url = f"{relative_url}?{urlencode(params, safe=_SAFE_CHARS)}"
+        # Bodies carry user text, so braces and dollars there must never read as references
+        body = urlencode(body_params) if body_params else None
+
+        operation = BatchOperation(method, relative_url, body, name, depends_on,
+                                   omit_response_on_success)
+        operation.position = len(self.operations)
+        self.operations.append(operation)
+        return operation
+
+    def _chunks(self) -> List[List[BatchOperation]]:
+        """
+        Split queued operations into chunks of at most MAX_BATCH_SIZE
+
+        Operations linked through names stay in the same chunk, because
+        JSONPath references only resolve within a single batch call.
+        """
+        groups: List[List[BatchOperation]] = []
+        group_of_name: Dict[str, List[BatchOperation]] = {}
+
+        for operation in self.operations:
+            linked = list({id(group_of_name[n]): group_of_name[n]
+                           for n in operation.references if n in group_of_name}.values())
+            if linked:
+                group = linked[0]
+                for other in linked[1:]:
+                    group.extend(other)
+                    groups = [g for g in groups if g is not other]
+                    for op in other:
+                        if op.name:
+                            group_of_name[op.name] = group
+                group.append(operation)
+            else:
+                group = [operation]
+                groups.append(group)
+            if operation.name:
+                group_of_name[operation.name] = group
+
+        chunks: List[List[BatchOperation]] = []
+        current: List[BatchOperation] = []
+        for group in groups:
+            if len(group) > MAX_BATCH_SIZE:
+                raise ValueError(f"Dependent operation group exceeds {MAX_BATCH_SIZE} requests")
+            if len(current) + len(group) > MAX_BATCH_SIZE:
+                chunks.append(current)
+                current = []
+            current.extend(sorted(group, key=lambda op: op.position))
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _send_chunk(self, chunk: List[BatchOperation]):
+        """Send one batch call and record each sub-response"""
+        start = time.perf_counter()
+        payload = {
+            "access_token": self.access_token,
+            "batch": json.dumps([operation.to_request() for operation in chunk]),
+            "include_headers": "false"
+        }
+
+        # Not retried: sub-requests may be non-idempotent (e.g. publishing)
+        try:
+            response = self.http.post(f"{self.base_url}/", data=payload)
+            response_data = response.json()
+        except RateLimitExceeded as e:
+            raise FacebookAPIError(str(e), 4)
+        except (requests.RequestException, ValueError) as e:
+            raise FacebookAPIError(f"Batch request failed: {str(e)}")
+
+        if isinstance(response_data, dict) and "error" in response_data:
+            error = response_data["error"]
+            raise FacebookAPIError(error.get("message", "Unknown Facebook API error"),
+                                   error.get("code"), error.get("error_subcode"))
+
+        if not isinstance(response_data, list):
+            raise FacebookAPIError(f"Unexpected batch response: {str(response_data)[:200]}")
+
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"Batch of {len(chunk)} operations completed in {duration_ms} ms")
+
+        for operation, item in zip(chunk, response_data):
+            operation.executed = True
+            operation.duration_ms = duration_ms
+            self._apply_response(operation, item)
+        for operation in chunk[len(response_data):]:
+            operation.executed = True
+            operation.error = FacebookAPIError("No response for this operation in the batch")
+
+    @staticmethod
+    def _apply_response(operation: BatchOperation, item: Optional[Dict]):
+        """Parse a sub-response into the operation"""
+        if item is None:
+            # Named operations may be omitted on success; otherwise a dependency failed
+            if not operation.omit_response_on_success:
+                operation.error = FacebookAPIError("No response (dependent operation failed)")
+            return
+
+        operation.status = item.get("code")
+        try:
+            body = json.loads(item.get("body") or "null")
+        except ValueError:
+            body = item.get("body")
+
+        if isinstance(body, dict) and "error" in body:
+            error = body["error"]
+            operation.error = FacebookAPIError(error.get("message", "Unknown Facebook API error"),
+                                               error.get("code"), error.get("error_subcode"))
+        elif operation.status is not None and operation.status >= 400:
+            operation.error = FacebookAPIError(f"Batch operation failed with HTTP {operation.status}")
+        else:
+            operation.data = body
+
+    def execute(self) -> List[BatchOperation]:
+        """
+        Send all queued operations
+
+        A failed batch call marks every operation of its chunk with the
+        error; the remaining chunks are still sent.
+
+        Returns:
+            Operations in the order they were added, each holding its
+            response data or error
+        """
+        for chunk in self._chunks():
+            try:
+                self._send_chunk(chunk)
+            except FacebookAPIError as e:
+                logger.error(f"Batch of {len(chunk)} operations failed: {e.message}")
+                for operation in chunk:
+                    operation.executed = True
+                    operation.error = e
+        return self.operations
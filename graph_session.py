@@ -0,0 +1,237 @@
+"""
+Graph API HTTP Session Pool
+
+This module provides a shared, thread-safe pool of keep-alive HTTP
+connections for Graph API and Marketing API calls. Every FacebookAPI
+instance and the Flask routes go through the same pool, so repeated calls
+to graph.facebook.com reuse open TCP/TLS connections instead of paying a
+new handshake on every request.
+
+Calls to graph.facebook.com are paced by the rate-limit governor, which
+also reads the usage headers of every response.
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import RateLimitGovernor, get_rate_governor
+
+logger = logging.getLogger("facebook_api.session")
+
+# Defaults, overridable through environment variables
+DEFAULT_POOL_CONNECTIONS = 10   # Number of distinct hosts kept in the pool manager
+DEFAULT_POOL_MAXSIZE = 32       # Keep-alive connections kept per host
+DEFAULT_CONNECT_TIMEOUT = 5.0   # Seconds to establish a connection
+DEFAULT_READ_TIMEOUT = 60.0     # Seconds to wait for a response
+
+GRAPH_HOST = "graph.facebook.com"
+
+
+def _env_number(name: str, default, cast):
+    """Read a numeric setting from the environment, falling back to default"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+class GraphSessionPool:
+    """
+    Shared connection pool for Graph API HTTP calls
+
+    Handles:
+    - A single requests.Session with keep-alive connections
+    - Per-host pool sizing (graph.facebook.com gets its own adapter)
+    - Default connect/read timeouts applied to every call
+    - Request counters and connection pool statistics
+    - Rate-limit pacing of Graph API calls
+    """
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 host_pool_sizes: Optional[Dict[str, int]] = None,
+                 governor: Optional[RateLimitGovernor] = None):
+        """
+        Initialize the session pool
+
+        Args:
+            pool_connections: Number of host pools to cache
+            pool_maxsize: Maximum keep-alive connections per host
+            connect_timeout: Default connect timeout in seconds
+            read_timeout: Default read timeout in seconds
+            host_pool_sizes: Optional per-host override of pool_maxsize
+            governor: Rate-limit governor (process-wide governor if not provided)
+        """
+        self.pool_connections = pool_connections or _env_number(
+            "FACEBOOK_HTTP_POOL_CONNECTIONS", DEFAULT_POOL_CONNECTIONS, int)
+        self.pool_maxsize = pool_maxsize or _env_number(
+            "FACEBOOK_HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE, int)
+        self.connect_timeout = connect_timeout or _env_number(
+            "FACEBOOK_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT, float)
+        self.read_timeout = read_timeout or _env_number(
+            "FACEBOOK_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT, float)
+
+        if host_pool_sizes is None:
+            host_pool_sizes = {GRAPH_HOST: self.pool_maxsize}
+        self.host_pool_sizes = dict(host_pool_sizes)
+        self.governor = governor or get_rate_governor()
+
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._requests_by_host: Dict[str, int] = {}
+        self._errors_by_host: Dict[str, int] = {}
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """Default (connect, read) timeout tuple"""
+        return (self.connect_timeout, self.read_timeout)
+
+    @property
+    def session(self) -> requests.Session:
+        """Shared requests session, created on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        """Create the session and mount the pooled adapters"""
+        session = requests.Session()
+
+        default_adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                      pool_maxsize=self.pool_maxsize)
+        session.mount("https://", default_adapter)
+        session.mount("http://", default_adapter)
+        self._adapters["*"] = default_adapter
+
+        # Longest matching prefix wins, so host adapters take precedence
+        for host, maxsize in self.host_pool_sizes.items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=maxsize)
+            session.mount(f"https://{host}", adapter)
+            self._adapters[host] = adapter
+
+        logger.info(f"HTTP session pool created (maxsize={self.pool_maxsize}, "
+                    f"hosts={list(self.host_pool_sizes)}, timeout={self.timeout})")
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session
+
+        Args:
+            method: HTTP method (GET, POST, DELETE)
+            url: Absolute URL
+            **kwargs: Extra arguments passed to requests (params, data, files, timeout...)
+
+        Returns:
+            requests.Response object
+
+        Raises:
+            RateLimitExceeded: If the Graph API budget is not available in time
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname or ""
+
+        scopes = self.governor.scopes_for_request(url, kwargs.get("data")) if host == GRAPH_HOST else None
+        if scopes:
+            self.governor.acquire(scopes)
+
+        with self._lock:
+            self._requests_by_host[host] = self._requests_by_host.get(host, 0) + 1
+
+        try:
+            response = self.session.request(method.upper(), url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors_by_host[host] = self._errors_by_host.get(host, 0) + 1
+            raise
+
+        if scopes:
+            self.governor.observe(response, scopes)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request through the shared session"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request through the shared session"""
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        """Send a DELETE request through the shared session"""
+        return self.request("DELETE", url, **kwargs)
+
+    def stats(self) -> Dict:
+        """
+        Get pool statistics
+
+        Returns:
+            Dictionary with configuration, per-host request counts and
+            per-host connection pool usage
+        """
+        pools = {}
+        with self._lock:
+            for name, adapter in self._adapters.items():
+                for key, pool in list(adapter.poolmanager.pools._container.items()):
+                    host = getattr(key, "key_host", None) or getattr(pool, "host", name)
+                    pools[host] = {
+                        "connections_opened": getattr(pool, "num_connections", 0),
+                        "requests_sent": getattr(pool, "num_requests", 0),
+                        "idle_connections": pool.pool.qsize() if pool.pool is not None else 0,
+                        "maxsize": adapter._pool_maxsize
+                    }
+
+            return {
+                "pool_maxsize": self.pool_maxsize,
+                "host_pool_sizes": dict(self.host_pool_sizes),
+                "timeout": {"connect": self.connect_timeout, "read": self.read_timeout},
+                "requests": dict(self._requests_by_host),
+                "errors": dict(self._errors_by_host),
+                "pools": pools,
+                "rate_limits": self.governor.stats()
+            }
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._adapters = {}
+
+
+# Process-wide pool shared by FacebookAPI instances and routes
+_default_pool: Optional[GraphSessionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> GraphSessionPool:
+    """Get or create the process-wide session pool"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = GraphSessionPool()
+    return _default_pool
+
+
+def reset_session_pool():
+    """Close the process-wide pool so the next call builds a fresh one"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = None
@@ -0,0 +1,228 @@
+"""
+Media Registry Module
+
+This module deduplicates media uploads by content hash. When the same
+images go to many pages, each file is read once into a shared buffer
+(keyed by its SHA-256) and that buffer is reused for every page upload.
+The IDs Facebook returns are remembered per (target, hash): the
+media_fbid of an unpublished page photo, or the image_hash of an ad
+image for an ad account. Later posts with identical media skip the
+upload entirely.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger("facebook_api.media")
+
+# Defaults, overridable through environment variables
+DEFAULT_BUFFER_BYTES = 256 * 1024 * 1024   # Bytes of file content kept in memory
+DEFAULT_FBID_TTL = 24 * 3600               # Seconds a page media_fbid is reused
+DEFAULT_REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "media_registry.json")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default"""
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+class MediaBlob:
+    """File content read once, shared by every upload of the same media"""
+
+    def __init__(self, path: str, content: bytes):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.content = content
+        self.size = len(content)
+        self.sha256 = hashlib.sha256(content).hexdigest()
+
+    def as_upload(self):
+        """(filename, content) tuple for the requests files argument"""
+        return (self.filename, self.content)
+
+
+class MediaRegistry:
+    """
+    Content-hash registry of uploaded media
+
+    Handles:
+    - Reading each file once into a bounded in-memory buffer cache
+    - media_fbid cache per (page, SHA-256), with a reuse TTL
+    - Ad image_hash cache per (ad account, SHA-256)
+    - Persistence of the ID caches in data/media_registry.json
+    - Hit/miss counters
+    """
+
+    def __init__(self, registry_file: Optional[str] = None, max_buffer_bytes: Optional[int] = None,
+                 fbid_ttl: Optional[int] = None):
+        """
+        Initialize the registry
+
+        Args:
+            registry_file: JSON file persisting uploaded IDs (FACEBOOK_MEDIA_REGISTRY_FILE if not provided)
+            max_buffer_bytes: Memory bound of the buffer cache (FACEBOOK_MEDIA_BUFFER_BYTES if not provided)
+            fbid_ttl: Seconds a page media_fbid is reused (FACEBOOK_MEDIA_FBID_TTL if not provided)
+        """
+        self.registry_file = registry_file or os.getenv("FACEBOOK_MEDIA_REGISTRY_FILE", DEFAULT_REGISTRY_FILE)
+        self.max_buffer_bytes = max_buffer_bytes if max_buffer_bytes is not None else _env_int(
+            "FACEBOOK_MEDIA_BUFFER_BYTES", DEFAULT_BUFFER_BYTES)
+        self.fbid_ttl = fbid_ttl if fbid_ttl is not None else _env_int("FACEBOOK_MEDIA_FBID_TTL", DEFAULT_FBID_TTL)
+
+        self._lock = threading.Lock()
+        self._buffers: "OrderedDict[tuple, MediaBlob]" = OrderedDict()
+        self._buffer_bytes = 0
+        self._loading: Dict[tuple, threading.Lock] = {}
+        self._ids: Dict[str, Dict] = self._read_registry()
+        self._stats = {"reads": 0, "buffer_hits": 0, "upload_hits": 0, "uploads": 0}
+
+    # --- File buffers ---------------------------------------------------
+
+    def load(self, path: str) -> MediaBlob:
+        """
+        Get the content of a file, reading it only once
+
+        Args:
+            path: Path to the media file
+
+        Returns:
+            MediaBlob with the content and its SHA-256
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            blob = self._buffers.get(key)
+            if blob is not None:
+                self._buffers.move_to_end(key)
+                self._stats["buffer_hits"] += 1
+                return blob
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # Concurrent uploads of the same file wait for a single read
+        with loading:
+            with self._lock:
+                blob = self._buffers.get(key)
+                if blob is not None:
+                    self._stats["buffer_hits"] += 1
+                    return blob
+
+            with open(path, "rb") as f:
+                blob = MediaBlob(path, f.read())
+
+            with self._lock:
+                self._stats["reads"] += 1
+                self._loading.pop(key, None)
+                if blob.size <= self.max_buffer_bytes:
+                    self._buffers[key] = blob
+                    self._buffer_bytes += blob.size
+                    while self._buffer_bytes > self.max_buffer_bytes:
+                        _, evicted = self._buffers.popitem(last=False)
+                        self._buffer_bytes -= evicted.size
+            return blob
+
+    # --- Uploaded IDs ---------------------------------------------------
+
+    def _read_registry(self) -> Dict[str, Dict]:
+        try:
+            with open(self.registry_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_registry(self):
+        """Persist the ID caches (lock must be held)"""
+        try:
+            os.makedirs(os.path.dirname(self.registry_file), exist_ok=True)
+            tmp_path = f"{self.registry_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._ids, f, indent=2)
+            os.replace(tmp_path, self.registry_file)
+        except OSError as e:
+            logger.warning(f"Could not save media registry: {e}")
+
+    def get_uploaded(self, target: str, sha256: str, kind: str) -> Optional[str]:
+        """
+        Get the ID of media already uploaded to a target
+
+        Args:
+            target: Page ID, or 'act_<id>' for an ad account
+            sha256: Content hash
+            kind: 'media_fbid' or 'image_hash'
+
+        Returns:
+            The cached ID, or None if unknown or expired
+        """
+        with self._lock:
+            entry = self._ids.get(f"{target}:{sha256}")
+            if not entry or kind not in entry:
+                return None
+            # Page photo IDs expire, ad image hashes are permanent for the account
+            if kind == "media_fbid" and time.time() - entry.get("uploaded_at", 0) > self.fbid_ttl:
+                return None
+            self._stats["upload_hits"] += 1
+            return entry[kind]
+
+    def remember(self, target: str, sha256: str, kind: str, value: str):
+        """
+        Record the ID returned for an upload
+
+        Args:
+            target: Page ID, or 'act_<id>' for an ad account
+            sha256: Content hash
+            kind: 'media_fbid' or 'image_hash'
+            value: ID returned by Facebook
+        """
+        with self._lock:
+            self._stats["uploads"] += 1
+            self._ids[f"{target}:{sha256}"] = {kind: value, "uploaded_at": time.time()}
+            self._write_registry()
+
+    def forget(self, target: str, sha256: str):
+        """Drop a cached ID (e.g. rejected by Facebook)"""
+        with self._lock:
+            if self._ids.pop(f"{target}:{sha256}", None) is not None:
+                self._write_registry()
+
+    def stats(self) -> Dict:
+        """
+        Get registry statistics
+
+        Returns:
+            Dictionary with file reads, buffer and upload cache hits,
+            uploads, buffered bytes and known IDs
+        """
+        with self._lock:
+            return dict(self._stats, buffered_bytes=self._buffer_bytes,
+                        buffered_files=len(self._buffers), known_ids=len(self._ids))
+
+
+# Process-wide registry shared by FacebookAPI instances
+_default_registry: Optional[MediaRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_media_registry() -> MediaRegistry:
+    """Get or create the process-wide media registry"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = MediaRegistry()
+    return _default_registry
+
+
+def reset_media_registry():
+    """Drop the process-wide registry so the next call builds a fresh one"""
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = None
@@ -0,0 +1,366 @@
+"""
+Page Token Store Module
+
+This module keeps the page access tokens of a user so page operations do
+not call /me/accounts each time. Tokens are fetched with full pagination
+of /me/accounts and indexed by page ID in memory (O(1) lookup). They are
+also persisted, encrypted, in a SQLite database (data/page_tokens.db)
+shared by every worker process. Page tokens expire with the user token,
+so the store asks /debug_token when that happens and fetches the tokens
+again shortly before.
+
+Tokens are encrypted with Fernet (AES-CBC with an HMAC-SHA256 tag, from
+the cryptography package), with a key derived from
+FACEBOOK_TOKEN_STORE_KEY or the app secret.
+"""
+
+import os
+import time
+import base64
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+from typing import Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger("facebook_api.page_tokens")
+
+# Defaults, overridable through environment variables
+DEFAULT_TTL = 24 * 3600              # Seconds before tokens are fetched again
+DEFAULT_REFRESH_MARGIN = 3600        # Seconds before expiry to refresh ahead
+DEFAULT_MISS_REFRESH_INTERVAL = 60   # Minimum seconds between refreshes for unknown pages
+MIN_REFRESH_INTERVAL = 60            # Minimum seconds between refreshes ahead of expiry
+DEFAULT_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "page_tokens.db")
+PAGE_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_sets (
+    user_key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    refresh_at REAL NOT NULL,
+    pages INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_tokens (
+    user_key TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    name TEXT,
+    token TEXT NOT NULL,
+    PRIMARY KEY (user_key, page_id)
+) WITHOUT ROWID;
+"""
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default"""
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+class TokenCipher:
+    """Authenticated encryption of tokens (Fernet) with a key derived from a secret"""
+
+    def __init__(self, secret: str):
+        key = hashlib.pbkdf2_hmac("sha256", secret.encode(), b"page-token-store", 100_000, dklen=32)
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+
+    def encrypt(self, plaintext: str) -> str:
+        """Encrypt a token into a base64 string"""
+        return self._fernet.encrypt(plaintext.encode()).decode()
+
+    def decrypt(self, token: str) -> str:
+        """
+        Decrypt a token produced by encrypt
+
+        Raises:
+            ValueError: If the token was altered or encrypted with another key
+        """
+        try:
+            return self._fernet.decrypt(token.encode()).decode()
+        except InvalidToken:
+            raise ValueError("Invalid token signature")
+
+
+class PageTokenStore:
+    """
+    Page access tokens per user token, cached in memory and in SQLite
+
+    Handles:
+    - Full pagination of /me/accounts
+    - O(1) lookup by page ID
+    - Encrypted persistence shared by worker processes (optional)
+    - Refresh ahead of expiry, using /debug_token for the user token expiry
+    - One refresh at a time per user token
+    """
+
+    def __init__(self, db_path: Optional[str] = None, secret: Optional[str] = None,
+                 ttl: Optional[int] = None, refresh_margin: Optional[int] = None,
+                 miss_refresh_interval: Optional[int] = None, check_expiry: Optional[bool] = None):
+        """
+        Initialize the store
+
+        Args:
+            db_path: SQLite database file (memory only if not provided)
+            secret: Encryption secret (FACEBOOK_TOKEN_STORE_KEY, then the app secret, if not provided)
+            ttl: Seconds before tokens are fetched again (FACEBOOK_PAGE_TOKEN_TTL if not provided)
+            refresh_margin: Seconds before expiry to refresh (FACEBOOK_PAGE_TOKEN_REFRESH_MARGIN if not provided)
+            miss_refresh_interval: Minimum seconds between refreshes caused by unknown pages
+            check_expiry: Ask /debug_token for the user token expiry (persistent stores by default)
+        """
+        self.db_path = db_path
+        self.secret = secret or os.getenv("FACEBOOK_TOKEN_STORE_KEY")
+        self.ttl = ttl if ttl is not None else _env_int("FACEBOOK_PAGE_TOKEN_TTL", DEFAULT_TTL)
+        self.refresh_margin = refresh_margin if refresh_margin is not None else _env_int(
+            "FACEBOOK_PAGE_TOKEN_REFRESH_MARGIN", DEFAULT_REFRESH_MARGIN)
+        self.miss_refresh_interval = (miss_refresh_interval if miss_refresh_interval is not None
+                                      else DEFAULT_MISS_REFRESH_INTERVAL)
+        self.check_expiry = bool(db_path) if check_expiry is None else check_expiry
+
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        self._ciphers: Dict[str, TokenCipher] = {}
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "loads": 0}
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _user_key(api) -> str:
+        """Identify a user token without storing it"""
+        return hashlib.sha256(f"{api.app_id}:{api.access_token}".encode()).hexdigest()[:32]
+
+    def _cipher(self, api) -> TokenCipher:
+        secret = self.secret or api.app_secret
+        with self._lock:
+            cipher = self._ciphers.get(secret)
+            if cipher is None:
+                cipher = self._ciphers[secret] = TokenCipher(secret)
+            return cipher
+
+    @staticmethod
+    def _due(entry: Dict, now: float) -> bool:
+        return now >= entry["refresh_at"]
+
+    # --- Public API -----------------------------------------------------
+
+    def get(self, api, page_id: str) -> Optional[str]:
+        """
+        Get the access token of a page
+
+        Args:
+            api: FacebookAPI client of the user (token, app credentials, requests)
+            page_id: ID of the Facebook page
+
+        Returns:
+            Page access token or None if the user does not manage the page
+        """
+        entry = self._entry(api)
+        token = entry["tokens"].get(page_id)
+        if token is None and time.time() - entry["fetched_at"] >= self.miss_refresh_interval:
+            # The page may have been added since the tokens were fetched
+            token = self._entry(api, refresh=True)["tokens"].get(page_id)
+
+        with self._lock:
+            self._stats["hits" if token else "misses"] += 1
+        return token
+
+    def get_all(self, api, refresh: bool = False) -> Dict[str, str]:
+        """
+        Get the access tokens of every page of the user
+
+        Args:
+            api: FacebookAPI client of the user
+            refresh: Fetch the tokens again even if they are fresh
+
+        Returns:
+            Dictionary mapping page ID to page access token
+        """
+        return dict(self._entry(api, refresh=refresh)["tokens"])
+
+    def invalidate(self, api=None):
+        """
+        Drop cached tokens
+
+        Args:
+            api: Only drop the tokens of this client's user (all tokens if not provided)
+        """
+        user_key = self._user_key(api) if api is not None else None
+        with self._lock:
+            if user_key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(user_key, None)
+        if self.db_path:
+            with closing(self._connect()) as conn, conn:
+                if user_key is None:
+                    conn.execute("DELETE FROM page_tokens")
+                    conn.execute("DELETE FROM token_sets")
+                else:
+                    conn.execute("DELETE FROM page_tokens WHERE user_key = ?", (user_key,))
+                    conn.execute("DELETE FROM token_sets WHERE user_key = ?", (user_key,))
+
+    def stats(self) -> Dict:
+        """
+        Get store statistics
+
+        Returns:
+            Dictionary with lookups hits/misses, Graph refreshes, database
+            loads, and the users and pages held in memory
+        """
+        with self._lock:
+            return dict(self._stats, users=len(self._memory),
+                        pages=sum(len(entry["tokens"]) for entry in self._memory.values()))
+
+    # --- Loading --------------------------------------------------------
+
+    def _entry(self, api, refresh: bool = False) -> Dict:
+        """Get the fresh token set of a user: memory, then database, then Graph API"""
+        user_key = self._user_key(api)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(user_key)
+            if entry is not None and not refresh and not self._due(entry, now):
+                return entry
+            refresh_lock = self._refresh_locks.setdefault(user_key, threading.Lock())
+
+        with refresh_lock:
+            with self._lock:
+                current = self._memory.get(user_key)
+            # Another thread refreshed while we waited
+            if current is not None and current is not entry and not self._due(current, now):
+                return current
+
+            # Another worker process may have refreshed
+            stored = self._load(user_key, api)
+            if stored is not None and not self._due(stored, now) and (
+                    not refresh or (entry is not None and stored["fetched_at"] > entry["fetched_at"])):
+                with self._lock:
+                    self._memory[user_key] = stored
+                return stored
+
+            fresh = self._fetch(api)
+            self._save(user_key, api, fresh)
+            with self._lock:
+                self._memory[user_key] = fresh
+            return fresh
+
+    def _fetch(self, api) -> Dict:
+        """Fetch every page token and the user token expiry from the Graph API"""
+        tokens, names = {}, {}
+        params = {"fields": "id,name,access_token", "limit": PAGE_LIMIT}
+        while True:
+            response = api._make_request("GET", "/me/accounts", params=dict(params), cache=False)
+            for page in response.get("data", []):
+                if page.get("id") and page.get("access_token"):
+                    tokens[page["id"]] = page["access_token"]
+                    names[page["id"]] = page.get("name")
+            paging = response.get("paging", {})
+            after = paging.get("cursors", {}).get("after")
+            if not paging.get("next") or not after:
+                break
+            params["after"] = after
+
+        fetched_at = time.time()
+        expires_at = fetched_at + self.ttl
+        if self.check_expiry:
+            expires_at = min(expires_at, self._user_token_expiry(api) or expires_at)
+
+        # An expiring user token cannot be renewed here: do not refetch on every call
+        refresh_at = max(expires_at - self.refresh_margin, fetched_at + MIN_REFRESH_INTERVAL)
+
+        with self._lock:
+            self._stats["refreshes"] += 1
+        logger.info(f"Fetched {len(tokens)} page tokens")
+        return {"tokens": tokens, "names": names, "fetched_at": fetched_at,
+                "expires_at": expires_at, "refresh_at": refresh_at}
+
+    def _user_token_expiry(self, api) -> Optional[float]:
+        """Earliest expiry (token or data access) of the user token, from /debug_token"""
+        try:
+            debug = api._make_request("GET", "/debug_token", params={"input_token": api.access_token},
+                                      access_token=f"{api.app_id}|{api.app_secret}").get("data", {})
+        except Exception as e:
+            logger.warning(f"Could not read user token expiry: {e}")
+            return None
+
+        if debug.get("is_valid") is False:
+            logger.warning("The user access token is no longer valid")
+        expiries = [float(expiry) for expiry in (debug.get("expires_at"), debug.get("data_access_expires_at"))
+                    if expiry]
+        return min(expiries) if expiries else None
+
+    def _load(self, user_key: str, api) -> Optional[Dict]:
+        """Read a user's token set from the database"""
+        if not self.db_path:
+            return None
+        with closing(self._connect()) as conn, conn:
+            meta = conn.execute("SELECT fetched_at, expires_at, refresh_at FROM token_sets WHERE user_key = ?",
+                                (user_key,)).fetchone()
+            if meta is None:
+                return None
+            rows = conn.execute("SELECT page_id, name, token FROM page_tokens WHERE user_key = ?",
+                                (user_key,)).fetchall()
+
+        cipher = self._cipher(api)
+        tokens, names = {}, {}
+        try:
+            for page_id, name, token in rows:
+                tokens[page_id] = cipher.decrypt(token)
+                names[page_id] = name
+        except ValueError:
+            logger.warning("Stored page tokens were encrypted with another key, fetching them again")
+            return None
+
+        with self._lock:
+            self._stats["loads"] += 1
+        return {"tokens": tokens, "names": names, "fetched_at": meta[0], "expires_at": meta[1],
+                "refresh_at": meta[2]}
+
+    def _save(self, user_key: str, api, entry: Dict):
+        """Replace a user's token set in the database"""
+        if not self.db_path:
+            return
+        cipher = self._cipher(api)
+        rows = [(user_key, page_id, entry["names"].get(page_id), cipher.encrypt(token))
+                for page_id, token in entry["tokens"].items()]
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM page_tokens WHERE user_key = ?", (user_key,))
+            conn.executemany("INSERT INTO page_tokens (user_key, page_id, name, token) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO token_sets (user_key, fetched_at, expires_at, refresh_at, pages) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (user_key, entry["fetched_at"], entry["expires_at"], entry["refresh_at"], len(rows)))
+
+
+# Process-wide persistent store shared by the app's clients
+_default_store: Optional[PageTokenStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_page_token_store() -> PageTokenStore:
+    """Get or create the process-wide page token store (persisted in FACEBOOK_PAGE_TOKEN_DB)"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = PageTokenStore(db_path=os.getenv("FACEBOOK_PAGE_TOKEN_DB", DEFAULT_DB_FILE))
+    return _default_store
+
+
+def reset_page_token_store():
+    """Drop the process-wide store so the next call builds a fresh one"""
+    global _default_store
+    with _default_store_lock:
+        _default_store = None
@@ -0,0 +1,468 @@
+"""
+Graph API Rate-Limit Governor
+
+This module paces outgoing Graph API calls before Facebook throttles them.
+Every response carries usage headers (X-App-Usage, X-Page-Usage,
+X-Ad-Account-Usage, X-Business-Use-Case-Usage) reporting how much of each
+budget has been consumed, as a percentage. The governor keeps one token
+bucket per budget (the app, each page, each ad account) and slows the
+refill of a bucket as its reported usage rises, so high-volume publishing
+and analytics refreshes back off gradually instead of hitting error 4/17/32.
+"""
+
+import os
+import json
+import asyncio
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("facebook_api.rate_limit")
+
+# Defaults, overridable through environment variables
+DEFAULT_APP_RATE = 20.0      # Calls per second for the whole app
+DEFAULT_PAGE_RATE = 5.0      # Calls per second for a single page
+DEFAULT_ACCOUNT_RATE = 5.0   # Calls per second for a single ad account
+DEFAULT_BURST = 2.0          # Bucket capacity, in seconds of refill
+DEFAULT_SOFT_LIMIT = 60.0    # Usage percentage where pacing starts
+DEFAULT_COOLDOWN = 60.0      # Seconds a budget stays blocked after a throttling error
+DEFAULT_MAX_WAIT = 30.0      # Maximum seconds a call waits for its budget
+
+MIN_REFILL_FACTOR = 0.1      # Refill factor just below 100% usage
+USAGE_TTL = 300.0            # Seconds after which a reported usage is considered stale
+
+# Graph error codes meaning a budget is exhausted
+APP_LIMIT_ERROR_CODES = [4, 17]
+PAGE_LIMIT_ERROR_CODES = [32, 613]
+BUSINESS_LIMIT_ERROR_CODES = list(range(80000, 80015))
+
+# X-Business-Use-Case-Usage types that belong to an ad account
+AD_ACCOUNT_USE_CASES = ["ads_management", "ads_insights", "custom_audience", "instagram", "leadgen"]
+
+
+def _env_number(name: str, default: float) -> float:
+    """Read a numeric setting from the environment, falling back to default"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than allowed for its budget"""
+    def __init__(self, scope: str, retry_after: float):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit budget exhausted for {scope}, retry in {retry_after:.1f}s")
+
+
+class UsageBudget:
+    """
+    Token bucket for one rate-limit budget
+
+    The refill rate is scaled down by the last usage percentage reported
+    by Facebook, and drops to zero while the budget is blocked.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.usage = 0.0
+        self.observed_at = 0.0
+        self.blocked_until = 0.0
+
+    def current_usage(self, now: float) -> float:
+        """Last reported usage percentage, or 0 once stale"""
+        if now - self.observed_at > USAGE_TTL:
+            return 0.0
+        return self.usage
+
+    def refill_rate(self, now: float, soft_limit: float) -> float:
+        """Tokens per second given the current usage"""
+        if now < self.blocked_until:
+            return 0.0
+        usage = self.current_usage(now)
+        if usage < soft_limit:
+            return self.rate
+        if usage >= 100:
+            return self.rate * MIN_REFILL_FACTOR
+        headroom = (100 - usage) / (100 - soft_limit)
+        return self.rate * max(MIN_REFILL_FACTOR, headroom)
+
+    def refill(self, now: float, soft_limit: float):
+        """Add the tokens earned since the last update"""
+        elapsed = now - max(self.updated, min(self.blocked_until, now))
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate(now, soft_limit))
+        self.updated = now
+
+    def wait_time(self, now: float, soft_limit: float, calls: int = 1) -> float:
+        """Seconds until a number of calls can start (at most a full bucket is waited for)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        needed = min(calls, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.refill_rate(now, soft_limit)
+
+
+class RateLimitGovernor:
+    """
+    Central pacing of Graph API calls
+
+    Handles:
+    - Parsing of the usage headers of every response
+    - One token bucket per app, page and ad account
+    - Refill slowed down as reported usage approaches 100%
+    - Blocking a budget after a throttling error until access is regained
+    """
+
+    def __init__(self, app_rate: Optional[float] = None, page_rate: Optional[float] = None,
+                 account_rate: Optional[float] = None, burst: Optional[float] = None,
+                 soft_limit: Optional[float] = None, cooldown: Optional[float] = None,
+                 max_wait: Optional[float] = None):
+        """
+        Initialize the governor
+
+        Args:
+            app_rate: Calls per second allowed for the app
+            page_rate: Calls per second allowed per page
+            account_rate: Calls per second allowed per ad account
+            burst: Bucket capacity, in seconds of refill
+            soft_limit: Usage percentage where pacing starts
+            cooldown: Seconds a budget is blocked after a throttling error
+            max_wait: Maximum seconds acquire() waits before giving up
+        """
+        self.rates = {
+            "app": app_rate or _env_number("FACEBOOK_RATE_LIMIT_APP_RATE", DEFAULT_APP_RATE),
+            "page": page_rate or _env_number("FACEBOOK_RATE_LIMIT_PAGE_RATE", DEFAULT_PAGE_RATE),
+            "account": account_rate or _env_number("FACEBOOK_RATE_LIMIT_ACCOUNT_RATE", DEFAULT_ACCOUNT_RATE)
+        }
+        self.burst = burst or _env_number("FACEBOOK_RATE_LIMIT_BURST", DEFAULT_BURST)
+        self.soft_limit = soft_limit or _env_number("FACEBOOK_RATE_LIMIT_SOFT_LIMIT", DEFAULT_SOFT_LIMIT)
+        self.cooldown = cooldown or _env_number("FACEBOOK_RATE_LIMIT_COOLDOWN", DEFAULT_COOLDOWN)
+        self.max_wait = max_wait if max_wait is not None else _env_number(
+            "FACEBOOK_RATE_LIMIT_MAX_WAIT", DEFAULT_MAX_WAIT)
+
+        self._lock = threading.Lock()
+        self._budgets: Dict[str, UsageBudget] = {}
+        self._waited: Dict[str, float] = {}
+
+    def _budget(self, scope: str) -> UsageBudget:
+        """Get or create the bucket of a scope (lock must be held)"""
+        budget = self._budgets.get(scope)
+        if budget is None:
+            rate = self.rates.get(scope.split(":", 1)[0], self.rates["page"])
+            budget = UsageBudget(rate, max(1.0, rate * self.burst))
+            self._budgets[scope] = budget
+        return budget
+
+    @staticmethod
+    def scopes_for_url(url: str) -> List[str]:
+        """
+        Get the budgets charged by a Graph API call
+
+        The first path segment after the version identifies the object:
+        'act_<id>' is an ad account, a numeric ID (or a '<page>_<post>' ID)
+        is charged to that page. /me only uses the app budget; batch calls
+        are charged per sub-request by scopes_for_request.
+
+        Args:
+            url: Absolute Graph API URL
+
+        Returns:
+            List of scopes, always starting with 'app'
+        """
+        segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+        if segments and segments[0].startswith("v") and "." in segments[0]:
+            segments = segments[1:]
+        if not segments:
+            return ["app"]
+
+        node = segments[0]
+        if node.startswith("act_"):
+            return ["app", f"account:{node[4:]}"]
+        page_id = node.split("_", 1)[0]
+        if page_id.isdigit():
+            return ["app", f"page:{page_id}"]
+        return ["app"]
+
+    @classmethod
+    def scopes_for_request(cls, url: str, data=None) -> List[str]:
+        """
+        Get the budgets charged by a Graph API request, batch calls included
+
+        A batch call (POST / with a batch parameter) costs one call per
+        sub-request, so it lists 'app' once per operation plus the page or
+        ad account of each operation's relative_url.
+
+        Args:
+            url: Absolute Graph API URL
+            data: Form data of the request
+
+        Returns:
+            List of scopes, a scope listed n times being charged n calls
+        """
+        scopes = cls.scopes_for_url(url)
+        batch = data.get("batch") if isinstance(data, dict) else None
+        if scopes != ["app"] or not batch:
+            return scopes
+        try:
+            operations = json.loads(batch)
+        except (TypeError, ValueError):
+            return scopes
+        if not isinstance(operations, list):
+            return scopes
+
+        charged = []
+        for operation in operations:
+            relative_url = operation.get("relative_url") if isinstance(operation, dict) else None
+            charged.extend(cls.scopes_for_url(f"/{str(relative_url or '').lstrip('/')}"))
+        return charged or scopes
+
+    def _try_acquire(self, scopes: List[str]):
+        """
+        Consume the calls of every scope if all have budget
+
+        A batch may cost more than a full bucket; it then starts once the
+        bucket is full and leaves the bucket in debt for the next calls.
+
+        Returns:
+            Tuple of (limiting scope, seconds to wait), wait is 0 when consumed
+        """
+        with self._lock:
+            now = time.monotonic()
+            budgets = [(scope, calls, self._budget(scope)) for scope, calls in Counter(scopes).items()]
+            for _, _, budget in budgets:
+                budget.refill(now, self.soft_limit)
+
+            scope, wait = max(((scope, budget.wait_time(now, self.soft_limit, calls))
+                               for scope, calls, budget in budgets), key=lambda item: item[1])
+            if wait <= 0:
+                for _, calls, budget in budgets:
+                    budget.tokens -= calls
+            return scope, wait
+
+    def _record_wait(self, scope: str, waited: float):
+        """Add to the time spent waiting on a scope"""
+        if waited:
+            with self._lock:
+                self._waited[scope] = self._waited.get(scope, 0.0) + waited
+
+    def _check_wait(self, scope: str, waited: float, wait: float, max_wait: Optional[float]):
+        """Raise when waiting longer would exceed max_wait"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        if waited + wait > max_wait:
+            logger.warning(f"Rate limit budget exhausted for {scope}, retry in {wait:.1f}s")
+            raise RateLimitExceeded(scope, wait)
+
+    def acquire(self, scopes: List[str], max_wait: Optional[float] = None) -> float:
+        """
+        Wait until every scope has budget for the call, then consume it
+
+        Args:
+            scopes: Scopes charged by the call (a scope listed n times is charged n calls)
+            max_wait: Override of the maximum wait in seconds
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: If the budget would not be available in time
+        """
+        waited = 0.0
+        while True:
+            scope, wait = self._try_acquire(scopes)
+            if wait <= 0:
+                self._record_wait(scope, waited)
+                return waited
+            self._check_wait(scope, waited, wait, max_wait)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, scopes: List[str], max_wait: Optional[float] = None) -> float:
+        """
+        Same as acquire() without blocking the event loop
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: If the budget would not be available in time
+        """
+        waited = 0.0
+        while True:
+            scope, wait = self._try_acquire(scopes)
+            if wait <= 0:
+                self._record_wait(scope, waited)
+                return waited
+            self._check_wait(scope, waited, wait, max_wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def record_usage(self, scope: str, usage: float, regain_seconds: float = 0):
+        """
+        Record a usage percentage reported by Facebook
+
+        Args:
+            scope: Budget scope ('app', 'page:<id>', 'account:<id>')
+            usage: Highest of the reported call count / CPU time / total time percentages
+            regain_seconds: Seconds until access is regained, when blocked
+        """
+        with self._lock:
+            budget = self._budget(scope)
+            now = time.monotonic()
+            budget.refill(now, self.soft_limit)
+            budget.usage = usage
+            budget.observed_at = now
+            if regain_seconds > 0:
+                budget.blocked_until = max(budget.blocked_until, now + regain_seconds)
+            elif usage >= 100:
+                budget.blocked_until = max(budget.blocked_until, now + self.cooldown)
+
+        if usage >= self.soft_limit:
+            logger.info(f"Rate limit usage for {scope}: {usage:.0f}%")
+
+    def throttle(self, scope: str, seconds: Optional[float] = None):
+        """
+        Block a budget after a throttling error
+
+        Args:
+            scope: Budget scope
+            seconds: Blocking duration (cooldown if not provided)
+        """
+        seconds = seconds or self.cooldown
+        with self._lock:
+            budget = self._budget(scope)
+            now = time.monotonic()
+            budget.refill(now, self.soft_limit)
+            budget.tokens = 0
+            budget.usage = 100.0
+            budget.observed_at = now
+            budget.blocked_until = max(budget.blocked_until, now + seconds)
+        logger.warning(f"Rate limit reached for {scope}, pausing calls for {seconds:.0f}s")
+
+    @staticmethod
+    def _header_json(headers, name: str) -> Optional[Dict]:
+        """Parse a JSON usage header, None when missing or malformed"""
+        value = headers.get(name)
+        if not value:
+            return None
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            logger.debug(f"Malformed {name} header: {value!r}")
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    def _usage_percent(usage: Dict) -> float:
+        """Highest percentage among the counters of a usage object"""
+        counters = [usage.get(key) or 0 for key in ("call_count", "total_cputime", "total_time")]
+        return float(max(counters))
+
+    def observe(self, response, scopes: List[str]):
+        """
+        Update budgets from a Graph API response
+
+        Args:
+            response: requests.Response of the call
+            scopes: Scopes charged by the call
+        """
+        headers = response.headers
+        # Page and ad account headers are only attributed when the call targets a single object
+        objects = set(scopes) - {"app"}
+        object_scope = objects.pop() if len(objects) == 1 else None
+        regain_by_scope: Dict[str, float] = {}
+
+        app_usage = self._header_json(headers, "X-App-Usage")
+        if app_usage:
+            self.record_usage("app", self._usage_percent(app_usage))
+
+        page_usage = self._header_json(headers, "X-Page-Usage")
+        if page_usage and object_scope and object_scope.startswith("page:"):
+            regain = float(page_usage.get("estimated_time_to_regain_access") or 0) * 60
+            regain_by_scope[object_scope] = regain
+            self.record_usage(object_scope, self._usage_percent(page_usage), regain)
+
+        account_usage = self._header_json(headers, "X-Ad-Account-Usage")
+        if account_usage and object_scope and object_scope.startswith("account:"):
+            regain = float(account_usage.get("reset_time_duration") or 0)
+            regain_by_scope[object_scope] = regain
+            self.record_usage(object_scope, float(account_usage.get("acc_id_util_pct") or 0), regain)
+
+        business_usage = self._header_json(headers, "X-Business-Use-Case-Usage")
+        for object_id, use_cases in (business_usage or {}).items():
+            for use_case in use_cases if isinstance(use_cases, list) else []:
+                kind = "account" if use_case.get("type") in AD_ACCOUNT_USE_CASES else "page"
+                scope = f"{kind}:{object_id}"
+                regain = float(use_case.get("estimated_time_to_regain_access") or 0) * 60
+                regain_by_scope[scope] = max(regain, regain_by_scope.get(scope, 0))
+                self.record_usage(scope, self._usage_percent(use_case), regain)
+
+        if response.status_code < 400:
+            return
+
+        try:
+            error_code = response.json().get("error", {}).get("code")
+        except (ValueError, AttributeError):
+            return
+
+        if error_code in APP_LIMIT_ERROR_CODES:
+            self.throttle("app")
+        elif error_code in PAGE_LIMIT_ERROR_CODES + BUSINESS_LIMIT_ERROR_CODES:
+            scope = object_scope or "app"
+            self.throttle(scope, regain_by_scope.get(scope))
+
+    def stats(self) -> Dict:
+        """
+        Get the state of every budget
+
+        Returns:
+            Dictionary keyed by scope with usage, tokens, refill rate,
+            remaining block time and total time spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            result = {}
+            for scope, budget in self._budgets.items():
+                budget.refill(now, self.soft_limit)
+                result[scope] = {
+                    "usage": budget.current_usage(now),
+                    "tokens": round(budget.tokens, 2),
+                    "refill_rate": round(budget.refill_rate(now, self.soft_limit), 3),
+                    "blocked_for": round(max(0.0, budget.blocked_until - now), 1),
+                    "waited_seconds": round(self._waited.get(scope, 0.0), 3)
+                }
+            return result
+
+
+# Process-wide governor shared by every session pool
+_default_governor: Optional[RateLimitGovernor] = None
+_default_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateLimitGovernor:
+    """Get or create the process-wide rate-limit governor"""
+    global _default_governor
+    if _default_governor is None:
+        with _default_governor_lock:
+            if _default_governor is None:
+                _default_governor = RateLimitGovernor()
+    return _default_governor
+
+
+def reset_rate_governor():
+    """Forget all budgets so the next call builds a fresh governor"""
+    global _default_governor
+    with _default_governor_lock:
+        _default_governor = None
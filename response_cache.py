@@ -0,0 +1,380 @@
+"""
+Response Cache Module
+
+This module caches the responses of Graph API read endpoints that the UI
+refetches on every refresh (pages, ad accounts, saved audiences, recent
+posts, insights). Entries are keyed by endpoint and parameters without
+the access token, scoped to the user, and each endpoint has its own TTL.
+
+Once an entry is past its TTL it is still served for a stale window
+while a background refresh fetches the new value (stale-while-revalidate).
+Writes invalidate the entries of the object they touch: publishing to a
+page drops that page's cached feed and insights, creating a campaign
+drops the ad account's cached reads.
+
+Storage is pluggable: an in-process LRU bounded in bytes (default), a
+directory on disk shared by worker processes, or any Redis-compatible
+client (get/set with ex/delete).
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from single_flight import endpoint_label
+
+logger = logging.getLogger("facebook_api.cache")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "response_cache")
+
+# Seconds a response stays fresh, per endpoint label (other endpoints are not cached)
+DEFAULT_TTLS = {
+    "/me/accounts": 300,
+    "/me/adaccounts": 600,
+    "/{id}/saved_audiences": 600,
+    "/{id}/feed": 120,
+    "/{id}/posts": 120,
+    "/{id}/insights": 900,
+}
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class MemoryBackend:
+    """
+    In-process LRU storage bounded by the total size of the values
+
+    Invalidation markers ('tag:' keys) are kept outside the LRU so they are
+    not evicted before the entries they hide have expired.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._markers: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = (self._markers if key.startswith("tag:") else self._items).get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and time.time() >= expires:
+                self._remove(key)
+                return None
+            if key in self._items:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        item = (value, time.time() + ex if ex else None)
+        with self._lock:
+            if key.startswith("tag:"):
+                self._markers[key] = item
+                return
+            self._remove(key)
+            if len(value) > self.max_bytes:
+                return
+            self._items[key] = item
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._markers.pop(key, None)
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[0])
+
+
+class DiskBackend:
+    """One file per key in a directory shared by worker processes"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                expires, value = f.read().split(b"\n", 1)
+        except (OSError, ValueError):
+            return None
+        if expires and time.time() >= float(expires):
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write((str(time.time() + ex) if ex else "").encode() + b"\n" + value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry: {e}")
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class RedisBackend:
+    """Adapter for a Redis-compatible client (redis-py or equivalent)"""
+
+    def __init__(self, client, prefix: str = "fbcache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        self.client.set(self.prefix + key, value, ex=ex)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class ResponseCache:
+    """
+    TTL cache of Graph API GET responses
+
+    Handles:
+    - Per-endpoint TTLs (endpoints without a TTL are not cached)
+    - Keys without access tokens, scoped by user
+    - Stale-while-revalidate with one background refresh per entry
+    - Invalidation of every entry of an object after a write
+    - Hit/miss counters
+    """
+
+    def __init__(self, backend=None, ttls: Optional[Dict[str, int]] = None, stale_factor: float = 1.0):
+        """
+        Initialize the cache
+
+        Args:
+            backend: Storage backend (in-process LRU if not provided)
+            ttls: TTL overrides per endpoint label (e.g. {"/{id}/insights": 3600}, 0 disables)
+            stale_factor: Stale window as a multiple of the TTL
+        """
+        self.backend = backend or MemoryBackend()
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stale_factor = stale_factor
+
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "refreshes": 0}
+
+    # --- Keys -----------------------------------------------------------
+
+    def ttl_for(self, endpoint: str) -> int:
+        """TTL of an endpoint (0 when it is not cached)"""
+        return self.ttls.get(endpoint_label(endpoint), 0)
+
+    @staticmethod
+    def _tag(endpoint: str) -> str:
+        """Object an endpoint belongs to (first path segment)"""
+        return endpoint.strip("/").split("/")[0]
+
+    def _version(self, tag: str) -> str:
+        return (self.backend.get(f"tag:{tag}") or b"0").decode()
+
+    def _key(self, scope: str, endpoint: str, params: Dict) -> str:
+        public = {key: value for key, value in params.items() if key != "access_token"}
+        tag = self._tag(endpoint)
+        raw = json.dumps([scope, "/" + endpoint.strip("/"), public], sort_keys=True, default=str)
+        return f"{tag}:{self._version(tag)}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    @staticmethod
+    def scope(app_id: Optional[str], access_token: Optional[str]) -> str:
+        """Cache scope of a user, without the token itself"""
+        return hashlib.sha256(f"{app_id}:{access_token}".encode()).hexdigest()[:16]
+
+    # --- Reads and writes -----------------------------------------------
+
+    def lookup(self, scope: str, endpoint: str, params: Dict) -> Tuple[Optional[str], Any]:
+        """
+        Look up a cached response
+
+        Args:
+            scope: User scope (see scope())
+            endpoint: API endpoint
+            params: Request parameters (access_token is ignored)
+
+        Returns:
+            (state, value): state is 'fresh', 'stale' or None on a miss
+        """
+        return self._lookup(self._key(scope, endpoint, params))
+
+    def store(self, scope: str, endpoint: str, params: Dict, value: Any):
+        """
+        Cache a response for its endpoint's TTL plus the stale window
+
+        Args:
+            scope: User scope
+            endpoint: API endpoint
+            params: Request parameters
+            value: Response dictionary
+        """
+        self._store(self._key(scope, endpoint, params), endpoint, value)
+
+    def get_or_fetch(self, scope: str, endpoint: str, params: Dict, fetch: Callable[[], Any]) -> Any:
+        """
+        Serve a GET from the cache, fetching on a miss
+
+        A stale entry is returned immediately and refreshed in the background.
+
+        Args:
+            scope: User scope
+            endpoint: API endpoint
+            params: Request parameters
+            fetch: Function performing the request
+
+        Returns:
+            Response dictionary
+        """
+        if not self.ttl_for(endpoint):
+            return fetch()
+
+        # The key is taken before fetching: a write meanwhile hides this result
+        key = self._key(scope, endpoint, params)
+        state, value = self._lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self._refresh_in_background(key, endpoint, fetch)
+            return value
+
+        value = fetch()
+        self._store(key, endpoint, value)
+        return value
+
+    def _lookup(self, key: str) -> Tuple[Optional[str], Any]:
+        raw = self.backend.get(key)
+        if raw is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None, None
+
+        entry = json.loads(raw)
+        state = FRESH if time.time() < entry["fresh_until"] else STALE
+        with self._lock:
+            self._stats["hits" if state == FRESH else "stale_hits"] += 1
+        return state, entry["value"]
+
+    def _store(self, key: str, endpoint: str, value: Any):
+        ttl = self.ttl_for(endpoint)
+        if not ttl:
+            return
+        entry = {"value": value, "fresh_until": time.time() + ttl}
+        self.backend.set(key, json.dumps(entry).encode(), ex=int(ttl * (1 + self.stale_factor)) + 1)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def _refresh_in_background(self, key: str, endpoint: str, fetch: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+
+        def refresh():
+            try:
+                self._store(key, endpoint, fetch())
+            except Exception as e:
+                logger.warning(f"Background refresh of {endpoint} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="cache-refresh", daemon=True).start()
+
+    def invalidate(self, endpoint: str):
+        """
+        Drop every cached response of the object an endpoint belongs to
+
+        Args:
+            endpoint: Endpoint written to (e.g. /123/feed drops all /123/... entries)
+        """
+        tag = self._tag(endpoint)
+        # The marker must outlive every entry it hides
+        window = int(max(self.ttls.values(), default=0) * (1 + self.stale_factor)) + 1
+        self.backend.set(f"tag:{tag}", str(time.time_ns()).encode(), ex=window)
+        with self._lock:
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with fresh and stale hits, misses, stores,
+            invalidations, background refreshes and (in memory) cached bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        if isinstance(self.backend, MemoryBackend):
+            stats.update(bytes=self.backend.bytes, max_bytes=self.backend.max_bytes)
+        return stats
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Build a cache from FACEBOOK_RESPONSE_CACHE ('memory', 'disk' or 'off')
+
+    Returns:
+        ResponseCache, or None when caching is off
+    """
+    kind = os.getenv("FACEBOOK_RESPONSE_CACHE", "memory").lower()
+    if kind == "off":
+        return None
+    if kind == "disk":
+        backend = DiskBackend(os.getenv("FACEBOOK_RESPONSE_CACHE_DIR", DEFAULT_CACHE_DIR))
+    else:
+        backend = MemoryBackend(int(os.getenv("FACEBOOK_RESPONSE_CACHE_BYTES", DEFAULT_MAX_BYTES)))
+    return ResponseCache(backend)
+
+
+# Process-wide cache shared by the app's clients
+_default_cache: Optional[ResponseCache] = None
+_default_cache_created = False
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get or create the process-wide response cache (None when disabled)"""
+    global _default_cache, _default_cache_created
+    if not _default_cache_created:
+        with _default_cache_lock:
+            if not _default_cache_created:
+                _default_cache = create_response_cache()
+                _default_cache_created = True
+    return _default_cache
+
+
+def reset_response_cache():
+    """Drop the process-wide cache so the next call builds a fresh one"""
+    global _default_cache, _default_cache_created
+    with _default_cache_lock:
+        _default_cache = None
+        _default_cache_created = False
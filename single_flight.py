@@ -0,0 +1,143 @@
+"""
+Single-Flight Module
+
+This module coalesces identical concurrent Graph API reads. While a GET
+for a given URL and parameters is in flight, other threads asking for
+the same thing wait for it and share its result (or its error) instead
+of sending their own request. Nothing is cached: once the request has
+completed, the next call goes to Facebook again.
+"""
+
+import re
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Numeric IDs (pages, posts "123_456", ad accounts "act_123") in endpoint paths
+_ID_SEGMENT = re.compile(r"^(act_)?\d+(_\d+)?$")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Group endpoints for statistics by replacing IDs with placeholders
+
+    Args:
+        endpoint: API endpoint (e.g. /123/posts)
+
+    Returns:
+        Endpoint label (e.g. /{id}/posts)
+    """
+    segments = endpoint.strip("/").split("/")
+    return "/" + "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in segments)
+
+
+class _Call:
+    """An in-flight call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalescing of identical concurrent calls
+
+    Handles:
+    - One execution per key at a time, shared by concurrent callers
+    - Result copies for waiting callers (results are mutable dicts)
+    - Error propagation to every caller of the call
+    - Per-endpoint counters of executed and coalesced calls
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], label: str = "default") -> Any:
+        """
+        Run fn, or wait for the identical call already in flight
+
+        Args:
+            key: Identity of the call (e.g. method, URL and parameters)
+            fn: Function performing the call
+            label: Statistics group (e.g. endpoint label)
+
+        Returns:
+            Result of fn (a copy for coalesced callers)
+
+        Raises:
+            Exception: The error raised by fn
+        """
+        with self._lock:
+            stats = self._stats.setdefault(label, {"executed": 0, "coalesced": 0})
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            # Copy before the leader's caller can mutate the result
+            if call.waiters and call.error is None:
+                call.result = copy.deepcopy(call.result)
+            call.done.set()
+
+    def stats(self) -> Dict:
+        """
+        Get per-endpoint statistics
+
+        Returns:
+            Dictionary with 'endpoints' (per endpoint label: executed and
+            coalesced call counts, share of coalesced calls) and
+            'in_flight' (calls currently running)
+        """
+        with self._lock:
+            endpoints = {}
+            for label, counts in self._stats.items():
+                total = counts["executed"] + counts["coalesced"]
+                endpoints[label] = dict(counts, coalesced_ratio=round(counts["coalesced"] / total, 3) if total else 0.0)
+            return {"endpoints": endpoints, "in_flight": len(self._calls)}
+
+
+# Process-wide coalescing layer shared by FacebookAPI instances
+_default_single_flight: Optional[SingleFlight] = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get or create the process-wide single-flight layer"""
+    global _default_single_flight
+    if _default_single_flight is None:
+        with _default_single_flight_lock:
+            if _default_single_flight is None:
+                _default_single_flight = SingleFlight()
+    return _default_single_flight
+
+
+def reset_single_flight():
+    """Drop the process-wide layer so the next call builds a fresh one"""
+    global _default_single_flight
+    with _default_single_flight_lock:
+        _default_single_flight = None
@@ -5,13 +5,25 @@ Facebook Publisher SaaS - Main Application v3.1.0
 import os
 import sys
 import json
+import time
+import uuid
 from datetime import datetime
+import click
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 
 # Add current directory to Python path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
+sys.path.append(os.path.join(current_dir, '..'))
+
+from graph_session import get_session_pool
+from services.page_sync import (PageSyncError, PageSyncWorker, fetch_all_pages, attach_recent_posts,
+                                format_page, apply_incremental_sync, read_sync_state)
+from services.settings import get_settings
+from services.facebook_clients import get_access_token, get_facebook_client, invalidate_facebook_clients
+from services.publish_jobs import PublishJobStore, PublishJobQueue, job_results
+from services.insights_store import InsightsSyncWorker, backfill_insights, get_insights_store
 
 # Import route blueprints with error handling
 try:
@@ -19,6 +31,7 @@ try:
     from routes.campaigns_routes import campaigns_bp  
     from routes.audiences_routes import audiences_bp
     from routes.facebook_api_routes import facebook_bp, reset_facebook_api
+    from routes.dashboard import get_analytics as dashboard_analytics
 except ImportError as e:
     print(f"Import error: {e}")
     # Fallback imports
@@ -27,6 +40,7 @@ except ImportError as e:
     audiences_bp = None
     facebook_bp = None
     reset_facebook_api = None
+    dashboard_analytics = None
 
 app = Flask(__name__)
 CORS(app)
@@ -41,6 +55,25 @@ if audiences_bp:
 if facebook_bp:
     app.register_blueprint(facebook_bp, url_prefix='/api/facebook')
 
+PAGES_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'facebook_pages.json')
+PAGE_SYNC_STATE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'page_sync_state.json')
+
+
+settings_store = get_settings()
+# Drop the Facebook API clients built with the previous credentials
+settings_store.on_change(invalidate_facebook_clients)
+if reset_facebook_api:
+    settings_store.on_change(reset_facebook_api)
+
+
+# Background page sync keeping data/facebook_pages.json warm (disabled when 0)
+page_sync_worker = PageSyncWorker(get_access_token, PAGES_FILE, PAGE_SYNC_STATE_FILE,
+                                  interval=float(os.getenv('FACEBOOK_PAGE_SYNC_INTERVAL', '0')))
+
+# Background snapshots of post and page insights (disabled when 0)
+insights_sync_worker = InsightsSyncWorker(get_access_token, get_facebook_client, get_insights_store(),
+                                          interval=float(os.getenv('FACEBOOK_INSIGHTS_SYNC_INTERVAL', '0')))
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
@@ -82,17 +115,9 @@ def dashboard_overview():
 @app.route('/api/settings', methods=['GET', 'POST'])
 def settings():
     """Handle settings get/save"""
-    settings_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-    
     if request.method == 'GET':
         # Read settings
-        settings = {}
-        if os.path.exists(settings_file):
-            with open(settings_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        settings[key] = value
+        settings = settings_store.all()
         
         # Return settings with secrets hidden
         return jsonify({
@@ -127,14 +152,8 @@ DEBUG=True
 LOG_LEVEL=INFO
 """
             
-            # Write to .env file
-            os.makedirs(os.path.dirname(settings_file), exist_ok=True)
-            with open(settings_file, 'w') as f:
-                f.write(env_content)
-            
-            # Reset Facebook API to use new credentials
-            if reset_facebook_api:
-                reset_facebook_api()
+            # Write to .env file (reloads the settings and resets the Facebook API clients)
+            settings_store.save(env_content)
             
             return jsonify({
                 'success': True,
@@ -148,18 +167,7 @@ LOG_LEVEL=INFO
 def sync_facebook_pages():
     """Synchronize Facebook pages from Graph API"""
     try:
-        # Read settings from .env file
-        settings_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-        settings = {}
-        
-        if os.path.exists(settings_file):
-            with open(settings_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        settings[key] = value
-        
-        access_token = settings.get('FACEBOOK_ACCESS_TOKEN')
+        access_token = get_access_token()
         if not access_token or access_token.strip() == '':
             return jsonify({
                 'error': 'Token d\'accès Facebook non configuré',
@@ -175,6 +183,7 @@ def sync_facebook_pages():
         
         # Call Facebook Graph API to get pages
         import requests
+        http = get_session_pool()
         
         # First, check token validity and permissions
         me_url = f"https://graph.facebook.com/v18.0/me"
@@ -184,7 +193,7 @@ def sync_facebook_pages():
         }
         
         try:
-            me_response = requests.get(me_url, params=me_params, timeout=10)
+            me_response = http.get(me_url, params=me_params, timeout=10)
         except requests.exceptions.Timeout:
             return jsonify({
                 'error': 'Timeout de connexion à Facebook',
@@ -243,7 +252,7 @@ def sync_facebook_pages():
         permissions_url = f"https://graph.facebook.com/v18.0/me/permissions"
         permissions_params = {'access_token': access_token}
         
-        permissions_response = requests.get(permissions_url, params=permissions_params, timeout=10)
+        permissions_response = http.get(permissions_url, params=permissions_params, timeout=10)
         permissions_data = permissions_response.json() if permissions_response.status_code == 200 else {'data': []}
         granted_permissions = [p['permission'] for p in permissions_data.get('data', []) if p.get('status') == 'granted']
         
@@ -268,118 +277,11 @@ def sync_facebook_pages():
                 ]
             }), 400
         
-        # Get ALL pages managed by the user with ENHANCED pagination
-        all_pages = []
-        pages_url = f"https://graph.facebook.com/v18.0/me/accounts"
-        params = {
-            'access_token': access_token,
-            'fields': 'id,name,category,fan_count,access_token,picture',
-            'limit': 100  # Maximum limit per request
-        }
-        
-        page_count = 0
-        max_iterations = 100  # Increased to support up to 10,000 pages
-        iteration = 0
-        
-        print(f"Starting ENHANCED pagination to fetch ALL pages for user {user_name}")
-        
-        # Enhanced pagination loop to get ALL pages
-        while pages_url and iteration < max_iterations:
-            iteration += 1
-            print(f"ENHANCED Pagination iteration {iteration}: Fetching from {pages_url[:150]}...")
-            
-            try:
-                response = requests.get(pages_url, params=params, timeout=60)  # Increased timeout to 60s
-            except requests.exceptions.Timeout:
-                print(f"Timeout at iteration {iteration}, returning {len(all_pages)} pages")
-                if len(all_pages) > 0:
-                    break  # Continue with what we have
-                else:
-                    return jsonify({
-                        'error': 'Timeout lors de la récupération des pages',
-                        'message': 'La récupération des pages a pris trop de temps. Veuillez réessayer.',
-                        'action_required': 'retry_sync'
-                    }), 408
-            except requests.exceptions.RequestException as e:
-                print(f"Network error at iteration {iteration}: {str(e)}")
-                if len(all_pages) > 0:
-                    break  # Continue with what we have
-                else:
-                    return jsonify({
-                        'error': 'Erreur de connexion lors de la pagination',
-                        'message': f'Erreur réseau: {str(e)}',
-                        'action_required': 'check_connection'
-                    }), 500
-            
-            print(f"Response status: {response.status_code}")
-            
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_info = error_data.get('error', {})
-                error_message = error_info.get('message', 'Erreur API Facebook')
-                error_code = error_info.get('code', 'unknown')
-                
-                print(f"API Error at iteration {iteration}: {error_code} - {error_message}")
-                
-                # Special handling for rate limiting
-                if error_code in [4, 17, 613]:  # Rate limit error codes
-                    print(f"Rate limit detected, waiting 5 seconds...")
-                    import time
-                    time.sleep(5)
-                    continue  # Retry the same request
-                
-                # If we have some pages already, continue with what we have
-                if len(all_pages) > 0:
-                    print(f"Continuing with {len(all_pages)} pages despite error")
-                    break
-                else:
-                    return jsonify({
-                        'error': f'Erreur Facebook API lors de la pagination (Code: {error_code})',
-                        'message': error_message,
-                        'action_required': 'check_token_permissions',
-                        'facebook_error': {
-                            'code': error_code,
-                            'message': error_message,
-                            'iteration': iteration
-                        }
-                    }), 400
-            
-            data = response.json()
-            current_pages = data.get('data', [])
-            
-            print(f"Retrieved {len(current_pages)} pages in iteration {iteration}")
-            
-            # Add current pages to our collection
-            if current_pages:
-                all_pages.extend(current_pages)
-                page_count += len(current_pages)
-                print(f"Total pages accumulated: {len(all_pages)}")
-            
-            # Check if there are more pages to fetch
-            paging = data.get('paging', {})
-            next_url = paging.get('next')
-            
-            if next_url:
-                pages_url = next_url
-                params = {}  # Clear params as next URL contains all needed parameters
-                print(f"Next URL found: {next_url[:150]}...")
-                
-                # Additional safety check for infinite loops
-                if 'after=' not in next_url and 'before=' not in next_url:
-                    print(f"Warning: No pagination cursor in URL at iteration {iteration}")
-                    # Try to continue anyway, but with extra caution
-                    if iteration > 10:  # If we've been going for a while without cursors, stop
-                        print("Stopping due to potential infinite loop")
-                        break
-            else:
-                print("No next URL found, pagination complete")
-                break
-            
-            # Progress logging every 10 iterations
-            if iteration % 10 == 0:
-                print(f"PROGRESS: {iteration} iterations completed, {len(all_pages)} pages retrieved")
-        
-        pages = all_pages
+        # Get ALL pages managed by the user, recent posts expanded inline
+        try:
+            pages, iteration, data = fetch_all_pages(access_token, http=http, user_name=user_name)
+        except PageSyncError as e:
+            return jsonify(e.payload), e.status_code
         
         # Enhanced logging for debugging
         print(f"ENHANCED PAGINATION COMPLETE: {len(pages)} pages retrieved in {iteration} iterations")
@@ -406,7 +308,7 @@ def sync_facebook_pages():
                     'user_name': user_name,
                     'permissions': granted_permissions,
                     'iterations': iteration,
-                    'last_api_response': data if 'data' in locals() else None
+                    'last_api_response': data
                 },
                 'instructions': [
                     '1. Vérifiez que vous êtes administrateur de pages Facebook',
@@ -416,57 +318,28 @@ def sync_facebook_pages():
                 ]
             }), 200
         
-        # Format pages data for frontend
-        formatted_pages = []
-        for page in pages:
-            # Get recent posts count (optional)
-            posts_count = 0
-            last_post_time = 'Aucune publication'
-            try:
-                posts_url = f"https://graph.facebook.com/v18.0/{page['id']}/posts"
-                posts_params = {
-                    'access_token': page.get('access_token', access_token),
-                    'limit': 5,
-                    'fields': 'created_time,message'
-                }
-                posts_response = requests.get(posts_url, params=posts_params)
-                if posts_response.status_code == 200:
-                    posts_data = posts_response.json()
-                    posts_list = posts_data.get('data', [])
-                    posts_count = len(posts_list)
-                    if posts_list:
-                        from datetime import datetime
-                        last_post = posts_list[0].get('created_time', '')
-                        if last_post:
-                            # Convert to readable format
-                            last_post_time = 'Récemment'
-            except:
-                pass
-            
-            formatted_page = {
-                'id': page['id'],
-                'name': page['name'],
-                'category': page.get('category', 'Page'),
-                'fan_count': page.get('fan_count', 0),
-                'access_token': page.get('access_token', ''),
-                'picture': page.get('picture', {}).get('data', {}).get('url', ''),
-                'posts_count': posts_count,
-                'status': 'Connectée',
-                'last_post': last_post_time
-            }
-            formatted_pages.append(formatted_page)
+        # Pages whose posts could not be expanded inline are probed in batches
+        probed = attach_recent_posts(pages, access_token, http=http)
+        if probed:
+            print(f"Recent posts probed separately for {probed} pages")
         
-        # Save pages to a simple JSON file for persistence
-        pages_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'facebook_pages.json')
-        os.makedirs(os.path.dirname(pages_file), exist_ok=True)
+        # Format pages data for frontend
+        formatted_pages = [format_page(page) for page in pages]
         
-        with open(pages_file, 'w') as f:
-            json.dump(formatted_pages, f, indent=2)
+        # Merge into the stored snapshot, only changed entries are rewritten
+        full_sync = request.args.get('full', 'false').lower() == 'true'
+        # Waits for a background sync in progress, so the two do not interleave their writes
+        with page_sync_worker.sync_lock:
+            sync_result = apply_incremental_sync(formatted_pages, PAGES_FILE, PAGE_SYNC_STATE_FILE, full=full_sync)
+        changes = sync_result['changes']
+        print(f"Page sync delta: {len(changes['added'])} added, {len(changes['removed'])} removed, "
+              f"{len(changes['changed'])} changed, {changes['unchanged']} unchanged")
         
         return jsonify({
             'success': True,
             'message': f'{len(formatted_pages)} pages synchronisées avec succès pour {user_name}',
-            'pages': formatted_pages,
+            'pages': sync_result['pages'],
+            'changes': changes,
             'user_info': {
                 'name': user_name,
                 'id': user_data.get('id'),
@@ -479,16 +352,25 @@ def sync_facebook_pages():
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la synchronisation: {str(e)}'}), 500
 
+@app.route('/api/facebook/pages/sync/status', methods=['GET'])
+def get_page_sync_status():
+    """Get the last page sync time and changes"""
+    status = read_sync_state(PAGE_SYNC_STATE_FILE)
+    status.update({
+        'background_sync': page_sync_worker.running,
+        'interval': page_sync_worker.interval,
+        'last_error': page_sync_worker.last_error
+    })
+    return jsonify(status)
+
 @app.route('/api/facebook/pages', methods=['GET'])
 def get_facebook_pages():
     """Get stored Facebook pages"""
     try:
-        pages_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'facebook_pages.json')
-        
-        if os.path.exists(pages_file):
-            with open(pages_file, 'r') as f:
+        if os.path.exists(PAGES_FILE):
+            with open(PAGES_FILE, 'r') as f:
                 pages = json.load(f)
-            return jsonify({'pages': pages})
+            return jsonify({'pages': pages, 'last_sync': read_sync_state(PAGE_SYNC_STATE_FILE)['last_sync']})
         else:
             # Return sample data if no real pages synced yet
             sample_pages = [
@@ -529,26 +411,12 @@ def get_facebook_pages():
 def get_pages_for_publishing():
     """Get pages formatted for publishing interface"""
     try:
-        # Import Facebook API here to avoid import issues
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from facebook_api import FacebookAPI
-        
-        # Load configuration
-        env_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-        if os.path.exists(env_file):
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        os.environ[key] = value
-        
-        access_token = os.environ.get('FACEBOOK_ACCESS_TOKEN')
+        access_token = get_access_token()
         if not access_token:
             return jsonify({'success': False, 'error': 'Token Facebook non configuré'}), 400
         
         # Initialize Facebook API
-        fb_api = FacebookAPI(access_token=access_token)
+        fb_api = get_facebook_client(access_token)
         
         # Get all pages
         pages = fb_api.get_all_pages_for_publishing()
@@ -577,19 +445,86 @@ def get_pages_for_publishing():
             'error': f'Erreur lors du chargement des pages: {str(e)}'
         }), 500
 
+def _publish_job_task(task):
+    """Publish one page of a queued publish job (runs in a queue worker)"""
+    access_token = get_access_token()
+    if not access_token:
+        raise RuntimeError('Token Facebook non configuré')
+    
+    # The shared client keeps the page tokens between tasks
+    fb_api = get_facebook_client(access_token)
+    page_token = fb_api._find_page_token(task['page_id'])
+    if not page_token:
+        raise RuntimeError('Token de page non trouvé')
+    
+    result = fb_api._publish_to_page(task['page_id'], task['message'], task['media_paths'] or None,
+                                     task['link'], page_token)
+    if not result.get('id'):
+        raise RuntimeError('Erreur lors de la publication')
+    return {'post_id': result['id']}
+
+
+def _publish_job_response(job):
+    """Build the publish response (status, progress, results per page) of a job"""
+    response = job_results(job)
+    for result in response['results'].values():
+        if result['success']:
+            result['message'] = 'Publication réussie'
+        elif result['success'] is False:
+            result['message'] = f"Erreur: {result['error']}"
+        else:
+            result['message'] = 'En attente' if result['status'] == 'pending' else 'Publication en cours'
+    response.update({
+        # A job still running has not succeeded yet: clients poll status_url
+        'success': job['status'] == 'completed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at'],
+        'progress': job['progress']
+    })
+    return response
+
+
+# Durable publish queue: a multi-page publication is stored as a job with
+# one task per page and executed by worker threads outside the request
+PUBLISH_JOBS_DB = os.path.join(os.path.dirname(__file__), '..', 'data', 'publish_jobs.db')
+PUBLISH_UPLOADS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'uploads', 'jobs')
+publish_queue = PublishJobQueue(PublishJobStore(PUBLISH_JOBS_DB), _publish_job_task,
+                                uploads_dir=PUBLISH_UPLOADS_DIR)
+app.extensions['publish_queue'] = publish_queue
+
+
+def start_background_workers():
+    """
+    Start the background threads of the app
+
+    Called by the entry points (not on import, so tests and CLI commands
+    do not start workers): page sync and insights snapshots when enabled,
+    and the publish queue, which resumes the pending tasks of jobs
+    interrupted by a restart.
+    """
+    if page_sync_worker.interval > 0:
+        page_sync_worker.start()
+    if insights_sync_worker.interval > 0:
+        insights_sync_worker.start()
+    publish_queue.start()
+
 @app.route('/api/facebook/publish/multi', methods=['POST'])
 def publish_multi_pages():
-    """Publish content to multiple Facebook pages"""
+    """
+    Publish content to multiple Facebook pages
+    
+    The publication is queued as a job. The response waits for the job up
+    to FACEBOOK_PUBLISH_SYNC_WAIT seconds and returns the results; larger
+    fan-outs (or async=true) get 202 with the job ID to poll.
+    """
     try:
-        # Import Facebook API here to avoid import issues
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from facebook_api import FacebookAPI
-        
         # Get form data
         message = request.form.get('message', '').strip()
         page_ids = json.loads(request.form.get('page_ids', '[]'))
         link = request.form.get('link', '').strip()
+        run_async = (request.form.get('async') or request.args.get('async', '')).lower() == 'true'
         
         if not message:
             return jsonify({'success': False, 'error': 'Le message est obligatoire'}), 400
@@ -597,88 +532,25 @@ def publish_multi_pages():
         if not page_ids:
             return jsonify({'success': False, 'error': 'Aucune page sélectionnée'}), 400
         
-        # Load configuration
-        env_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-        if os.path.exists(env_file):
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        os.environ[key] = value
-        
-        access_token = os.environ.get('FACEBOOK_ACCESS_TOKEN')
-        if not access_token:
+        if not get_access_token():
             return jsonify({'success': False, 'error': 'Token Facebook non configuré'}), 400
         
-        # Initialize Facebook API
-        fb_api = FacebookAPI(access_token=access_token)
+        # Media files are kept with the job until it completes
+        job_id = uuid.uuid4().hex
+        media_paths = []
+        for media_file in request.files.getlist('media_files'):
+            if media_file.filename:
+                media_path = os.path.join(publish_queue.media_dir(job_id), os.path.basename(media_file.filename))
+                media_file.save(media_path)
+                media_paths.append(media_path)
         
-        # Get all pages to get access tokens
-        all_pages = fb_api.get_all_pages_for_publishing()
-        page_tokens = {page['id']: page.get('access_token', '') for page in all_pages}
+        publish_queue.enqueue([str(page_id) for page_id in page_ids], message, link or None,
+                              media_paths, job_id=job_id)
         
-        # Publish to each selected page
-        results = {}
-        successful = 0
-        failed = 0
-        
-        for page_id in page_ids:
-            try:
-                page_token = page_tokens.get(page_id)
-                if not page_token:
-                    results[page_id] = {
-                        'success': False,
-                        'message': 'Token de page non trouvé'
-                    }
-                    failed += 1
-                    continue
-                
-                # Create page-specific API instance
-                page_api = FacebookAPI(access_token=page_token)
-                
-                # Publish post
-                if link:
-                    post_data = {
-                        'message': message,
-                        'link': link
-                    }
-                else:
-                    post_data = {
-                        'message': message
-                    }
-                
-                result = page_api.publish_post(page_id, **post_data)
-                
-                if result.get('id'):
-                    results[page_id] = {
-                        'success': True,
-                        'message': 'Publication réussie',
-                        'post_id': result['id']
-                    }
-                    successful += 1
-                else:
-                    results[page_id] = {
-                        'success': False,
-                        'message': 'Erreur lors de la publication'
-                    }
-                    failed += 1
-                    
-            except Exception as e:
-                results[page_id] = {
-                    'success': False,
-                    'message': f'Erreur: {str(e)}'
-                }
-                failed += 1
-        
-        return jsonify({
-            'success': True,
-            'results': results,
-            'summary': {
-                'total': len(page_ids),
-                'successful': successful,
-                'failed': failed
-            }
-        })
+        job = publish_queue.wait(job_id, 0 if run_async else publish_queue.sync_wait)
+        response = _publish_job_response(job)
+        response['status_url'] = f'/api/facebook/publish/jobs/{job_id}'
+        return jsonify(response), 200 if job['status'] == 'completed' else 202
         
     except Exception as e:
         return jsonify({
@@ -686,30 +558,30 @@ def publish_multi_pages():
             'error': f'Erreur lors de la publication: {str(e)}'
         }), 500
 
+@app.route('/api/facebook/publish/jobs/<job_id>', methods=['GET'])
+def get_publish_job(job_id):
+    """Get the status, progress and per-page results of a publish job"""
+    job = publish_queue.store.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Publication introuvable'}), 404
+    return jsonify(_publish_job_response(job))
+
+@app.route('/api/facebook/publish/jobs', methods=['GET'])
+def list_publish_jobs():
+    """List the most recent publish jobs"""
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'success': True, 'jobs': publish_queue.store.list_jobs(limit)})
+
 @app.route('/api/facebook/posts/performance')
 def get_posts_performance():
     """Get posts performance data for analytics"""
     try:
-        # Import Facebook API here to avoid import issues
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from facebook_api import FacebookAPI
-        
-        # Load configuration
-        env_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-        if os.path.exists(env_file):
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        os.environ[key] = value
-        
-        access_token = os.environ.get('FACEBOOK_ACCESS_TOKEN')
+        access_token = get_access_token()
         if not access_token:
             return jsonify({'success': False, 'error': 'Token Facebook non configuré'}), 400
         
         # Initialize Facebook API
-        fb_api = FacebookAPI(access_token=access_token)
+        fb_api = get_facebook_client(access_token)
         
         # Get all pages
         pages = fb_api.get_all_pages_for_publishing()
@@ -822,11 +694,6 @@ def generate_sample_posts_for_page(page):
 def create_boost_campaign():
     """Create a boost campaign for a post"""
     try:
-        # Import Facebook API here to avoid import issues
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from facebook_api import FacebookAPI
-        
         # Get JSON data
         data = request.get_json()
         
@@ -842,21 +709,12 @@ def create_boost_campaign():
         if not post_id:
             return jsonify({'success': False, 'error': 'ID du post manquant'}), 400
         
-        # Load configuration
-        env_file = os.path.join(os.path.dirname(__file__), '..', '.env')
-        if os.path.exists(env_file):
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        os.environ[key] = value
-        
-        access_token = os.environ.get('FACEBOOK_ACCESS_TOKEN')
+        access_token = get_access_token()
         if not access_token:
             return jsonify({'success': False, 'error': 'Token Facebook non configuré'}), 400
         
         # Initialize Facebook API
-        fb_api = FacebookAPI(access_token=access_token)
+        fb_api = get_facebook_client(access_token)
         
         # For now, simulate boost creation (in real implementation, use Facebook Marketing API)
         boost_data = {
@@ -994,11 +852,6 @@ def get_campaigns():
 def create_campaign():
     """Create a new campaign with adset and ad"""
     try:
-        # Import Facebook API here to avoid import issues
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from facebook_api import FacebookAPI
-        
         # Get JSON data
         data = request.get_json()
         
@@ -1009,13 +862,12 @@ def create_campaign():
         if not data.get('campaign') or not data.get('adset') or not data.get('ad'):
             return jsonify({'success': False, 'error': 'Données de campagne incomplètes'}), 400
         
-        # Get access token from environment
-        access_token = os.getenv('FACEBOOK_ACCESS_TOKEN')
+        access_token = get_access_token()
         if not access_token:
             return jsonify({'success': False, 'error': 'Token Facebook non configuré'}), 400
         
         # Initialize Facebook API
-        fb_api = FacebookAPI(access_token=access_token)
+        fb_api = get_facebook_client(access_token)
         
         # For demo purposes, simulate campaign creation
         # In a real implementation, use Facebook Marketing API to create:
@@ -1105,6 +957,23 @@ def internal_error(error):
     """Handle 500 errors"""
     return jsonify({'error': 'Internal server error'}), 500
 
+# Only the analytics view of the dashboard blueprint is served: its other
+# routes (scheduled posts, campaigns, notifications, export) return mock data
+if dashboard_analytics:
+    app.add_url_rule('/api/dashboard/analytics', 'dashboard_analytics', dashboard_analytics, methods=['GET'])
+
+@app.cli.command('insights-backfill')
+@click.option('--days', default=90, show_default=True, help='Days of history to load')
+def insights_backfill(days):
+    """Load the history of page insights and snapshot the posts of the period"""
+    access_token = get_access_token()
+    if not access_token:
+        raise click.ClickException('Token Facebook non configuré')
+    result = backfill_insights(get_facebook_client(access_token), get_insights_store(), days=days)
+    click.echo(f"{result['pages']['values']} page values from {result['pages']['pages']} pages, "
+               f"posts of {result['posts']['pages_crawled']}/{result['posts']['pages_total']} pages")
+
 if __name__ == '__main__':
+    start_background_workers()
     app.run(host='0.0.0.0', port=5001, debug=True)
 
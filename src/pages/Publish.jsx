@@ -10,7 +10,7 @@ import {
 } from '@heroicons/react/24/outline'
 import PageCard from '../components/ui/PageCard'
 import LoadingSpinner from '../components/ui/LoadingSpinner'
-import { fetchPages, publishToPages } from '../services/api'
+import { fetchPages, publishAndWait } from '../services/api'
 
 const Publish = () => {
   const [selectedPages, setSelectedPages] = useState([])
@@ -22,7 +22,12 @@ const Publish = () => {
 
   const { data: pages, isLoading: pagesLoading } = useQuery('pages', fetchPages)
 
-  const publishMutation = useMutation(publishToPages, {
+  const publishMutation = useMutation((publishData) => publishAndWait(publishData, {
+    onProgress: (progress) => toast.loading(
+      `Publication en cours : ${progress?.done || 0}/${progress?.total || 0} page(s)`, { id: 'publish-progress' }
+    ),
+  }), {
+    onSettled: () => toast.dismiss('publish-progress'),
     onSuccess: (data) => {
       if (data.success) {
         toast.success(`Publication réussie sur ${data.summary?.successful || 0} page(s)`)
@@ -3,26 +3,34 @@ Analytics and Boost Post Routes for Facebook Publisher SaaS v3.0.0
 """
 
 import os
+import sys
 import json
-import requests
+import time
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from facebook_api import FacebookAPIError
+from services.settings import get_settings
+from services.facebook_clients import get_facebook_client
+from services.posts_performance import crawl_posts_performance
+from services.insights_store import DEFAULT_MAX_AGE, get_insights_store
+
 analytics_bp = Blueprint('analytics', __name__)
 
 def get_facebook_token():
-    """Get Facebook access token from environment"""
-    settings_file = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
-    if os.path.exists(settings_file):
-        with open(settings_file, 'r') as f:
-            for line in f:
-                if line.startswith('FACEBOOK_ACCESS_TOKEN='):
-                    return line.split('=', 1)[1].strip()
-    return None
+    """Get Facebook access token from the cached settings"""
+    return get_settings().get('FACEBOOK_ACCESS_TOKEN')
 
 @analytics_bp.route('/api/facebook/posts/performance', methods=['GET'])
 def get_posts_performance():
-    """Get posts performance data for analytics"""
+    """
+    Get posts performance data for analytics
+
+    Served from the local insights store while its last snapshot is recent
+    (FACEBOOK_INSIGHTS_MAX_AGE), otherwise every page is crawled within
+    ?budget= seconds and the result is recorded. ?refresh=true forces a crawl.
+    """
     try:
         access_token = get_facebook_token()
         if not access_token:
@@ -32,123 +40,39 @@ def get_posts_performance():
                 'stats': {}
             }), 400
 
-        # Get pages first
-        pages_url = f"https://graph.facebook.com/v18.0/me/accounts"
-        pages_params = {
-            'access_token': access_token,
-            'fields': 'id,name,access_token',
-            'limit': 100
-        }
-        
-        pages_response = requests.get(pages_url, params=pages_params, timeout=30)
-        if pages_response.status_code != 200:
+        store = get_insights_store()
+        last = store.last_ingest()
+        max_age = float(os.getenv('FACEBOOK_INSIGHTS_MAX_AGE', DEFAULT_MAX_AGE))
+        if request.args.get('refresh') != 'true' and last and time.time() - last['finished_at'] < max_age:
+            performance = store.posts_performance()
+            return jsonify({
+                'success': True,
+                'source': 'local',
+                'posts': performance['posts'],
+                'stats': performance['stats'],
+                'pages': performance['pages'],
+                'coverage': performance['coverage'],
+                'as_of': performance['as_of']
+            })
+
+        budget = request.args.get('budget', type=float)
+        try:
+            performance = crawl_posts_performance(get_facebook_client(access_token), budget=budget, store=store)
+        except FacebookAPIError:
             return jsonify({
                 'error': 'Erreur lors de la récupération des pages',
                 'posts': [],
                 'stats': {}
             }), 400
 
-        pages_data = pages_response.json()
-        pages = pages_data.get('data', [])
-        
-        all_posts = []
-        total_reach = 0
-        total_engagement = 0
-        total_shares = 0
-        boosted_posts_count = 0
-        
-        # Get posts from each page
-        for page in pages[:10]:  # Limit to first 10 pages for performance
-            page_id = page['id']
-            page_name = page['name']
-            page_token = page.get('access_token', access_token)
-            
-            # Get posts from this page
-            posts_url = f"https://graph.facebook.com/v18.0/{page_id}/posts"
-            posts_params = {
-                'access_token': page_token,
-                'fields': 'id,message,created_time,insights.metric(post_impressions,post_engaged_users,post_clicks,post_reactions_like_total,post_reactions_love_total,post_reactions_wow_total,post_reactions_haha_total,post_reactions_sorry_total,post_reactions_anger_total,post_comments,post_shares)',
-                'limit': 20,
-                'since': (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            }
-            
-            try:
-                posts_response = requests.get(posts_url, params=posts_params, timeout=20)
-                if posts_response.status_code == 200:
-                    posts_data = posts_response.json()
-                    page_posts = posts_data.get('data', [])
-                    
-                    for post in page_posts:
-                        # Extract insights data
-                        insights = post.get('insights', {}).get('data', [])
-                        post_metrics = {}
-                        
-                        for insight in insights:
-                            metric_name = insight.get('name')
-                            metric_values = insight.get('values', [])
-                            if metric_values:
-                                post_metrics[metric_name] = metric_values[0].get('value', 0)
-                        
-                        # Calculate engagement
-                        likes = post_metrics.get('post_reactions_like_total', 0)
-                        loves = post_metrics.get('post_reactions_love_total', 0)
-                        wows = post_metrics.get('post_reactions_wow_total', 0)
-                        hahas = post_metrics.get('post_reactions_haha_total', 0)
-                        sorrys = post_metrics.get('post_reactions_sorry_total', 0)
-                        angers = post_metrics.get('post_reactions_anger_total', 0)
-                        comments = post_metrics.get('post_comments', 0)
-                        shares = post_metrics.get('post_shares', 0)
-                        
-                        total_reactions = likes + loves + wows + hahas + sorrys + angers
-                        engagement = total_reactions + comments + shares
-                        reach = post_metrics.get('post_impressions', 0)
-                        
-                        # Add to totals
-                        total_reach += reach
-                        total_engagement += engagement
-                        total_shares += shares
-                        
-                        # Format post data
-                        post_data = {
-                            'id': post['id'],
-                            'message': post.get('message', '')[:100] + ('...' if len(post.get('message', '')) > 100 else ''),
-                            'page_name': page_name,
-                            'page_id': page_id,
-                            'created_time': post.get('created_time'),
-                            'reach': reach,
-                            'engagement': engagement,
-                            'likes': total_reactions,
-                            'comments': comments,
-                            'shares': shares,
-                            'status': 'boosted' if reach > 1000 else 'organic',  # Simple heuristic
-                            'boost_eligible': True
-                        }
-                        
-                        if post_data['status'] == 'boosted':
-                            boosted_posts_count += 1
-                        
-                        all_posts.append(post_data)
-                        
-            except Exception as e:
-                print(f"Error getting posts for page {page_name}: {str(e)}")
-                continue
-        
-        # Sort posts by engagement descending
-        all_posts.sort(key=lambda x: x['engagement'], reverse=True)
-        
-        # Prepare stats summary
-        stats = {
-            'total_reach': total_reach,
-            'total_engagement': total_engagement,
-            'total_shares': total_shares,
-            'boosted_posts_count': boosted_posts_count,
-            'posts_count': len(all_posts)
-        }
-        
         return jsonify({
             'success': True,
-            'posts': all_posts[:50],  # Return top 50 posts
-            'stats': stats
+            'source': 'graph',
+            'posts': performance['posts'],
+            'stats': performance['stats'],
+            'pages': performance['pages'],
+            'coverage': performance['coverage'],
+            'timings': performance['timings']
         })
         
     except Exception as e:
@@ -253,13 +177,7 @@ def boost_post(post_id):
                 'error': 'Token Facebook non configuré'
             }), 400
         
-        # Import Facebook API
-        import sys
-        import os
-        sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-        from facebook_api import FacebookAPI
-        
-        fb_api = FacebookAPI(access_token)
+        fb_api = get_facebook_client(access_token)
         
         # Prepare targeting
         targeting = {
@@ -345,13 +263,7 @@ def get_ad_accounts():
                 'error': 'Token Facebook non configuré'
             }), 400
         
-        # Import Facebook API
-        import sys
-        import os
-        sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-        from facebook_api import FacebookAPI
-        
-        fb_api = FacebookAPI(access_token)
+        fb_api = get_facebook_client(access_token)
         ad_accounts = fb_api.get_ad_accounts()
         
         return jsonify({
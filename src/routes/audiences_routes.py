@@ -1,121 +1,51 @@
 """
 Audiences CRUD Routes for Facebook Publisher SaaS v3.1.0
-Complete audience management system with JSON storage and Facebook API integration
+Complete audience management system with SQLite storage and Facebook API integration
 """
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-import json
 import os
 import uuid
 
+from services.settings import get_settings
+from services.audience_store import get_audience_store
+from services.targeting_search import get_targeting_search
+from services.audience_estimator import (calculate_audience_size, generate_audience_recommendations,
+                                         get_audience_estimator)
+from services.facebook_clients import get_facebook_client
+
 audiences_bp = Blueprint('audiences', __name__)
 
-# Path to audiences storage file
+# Maximum targeting specs per batch estimate
+MAX_BATCH_ESTIMATES = 200
+
+# Former audiences storage file, imported once into the database next to it
 AUDIENCES_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'audiences.json')
 
 def get_facebook_token():
-    """Get Facebook access token from environment"""
-    return os.getenv('FACEBOOK_ACCESS_TOKEN')
+    """Get Facebook access token from the cached settings, then environment"""
+    return get_settings().get('FACEBOOK_ACCESS_TOKEN') or os.getenv('FACEBOOK_ACCESS_TOKEN')
 
-def load_audiences():
-    """Load audiences from JSON file"""
-    try:
-        if os.path.exists(AUDIENCES_FILE):
-            with open(AUDIENCES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-    except Exception as e:
-        print(f"Error loading audiences: {str(e)}")
-        return []
+def get_store():
+    """Audience repository (FACEBOOK_AUDIENCES_DB, or audiences.db next to AUDIENCES_FILE)"""
+    db_path = os.getenv('FACEBOOK_AUDIENCES_DB') or os.path.splitext(AUDIENCES_FILE)[0] + '.db'
+    return get_audience_store(db_path, legacy_json=AUDIENCES_FILE)
 
-def save_audiences(audiences):
-    """Save audiences to JSON file"""
-    try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(AUDIENCES_FILE), exist_ok=True)
-        
-        with open(AUDIENCES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(audiences, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving audiences: {str(e)}")
-        return False
+def search_graph_interests(queries):
+    """Search Facebook targeting interests for the remote lookups of the interest search"""
+    return get_facebook_client(get_facebook_token()).search_interests(queries, locale='fr_FR')
 
-def calculate_audience_size(targeting, audience_type='custom'):
-    """Calculate estimated audience size based on targeting"""
-    base_size = 1000000  # Base population for France
-    
-    if audience_type == 'lookalike':
-        return 28000
-    
-    # Apply demographic filters
-    if 'age_min' in targeting and 'age_max' in targeting:
-        age_range = targeting['age_max'] - targeting['age_min']
-        age_factor = min(age_range / 40, 1.0)  # Max factor for 40+ year range
-        base_size *= age_factor
-    
-    # Apply gender filter
-    if 'gender' in targeting and targeting['gender'] != 'all':
-        base_size *= 0.5
-    
-    # Apply location filter
-    if 'location' in targeting:
-        location_factors = {
-            'FR': 1.0,
-            'BE': 0.17,
-            'CH': 0.13,
-            'CA': 0.56
-        }
-        base_size *= location_factors.get(targeting['location'], 0.1)
-    
-    # Apply interests filter
-    if 'interests' in targeting and targeting['interests']:
-        interest_count = len(targeting['interests'])
-        interest_factor = max(0.1, 1.0 - (interest_count * 0.15))
-        base_size *= interest_factor
-    
-    return max(1000, int(base_size))
-
-def generate_audience_recommendations(targeting, estimated_size):
-    """Generate recommendations for audience optimization"""
-    recommendations = []
-    
-    if estimated_size < 10000:
-        recommendations.append({
-            'type': 'warning',
-            'message': 'Audience trop petite (< 10k). Élargissez les critères.',
-            'suggestion': 'Augmentez la tranche d\'âge ou réduisez les centres d\'intérêt'
-        })
-    
-    if estimated_size > 500000:
-        recommendations.append({
-            'type': 'info',
-            'message': 'Audience très large. Affinez pour de meilleurs résultats.',
-            'suggestion': 'Ajoutez des centres d\'intérêt spécifiques ou réduisez la zone géographique'
-        })
-    
-    if 'interests' in targeting and len(targeting.get('interests', [])) > 5:
-        recommendations.append({
-            'type': 'tip',
-            'message': 'Trop de centres d\'intérêt peuvent réduire la portée.',
-            'suggestion': 'Limitez à 3-5 centres d\'intérêt principaux'
-        })
-    
-    if not recommendations:
-        recommendations.append({
-            'type': 'success',
-            'message': 'Taille d\'audience optimale pour de bons résultats.',
-            'suggestion': 'Cette audience devrait bien performer'
-        })
-    
-    return recommendations
+def new_audience_id():
+    """Generate a unique audience ID"""
+    return f"audience_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
 
 @audiences_bp.route('/api/facebook/audiences', methods=['GET'])
 def get_audiences():
     """Get all saved audiences"""
     try:
-        audiences = load_audiences()
+        store = get_store()
+        audiences = store.list()
         
         # If no audiences exist, create sample ones
         if not audiences:
@@ -168,8 +98,8 @@ def get_audiences():
                 }
             ]
             
-            save_audiences(sample_audiences)
-            audiences = sample_audiences
+            store.create_many(sample_audiences, skip_existing=True)
+            audiences = store.list()
         
         return jsonify({
             'success': True,
@@ -211,7 +141,7 @@ def create_audience():
                     }), 400
         
         # Generate unique ID
-        audience_id = f"audience_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        audience_id = new_audience_id()
         
         # Calculate audience size
         estimated_size = calculate_audience_size(targeting, data['type'])
@@ -229,26 +159,15 @@ def create_audience():
             'facebook_audience_id': None  # Will be set when created on Facebook
         }
         
-        # Load existing audiences and add new one
-        audiences = load_audiences()
-        audiences.append(new_audience)
-        
-        # Save to file
-        if not save_audiences(audiences):
-            return jsonify({
-                'success': False,
-                'error': 'Erreur lors de la sauvegarde'
-            }), 500
+        # Save to the repository
+        store = get_store()
+        store.create(new_audience)
         
         # Try to create on Facebook (optional)
         access_token = get_facebook_token()
         if access_token:
             try:
-                import sys
-                sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-                from facebook_api import FacebookAPI
-                
-                fb_api = FacebookAPI(access_token)
+                fb_api = get_facebook_client(access_token)
                 
                 # Get ad account ID (you might want to make this configurable)
                 ad_account_id = '123456789'  # Replace with actual ad account ID
@@ -261,7 +180,8 @@ def create_audience():
                 
                 if fb_result.get('success'):
                     new_audience['facebook_audience_id'] = fb_result.get('audience_id')
-                    save_audiences(audiences)
+                    store.update(audience_id, lambda audience: audience.update(
+                        facebook_audience_id=new_audience['facebook_audience_id']))
                 
             except Exception as fb_error:
                 print(f"Facebook API error (non-critical): {str(fb_error)}")
@@ -283,9 +203,7 @@ def create_audience():
 def get_audience(audience_id):
     """Get a specific audience by ID"""
     try:
-        audiences = load_audiences()
-        
-        audience = next((a for a in audiences if a['id'] == audience_id), None)
+        audience = get_store().get(audience_id)
         
         if not audience:
             return jsonify({
@@ -310,37 +228,28 @@ def update_audience(audience_id):
     """Update an existing audience"""
     try:
         data = request.get_json()
-        audiences = load_audiences()
         
-        audience_index = next((i for i, a in enumerate(audiences) if a['id'] == audience_id), None)
+        def apply_changes(audience):
+            if 'name' in data:
+                audience['name'] = data['name']
+            if 'description' in data:
+                audience['description'] = data['description']
+            if 'targeting' in data:
+                audience['targeting'] = data['targeting']
+                # Recalculate size if targeting changed
+                audience['size'] = calculate_audience_size(data['targeting'], audience['type'])
+            
+            audience['updated_date'] = datetime.now().isoformat() + 'Z'
+        
+        # Update audience data in a single transaction
+        audience = get_store().update(audience_id, apply_changes)
         
-        if audience_index is None:
+        if audience is None:
             return jsonify({
                 'success': False,
                 'error': 'Audience non trouvée'
             }), 404
         
-        # Update audience data
-        audience = audiences[audience_index]
-        
-        if 'name' in data:
-            audience['name'] = data['name']
-        if 'description' in data:
-            audience['description'] = data['description']
-        if 'targeting' in data:
-            audience['targeting'] = data['targeting']
-            # Recalculate size if targeting changed
-            audience['size'] = calculate_audience_size(data['targeting'], audience['type'])
-        
-        audience['updated_date'] = datetime.now().isoformat() + 'Z'
-        
-        # Save changes
-        if not save_audiences(audiences):
-            return jsonify({
-                'success': False,
-                'error': 'Erreur lors de la sauvegarde'
-            }), 500
-        
         return jsonify({
             'success': True,
             'audience': audience,
@@ -358,26 +267,15 @@ def update_audience(audience_id):
 def delete_audience(audience_id):
     """Delete an audience"""
     try:
-        audiences = load_audiences()
-        
-        audience_index = next((i for i, a in enumerate(audiences) if a['id'] == audience_id), None)
+        # Remove audience
+        deleted_audience = get_store().delete(audience_id)
         
-        if audience_index is None:
+        if deleted_audience is None:
             return jsonify({
                 'success': False,
                 'error': 'Audience non trouvée'
             }), 404
         
-        # Remove audience
-        deleted_audience = audiences.pop(audience_index)
-        
-        # Save changes
-        if not save_audiences(audiences):
-            return jsonify({
-                'success': False,
-                'error': 'Erreur lors de la sauvegarde'
-            }), 500
-        
         return jsonify({
             'success': True,
             'message': f'Audience "{deleted_audience["name"]}" supprimée avec succès'
@@ -394,9 +292,8 @@ def delete_audience(audience_id):
 def duplicate_audience(audience_id):
     """Duplicate an existing audience"""
     try:
-        audiences = load_audiences()
-        
-        original_audience = next((a for a in audiences if a['id'] == audience_id), None)
+        store = get_store()
+        original_audience = store.get(audience_id)
         
         if not original_audience:
             return jsonify({
@@ -405,10 +302,10 @@ def duplicate_audience(audience_id):
             }), 404
         
         # Create duplicate
-        new_audience_id = f"audience_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        duplicate_id = new_audience_id()
         
         duplicate_audience = {
-            'id': new_audience_id,
+            'id': duplicate_id,
             'name': f"{original_audience['name']} (Copie)",
             'description': f"Copie de: {original_audience['description']}",
             'type': original_audience['type'],
@@ -419,14 +316,8 @@ def duplicate_audience(audience_id):
             'facebook_audience_id': None
         }
         
-        audiences.append(duplicate_audience)
-        
-        # Save changes
-        if not save_audiences(audiences):
-            return jsonify({
-                'success': False,
-                'error': 'Erreur lors de la sauvegarde'
-            }), 500
+        # Save the copy
+        store.create(duplicate_audience)
         
         return jsonify({
             'success': True,
@@ -453,37 +344,65 @@ def estimate_audience_size():
                 'error': 'Données de ciblage manquantes'
             }), 400
         
-        targeting = data['targeting']
-        audience_type = data.get('type', 'custom')
+        # Size, recommendations and cost (memoized per canonical spec)
+        estimate = get_audience_estimator().estimate(data['targeting'], data.get('type', 'custom'))
+        
+        return jsonify({
+            'success': True,
+            'estimate': estimate
+        })
+        
+    except Exception as e:
+        print(f"Error estimating audience: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Erreur lors de l\'estimation: {str(e)}'
+        }), 500
+
+@audiences_bp.route('/api/facebook/audiences/estimate/batch', methods=['POST'])
+def estimate_audience_sizes():
+    """Estimate audience sizes for several targeting specs in one call"""
+    try:
+        data = request.get_json() or {}
+        specs = data.get('specs')
         
-        # Calculate size
-        estimated_size = calculate_audience_size(targeting, audience_type)
+        if not isinstance(specs, list) or not specs:
+            return jsonify({
+                'success': False,
+                'error': 'Liste de ciblages manquante (specs)'
+            }), 400
         
-        # Generate recommendations
-        recommendations = generate_audience_recommendations(targeting, estimated_size)
+        if len(specs) > MAX_BATCH_ESTIMATES:
+            return jsonify({
+                'success': False,
+                'error': f'Trop de ciblages (maximum {MAX_BATCH_ESTIMATES})'
+            }), 400
         
-        # Calculate cost estimates
-        cost_per_thousand = 15  # Base CPM in euros
-        daily_budget_suggestion = max(10, min(50, estimated_size // 1000))
+        for position, spec in enumerate(specs):
+            if not isinstance(spec, dict) or not isinstance(spec.get('targeting'), dict):
+                return jsonify({
+                    'success': False,
+                    'error': f'Données de ciblage manquantes (ciblage {position})'
+                }), 400
         
-        estimate = {
-            'size': estimated_size,
-            'reach_potential': 'Élevé' if estimated_size > 50000 else 'Moyen' if estimated_size > 10000 else 'Faible',
-            'recommendations': recommendations,
-            'cost_estimate': {
-                'cpm': cost_per_thousand,
-                'suggested_daily_budget': daily_budget_suggestion,
-                'estimated_daily_reach': min(estimated_size, daily_budget_suggestion * 1000 // cost_per_thousand)
-            }
-        }
+        estimator = get_audience_estimator()
+        try:
+            estimates = estimator.estimate_many([(spec['targeting'], spec.get('type', 'custom')) for spec in specs])
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': f'Ciblage invalide: {str(e)}'
+            }), 400
         
         return jsonify({
             'success': True,
-            'estimate': estimate
+            'estimates': estimates,
+            'total': len(estimates),
+            'cache': estimator.stats()
         })
         
     except Exception as e:
-        print(f"Error estimating audience: {str(e)}")
+        print(f"Error estimating audiences: {str(e)}")
         return jsonify({
             'success': False,
             'error': f'Erreur lors de l\'estimation: {str(e)}'
@@ -501,34 +420,14 @@ def search_interests():
                 'error': 'Requête trop courte (minimum 2 caractères)'
             }), 400
         
-        # Sample interests database (in real implementation, this would query Facebook API)
-        all_interests = [
-            {'id': 'bricolage', 'name': 'Bricolage', 'category': 'Hobbies'},
-            {'id': 'jardinage', 'name': 'Jardinage', 'category': 'Hobbies'},
-            {'id': 'amenagement_exterieur', 'name': 'Aménagement extérieur', 'category': 'Home & Garden'},
-            {'id': 'terrasse', 'name': 'Terrasse', 'category': 'Home & Garden'},
-            {'id': 'cloture', 'name': 'Clôture', 'category': 'Home & Garden'},
-            {'id': 'bois', 'name': 'Bois', 'category': 'Materials'},
-            {'id': 'composite', 'name': 'Composite', 'category': 'Materials'},
-            {'id': 'renovation', 'name': 'Rénovation', 'category': 'Home Improvement'},
-            {'id': 'menuiserie', 'name': 'Menuiserie', 'category': 'Crafts'},
-            {'id': 'outillage', 'name': 'Outillage', 'category': 'Tools'},
-            {'id': 'decoration_exterieure', 'name': 'Décoration extérieure', 'category': 'Home & Garden'},
-            {'id': 'piscine', 'name': 'Piscine', 'category': 'Home & Garden'},
-            {'id': 'barbecue', 'name': 'Barbecue', 'category': 'Outdoor Living'},
-            {'id': 'mobilier_jardin', 'name': 'Mobilier de jardin', 'category': 'Furniture'},
-            {'id': 'pergola', 'name': 'Pergola', 'category': 'Home & Garden'}
-        ]
-        
-        # Filter interests based on query
-        matching_interests = [
-            interest for interest in all_interests
-            if query.lower() in interest['name'].lower() or query.lower() in interest['id'].lower()
-        ]
+        # Local interest index first, then Facebook's targeting search (cached)
+        result = get_targeting_search(search_graph_interests).search(
+            query, limit=10, remote=bool(get_facebook_token()))
         
         return jsonify({
             'success': True,
-            'interests': matching_interests[:10],  # Limit to 10 results
+            'interests': result['interests'],
+            'source': result['source'],
             'query': query
         })
         
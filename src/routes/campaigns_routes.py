@@ -8,15 +8,18 @@ from datetime import datetime, timedelta
 import json
 import os
 
+from services.settings import get_settings
+from services.facebook_clients import get_facebook_client
+
 campaigns_bp = Blueprint('campaigns', __name__)
 
 def get_facebook_token():
-    """Get Facebook access token from environment"""
-    return os.getenv('FACEBOOK_ACCESS_TOKEN')
+    """Get Facebook access token from the cached settings, then environment"""
+    return get_settings().get('FACEBOOK_ACCESS_TOKEN') or os.getenv('FACEBOOK_ACCESS_TOKEN')
 
 def get_facebook_app_id():
-    """Get Facebook app ID from environment"""
-    return os.getenv('FACEBOOK_APP_ID')
+    """Get Facebook app ID from the cached settings, then environment"""
+    return get_settings().get('FACEBOOK_APP_ID') or os.getenv('FACEBOOK_APP_ID')
 
 @campaigns_bp.route('/api/facebook/campaigns', methods=['GET'])
 def get_campaigns():
@@ -125,12 +128,7 @@ def create_complete_campaign():
                 'error': 'Token Facebook non configuré'
             }), 400
         
-        # Import Facebook API
-        import sys
-        sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-        from facebook_api import FacebookAPI
-        
-        fb_api = FacebookAPI(access_token)
+        fb_api = get_facebook_client(access_token)
         
         # Get ad account ID from request or use default
         ad_account_id = data.get('adAccountId', '123456789')
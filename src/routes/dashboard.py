@@ -10,9 +10,34 @@ import json
 import os
 from datetime import datetime, timedelta
 from facebook_api import FacebookAPI, FacebookAPIError
+from services.insights_store import DAY, PAGES, WEEK, get_insights_store, week_start
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+PAGES_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'facebook_pages.json')
+
+# Analytics periods, in days
+PERIODS = {'7d': 7, '30d': 30, '90d': 90}
+
+
+def _clip_first_week(weekly, daily, since):
+    """Weekly series whose first bucket only counts the days from since on"""
+    first_week = week_start(since)
+    if first_week == since or first_week not in weekly:
+        return weekly
+    clipped = dict(weekly)
+    clipped[first_week] = sum(value for day, value in daily.items() if week_start(day) == first_week)
+    return clipped
+
+
+def _followers():
+    """Fan count of each synced page (data/facebook_pages.json)"""
+    try:
+        with open(PAGES_FILE, 'r') as f:
+            return {page['id']: page.get('fan_count', 0) for page in json.load(f)}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
 @dashboard_bp.route('/overview', methods=['GET'])
 def get_overview():
     """Get dashboard overview statistics"""
@@ -59,59 +84,80 @@ def get_overview():
 
 @dashboard_bp.route('/analytics', methods=['GET'])
 def get_analytics():
-    """Get analytics data for charts and graphs"""
+    """Get analytics data for charts and graphs, from the insights rollups"""
     try:
         # Get query parameters
         period = request.args.get('period', '7d')  # 7d, 30d, 90d
+        granularity = request.args.get('granularity', DAY)  # day, week
+        if period not in PERIODS:
+            return jsonify({'error': f'Invalid period, expected one of {", ".join(PERIODS)}'}), 400
+        if granularity not in (DAY, WEEK):
+            return jsonify({'error': 'Invalid granularity, expected day or week'}), 400
+        
+        # Daily page insights are complete up to yesterday
+        until = datetime.now().date() - timedelta(days=1)
+        days = [(until - timedelta(days=offset)).isoformat() for offset in range(PERIODS[period] - 1, -1, -1)]
+        store = get_insights_store()
+        
+        reach = store.page_series('page_impressions', days[0], days[-1])
+        engagement = store.page_series('page_engaged_users', days[0], days[-1])
+        totals = {'reach': sum(reach.values()), 'engagement': sum(engagement.values())}
+        labels = days
+        if granularity == WEEK:
+            labels = list(dict.fromkeys(week_start(day) for day in days))
+            reach = _clip_first_week(store.page_series('page_impressions', days[0], days[-1], grain=WEEK),
+                                     reach, days[0])
+            engagement = _clip_first_week(store.page_series('page_engaged_users', days[0], days[-1], grain=WEEK),
+                                          engagement, days[0])
+        page_reach = store.page_totals('page_impressions', days[0], days[-1])
+        page_engagement = store.page_totals('page_engaged_users', days[0], days[-1])
+        # The 7-day columns of the page table keep their meaning whatever the period
+        week_ago = days[-7]
+        page_reach_7d = store.page_totals('page_impressions', week_ago, days[-1])
+        page_engagement_7d = store.page_totals('page_engaged_users', week_ago, days[-1])
+        followers = _followers()
+        top_posts = store.posts_performance(days=PERIODS[period], limit=5)['posts']
+        last_ingest = store.last_ingest(PAGES)
         
-        # Mock analytics data - in production this would come from Facebook API
         analytics_data = {
+            'totals': totals,
             'reach_chart': {
-                'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-                'data': [1200, 1900, 3000, 5000, 2300, 2200, 1800]
+                'labels': labels,
+                'data': [reach.get(label, 0) for label in labels]
             },
             'engagement_chart': {
-                'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-                'data': [65, 89, 180, 281, 156, 155, 140]
+                'labels': labels,
+                'data': [engagement.get(label, 0) for label in labels]
             },
             'top_performing_posts': [
                 {
-                    'id': '123456789',
-                    'message': 'Check out our latest wood furniture collection!',
-                    'reach': 5420,
-                    'engagement': 342,
-                    'created_time': '2025-06-19T10:30:00Z'
-                },
-                {
-                    'id': '987654321',
-                    'message': 'Summer sale - 30% off all outdoor furniture',
-                    'reach': 4890,
-                    'engagement': 298,
-                    'created_time': '2025-06-18T14:15:00Z'
+                    'id': post['id'],
+                    'message': post['message'],
+                    'reach': post['reach'],
+                    'engagement': post['engagement'],
+                    'created_time': post['created_time']
                 }
+                for post in top_posts
             ],
-            'page_performance': [
+            'page_performance': sorted((
                 {
-                    'page_id': 'page1',
-                    'name': 'Bois Malin Paris',
-                    'followers': 2340,
-                    'reach_7d': 8920,
-                    'engagement_7d': 456
-                },
-                {
-                    'page_id': 'page2',
-                    'name': 'Bois Malin Lyon',
-                    'followers': 1890,
-                    'reach_7d': 6780,
-                    'engagement_7d': 334
+                    'page_id': page_id,
+                    'name': page_total['name'],
+                    'followers': followers.get(page_id, 0),
+                    'reach_7d': page_reach_7d.get(page_id, {}).get('value', 0),
+                    'engagement_7d': page_engagement_7d.get(page_id, {}).get('value', 0),
+                    f'reach_{period}': page_total['value'],
+                    f'engagement_{period}': page_engagement.get(page_id, {}).get('value', 0)
                 }
-            ]
+                for page_id, page_total in page_reach.items()
+            ), key=lambda page: page[f'reach_{period}'], reverse=True)
         }
         
         return jsonify({
             'success': True,
             'period': period,
-            'data': analytics_data
+            'data': analytics_data,
+            'as_of': datetime.fromtimestamp(last_ingest['finished_at']).isoformat() if last_ingest else None
         })
         
     except Exception as e:
@@ -10,12 +10,21 @@ import json
 import os
 import sys
 import tempfile
+import uuid
 import pathlib
 from datetime import datetime
 
 # Add parent directory to path to import facebook_api
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 from facebook_api import FacebookAPI, FacebookAPIError
+from fanout import summarize_timings
+from video_upload import get_upload_metrics
+from single_flight import get_single_flight
+from response_cache import get_response_cache
+from services.publish_jobs import job_results
+from services.settings import get_settings
+from services.facebook_clients import invalidate_facebook_clients
+from client_registry import get_client_registry
 
 facebook_bp = Blueprint('facebook', __name__)
 
@@ -26,27 +35,15 @@ def reset_facebook_api():
     """Reset Facebook API instance to force reinitialization"""
     global fb_api
     fb_api = None
+    invalidate_facebook_clients()
 
 def get_facebook_api():
     """Get or initialize Facebook API instance"""
     global fb_api
     if fb_api is None:
         try:
-            # Read settings from .env file
-            settings_file = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
-            current_app.logger.info(f"DEBUG: Looking for .env file at: {settings_file}")
-            settings = {}
-            
-            if os.path.exists(settings_file):
-                current_app.logger.info(f"DEBUG: .env file found, reading...")
-                with open(settings_file, 'r') as f:
-                    for line in f:
-                        if '=' in line and not line.startswith('#'):
-                            key, value = line.strip().split('=', 1)
-                            settings[key] = value
-                            current_app.logger.info(f"DEBUG: Read setting {key}=***")
-            else:
-                current_app.logger.error(f"DEBUG: .env file not found at {settings_file}")
+            # Read settings from the cached .env settings
+            settings = get_settings().all()
             
             # Get credentials from settings
             app_id = settings.get('FACEBOOK_APP_ID')
@@ -59,8 +56,8 @@ def get_facebook_api():
             
             if app_id and app_secret and access_token:
                 current_app.logger.info("DEBUG: Creating FacebookAPI instance with direct parameters")
-                # Pass credentials directly to constructor instead of using environment variables
-                fb_api = FacebookAPI(app_id=app_id, app_secret=app_secret, access_token=access_token)
+                # Shared client from the registry, built with the credentials from the settings
+                fb_api = get_client_registry().get(access_token, app_id=app_id, app_secret=app_secret)
                 current_app.logger.info("DEBUG: FacebookAPI instance created successfully")
             else:
                 current_app.logger.error("Missing Facebook credentials in .env file")
@@ -407,14 +404,18 @@ def publish_to_multiple_pages():
         if not api:
             return jsonify({'error': 'Facebook API not configured'}), 500
         
-        data = request.get_json()
+        # JSON body, or form data when media files are attached
+        data = request.get_json(silent=True) or request.form
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         # Extract required fields
         message = data.get('message', '').strip()
         page_ids = data.get('page_ids', [])
+        if isinstance(page_ids, str):
+            page_ids = json.loads(page_ids or '[]')
         link = data.get('link', '').strip() or None
+        run_async = str(data.get('async') or request.args.get('async', '')).lower() == 'true'
         
         # Validation
         if not message:
@@ -428,6 +429,31 @@ def publish_to_multiple_pages():
             all_pages = api.get_all_pages_for_publishing()
             page_ids = [page["id"] for page in all_pages]
         
+        # Queue the publication as a durable job when the app runs a publish queue
+        queue = current_app.extensions.get('publish_queue')
+        if queue is not None:
+            job_id = uuid.uuid4().hex
+            media_paths = []
+            for media_file in request.files.getlist('media_files'):
+                if media_file.filename:
+                    media_path = os.path.join(queue.media_dir(job_id), os.path.basename(media_file.filename))
+                    media_file.save(media_path)
+                    media_paths.append(media_path)
+            
+            queue.enqueue([str(page_id) for page_id in page_ids], message, link, media_paths, job_id=job_id)
+            job = queue.wait(job_id, 0 if run_async else queue.sync_wait)
+            
+            response = job_results(job)
+            response.update({
+                # Only a completed job is reported as successful; clients poll status_url
+                'success': job['status'] == 'completed',
+                'job_id': job_id,
+                'status': job['status'],
+                'progress': job['progress'],
+                'status_url': f'/api/facebook/publish/jobs/{job_id}'
+            })
+            return jsonify(response), 200 if job['status'] == 'completed' else 202
+        
         # Handle media files (if any)
         media_paths = []
         if 'media_files' in request.files:
@@ -470,7 +496,8 @@ def publish_to_multiple_pages():
                 'successful': len(successful_pages),
                 'failed': len(failed_pages),
                 'successful_pages': successful_pages,
-                'failed_pages': failed_pages
+                'failed_pages': failed_pages,
+                'timings': summarize_timings(results)
             }
         })
         
@@ -548,6 +575,26 @@ def upload_media():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@facebook_bp.route('/upload/metrics', methods=['GET'])
+def get_upload_metrics_route():
+    """Get video upload throughput per page"""
+    return jsonify({
+        'success': True,
+        'pages': get_upload_metrics().stats()
+    })
+
+
+@facebook_bp.route('/graph/stats', methods=['GET'])
+def get_graph_stats_route():
+    """Get per-endpoint counts of coalesced Graph API reads and response cache statistics"""
+    cache = get_response_cache()
+    return jsonify({
+        'success': True,
+        'single_flight': get_single_flight().stats(),
+        'response_cache': cache.stats() if cache else None
+    })
+
+
 @facebook_bp.route('/upload', methods=['POST'])
 def upload():
     """Multipart form : page_id, message, files[]"""
@@ -42,6 +42,18 @@ export const syncPages = () => api.post('/facebook/pages/sync')
 
 // Publishing
 export const publishToPages = (data) => api.post('/facebook/publish/multi', data)
+export const fetchPublishJob = (jobId) => api.get(`/facebook/publish/jobs/${jobId}`)
+
+// Publish, then poll the job until every page is done when the server answers 202
+export const publishAndWait = async (data, { interval = 2000, onProgress } = {}) => {
+  let job = await publishToPages(data)
+  while (job.job_id && job.status !== 'completed') {
+    onProgress?.(job.progress)
+    await new Promise((resolve) => setTimeout(resolve, interval))
+    job = await fetchPublishJob(job.job_id)
+  }
+  return job
+}
 
 // Analytics
 export const fetchAnalytics = (dateRange) => api.get(`/analytics?period=${dateRange}`)
@@ -0,0 +1,279 @@
+"""
+Audience Size Estimator
+
+Estimates the size, reach and cost of targeting specs for the Audiences
+page. Specs are first reduced to a canonical key (sorted, de-duplicated
+interests, integer ages, upper-case country codes, folded gender), so
+variants that only differ in order or spelling share one estimate.
+Estimates are memoized in an LRU (FACEBOOK_AUDIENCE_ESTIMATE_CACHE
+entries), and a batch of specs missing from it is computed in one pass
+over NumPy columns of factors.
+"""
+
+import os
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("facebook_api.audiences")
+
+BASE_POPULATION = 1000000       # Base population for France
+LOOKALIKE_SIZE = 28000
+MIN_SIZE = 1000
+COST_PER_THOUSAND = 15          # Base CPM in euros
+DEFAULT_CACHE_SIZE = 4096
+
+LOCATION_FACTORS = {
+    'FR': 1.0,
+    'BE': 0.17,
+    'CH': 0.13,
+    'CA': 0.56
+}
+OTHER_LOCATION_FACTOR = 0.1
+
+
+def _env_cache_size() -> int:
+    """Cached estimates from FACEBOOK_AUDIENCE_ESTIMATE_CACHE, falling back to the default"""
+    try:
+        return max(1, int(os.getenv("FACEBOOK_AUDIENCE_ESTIMATE_CACHE", DEFAULT_CACHE_SIZE)))
+    except ValueError:
+        logger.warning(f"Invalid value for FACEBOOK_AUDIENCE_ESTIMATE_CACHE, using {DEFAULT_CACHE_SIZE}")
+        return DEFAULT_CACHE_SIZE
+
+
+def canonical_spec(targeting: Dict, audience_type: str = 'custom') -> Tuple:
+    """
+    Reduce a targeting spec to the key of its estimate
+
+    Args:
+        targeting: Targeting (location, age_min, age_max, gender, interests)
+        audience_type: 'custom' or 'lookalike'
+
+    Returns:
+        Hashable key: (type, age_min, age_max, gender, locations, interests)
+
+    Raises:
+        ValueError: If an age is not a number
+    """
+    audience_type = str(audience_type or 'custom').strip().lower()
+    if audience_type == 'lookalike':
+        return ('lookalike', None, None, 'all', (), ())
+
+    ages = (None, None)
+    if 'age_min' in targeting and 'age_max' in targeting:
+        ages = (int(targeting['age_min']), int(targeting['age_max']))
+
+    gender = str(targeting.get('gender') or 'all').strip().lower()
+
+    locations = targeting.get('location')
+    if locations is None:
+        locations = ()
+    elif isinstance(locations, (list, tuple)):
+        locations = tuple(sorted({str(location).strip().upper() for location in locations}))
+    else:
+        locations = (str(locations).strip().upper(),)
+
+    interests = set()
+    for interest in targeting.get('interests') or []:
+        value = interest.get('id') or interest.get('name') if isinstance(interest, dict) else interest
+        if value:
+            interests.add(str(value).strip().casefold())
+
+    return (audience_type, ages[0], ages[1], gender, locations, tuple(sorted(interests)))
+
+
+def _factors(key: Tuple) -> Tuple[float, float, float, float]:
+    """Age, gender, location and interest factors of a canonical spec"""
+    _, age_min, age_max, gender, locations, interests = key
+    age = min((age_max - age_min) / 40, 1.0) if age_min is not None else 1.0  # Max factor for 40+ year range
+    gender_factor = 0.5 if gender != 'all' else 1.0
+    if not locations:
+        location = 1.0
+    else:
+        location = sum(LOCATION_FACTORS.get(code, OTHER_LOCATION_FACTOR) for code in locations)
+    interest = max(0.1, 1.0 - (len(interests) * 0.15)) if interests else 1.0
+    return age, gender_factor, location, interest
+
+
+def _sizes(keys: List[Tuple]) -> List[int]:
+    """Sizes of canonical specs, computed column-wise"""
+    sizes = [LOOKALIKE_SIZE if key[0] == 'lookalike' else None for key in keys]
+    custom = [index for index, key in enumerate(keys) if sizes[index] is None]
+    if not custom:
+        return sizes
+
+    columns = list(zip(*(_factors(keys[index]) for index in custom)))
+    ages, genders, locations, interests = (np.asarray(column, dtype=np.float64) for column in columns)
+    values = np.maximum(MIN_SIZE, (BASE_POPULATION * ages * genders * locations * interests)
+                        .astype(np.int64)).tolist()
+
+    for index, value in zip(custom, values):
+        sizes[index] = value
+    return sizes
+
+
+def calculate_audience_size(targeting, audience_type='custom'):
+    """Calculate estimated audience size based on targeting"""
+    return _sizes([canonical_spec(targeting, audience_type)])[0]
+
+
+def generate_audience_recommendations(targeting, estimated_size):
+    """Generate recommendations for audience optimization"""
+    recommendations = []
+
+    if estimated_size < 10000:
+        recommendations.append({
+            'type': 'warning',
+            'message': 'Audience trop petite (< 10k). Élargissez les critères.',
+            'suggestion': 'Augmentez la tranche d\'âge ou réduisez les centres d\'intérêt'
+        })
+
+    if estimated_size > 500000:
+        recommendations.append({
+            'type': 'info',
+            'message': 'Audience très large. Affinez pour de meilleurs résultats.',
+            'suggestion': 'Ajoutez des centres d\'intérêt spécifiques ou réduisez la zone géographique'
+        })
+
+    if 'interests' in targeting and len(targeting.get('interests', [])) > 5:
+        recommendations.append({
+            'type': 'tip',
+            'message': 'Trop de centres d\'intérêt peuvent réduire la portée.',
+            'suggestion': 'Limitez à 3-5 centres d\'intérêt principaux'
+        })
+
+    if not recommendations:
+        recommendations.append({
+            'type': 'success',
+            'message': 'Taille d\'audience optimale pour de bons résultats.',
+            'suggestion': 'Cette audience devrait bien performer'
+        })
+
+    return recommendations
+
+
+def build_estimate(targeting: Dict, estimated_size: int) -> Dict:
+    """
+    Estimate shown for a targeting spec
+
+    Args:
+        targeting: Targeting spec
+        estimated_size: Estimated audience size
+
+    Returns:
+        Dictionary with size, reach_potential, recommendations and cost_estimate
+    """
+    daily_budget_suggestion = max(10, min(50, estimated_size // 1000))
+    return {
+        'size': estimated_size,
+        'reach_potential': 'Élevé' if estimated_size > 50000 else 'Moyen' if estimated_size > 10000 else 'Faible',
+        'recommendations': generate_audience_recommendations(targeting, estimated_size),
+        'cost_estimate': {
+            'cpm': COST_PER_THOUSAND,
+            'suggested_daily_budget': daily_budget_suggestion,
+            'estimated_daily_reach': min(estimated_size, daily_budget_suggestion * 1000 // COST_PER_THOUSAND)
+        }
+    }
+
+
+class AudienceEstimator:
+    """
+    Memoized estimates of targeting specs
+
+    Handles:
+    - Canonical keys shared by equivalent specs
+    - LRU cache of estimates
+    - Column-wise computation of the specs missing from the cache
+    - Hit and computation counters
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Initialize the estimator
+
+        Args:
+            max_entries: Cached estimates (FACEBOOK_AUDIENCE_ESTIMATE_CACHE if not provided)
+        """
+        self.max_entries = max_entries or _env_cache_size()
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self.hits = 0
+        self.computed = 0
+
+    def estimate_many(self, specs: List[Tuple[Dict, str]]) -> List[Dict]:
+        """
+        Estimate several targeting specs
+
+        Args:
+            specs: (targeting, audience type) pairs
+
+        Returns:
+            Estimates (see build_estimate), in the order of specs
+
+        Raises:
+            ValueError: If a spec has an invalid age
+        """
+        keys = [canonical_spec(targeting, audience_type) for targeting, audience_type in specs]
+        estimates: List[Optional[Dict]] = [None] * len(keys)
+        missing: Dict[Tuple, List[int]] = {}
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    estimates[index] = self._cache[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(index)
+
+        if missing:
+            sizes = _sizes(list(missing))
+            computed = {}
+            for (key, indexes), size in zip(missing.items(), sizes):
+                # Recommendations only read the interest count, the same for every spec of a key
+                computed[key] = build_estimate({'interests': list(key[5])}, size)
+                for index in indexes:
+                    estimates[index] = computed[key]
+
+            with self._lock:
+                self.computed += len(computed)
+                self._cache.update(computed)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        return [copy.deepcopy(estimate) for estimate in estimates]
+
+    def estimate(self, targeting: Dict, audience_type: str = 'custom') -> Dict:
+        """Estimate one targeting spec (see estimate_many)"""
+        return self.estimate_many([(targeting, audience_type)])[0]
+
+    def stats(self) -> Dict:
+        """Cache hits, computed estimates and cached entries"""
+        with self._lock:
+            return {'hits': self.hits, 'computed': self.computed, 'cached': len(self._cache)}
+
+
+# Process-wide estimator shared by the routes
+_default_estimator: Optional[AudienceEstimator] = None
+_default_estimator_lock = threading.Lock()
+
+
+def get_audience_estimator() -> AudienceEstimator:
+    """Get or create the process-wide estimator"""
+    global _default_estimator
+    if _default_estimator is None:
+        with _default_estimator_lock:
+            if _default_estimator is None:
+                _default_estimator = AudienceEstimator()
+    return _default_estimator
+
+
+def reset_audience_estimator():
+    """Drop the process-wide estimator so the next call creates it again"""
+    global _default_estimator
+    with _default_estimator_lock:
+        _default_estimator = None
@@ -0,0 +1,366 @@
+"""
+Audience Repository
+
+Saved audiences are kept in a SQLite database (data/audiences.db by
+default) with one row per audience, keyed by its ID. Updates and
+deletes touch a single row inside a transaction, and WAL mode lets
+readers run while another worker writes.
+
+Each store also keeps the parsed audiences in memory, indexed by ID.
+Writes go through to it, and it is only read again from the database
+when the database files change on disk (mtime and size of the database
+and its WAL), so lookups do not touch SQLite between changes. A revision
+number bumped by every write tells the process's own writes apart from
+the writes of other workers.
+
+The audiences.json file used before is imported once when the database
+is opened next to it, then renamed to audiences.json.migrated.
+"""
+
+import os
+import copy
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("facebook_api.audiences")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audiences (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audiences_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO audiences_meta (key, value) VALUES ('revision', 0);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+class AudienceStore:
+    """
+    SQLite persistence of saved audiences
+
+    Handles:
+    - Listing in creation order and lookups by primary key
+    - Inserts, single-row updates (read-modify-write in one transaction) and deletes
+    - In-memory copy indexed by ID, written through and revalidated on file changes
+    - One-shot migration of the former audiences.json file
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the store
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        # Audiences by ID in creation order, the revision they were read at
+        # and the file signature they are known to be current for
+        self._lock = threading.Lock()
+        self._by_id: Optional[Dict[str, Dict]] = None
+        self._revision: Optional[int] = None
+        self._signature: Optional[tuple] = None
+        self.cache_hits = 0
+        self.cache_loads = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row(audience: Dict) -> tuple:
+        return (audience['id'], audience.get('name'), audience.get('type'),
+                json.dumps(audience, ensure_ascii=False), _now())
+
+    # --- Cache ---------------------------------------------------------
+
+    def _file_signature(self) -> tuple:
+        """mtime and size of the database and its WAL (any commit changes one of them)"""
+        signature = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    def _read_revision(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM audiences_meta WHERE key = 'revision'").fetchone()[0]
+
+    def _audiences(self) -> Dict[str, Dict]:
+        """The cached audiences, read again only if another writer changed them"""
+        with self._lock:
+            # Taken before reading, so a write landing meanwhile changes it again
+            signature = self._file_signature()
+            if self._by_id is not None and signature == self._signature:
+                self.cache_hits += 1
+                return self._by_id
+
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN")
+                revision = self._read_revision(conn)
+                if self._by_id is None or revision != self._revision:
+                    self._by_id = {row['id']: json.loads(row['data'])
+                                   for row in conn.execute("SELECT id, data FROM audiences ORDER BY rowid")}
+                    self._revision = revision
+                    self.cache_loads += 1
+                else:
+                    self.cache_hits += 1
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+            self._signature = signature
+            return self._by_id
+
+    def _bump_revision(self, conn: sqlite3.Connection) -> int:
+        """Count a write in its transaction, returning the revision it started from"""
+        revision = self._read_revision(conn)
+        conn.execute("UPDATE audiences_meta SET value = ? WHERE key = 'revision'", (revision + 1,))
+        return revision
+
+    def _write_through(self, revision: int, apply: Callable[[Dict[str, Dict]], None]):
+        """Apply a committed write to the cache if it held the state the write started from"""
+        with self._lock:
+            if self._by_id is not None and self._revision == revision:
+                apply(self._by_id)
+                self._revision = revision + 1
+            else:
+                self._by_id = None
+            # The files changed: the next read checks the revision once
+            self._signature = None
+
+    def invalidate(self):
+        """Drop the cached audiences"""
+        with self._lock:
+            self._by_id = None
+            self._signature = None
+
+    def cache_stats(self) -> Dict:
+        """Cache hits, loads from the database and cached audience count"""
+        with self._lock:
+            return {'hits': self.cache_hits, 'loads': self.cache_loads,
+                    'cached': len(self._by_id) if self._by_id is not None else 0}
+
+    # --- Reads -----------------------------------------------------------
+
+    def list(self) -> List[Dict]:
+        """All audiences, oldest first"""
+        return copy.deepcopy(list(self._audiences().values()))
+
+    def get(self, audience_id: str) -> Optional[Dict]:
+        """
+        Get an audience by ID
+
+        Args:
+            audience_id: Audience ID
+
+        Returns:
+            Audience dictionary, or None if not found
+        """
+        audience = self._audiences().get(audience_id)
+        return copy.deepcopy(audience) if audience is not None else None
+
+    def count(self) -> int:
+        """Number of saved audiences"""
+        return len(self._audiences())
+
+    # --- Writes ----------------------------------------------------------
+
+    def create(self, audience: Dict) -> Dict:
+        """
+        Insert an audience
+
+        Args:
+            audience: Audience dictionary with a unique 'id'
+
+        Returns:
+            The audience
+
+        Raises:
+            sqlite3.IntegrityError: If an audience with this ID exists
+        """
+        self.create_many([audience])
+        return audience
+
+    def create_many(self, audiences: List[Dict], skip_existing: bool = False) -> int:
+        """
+        Insert audiences in one transaction
+
+        Args:
+            audiences: Audience dictionaries
+            skip_existing: Ignore audiences whose ID is already stored instead of failing
+
+        Returns:
+            Number of audiences inserted
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT {'OR IGNORE ' if skip_existing else ''}INTO audiences (id, name, type, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", [self._row(audience) for audience in audiences])
+            inserted = conn.total_changes - before
+            revision = self._bump_revision(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        def insert(by_id):
+            for audience in audiences:
+                if not skip_existing or audience['id'] not in by_id:
+                    by_id[audience['id']] = copy.deepcopy(audience)
+        self._write_through(revision, insert)
+        return inserted
+
+    def update(self, audience_id: str, apply: Callable[[Dict], None]) -> Optional[Dict]:
+        """
+        Change an audience in place, without racing other writers
+
+        Args:
+            audience_id: Audience ID
+            apply: Function modifying the audience dictionary
+
+        Returns:
+            The updated audience, or None if not found
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM audiences WHERE id = ?", (audience_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            audience = json.loads(row['data'])
+            apply(audience)
+            conn.execute("UPDATE audiences SET name = ?, type = ?, data = ?, updated_at = ? WHERE id = ?",
+                         self._row(audience)[1:] + (audience_id,))
+            revision = self._bump_revision(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self._write_through(revision, lambda by_id: by_id.__setitem__(audience_id, copy.deepcopy(audience)))
+        return audience
+
+    def delete(self, audience_id: str) -> Optional[Dict]:
+        """
+        Delete an audience
+
+        Args:
+            audience_id: Audience ID
+
+        Returns:
+            The deleted audience, or None if not found
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM audiences WHERE id = ?", (audience_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("DELETE FROM audiences WHERE id = ?", (audience_id,))
+            revision = self._bump_revision(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self._write_through(revision, lambda by_id: by_id.pop(audience_id, None))
+        return json.loads(row['data'])
+
+    # --- Migration -------------------------------------------------------
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import a former audiences.json file, then rename it so it is imported once
+
+        Args:
+            json_path: Path of the JSON file (a list of audiences)
+
+        Returns:
+            Number of audiences imported
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                audiences = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read {json_path}, audiences not migrated: {str(e)}")
+            return 0
+
+        imported = self.create_many([audience for audience in audiences if audience.get('id')],
+                                    skip_existing=True) if isinstance(audiences, list) else 0
+        os.replace(json_path, json_path + '.migrated')
+        logger.info(f"Migrated {imported} audiences from {json_path}")
+        return imported
+
+
+# Stores opened by the process, one per database file
+_stores: Dict[str, AudienceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_audience_store(db_path: str, legacy_json: Optional[str] = None) -> AudienceStore:
+    """
+    Get or open the store of a database file
+
+    Args:
+        db_path: Path of the SQLite database file
+        legacy_json: audiences.json file imported when the store is opened
+
+    Returns:
+        AudienceStore shared by the process
+    """
+    key = os.path.abspath(db_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = AudienceStore(db_path)
+                if legacy_json:
+                    store.migrate_json(legacy_json)
+                _stores[key] = store
+    return store
+
+
+def reset_audience_stores():
+    """Forget the opened stores so the next call opens them again"""
+    with _stores_lock:
+        _stores.clear()
@@ -0,0 +1,42 @@
+"""
+Facebook Clients Service
+
+Hands out the shared FacebookAPI clients of the client registry, built
+with the credentials of the cached .env settings. Clients are dropped
+when the settings change.
+"""
+
+import os
+from typing import Optional
+
+from client_registry import get_client_registry
+from services.settings import get_settings
+
+
+def get_access_token() -> Optional[str]:
+    """Get the user access token (.env settings, then process environment)"""
+    return get_settings().get('FACEBOOK_ACCESS_TOKEN') or os.environ.get('FACEBOOK_ACCESS_TOKEN')
+
+
+def get_facebook_client(access_token: Optional[str] = None):
+    """
+    Get the long-lived FacebookAPI client for a token
+
+    Args:
+        access_token: User access token (from the settings if not provided)
+
+    Returns:
+        Shared FacebookAPI instance
+
+    Raises:
+        ValueError: If credentials are missing
+    """
+    settings = get_settings()
+    return get_client_registry().get(access_token or get_access_token(),
+                                     app_id=settings.get('FACEBOOK_APP_ID'),
+                                     app_secret=settings.get('FACEBOOK_APP_SECRET'))
+
+
+def invalidate_facebook_clients():
+    """Drop every shared client so the next call uses the current credentials"""
+    get_client_registry().clear()
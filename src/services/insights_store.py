@@ -0,0 +1,608 @@
+"""
+Insights Time-Series Store
+
+Keeps daily snapshots of post and page insights in a SQLite database
+(data/insights.db) so analytics views are answered from local data
+instead of re-querying insights.metric(...) on every post:
+
+- post_metrics: one row per post, metric and day holding the post's
+  lifetime value as read that day (the latest day is the current value)
+- page_metrics: one row per page, metric and day holding the daily value
+  reported by /{page_id}/insights
+- page_rollups: totals of page metrics across all pages per day, and per
+  page and across all pages per week, kept up to date in the transaction
+  that writes page_metrics so charts never re-sum raw values
+
+Snapshots are written by the posts performance crawl, by a periodic sync
+(FACEBOOK_INSIGHTS_SYNC_INTERVAL) and by the backfill command
+(flask --app src/main.py insights-backfill --days 90).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fanout import ANALYTICS_POOL, get_fanout_executor
+from services.metrics_engine import MetricsEngine, post_metrics
+from services.posts_performance import DEFAULT_DAYS, TOP_POSTS, crawl_posts_performance
+
+logger = logging.getLogger("facebook_api.insights")
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'insights.db')
+DEFAULT_MAX_AGE = 900           # Seconds a posts snapshot is served before crawling again
+SYNC_PAGE_DAYS = 3              # Days of page insights read again by each periodic sync
+BACKFILL_BUDGET = 600.0         # Seconds for the posts crawl of a backfill
+INSIGHTS_CHUNK_DAYS = 90        # Graph serves at most 93 days of page insights per call
+
+# Page metrics read by the sync (the daily values of the dashboard charts)
+PAGE_METRICS = ['page_impressions', 'page_engaged_users']
+
+# Kinds of ingest
+POSTS = 'posts'
+PAGES = 'pages'
+
+# Rollup grains, and the page ID of totals across all pages
+DAY = 'day'
+WEEK = 'week'
+ALL_PAGES = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    page_id TEXT NOT NULL,
+    message TEXT,
+    created_time TEXT,
+    last_day TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_time);
+CREATE TABLE IF NOT EXISTS post_metrics (
+    post_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (post_id, day, metric)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS page_metrics (
+    page_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (metric, day, page_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS page_rollups (
+    metric TEXT NOT NULL,
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (metric, grain, page_id, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    coverage TEXT
+);
+"""
+
+
+def _today() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def week_start(day: str) -> str:
+    """Monday of the week of a day (week rollup bucket)"""
+    date = datetime.strptime(day, '%Y-%m-%d')
+    return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+
+
+def _metric_day(end_time: str) -> str:
+    """Day a daily page insight covers (Graph stamps it with the end of the day)"""
+    return (datetime.strptime(end_time[:10], '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+class InsightsStore:
+    """
+    SQLite time series of post and page insights
+
+    Handles:
+    - Daily post snapshots and daily page values, upserted per metric
+    - Latest post performance rows, without calling Facebook
+    - Incremental day and week rollups of page metrics
+    - Daily or weekly series and per-page totals of page metrics
+    - Ingest log (last snapshot time and crawl coverage)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB):
+        """
+        Initialize the store
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases written before rollups existed are aggregated once
+            if (conn.execute("SELECT 1 FROM page_metrics LIMIT 1").fetchone()
+                    and not conn.execute("SELECT 1 FROM page_rollups LIMIT 1").fetchone()):
+                self.rebuild_rollups()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Ingestion -------------------------------------------------------
+
+    def ingest_posts(self, pages_posts: List[Tuple[Dict, List[Dict]]], coverage: Optional[Dict] = None,
+                     day: Optional[str] = None, log: bool = True) -> int:
+        """
+        Record today's snapshot of posts with inline insights
+
+        Args:
+            pages_posts: (page, posts) pairs, posts as returned by /{page_id}/posts
+            coverage: Coverage of the crawl the posts come from
+            day: Snapshot day (today if not provided)
+            log: Record the ingest (False for the chunks of a streamed crawl,
+                which is logged once with log_posts_ingest)
+
+        Returns:
+            Number of metric values written
+        """
+        day = day or _today()
+        pages, posts, metrics = [], [], []
+        for page, page_posts in pages_posts:
+            pages.append((page['id'], page.get('name')))
+            for post in page_posts:
+                posts.append((post['id'], page['id'], post.get('message', ''), post.get('created_time'), day))
+                metrics.extend((post['id'], metric, day, value)
+                               for metric, value in post_metrics(post).items() if isinstance(value, (int, float)))
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._upsert_pages(conn, pages)
+            conn.executemany(
+                "INSERT INTO posts (post_id, page_id, message, created_time, last_day) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(post_id) DO UPDATE SET message = excluded.message, "
+                "last_day = MAX(last_day, excluded.last_day)", posts)
+            conn.executemany(
+                "INSERT OR REPLACE INTO post_metrics (post_id, metric, day, value) VALUES (?, ?, ?, ?)", metrics)
+            if log:
+                self._log_ingest(conn, POSTS, len(metrics), coverage)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return len(metrics)
+
+    def log_posts_ingest(self, rows: int, coverage: Optional[Dict] = None):
+        """
+        Record the end of a streamed posts crawl
+
+        Args:
+            rows: Number of metric values written by its chunks
+            coverage: Coverage of the crawl
+        """
+        conn = self._connect()
+        try:
+            self._log_ingest(conn, POSTS, rows, coverage)
+        finally:
+            conn.close()
+
+    def ingest_page_insights(self, pages_insights: List[Tuple[Dict, Dict]]) -> int:
+        """
+        Record the daily values of /{page_id}/insights responses
+
+        Args:
+            pages_insights: (page, insights response) pairs
+
+        Returns:
+            Number of daily values written
+        """
+        pages, latest = [], {}
+        for page, response in pages_insights:
+            pages.append((page['id'], page.get('name')))
+            for insight in response.get('data', []):
+                if insight.get('period', 'day') != 'day':
+                    continue
+                for point in insight.get('values', []):
+                    if point.get('end_time') and isinstance(point.get('value'), (int, float)):
+                        # A day read twice (chunk boundaries) is counted once
+                        latest[(page['id'], insight['name'], _metric_day(point['end_time']))] = point['value']
+        values = [key + (value,) for key, value in latest.items()]
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._upsert_pages(conn, pages)
+            self._apply_to_rollups(conn, values)
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_metrics (page_id, metric, day, value) VALUES (?, ?, ?, ?)", values)
+            self._log_ingest(conn, PAGES, len(values), None)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return len(values)
+
+    @staticmethod
+    def _apply_to_rollups(conn: sqlite3.Connection, values: List[Tuple[str, str, str, int]]):
+        """Add the change of each daily value (new value minus stored one) to its rollups"""
+        deltas: Dict[Tuple[str, str, str, str], int] = {}
+        for page_id, metric, day, value in values:
+            previous = conn.execute("SELECT value FROM page_metrics WHERE metric = ? AND day = ? AND page_id = ?",
+                                    (metric, day, page_id)).fetchone()
+            delta = value - (previous[0] if previous else 0)
+            if not delta:
+                continue
+            week = week_start(day)
+            for key in ((metric, DAY, day, ALL_PAGES), (metric, WEEK, week, ALL_PAGES), (metric, WEEK, week, page_id)):
+                deltas[key] = deltas.get(key, 0) + delta
+
+        conn.executemany(
+            "INSERT INTO page_rollups (metric, grain, bucket, page_id, value) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(metric, grain, page_id, bucket) DO UPDATE SET value = value + excluded.value",
+            [key + (delta,) for key, delta in deltas.items()])
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the raw daily values"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM page_rollups")
+            values = conn.execute("SELECT page_id, metric, day, value FROM page_metrics").fetchall()
+            conn.execute("DELETE FROM page_metrics")
+            self._apply_to_rollups(conn, [tuple(row) for row in values])
+            conn.executemany("INSERT INTO page_metrics (page_id, metric, day, value) VALUES (?, ?, ?, ?)",
+                             [tuple(row) for row in values])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        logger.info(f"Rebuilt insights rollups from {len(values)} daily values")
+
+    @staticmethod
+    def _upsert_pages(conn: sqlite3.Connection, pages: List[Tuple[str, Optional[str]]]):
+        conn.executemany(
+            "INSERT INTO pages (page_id, name) VALUES (?, ?) "
+            "ON CONFLICT(page_id) DO UPDATE SET name = COALESCE(excluded.name, name)", pages)
+
+    @staticmethod
+    def _log_ingest(conn: sqlite3.Connection, kind: str, rows: int, coverage: Optional[Dict]):
+        conn.execute("INSERT INTO ingests (kind, finished_at, rows, coverage) VALUES (?, ?, ?, ?)",
+                     (kind, time.time(), rows, json.dumps(coverage) if coverage is not None else None))
+
+    # --- Queries ---------------------------------------------------------
+
+    def last_ingest(self, kind: str = POSTS) -> Optional[Dict]:
+        """
+        Get the most recent ingest of a kind
+
+        Args:
+            kind: 'posts' or 'pages'
+
+        Returns:
+            Dictionary with finished_at (epoch seconds), rows and coverage, or None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM ingests WHERE kind = ? ORDER BY id DESC LIMIT 1", (kind,)).fetchone()
+        if row is None:
+            return None
+        return {'finished_at': row['finished_at'], 'rows': row['rows'],
+                'coverage': json.loads(row['coverage']) if row['coverage'] else None}
+
+    def posts_performance(self, days: int = DEFAULT_DAYS, limit: int = TOP_POSTS) -> Dict:
+        """
+        Build the posts performance view from the latest post snapshots
+
+        Args:
+            days: Only posts created in the last days are included
+            limit: Number of top posts returned
+
+        Returns:
+            Dictionary shaped like crawl_posts_performance, with 'as_of'
+            (time of the last posts snapshot) instead of timings
+        """
+        since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT p.post_id, p.page_id, p.message, p.created_time, g.name, m.metric, m.value "
+                "FROM posts p JOIN pages g ON g.page_id = p.page_id "
+                "LEFT JOIN post_metrics m ON m.post_id = p.post_id AND m.day = p.last_day "
+                "WHERE p.created_time >= ?", (since,)).fetchall()
+
+        posts: Dict[str, Tuple[Dict, Dict, Dict]] = {}
+        for row in rows:
+            post, page, metrics = posts.setdefault(row['post_id'], (
+                {'id': row['post_id'], 'message': row['message'], 'created_time': row['created_time']},
+                {'id': row['page_id'], 'name': row['name']}, {}))
+            if row['metric'] is not None:
+                metrics[row['metric']] = row['value']
+
+        engine = MetricsEngine(keep_top=limit).extend(posts.values())
+        last = self.last_ingest(POSTS)
+        return {
+            'posts': engine.top(limit),
+            'stats': engine.totals(),
+            'pages': engine.by_page(),
+            'coverage': last['coverage'] if last else None,
+            'as_of': datetime.fromtimestamp(last['finished_at']).isoformat() if last else None
+        }
+
+    def page_series(self, metric: str, since: str, until: str, page_id: Optional[str] = None,
+                    grain: str = DAY) -> Dict[str, int]:
+        """
+        Daily or weekly values of a page metric, summed over pages
+
+        Args:
+            metric: Page metric name (e.g. page_impressions)
+            since: First day (YYYY-MM-DD)
+            until: Last day (YYYY-MM-DD)
+            page_id: Only this page (all pages if not provided)
+            grain: 'day' or 'week' (weeks starting on Monday, keyed by their Monday)
+
+        Returns:
+            Dictionary of day (or week) to value, in order, for buckets with data
+        """
+        if grain == WEEK:
+            since = week_start(since)
+        if page_id and grain == DAY:
+            query = ("SELECT day AS bucket, value FROM page_metrics "
+                     "WHERE metric = ? AND day BETWEEN ? AND ? AND page_id = ? ORDER BY day")
+            params = (metric, since, until, page_id)
+        else:
+            query = ("SELECT bucket, value FROM page_rollups "
+                     "WHERE metric = ? AND grain = ? AND page_id = ? AND bucket BETWEEN ? AND ? ORDER BY bucket")
+            params = (metric, grain, page_id or ALL_PAGES, since, until)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return {row['bucket']: row['value'] for row in rows}
+
+    def page_totals(self, metric: str, since: str, until: str) -> Dict[str, Dict]:
+        """
+        Total of a page metric per page over a range of days
+
+        Whole weeks are read from the week rollups, only the days of the
+        partial weeks at both ends are read from the daily values.
+
+        Args:
+            metric: Page metric name
+            since: First day (YYYY-MM-DD)
+            until: Last day (YYYY-MM-DD)
+
+        Returns:
+            Dictionary of page ID to {'name', 'value'}
+        """
+        first_week = week_start(since)
+        if first_week != since:
+            first_week = (datetime.strptime(first_week, '%Y-%m-%d') + timedelta(days=7)).strftime('%Y-%m-%d')
+        # Last Monday whose whole week is in the range
+        end = datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1)
+        last_week = (end - timedelta(days=end.weekday() + 7)).strftime('%Y-%m-%d')
+
+        with closing(self._connect()) as conn:
+            if first_week <= last_week:
+                week_end = (datetime.strptime(last_week, '%Y-%m-%d') + timedelta(days=6)).strftime('%Y-%m-%d')
+                rows = conn.execute(
+                    "SELECT page_id, SUM(value) AS value FROM ("
+                    "  SELECT page_id, value FROM page_rollups WHERE metric = ? AND grain = ? AND page_id != ?"
+                    "    AND bucket BETWEEN ? AND ?"
+                    "  UNION ALL SELECT page_id, value FROM page_metrics WHERE metric = ?"
+                    "    AND ((day >= ? AND day < ?) OR (day > ? AND day <= ?))"
+                    ") GROUP BY page_id",
+                    (metric, WEEK, ALL_PAGES, first_week, last_week, metric, since, first_week, week_end, until)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT page_id, SUM(value) AS value FROM page_metrics "
+                    "WHERE metric = ? AND day BETWEEN ? AND ? GROUP BY page_id", (metric, since, until)).fetchall()
+            names = {row['page_id']: row['name'] for row in conn.execute("SELECT page_id, name FROM pages")}
+        return {row['page_id']: {'name': names.get(row['page_id']), 'value': row['value']} for row in rows}
+
+    def stats(self) -> Dict:
+        """
+        Get store statistics
+
+        Returns:
+            Dictionary with row counts and last ingest times
+        """
+        with closing(self._connect()) as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ('pages', 'posts', 'post_metrics', 'page_metrics')}
+        for kind in (POSTS, PAGES):
+            last = self.last_ingest(kind)
+            counts[f'last_{kind}_ingest'] = datetime.fromtimestamp(last['finished_at']).isoformat() if last else None
+        return counts
+
+
+def fetch_page_insights(fb_api, store: InsightsStore, days: int, budget: Optional[float] = None) -> Dict:
+    """
+    Fetch the daily page insights of every page for the last days and record them
+
+    Args:
+        fb_api: FacebookAPI client of the user
+        store: Store the values are written to
+        days: Number of days, read in chunks of INSIGHTS_CHUNK_DAYS
+        budget: Wall-clock budget in seconds (no limit if not provided)
+
+    Returns:
+        Dictionary with the number of pages read, failed pages and values written
+    """
+    pages = {page['id']: page for page in fb_api.get_all_pages(fields='id,name,access_token') if page.get('id')}
+    until = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    chunks = []
+    start = until - timedelta(days=days)
+    while start < until:
+        end = min(start + timedelta(days=INSIGHTS_CHUNK_DAYS), until)
+        chunks.append((int(start.timestamp()), int(end.timestamp())))
+        start = end
+
+    def fetch_page(page_id: str) -> Dict:
+        data = []
+        for since_ts, until_ts in chunks:
+            response = fb_api._make_request(
+                "GET",
+                f"/{page_id}/insights",
+                params={'metric': ','.join(PAGE_METRICS), 'period': 'day', 'since': since_ts, 'until': until_ts},
+                access_token=pages[page_id].get('access_token') or fb_api.access_token
+            )
+            data.extend(response.get('data', []))
+        return {'data': data}
+
+    results = get_fanout_executor(fb_api.app_id, pool=ANALYTICS_POOL).run(fetch_page, pages, timeout=budget)
+    fetched = [(pages[page_id], outcome['result']) for page_id, outcome in results.items()
+               if outcome['error'] is None]
+    failed = [page_id for page_id, outcome in results.items() if outcome['error'] is not None]
+    for page_id in failed:
+        logger.warning(f"Could not read insights of page {page_id}: {results[page_id]['error']}")
+
+    return {'pages': len(fetched), 'failed': failed, 'values': store.ingest_page_insights(fetched)}
+
+
+def sync_insights(fb_api, store: InsightsStore, page_days: int = SYNC_PAGE_DAYS,
+                  post_days: int = DEFAULT_DAYS, budget: Optional[float] = None) -> Dict:
+    """
+    Take a snapshot of post insights and read the recent daily page insights
+
+    Args:
+        fb_api: FacebookAPI client of the user
+        store: Store the snapshots are written to
+        page_days: Days of page insights read
+        post_days: Posts created in the last days are snapshotted
+        budget: Wall-clock budget in seconds of each crawl (FACEBOOK_ANALYTICS_BUDGET if not provided)
+
+    Returns:
+        Dictionary with the posts crawl coverage and the page insights summary
+    """
+    posts = crawl_posts_performance(fb_api, budget=budget, days=post_days, store=store)
+    pages = fetch_page_insights(fb_api, store, page_days, budget=budget)
+    logger.info(f"Insights sync: {posts['stats']['posts_count']} posts, {pages['values']} page values")
+    return {'posts': posts['coverage'], 'pages': pages}
+
+
+def backfill_insights(fb_api, store: InsightsStore, days: int = 90) -> Dict:
+    """
+    Load the history of daily page insights and snapshot the posts of the period
+
+    Args:
+        fb_api: FacebookAPI client of the user
+        store: Store the history is written to
+        days: Number of days of history
+
+    Returns:
+        Same as sync_insights
+    """
+    return sync_insights(fb_api, store, page_days=days, post_days=days, budget=BACKFILL_BUDGET)
+
+
+class InsightsSyncWorker:
+    """
+    Background thread running sync_insights periodically
+    """
+
+    def __init__(self, token_provider: Callable[[], Optional[str]], client_provider: Callable,
+                 store: InsightsStore, interval: float = 3600):
+        """
+        Initialize the worker
+
+        Args:
+            token_provider: Callable returning the current user access token
+            client_provider: Callable returning the FacebookAPI client of a token
+            store: Store the snapshots are written to
+            interval: Seconds between two syncs
+        """
+        self.token_provider = token_provider
+        self.client_provider = client_provider
+        self.store = store
+        self.interval = interval
+        self.last_error: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def sync_now(self) -> Optional[Dict]:
+        """
+        Run one sync
+
+        Returns:
+            Result of sync_insights, or None on error
+        """
+        try:
+            access_token = self.token_provider()
+            if not access_token:
+                self.last_error = 'Token Facebook non configuré'
+                return None
+            result = sync_insights(self.client_provider(access_token), self.store)
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Insights sync failed: {e}")
+        return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.sync_now()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='insights-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+# Process-wide store shared by the routes and the sync worker
+_default_store: Optional[InsightsStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_insights_store() -> InsightsStore:
+    """Get or create the process-wide store (FACEBOOK_INSIGHTS_DB, data/insights.db by default)"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = InsightsStore(os.getenv("FACEBOOK_INSIGHTS_DB", DEFAULT_DB))
+    return _default_store
+
+
+def reset_insights_store():
+    """Drop the process-wide store so the next call opens it again"""
+    global _default_store
+    with _default_store_lock:
+        _default_store = None
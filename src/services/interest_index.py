@@ -0,0 +1,319 @@
+"""
+Interest Search Index
+
+Targeting interests are searched in a catalogue loaded once per process
+and indexed by accent-folded words ("Aménagement extérieur" is found by
+"amenagement", "exter" or "AMÉNAG"):
+
+- a sorted array of (word, interest) pairs answers word-prefix queries
+  with bisect, without scanning the catalogue
+- the folded names joined in one string answer substring queries with
+  str.find, only to fill the results left after prefix matches
+
+Interests added later (remote search hits) go to a small overlay segment
+searched alongside the base one, so adding a few hits does not re-sort
+the whole catalogue. The overlay is merged into the base once it grows
+past a fraction of it, outside the lock searches take.
+
+Results are ranked: exact name, name prefix, word prefixes, substring,
+then larger audiences first. The catalogue is the built-in list below,
+or a local dump of Facebook's targeting taxonomy (FACEBOOK_INTEREST_TAXONOMY,
+a JSON list, a Graph {"data": [...]} response or JSON lines).
+"""
+
+import os
+import re
+import json
+import bisect
+import heapq
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("facebook_api.interests")
+
+DEFAULT_LIMIT = 10
+OVERLAY_MIN = 256       # Interests kept in the overlay before it is merged...
+OVERLAY_RATIO = 8       # ...or 1/OVERLAY_RATIO of the base when larger
+
+# Rank of a match, best first
+EXACT = 0
+NAME_PREFIX = 1
+WORD_PREFIX = 2
+SUBSTRING = 3
+
+# Interests offered when no taxonomy dump is configured
+DEFAULT_INTERESTS = [
+    {'id': 'bricolage', 'name': 'Bricolage', 'category': 'Hobbies'},
+    {'id': 'jardinage', 'name': 'Jardinage', 'category': 'Hobbies'},
+    {'id': 'amenagement_exterieur', 'name': 'Aménagement extérieur', 'category': 'Home & Garden'},
+    {'id': 'terrasse', 'name': 'Terrasse', 'category': 'Home & Garden'},
+    {'id': 'cloture', 'name': 'Clôture', 'category': 'Home & Garden'},
+    {'id': 'bois', 'name': 'Bois', 'category': 'Materials'},
+    {'id': 'composite', 'name': 'Composite', 'category': 'Materials'},
+    {'id': 'renovation', 'name': 'Rénovation', 'category': 'Home Improvement'},
+    {'id': 'menuiserie', 'name': 'Menuiserie', 'category': 'Crafts'},
+    {'id': 'outillage', 'name': 'Outillage', 'category': 'Tools'},
+    {'id': 'decoration_exterieure', 'name': 'Décoration extérieure', 'category': 'Home & Garden'},
+    {'id': 'piscine', 'name': 'Piscine', 'category': 'Home & Garden'},
+    {'id': 'barbecue', 'name': 'Barbecue', 'category': 'Outdoor Living'},
+    {'id': 'mobilier_jardin', 'name': 'Mobilier de jardin', 'category': 'Furniture'},
+    {'id': 'pergola', 'name': 'Pergola', 'category': 'Home & Garden'}
+]
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase a text and strip its accents ("Clôture" -> "cloture")"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded words of a text"""
+    return _WORD.findall(fold(text))
+
+
+def normalize_interest(entry: Dict) -> Optional[Dict]:
+    """
+    Shape a taxonomy entry as a search result
+
+    Args:
+        entry: Interest from the built-in list or a /search?type=adinterest response
+
+    Returns:
+        Dictionary with id, name, category and audience_size (when known),
+        or None if the entry has no id or name
+    """
+    if not entry.get('id') or not entry.get('name'):
+        return None
+    path = entry.get('path') or []
+    interest = {
+        'id': str(entry['id']),
+        'name': entry['name'],
+        'category': entry.get('category') or entry.get('topic') or (path[-2] if len(path) > 1 else None)
+    }
+    size = entry.get('audience_size') or entry.get('audience_size_upper_bound')
+    if size:
+        interest['audience_size'] = size
+    return interest
+
+
+class _Segment:
+    """Immutable word array and joined names of a contiguous range of interests"""
+
+    __slots__ = ('first', 'count', 'words', 'names', 'offsets')
+
+    def __init__(self, first: int, count: int, words: List[tuple], names: str, offsets: List[int]):
+        self.first = first
+        self.count = count
+        self.words = words
+        self.names = names
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, first: int, folded: List[str]) -> '_Segment':
+        """Index the folded names of the interests at positions first, first + 1, ..."""
+        words, offsets, offset = [], [], 0
+        for position, name in enumerate(folded, start=first):
+            words.extend((word, position) for word in set(_WORD.findall(name)))
+            offsets.append(offset)
+            offset += len(name) + 1
+        words.sort()
+        return cls(first, len(folded), words, '\n'.join(folded), offsets)
+
+    def merge(self, other: '_Segment') -> '_Segment':
+        """Segment covering this one followed by other"""
+        if not self.count:
+            return other
+        shift = len(self.names) + 1
+        # Two sorted runs: Timsort merges them in linear time
+        words = self.words + other.words
+        words.sort()
+        return _Segment(self.first, self.count + other.count, words, self.names + '\n' + other.names,
+                        self.offsets + [offset + shift for offset in other.offsets])
+
+    def word_prefix_matches(self, prefix: str) -> set:
+        """Positions of the interests having a word starting with prefix"""
+        start = bisect.bisect_left(self.words, (prefix,))
+        end = bisect.bisect_left(self.words, (prefix + '\U0010ffff',), start)
+        return {position for _, position in self.words[start:end]}
+
+    def substring_matches(self, text: str, folded: List[str], ranked: Dict[int, int], limit: int):
+        """Add the interests whose name contains text to ranked, up to limit"""
+        start = self.names.find(text)
+        while start != -1 and len(ranked) < limit:
+            index = bisect.bisect_right(self.offsets, start) - 1
+            position = self.first + index
+            ranked.setdefault(position, SUBSTRING)
+            start = self.names.find(text, self.offsets[index] + len(folded[position]) + 1)
+
+
+class InterestIndex:
+    """
+    Prefix index of targeting interests over accent-folded words
+
+    Handles:
+    - Word-prefix lookups with bisect over sorted word arrays
+    - Substring lookups over the folded names
+    - Ranking (exact, name prefix, word prefix, substring, audience size)
+    - Adding interests (e.g. remote search results) to an overlay,
+      without reloading or re-sorting the catalogue
+    """
+
+    def __init__(self, interests: Iterable[Dict] = ()):
+        """
+        Initialize the index
+
+        Args:
+            interests: Interests (see normalize_interest), duplicates by id are ignored
+        """
+        # _lock guards the segments searches read, _write_lock serializes add()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._interests: List[Dict] = []
+        self._ids: Dict[str, int] = {}
+        self._folded: List[str] = []
+        self._base = _Segment(0, 0, [], '', [])
+        self._overlay = _Segment(0, 0, [], '', [])
+        self.add(interests)
+
+    def __len__(self) -> int:
+        return len(self._interests)
+
+    def __contains__(self, interest_id: str) -> bool:
+        return interest_id in self._ids
+
+    def add(self, interests: Iterable[Dict]) -> int:
+        """
+        Add interests to the index
+
+        Args:
+            interests: Interests or raw taxonomy entries
+
+        Returns:
+            Number of interests added
+        """
+        with self._write_lock:
+            first = len(self._interests)
+            added, ids = [], {}
+            for entry in interests:
+                interest = normalize_interest(entry)
+                if interest is not None and interest['id'] not in self._ids and interest['id'] not in ids:
+                    ids[interest['id']] = first + len(added)
+                    added.append(interest)
+            if not added:
+                return 0
+
+            # Segments are built outside _lock: searches keep reading the current ones
+            folded = [fold(interest['name']) for interest in added]
+            base, overlay = self._base, self._overlay.merge(_Segment.build(first, folded))
+            if overlay.count > max(OVERLAY_MIN, base.count // OVERLAY_RATIO):
+                base, overlay = base.merge(overlay), _Segment(first + len(added), 0, [], '', [])
+
+            # Positions are appended before the segments referencing them are published
+            self._folded.extend(folded)
+            self._interests.extend(added)
+            with self._lock:
+                self._base, self._overlay = base, overlay
+            self._ids.update(ids)
+        return len(added)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """
+        Find interests matching a query
+
+        Every word of the query must start a word of the name (in any order);
+        names merely containing the query are added after these.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results
+
+        Returns:
+            Interests, best match first
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        folded_query = ' '.join(terms)
+        with self._lock:
+            segments = [segment for segment in (self._base, self._overlay) if segment.count]
+        interests, folded = self._interests, self._folded
+
+        # Most selective word first, then intersect
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            matches = set().union(*(segment.word_prefix_matches(term) for segment in segments))
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                break
+
+        ranked = {}
+        for position in candidates or ():
+            name = folded[position]
+            ranked[position] = EXACT if name == folded_query else \
+                NAME_PREFIX if name.startswith(folded_query) else WORD_PREFIX
+
+        if len(ranked) < limit and len(folded_query) >= 2:
+            for segment in segments:
+                segment.substring_matches(folded_query, folded, ranked, limit)
+
+        order = heapq.nsmallest(limit, ranked, key=lambda position: (ranked[position],
+                                                     -(interests[position].get('audience_size') or 0),
+                                                     len(folded[position]), folded[position]))
+        return [dict(interests[position]) for position in order]
+
+
+def load_taxonomy(path: str) -> List[Dict]:
+    """
+    Read a local dump of the targeting taxonomy
+
+    Args:
+        path: JSON file (a list, or a Graph response with 'data') or JSON lines file
+
+    Returns:
+        Normalized interests
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    try:
+        entries = json.loads(content)
+    except ValueError:
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    if isinstance(entries, dict):
+        entries = entries.get('data', [])
+    interests = [interest for interest in map(normalize_interest, entries) if interest is not None]
+    logger.info(f"Loaded {len(interests)} interests from {path}")
+    return interests
+
+
+# Process-wide index shared by the routes
+_default_index: Optional[InterestIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_interest_index() -> InterestIndex:
+    """Get or build the process-wide index (FACEBOOK_INTEREST_TAXONOMY, the built-in list otherwise)"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                interests = DEFAULT_INTERESTS
+                taxonomy = os.getenv("FACEBOOK_INTEREST_TAXONOMY")
+                if taxonomy:
+                    try:
+                        interests = load_taxonomy(taxonomy)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Cannot load interest taxonomy {taxonomy}, using built-in list: {str(e)}")
+                _default_index = InterestIndex(interests)
+    return _default_index
+
+
+def reset_interest_index():
+    """Drop the process-wide index so the next call builds it again"""
+    global _default_index
+    with _default_index_lock:
+        _default_index = None
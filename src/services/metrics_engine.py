@@ -0,0 +1,242 @@
+"""
+Post Metrics Engine
+
+Columnar aggregation of post insights for the analytics views. Posts are
+appended one at a time (so a crawl can stream into it); each post only
+leaves its reach, engagement, shares and page in the columns, and totals,
+rates and per-page breakdowns are computed on whole columns with NumPy
+(vectorized sums, bincount per page). The fields of a post (message,
+metrics) are only kept while it is among the top posts by engagement, in
+a heap bounded by keep_top, so memory does not grow with post text.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+POST_METRICS = [
+    'post_impressions', 'post_engaged_users', 'post_clicks',
+    'post_reactions_like_total', 'post_reactions_love_total', 'post_reactions_wow_total',
+    'post_reactions_haha_total', 'post_reactions_sorry_total', 'post_reactions_anger_total',
+    'post_comments', 'post_shares'
+]
+REACTION_METRICS = [metric for metric in POST_METRICS if metric.startswith('post_reactions_')]
+BOOSTED_REACH = 1000    # Reach above which a post is shown as boosted (simple heuristic)
+KEEP_TOP = 50           # Top posts kept with their fields by default
+
+
+def post_metrics(post: Dict) -> Dict[str, int]:
+    """
+    Read the lifetime metric values of a post with inline insights
+
+    Args:
+        post: Post object with an insights.metric(...) field
+
+    Returns:
+        Dictionary of metric name to value
+    """
+    metrics = {}
+    for insight in post.get('insights', {}).get('data', []):
+        values = insight.get('values', [])
+        if values:
+            metrics[insight.get('name')] = values[0].get('value', 0)
+    return metrics
+
+
+def format_post(post: Dict, page: Dict, metrics: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Flatten a post and its insights into the analytics row shown by the UI
+
+    Args:
+        post: Post object (id, message, created_time)
+        page: Page the post belongs to (id, name)
+        metrics: Metric values (read from the post's inline insights if not provided)
+
+    Returns:
+        Dictionary with reach, engagement, reactions, comments and shares
+    """
+    if metrics is None:
+        metrics = post_metrics(post)
+
+    reactions = sum(metrics.get(metric, 0) for metric in REACTION_METRICS)
+    comments = metrics.get('post_comments', 0)
+    shares = metrics.get('post_shares', 0)
+    reach = metrics.get('post_impressions', 0)
+    message = post.get('message', '')
+
+    return {
+        'id': post['id'],
+        'message': message[:100] + ('...' if len(message) > 100 else ''),
+        'page_name': page.get('name'),
+        'page_id': page['id'],
+        'created_time': post.get('created_time'),
+        'reach': reach,
+        'engagement': reactions + comments + shares,
+        'likes': reactions,
+        'comments': comments,
+        'shares': shares,
+        'status': 'boosted' if reach > BOOSTED_REACH else 'organic',
+        'boost_eligible': True
+    }
+
+
+class MetricsEngine:
+    """
+    Column store of post metrics with vectorized aggregations
+
+    Handles:
+    - Streaming appends of posts with their metric values
+    - Engagement (reactions + comments + shares) per post
+    - Totals and engagement rate across posts
+    - Per-page breakdowns
+    - Top-K posts by engagement, from a bounded candidate heap
+    """
+
+    def __init__(self, keep_top: int = KEEP_TOP):
+        """
+        Initialize an empty engine
+
+        Args:
+            keep_top: Most posts top() can return (only these keep their fields)
+        """
+        self.keep_top = keep_top
+        self._pages: Dict[str, Dict] = {}
+        self._page_index: List[str] = []
+        self._page_of: List[int] = []
+        self._columns: Dict[str, List[int]] = {'reach': [], 'engagement': [], 'shares': []}
+        # Min-heap of (engagement, -index, post, page ID, metrics): the weakest candidate is evicted first
+        self._top: List[Tuple[int, int, Dict, str, Dict[str, int]]] = []
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return len(self._page_of)
+
+    def add(self, post: Dict, page: Dict, metrics: Optional[Dict[str, int]] = None):
+        """
+        Append a post
+
+        Args:
+            post: Post object (id, message, created_time)
+            page: Page the post belongs to (id, name)
+            metrics: Metric values (read from the post's inline insights if not provided)
+        """
+        if metrics is None:
+            metrics = post_metrics(post)
+        if page['id'] not in self._pages:
+            self._pages[page['id']] = {'index': len(self._page_index), 'name': page.get('name')}
+            self._page_index.append(page['id'])
+
+        values = {metric: metrics.get(metric, 0) for metric in POST_METRICS}
+        values = {metric: value if isinstance(value, (int, float)) else 0 for metric, value in values.items()}
+        engagement = sum(values[metric] for metric in REACTION_METRICS) + values['post_comments'] + values['post_shares']
+
+        index = len(self)
+        self._page_of.append(self._pages[page['id']]['index'])
+        self._columns['reach'].append(values['post_impressions'])
+        self._columns['engagement'].append(engagement)
+        self._columns['shares'].append(values['post_shares'])
+        self._arrays = None
+
+        # Ties keep the earliest post, like a stable sort by engagement
+        candidate = (engagement, -index)
+        if len(self._top) < self.keep_top:
+            heapq.heappush(self._top, candidate + (self._post_fields(post), page['id'], values))
+        elif self._top and candidate > self._top[0][:2]:
+            heapq.heapreplace(self._top, candidate + (self._post_fields(post), page['id'], values))
+
+    @staticmethod
+    def _post_fields(post: Dict) -> Dict:
+        return {'id': post['id'], 'message': post.get('message', ''), 'created_time': post.get('created_time')}
+
+    def extend(self, rows: Iterable[Tuple[Dict, Dict, Optional[Dict[str, int]]]]) -> 'MetricsEngine':
+        """
+        Append (post, page, metrics) rows, consuming an iterator lazily
+
+        Returns:
+            The engine itself
+        """
+        for post, page, metrics in rows:
+            self.add(post, page, metrics)
+        return self
+
+    # --- Columns ---------------------------------------------------------
+
+    def _arrays_of_columns(self) -> Dict:
+        if self._arrays is None:
+            arrays = {name: np.asarray(column, dtype=np.int64) for name, column in self._columns.items()}
+            arrays['page'] = np.asarray(self._page_of, dtype=np.int64)
+            self._arrays = arrays
+        return self._arrays
+
+    def engagement(self) -> List[int]:
+        """Engagement of each post, in insertion order"""
+        return list(self._columns['engagement'])
+
+    # --- Aggregations ----------------------------------------------------
+
+    def totals(self) -> Dict:
+        """
+        Totals shown above the posts table
+
+        Returns:
+            Dictionary with total reach, engagement and shares, boosted and
+            total post counts and the engagement rate (engagement / reach)
+        """
+        arrays = self._arrays_of_columns()
+        reach = int(arrays['reach'].sum())
+        engagement = int(arrays['engagement'].sum())
+        shares = int(arrays['shares'].sum())
+        boosted = int((arrays['reach'] > BOOSTED_REACH).sum())
+
+        return {
+            'total_reach': reach,
+            'total_engagement': engagement,
+            'total_shares': shares,
+            'boosted_posts_count': boosted,
+            'posts_count': len(self),
+            'engagement_rate': round(engagement / reach, 4) if reach else 0.0
+        }
+
+    def by_page(self) -> List[Dict]:
+        """
+        Per-page breakdown, pages with the most engagement first
+
+        Returns:
+            List of dictionaries with page_id, page_name, posts_count,
+            reach, engagement, shares and engagement_rate
+        """
+        count = len(self._page_index)
+        arrays = self._arrays_of_columns()
+        posts = np.bincount(arrays['page'], minlength=count).tolist()
+        reach = np.bincount(arrays['page'], weights=arrays['reach'], minlength=count).tolist()
+        engagement = np.bincount(arrays['page'], weights=arrays['engagement'], minlength=count).tolist()
+        shares = np.bincount(arrays['page'], weights=arrays['shares'], minlength=count).tolist()
+
+        pages = [{
+            'page_id': page_id,
+            'page_name': self._pages[page_id]['name'],
+            'posts_count': int(posts[index]),
+            'reach': int(reach[index]),
+            'engagement': int(engagement[index]),
+            'shares': int(shares[index]),
+            'engagement_rate': round(engagement[index] / reach[index], 4) if reach[index] else 0.0
+        } for index, page_id in enumerate(self._page_index)]
+        pages.sort(key=lambda page: page['engagement'], reverse=True)
+        return pages
+
+    def top(self, k: int) -> List[Dict]:
+        """
+        The k posts with the most engagement, as format_post rows
+
+        Args:
+            k: Number of posts (at most keep_top)
+
+        Returns:
+            List of rows, most engagement first (ties in insertion order)
+        """
+        if k <= 0:
+            return []
+        best = sorted(self._top, key=lambda candidate: candidate[:2], reverse=True)[:k]
+        return [format_post(post, {'id': page_id, 'name': self._pages[page_id]['name']}, metrics)
+                for _, _, post, page_id, metrics in best]
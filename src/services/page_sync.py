@@ -0,0 +1,495 @@
+"""
+Facebook Page Synchronization Service
+
+Fetches every page managed by the user from /me/accounts, with the recent
+posts of each page expanded inline (posts.limit(5){...}) so a sync costs
+one request per 100 pages instead of one extra /posts request per page.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from graph_batch import GraphBatch
+from graph_session import GraphSessionPool, get_session_pool
+from rate_limit import RateLimitExceeded
+
+GRAPH_URL = "https://graph.facebook.com/v18.0"
+PAGE_FIELDS = 'id,name,category,fan_count,access_token,picture'
+RECENT_POSTS_FIELD = 'posts.limit(5){created_time,message}'
+
+# Graph error codes returned when the nested posts edge is not readable
+EXPANSION_ERROR_CODES = [10, 100, 200]
+
+# Rate limit error codes, and how many times a throttled call is retried
+RATE_LIMIT_ERROR_CODES = [4, 17, 32, 613]
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class PageSyncError(Exception):
+    """Sync failure carrying the JSON payload and HTTP status for the client"""
+    def __init__(self, payload: Dict, status_code: int):
+        self.payload = payload
+        self.status_code = status_code
+        super().__init__(payload.get('error', 'Page sync failed'))
+
+
+def fetch_all_pages(access_token: str, http: Optional[GraphSessionPool] = None, user_name: str = '',
+                    expand_posts: bool = True, max_iterations: int = 100) -> Tuple[List[Dict], int, Optional[Dict]]:
+    """
+    Fetch all pages managed by the user, following pagination
+
+    Args:
+        access_token: User access token
+        http: HTTP session pool (shared process-wide pool if not provided)
+        user_name: User name, for logs
+        expand_posts: Request the recent posts of each page inline
+        max_iterations: Maximum number of pages of results (100 pages each)
+
+    Returns:
+        Tuple of (pages, iterations, last API response)
+
+    Raises:
+        PageSyncError: If no page could be retrieved
+    """
+    http = http or get_session_pool()
+
+    all_pages = []
+    pages_url = f"{GRAPH_URL}/me/accounts"
+    params = {
+        'access_token': access_token,
+        'fields': f"{PAGE_FIELDS},{RECENT_POSTS_FIELD}" if expand_posts else PAGE_FIELDS,
+        'limit': 100  # Maximum limit per request
+    }
+
+    iteration = 0
+    rate_limit_retries = 0
+    data = None
+
+    print(f"Starting ENHANCED pagination to fetch ALL pages for user {user_name}")
+
+    # Enhanced pagination loop to get ALL pages
+    while pages_url and iteration < max_iterations:
+        iteration += 1
+        print(f"ENHANCED Pagination iteration {iteration}: Fetching from {pages_url[:150]}...")
+
+        try:
+            response = http.get(pages_url, params=params, timeout=60)  # Increased timeout to 60s
+        except requests.exceptions.Timeout:
+            print(f"Timeout at iteration {iteration}, returning {len(all_pages)} pages")
+            if len(all_pages) > 0:
+                break  # Continue with what we have
+            raise PageSyncError({
+                'error': 'Timeout lors de la récupération des pages',
+                'message': 'La récupération des pages a pris trop de temps. Veuillez réessayer.',
+                'action_required': 'retry_sync'
+            }, 408)
+        except RateLimitExceeded as e:
+            print(f"Rate limit budget exhausted at iteration {iteration}: {str(e)}")
+            if len(all_pages) > 0:
+                break  # Continue with what we have
+            raise PageSyncError({
+                'error': 'Limite de requêtes Facebook atteinte',
+                'message': f'Veuillez réessayer dans {int(e.retry_after) + 1} secondes.',
+                'action_required': 'retry_sync',
+                'retry_after': round(e.retry_after, 1)
+            }, 429)
+        except requests.exceptions.RequestException as e:
+            print(f"Network error at iteration {iteration}: {str(e)}")
+            if len(all_pages) > 0:
+                break  # Continue with what we have
+            raise PageSyncError({
+                'error': 'Erreur de connexion lors de la pagination',
+                'message': f'Erreur réseau: {str(e)}',
+                'action_required': 'check_connection'
+            }, 500)
+
+        print(f"Response status: {response.status_code}")
+
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_info = error_data.get('error', {})
+            error_message = error_info.get('message', 'Erreur API Facebook')
+            error_code = error_info.get('code', 'unknown')
+
+            print(f"API Error at iteration {iteration}: {error_code} - {error_message}")
+
+            # Nested posts not readable with this token: retry without the expansion
+            if error_code in EXPANSION_ERROR_CODES and RECENT_POSTS_FIELD in params.get('fields', ''):
+                print("Posts field expansion rejected, retrying without it")
+                params['fields'] = PAGE_FIELDS
+                continue
+
+            # Rate limiting: the governor has paused the budget, the retry waits for it
+            if error_code in RATE_LIMIT_ERROR_CODES and rate_limit_retries < MAX_RATE_LIMIT_RETRIES:
+                rate_limit_retries += 1
+                print(f"Rate limit detected, retrying ({rate_limit_retries}/{MAX_RATE_LIMIT_RETRIES})...")
+                continue  # Retry the same request
+
+            # If we have some pages already, continue with what we have
+            if len(all_pages) > 0:
+                print(f"Continuing with {len(all_pages)} pages despite error")
+                break
+            raise PageSyncError({
+                'error': f'Erreur Facebook API lors de la pagination (Code: {error_code})',
+                'message': error_message,
+                'action_required': 'check_token_permissions',
+                'facebook_error': {
+                    'code': error_code,
+                    'message': error_message,
+                    'iteration': iteration
+                }
+            }, 400)
+
+        rate_limit_retries = 0
+        data = response.json()
+        current_pages = data.get('data', [])
+
+        print(f"Retrieved {len(current_pages)} pages in iteration {iteration}")
+
+        # Add current pages to our collection
+        if current_pages:
+            all_pages.extend(current_pages)
+            print(f"Total pages accumulated: {len(all_pages)}")
+
+        # Check if there are more pages to fetch
+        paging = data.get('paging', {})
+        next_url = paging.get('next')
+
+        if next_url:
+            pages_url = next_url
+            params = {}  # Clear params as next URL contains all needed parameters
+            print(f"Next URL found: {next_url[:150]}...")
+
+            # Additional safety check for infinite loops
+            if 'after=' not in next_url and 'before=' not in next_url:
+                print(f"Warning: No pagination cursor in URL at iteration {iteration}")
+                # Try to continue anyway, but with extra caution
+                if iteration > 10:  # If we've been going for a while without cursors, stop
+                    print("Stopping due to potential infinite loop")
+                    break
+        else:
+            print("No next URL found, pagination complete")
+            break
+
+        # Progress logging every 10 iterations
+        if iteration % 10 == 0:
+            print(f"PROGRESS: {iteration} iterations completed, {len(all_pages)} pages retrieved")
+
+    return all_pages, iteration, data
+
+
+def attach_recent_posts(pages: List[Dict], access_token: str, http: Optional[GraphSessionPool] = None) -> int:
+    """
+    Fill in recent posts for pages fetched without the inline expansion
+
+    Pages missing the 'posts' field are probed with batch requests
+    (50 pages per call).
+
+    Args:
+        pages: Pages returned by fetch_all_pages (updated in place)
+        access_token: User access token, used when a page has no token
+        http: HTTP session pool (shared process-wide pool if not provided)
+
+    Returns:
+        Number of pages that had to be probed
+    """
+    missing = [page for page in pages if 'posts' not in page]
+    if not missing:
+        return 0
+
+    posts_batch = GraphBatch(access_token, session_pool=http)
+    probes = [
+        (page, posts_batch.add(
+            'GET',
+            f"/{page['id']}/posts",
+            params={'limit': 5, 'fields': 'created_time,message'},
+            access_token=page.get('access_token', access_token)
+        ))
+        for page in missing
+    ]
+    posts_batch.execute()
+
+    for page, probe in probes:
+        page['posts'] = probe.data if probe.ok and probe.data else {'data': []}
+    return len(missing)
+
+
+def format_page(page: Dict) -> Dict:
+    """
+    Format a Graph page object for the frontend
+
+    Args:
+        page: Page object, with its recent posts under 'posts'
+
+    Returns:
+        Page dictionary as stored in data/facebook_pages.json
+    """
+    posts_list = page.get('posts', {}).get('data', [])
+    last_post_time = 'Aucune publication'
+    if posts_list and posts_list[0].get('created_time'):
+        # Convert to readable format
+        last_post_time = 'Récemment'
+
+    return {
+        'id': page['id'],
+        'name': page['name'],
+        'category': page.get('category', 'Page'),
+        'fan_count': page.get('fan_count', 0),
+        'access_token': page.get('access_token', ''),
+        'picture': page.get('picture', {}).get('data', {}).get('url', ''),
+        'posts_count': len(posts_list),
+        'status': 'Connectée',
+        'last_post': last_post_time
+    }
+
+
+# --- Incremental synchronization --------------------------------------------
+
+def page_fingerprint(page: Dict) -> str:
+    """
+    Compute the fingerprint of a formatted page
+
+    Covers name, category, fan count, access token (hashed), picture URL
+    and the recent posts summary shown in the UI.
+
+    Args:
+        page: Page dictionary returned by format_page
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    token = page.get('access_token') or ''
+    material = {
+        'name': page.get('name'),
+        'category': page.get('category'),
+        'fan_count': page.get('fan_count'),
+        'token': hashlib.sha256(token.encode('utf-8')).hexdigest(),
+        'picture': page.get('picture'),
+        'posts_count': page.get('posts_count'),
+        'last_post': page.get('last_post')
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _read_json(path: str, default):
+    """Read a JSON file, returning default when missing or unreadable"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path: str, payload):
+    """Write a JSON file atomically (temporary file + rename)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def apply_incremental_sync(formatted_pages: List[Dict], pages_file: str, state_file: str,
+                           full: bool = False) -> Dict:
+    """
+    Merge freshly fetched pages into the stored snapshot
+
+    Pages whose fingerprint did not change keep their stored entry, and
+    the snapshot file is only rewritten when something was added, removed
+    or changed.
+
+    Args:
+        formatted_pages: Pages returned by format_page, in display order
+        pages_file: Path of the page snapshot (data/facebook_pages.json)
+        state_file: Path of the sync state (fingerprints, last sync)
+        full: Rewrite every entry and the snapshot file regardless of changes
+
+    Returns:
+        Dictionary with 'pages' (new snapshot) and 'changes' (added,
+        removed and changed page IDs, unchanged count, written flag)
+    """
+    state = _read_json(state_file, {})
+    old_fingerprints = state.get('fingerprints', {})
+    stored_pages = {page.get('id'): page for page in _read_json(pages_file, [])
+                    if isinstance(page, dict)}
+
+    snapshot = []
+    fingerprints = {}
+    added, changed = [], []
+    for page in formatted_pages:
+        fingerprint = page_fingerprint(page)
+        fingerprints[page['id']] = fingerprint
+        previous = old_fingerprints.get(page['id'])
+
+        if previous is None or page['id'] not in stored_pages:
+            added.append(page['id'])
+            snapshot.append(page)
+        elif previous != fingerprint or full:
+            if previous != fingerprint:
+                changed.append(page['id'])
+            snapshot.append(page)
+        else:
+            snapshot.append(stored_pages[page['id']])
+
+    removed = [page_id for page_id in old_fingerprints if page_id not in fingerprints]
+    order_changed = [page['id'] for page in snapshot] != list(stored_pages)
+    written = full or bool(added or changed or removed) or order_changed
+
+    if written:
+        _write_json(pages_file, snapshot)
+
+    changes = {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': len(snapshot) - len(added) - len(changed),
+        'written': written
+    }
+    _write_json(state_file, {
+        'fingerprints': fingerprints,
+        'last_sync': datetime.now().isoformat(),
+        'last_changes': changes
+    })
+    return {'pages': snapshot, 'changes': changes}
+
+
+def run_page_sync(access_token: str, pages_file: str, state_file: str,
+                  http: Optional[GraphSessionPool] = None, full: bool = False) -> Dict:
+    """
+    Fetch all pages and apply them incrementally to the snapshot
+
+    Args:
+        access_token: User access token
+        pages_file: Path of the page snapshot
+        state_file: Path of the sync state
+        http: HTTP session pool (shared process-wide pool if not provided)
+        full: Rewrite every entry regardless of changes
+
+    Returns:
+        Result of apply_incremental_sync
+
+    Raises:
+        PageSyncError: If no page could be retrieved
+    """
+    pages, _, _ = fetch_all_pages(access_token, http=http)
+    attach_recent_posts(pages, access_token, http=http)
+    return apply_incremental_sync([format_page(page) for page in pages], pages_file, state_file, full=full)
+
+
+def read_sync_state(state_file: str) -> Dict:
+    """
+    Get the last sync time and changes, without fingerprints
+
+    Args:
+        state_file: Path of the sync state
+
+    Returns:
+        Dictionary with 'last_sync' and 'last_changes'
+    """
+    state = _read_json(state_file, {})
+    return {
+        'last_sync': state.get('last_sync'),
+        'last_changes': state.get('last_changes')
+    }
+
+
+class PageSyncWorker:
+    """
+    Background thread running an incremental page sync periodically
+
+    Keeps data/facebook_pages.json warm so the UI reads a recent snapshot
+    instead of waiting on a full sync.
+    """
+
+    def __init__(self, token_provider: Callable[[], Optional[str]], pages_file: str, state_file: str,
+                 interval: float = 900):
+        """
+        Initialize the worker
+
+        Args:
+            token_provider: Callable returning the current user access token
+            pages_file: Path of the page snapshot
+            state_file: Path of the sync state
+            interval: Seconds between two syncs
+        """
+        self.token_provider = token_provider
+        self.pages_file = pages_file
+        self.state_file = state_file
+        self.interval = interval
+        self.last_error: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sync_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def sync_lock(self) -> threading.Lock:
+        """Lock held while a sync writes the snapshot, for syncs run outside the worker"""
+        return self._sync_lock
+
+    def sync_now(self, full: bool = False) -> Optional[Dict]:
+        """
+        Run one sync unless another one is already in progress
+
+        Returns:
+            Result of run_page_sync, or None if skipped
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return None
+        try:
+            access_token = self.token_provider()
+            if not access_token:
+                self.last_error = 'Token Facebook non configuré'
+                return None
+            result = run_page_sync(access_token, self.pages_file, self.state_file, full=full)
+            self.last_error = None
+            return result
+        except PageSyncError as e:
+            self.last_error = e.payload.get('message') or str(e)
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            self._sync_lock.release()
+        return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            result = self.sync_now()
+            if result:
+                changes = result['changes']
+                print(f"Background page sync: {len(changes['added'])} added, "
+                      f"{len(changes['removed'])} removed, {len(changes['changed'])} changed")
+            elif self.last_error:
+                print(f"Background page sync failed: {self.last_error}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='page-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
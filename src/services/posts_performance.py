@@ -0,0 +1,171 @@
+"""
+Posts Performance Service
+
+Crawls the recent posts (with their insights) of every page of the user
+concurrently, through the app's analytics fan-out pool (separate from the
+one publishing uses), within a wall-clock budget. Each feed is followed
+page by page (paging.next) down to the start of the window and streamed
+into the metrics engine, so memory does not grow with full responses. When the budget runs out, the posts read
+so far are returned with a coverage indicator listing the pages left
+out, and every page reports how long its fetch took. The raw insights of
+the crawled posts can be recorded in the local insights store on the way.
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fanout import ANALYTICS_POOL, get_fanout_executor, summarize_timings
+from services.metrics_engine import POST_METRICS, MetricsEngine
+
+logger = logging.getLogger("facebook_api.analytics")
+
+DEFAULT_BUDGET = 15.0    # Seconds for the whole crawl
+MIN_BUDGET = 1.0
+MAX_BUDGET = 60.0
+DEFAULT_DAYS = 30
+DEFAULT_MAX_POSTS = 500    # Posts read per page, newest first
+POSTS_PER_REQUEST = 25     # Graph page size (each post carries its insights)
+STORE_CHUNK = 100          # Posts written to the store per transaction
+TOP_POSTS = 50
+
+
+def _env_max_posts() -> int:
+    """Posts read per page from FACEBOOK_ANALYTICS_MAX_POSTS, falling back to the default"""
+    try:
+        return max(1, int(os.getenv("FACEBOOK_ANALYTICS_MAX_POSTS", DEFAULT_MAX_POSTS)))
+    except ValueError:
+        logger.warning(f"Invalid value for FACEBOOK_ANALYTICS_MAX_POSTS, using {DEFAULT_MAX_POSTS}")
+        return DEFAULT_MAX_POSTS
+
+
+def _env_budget() -> float:
+    """Crawl budget from FACEBOOK_ANALYTICS_BUDGET, falling back to the default"""
+    try:
+        return max(MIN_BUDGET, float(os.getenv("FACEBOOK_ANALYTICS_BUDGET", DEFAULT_BUDGET)))
+    except ValueError:
+        logger.warning(f"Invalid value for FACEBOOK_ANALYTICS_BUDGET, using {DEFAULT_BUDGET}")
+        return DEFAULT_BUDGET
+
+
+def crawl_posts_performance(fb_api, budget: Optional[float] = None, days: int = DEFAULT_DAYS,
+                            store=None, max_posts: Optional[int] = None) -> Dict:
+    """
+    Fetch the recent posts of every page concurrently within a time budget
+
+    Each page's posts are read with FacebookAPI.iter_posts, following
+    paging.next until the start of the window, and streamed by chunks
+    into the metrics engine (and the store) as they arrive. When the
+    budget runs out the remaining feeds are abandoned: the chunks already
+    recorded are kept and their pages are reported as timed out.
+
+    Args:
+        fb_api: FacebookAPI client of the user
+        budget: Wall-clock budget in seconds, clamped to MIN_BUDGET..MAX_BUDGET
+            (FACEBOOK_ANALYTICS_BUDGET if not provided)
+        days: Only posts of the last days are fetched
+        store: InsightsStore recording the fetched insights (not recorded if not provided)
+        max_posts: Maximum posts read per page (FACEBOOK_ANALYTICS_MAX_POSTS if not provided)
+
+    Returns:
+        Dictionary with 'posts' (top posts by engagement), 'stats',
+        'pages' (per-page breakdown), 'coverage' (pages crawled, failed,
+        timed out and truncated at max_posts) and 'timings' (per-page
+        fetch latency in ms)
+    """
+    budget = min(MAX_BUDGET, max(MIN_BUDGET, budget)) if budget is not None else _env_budget()
+    max_posts = max_posts or _env_max_posts()
+    pages = {page['id']: page for page in fb_api.get_all_pages(fields='id,name,access_token') if page.get('id')}
+    since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+    engine = MetricsEngine(keep_top=TOP_POSTS)
+    engine_lock = threading.Condition()
+    closed = threading.Event()
+    stored, writing = [0], [0]
+    chunk_size = STORE_CHUNK if store is not None else POSTS_PER_REQUEST
+
+    def record(page: Dict, chunk: List[Dict]) -> bool:
+        """Add a chunk of posts to the answer (and the store), unless the crawl is closed"""
+        with engine_lock:
+            # Posts arriving after the deadline are not part of the answer
+            if closed.is_set():
+                return False
+            writing[0] += 1
+        rows = 0
+        try:
+            if store is not None and chunk:
+                rows = store.ingest_posts([(page, chunk)], log=False)
+        finally:
+            with engine_lock:
+                for post in chunk:
+                    engine.add(post, page)
+                stored[0] += rows
+                writing[0] -= 1
+                engine_lock.notify_all()
+        return True
+
+    def fetch_page(page_id: str) -> int:
+        page = pages[page_id]
+        posts = fb_api.iter_posts(
+            page_id,
+            fields=f"id,message,created_time,insights.metric({','.join(POST_METRICS)})",
+            since=since,
+            max_items=max_posts,
+            page_size=POSTS_PER_REQUEST,
+            page_access_token=page.get('access_token') or fb_api.access_token
+        )
+        count, chunk = 0, []
+        for post in posts:
+            count += 1
+            chunk.append(post)
+            if len(chunk) >= chunk_size:
+                if not record(page, chunk):
+                    return count
+                chunk = []
+        record(page, chunk)
+        return count
+
+    results = get_fanout_executor(fb_api.app_id, pool=ANALYTICS_POOL).run(fetch_page, pages, timeout=budget)
+    with engine_lock:
+        closed.set()
+        # Chunks being written are kept, so the answer, the store and the logged rows agree
+        engine_lock.wait_for(lambda: not writing[0])
+
+    failed, timed_out, truncated = [], [], []
+    for page_id, outcome in results.items():
+        if outcome.get('timed_out'):
+            timed_out.append(page_id)
+        elif outcome['error'] is not None:
+            logger.warning(f"Error getting posts for page {pages[page_id].get('name')}: {outcome['error']}")
+            failed.append(page_id)
+        elif outcome['result'] >= max_posts:
+            truncated.append(page_id)
+
+    crawled = len(pages) - len(failed) - len(timed_out)
+    if timed_out:
+        logger.warning(f"Analytics budget of {budget}s reached, {len(timed_out)} pages left out")
+
+    coverage = {
+        'pages_total': len(pages),
+        'pages_crawled': crawled,
+        'pages_failed': failed,
+        'pages_timed_out': timed_out,
+        'pages_truncated': truncated,
+        'ratio': round(crawled / len(pages), 3) if pages else 1.0,
+        'complete': crawled == len(pages),
+        'budget_s': budget,
+        'max_posts': max_posts
+    }
+    if store is not None:
+        store.log_posts_ingest(stored[0], coverage)
+
+    with engine_lock:
+        return {
+            'posts': engine.top(TOP_POSTS),
+            'stats': engine.totals(),
+            'pages': engine.by_page(),
+            'coverage': coverage,
+            'timings': summarize_timings(results)
+        }
@@ -0,0 +1,522 @@
+"""
+Durable Publish Job Queue
+
+A multi-page publish request is stored as one job with one task per page
+in a SQLite database (data/publish_jobs.db). Worker threads claim pending
+tasks and run them outside the HTTP request, and the job status, per-page
+progress and results are read back from the database, so they survive a
+server restart in the middle of a fan-out.
+
+Running tasks hold a lease: the worker process refreshes their updated_at
+while the page is being published. A task whose lease expired
+(FACEBOOK_PUBLISH_TASK_LEASE seconds without heartbeat) belonged to a
+process that stopped or hung; it is not replayed, since it may already
+have been published, and is reported as interrupted. Expired leases are
+checked each time a worker claims a task, and pending tasks are picked
+up again once the queue is started.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fanout import summarize_timings
+
+logger = logging.getLogger("facebook_api.jobs")
+
+DEFAULT_WORKERS = 4
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_SYNC_WAIT = 25.0
+DEFAULT_LEASE = 120.0           # Seconds a running task stays claimed without heartbeat
+
+# Job and task states
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCESS = 'success'
+FAILED = 'failed'
+COMPLETED = 'completed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publish_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL,
+    link TEXT,
+    media_paths TEXT NOT NULL DEFAULT '[]',
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS publish_tasks (
+    job_id TEXT NOT NULL REFERENCES publish_jobs(id),
+    page_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    owner_pid INTEGER,
+    result TEXT,
+    error TEXT,
+    duration_ms REAL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, page_id)
+);
+CREATE INDEX IF NOT EXISTS idx_publish_tasks_status ON publish_tasks(status, job_id, position);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+class PublishJobStore:
+    """
+    SQLite persistence of publish jobs and their per-page tasks
+
+    Handles:
+    - Job creation with one pending task per page
+    - Atomic task claiming (safe across threads and processes)
+    - Task leases refreshed by heartbeats
+    - Task results, job completion and progress counters
+    - Recovery of tasks whose lease expired
+    """
+
+    def __init__(self, db_path: str, lease: Optional[float] = None):
+        """
+        Initialize the store (the database is created on first use)
+
+        Args:
+            db_path: Path of the SQLite database file
+            lease: Seconds a running task stays claimed without heartbeat
+                (FACEBOOK_PUBLISH_TASK_LEASE if not provided)
+        """
+        self.db_path = db_path
+        self.lease = lease if lease is not None else float(os.getenv('FACEBOOK_PUBLISH_TASK_LEASE', DEFAULT_LEASE))
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    with closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None)) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(SCHEMA)
+                    self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create_job(self, page_ids: List[str], message: str, link: Optional[str] = None,
+                   media_paths: Optional[List[str]] = None, job_id: Optional[str] = None) -> str:
+        """
+        Store a job with one pending task per page
+
+        Args:
+            page_ids: Facebook page IDs (duplicates are ignored)
+            message: Post message text
+            link: Optional link to include
+            media_paths: Optional media file paths
+            job_id: Job ID (generated if not provided)
+
+        Returns:
+            Job ID
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = _now()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO publish_jobs (id, status, message, link, media_paths, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, PENDING, message, link, json.dumps(media_paths or []), now)
+            )
+            conn.executemany(
+                "INSERT INTO publish_tasks (job_id, page_id, position, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, page_id, position, PENDING, now)
+                 for position, page_id in enumerate(dict.fromkeys(page_ids))]
+            )
+            conn.execute("COMMIT")
+        return job_id
+
+    def claim_task(self) -> Optional[Dict]:
+        """
+        Mark the oldest pending task as running for this process
+
+        Tasks whose lease expired are reported as interrupted first.
+
+        Returns:
+            Dictionary with the task and its job fields, or None if idle
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn)
+            row = conn.execute(
+                "SELECT t.job_id, t.page_id, j.message, j.link, j.media_paths "
+                "FROM publish_tasks t JOIN publish_jobs j ON j.id = t.job_id "
+                "WHERE t.status = ? ORDER BY j.created_at, t.position LIMIT 1",
+                (PENDING,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            now = _now()
+            conn.execute(
+                "UPDATE publish_tasks SET status = ?, owner_pid = ?, updated_at = ? WHERE job_id = ? AND page_id = ?",
+                (RUNNING, os.getpid(), now, row['job_id'], row['page_id'])
+            )
+            conn.execute(
+                "UPDATE publish_jobs SET status = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, now, row['job_id'])
+            )
+            conn.execute("COMMIT")
+
+        task = dict(row)
+        task['media_paths'] = json.loads(task['media_paths'])
+        return task
+
+    def finish_task(self, job_id: str, page_id: str, result: Optional[Dict] = None,
+                    error: Optional[str] = None, duration_ms: Optional[float] = None) -> bool:
+        """
+        Record the outcome of a task, completing the job after its last task
+
+        Args:
+            job_id: Job ID
+            page_id: Facebook page ID
+            result: Result of a successful task
+            error: Error message of a failed task
+            duration_ms: Task duration
+
+        Returns:
+            True if this was the last task of the job (False when the task
+            was no longer running)
+        """
+        now = _now()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE publish_tasks SET status = ?, result = ?, error = ?, duration_ms = ?, updated_at = ? "
+                "WHERE job_id = ? AND page_id = ? AND status = ?",
+                (FAILED if error else SUCCESS, json.dumps(result) if result is not None else None,
+                 error, duration_ms, now, job_id, page_id, RUNNING)
+            ).rowcount
+            # A task whose lease expired was already reported interrupted
+            completed = bool(updated) and self._complete_if_done(conn, job_id, now)
+            conn.execute("COMMIT")
+        return completed
+
+    def _complete_if_done(self, conn: sqlite3.Connection, job_id: str, now: str) -> bool:
+        """Mark a job completed when none of its tasks is pending or running"""
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM publish_tasks WHERE job_id = ? AND status IN (?, ?)",
+            (job_id, PENDING, RUNNING)
+        ).fetchone()[0]
+        if remaining:
+            return False
+        conn.execute("UPDATE publish_jobs SET status = ?, finished_at = ? WHERE id = ?",
+                     (COMPLETED, now, job_id))
+        return True
+
+    def heartbeat(self, tasks: List[tuple]) -> None:
+        """
+        Extend the lease of running tasks
+
+        Args:
+            tasks: (job_id, page_id) pairs being executed by this process
+        """
+        if not tasks:
+            return
+        now = _now()
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE publish_tasks SET updated_at = ? WHERE job_id = ? AND page_id = ? AND status = ?",
+                [(now, job_id, page_id, RUNNING) for job_id, page_id in tasks]
+            )
+
+    def _expire_leases(self, conn: sqlite3.Connection) -> int:
+        """Fail the running tasks whose lease expired (inside a write transaction)"""
+        now = datetime.now()
+        cutoff = (now - timedelta(seconds=self.lease)).isoformat()
+        rows = conn.execute(
+            "SELECT job_id, page_id FROM publish_tasks WHERE status = ? AND updated_at < ?", (RUNNING, cutoff)
+        ).fetchall()
+        if not rows:
+            return 0
+
+        now = now.isoformat()
+        conn.executemany(
+            "UPDATE publish_tasks SET status = ?, error = ?, updated_at = ? WHERE job_id = ? AND page_id = ?",
+            [(FAILED, 'Publication interrompue par un redémarrage du serveur, vérifiez la page',
+              now, row['job_id'], row['page_id']) for row in rows]
+        )
+        for job_id in {row['job_id'] for row in rows}:
+            self._complete_if_done(conn, job_id, now)
+        logger.warning(f"{len(rows)} publish tasks were interrupted (lease expired)")
+        return len(rows)
+
+    def recover(self) -> int:
+        """
+        Fail the running tasks whose lease expired
+
+        Returns:
+            Number of interrupted tasks
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            interrupted = self._expire_leases(conn)
+            conn.execute("COMMIT")
+        return interrupted
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Get a job with its progress and per-page results
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dictionary with 'progress' and 'tasks', or None if unknown
+        """
+        with closing(self._connect()) as conn:
+            job = conn.execute("SELECT * FROM publish_jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            tasks = conn.execute(
+                "SELECT page_id, status, result, error, duration_ms, updated_at FROM publish_tasks "
+                "WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+
+        job = dict(job)
+        job['media_paths'] = json.loads(job['media_paths'])
+        job['tasks'] = []
+        for task in tasks:
+            task = dict(task)
+            task['result'] = json.loads(task['result']) if task['result'] else None
+            job['tasks'].append(task)
+
+        counts = {status: 0 for status in (PENDING, RUNNING, SUCCESS, FAILED)}
+        for task in job['tasks']:
+            counts[task['status']] += 1
+        total = len(job['tasks'])
+        done = counts[SUCCESS] + counts[FAILED]
+        job['progress'] = dict(counts, total=total, done=done,
+                               percent=round(done * 100 / total, 1) if total else 100.0)
+        return job
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """
+        Get the most recent jobs with their progress counters
+
+        Args:
+            limit: Maximum number of jobs
+
+        Returns:
+            List of job dictionaries (without per-page tasks)
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT j.id, j.status, j.message, j.created_at, j.started_at, j.finished_at, "
+                "COUNT(t.page_id) AS total, "
+                "SUM(CASE WHEN t.status = ? THEN 1 ELSE 0 END) AS success, "
+                "SUM(CASE WHEN t.status = ? THEN 1 ELSE 0 END) AS failed "
+                "FROM publish_jobs j LEFT JOIN publish_tasks t ON t.job_id = j.id "
+                "GROUP BY j.id ORDER BY j.created_at DESC LIMIT ?",
+                (SUCCESS, FAILED, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class PublishJobQueue:
+    """
+    Worker threads executing publish tasks from a PublishJobStore
+
+    The handler receives the claimed task (job_id, page_id, message, link,
+    media_paths) and returns the result dictionary, or raises on failure.
+    A heartbeat thread extends the lease of the tasks being executed.
+    """
+
+    def __init__(self, store: PublishJobStore, handler: Callable[[Dict], Dict],
+                 workers: Optional[int] = None, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 uploads_dir: Optional[str] = None, sync_wait: Optional[float] = None,
+                 on_job_completed: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the queue
+
+        Args:
+            store: Job store
+            handler: Function publishing one task
+            workers: Number of worker threads (FACEBOOK_PUBLISH_WORKERS if not provided)
+            poll_interval: Seconds between polls when idle
+            uploads_dir: Directory keeping the media files of jobs until they complete
+            sync_wait: Seconds a publish request waits for its job (FACEBOOK_PUBLISH_SYNC_WAIT if not provided)
+            on_job_completed: Optional callback receiving the ID of each completed job
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers or int(os.getenv('FACEBOOK_PUBLISH_WORKERS', DEFAULT_WORKERS))
+        self.poll_interval = poll_interval
+        self.uploads_dir = uploads_dir
+        self.sync_wait = sync_wait if sync_wait is not None else float(
+            os.getenv('FACEBOOK_PUBLISH_SYNC_WAIT', DEFAULT_SYNC_WAIT))
+        self.on_job_completed = on_job_completed
+
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Recover interrupted tasks and start the worker and heartbeat threads"""
+        with self._lock:
+            if self._threads:
+                return
+            self.store.recover()
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"publish-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="publish-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads after their current task"""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout=5)
+            self._threads = []
+
+    def enqueue(self, page_ids: List[str], message: str, link: Optional[str] = None,
+                media_paths: Optional[List[str]] = None, job_id: Optional[str] = None) -> str:
+        """
+        Store a job and wake up the workers
+
+        Returns:
+            Job ID
+        """
+        job_id = self.store.create_job(page_ids, message, link, media_paths, job_id=job_id)
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return job_id
+
+    def media_dir(self, job_id: str) -> str:
+        """
+        Get (and create) the directory for the media files of a job
+
+        The directory is removed when the job completes.
+        """
+        path = os.path.join(self.uploads_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """
+        Wait for a job to complete
+
+        Args:
+            job_id: Job ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The job (completed or not when the timeout expires)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get_job(job_id)
+            if job is None or job['status'] == COMPLETED or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+
+    def _heartbeat(self):
+        # Refresh well within the lease so a slow publish is not reported interrupted
+        while not self._stop.wait(self.store.lease / 3):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.store.heartbeat(running)
+            except sqlite3.Error as e:
+                logger.warning(f"Publish task heartbeat failed: {e}")
+
+    def _work(self):
+        while not self._stop.is_set():
+            task = self.store.claim_task()
+            if task is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            key = (task['job_id'], task['page_id'])
+            with self._running_lock:
+                self._running.add(key)
+            start = time.perf_counter()
+            try:
+                result = self.handler(task)
+                error = None
+            except Exception as e:
+                logger.error(f"Publish task {task['job_id']}/{task['page_id']} failed: {str(e)}")
+                result, error = None, str(e) or e.__class__.__name__
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            completed = self.store.finish_task(task['job_id'], task['page_id'], result, error, duration_ms)
+            with self._running_lock:
+                self._running.discard(key)
+            if completed:
+                logger.info(f"Publish job {task['job_id']} completed")
+                if self.uploads_dir:
+                    shutil.rmtree(os.path.join(self.uploads_dir, task['job_id']), ignore_errors=True)
+                if self.on_job_completed:
+                    try:
+                        self.on_job_completed(task['job_id'])
+                    except Exception as e:
+                        logger.warning(f"Job completion callback failed for {task['job_id']}: {e}")
+
+
+def job_results(job: Dict) -> Dict:
+    """
+    Build the per-page results and summary of a job
+
+    Args:
+        job: Job returned by PublishJobStore.get_job
+
+    Returns:
+        Dictionary with 'results' (per page: success, status, post_id,
+        error, duration_ms) and 'summary' (same keys as a direct
+        multi-page publication: counters, page lists and timings)
+    """
+    results = {}
+    for task in job['tasks']:
+        done = task['status'] in (SUCCESS, FAILED)
+        results[task['page_id']] = {
+            'success': task['status'] == SUCCESS if done else None,
+            'status': task['status'],
+            'post_id': (task['result'] or {}).get('post_id'),
+            'error': task['error'],
+            'duration_ms': task['duration_ms']
+        }
+
+    return {
+        'results': results,
+        'summary': {
+            'total_pages': job['progress']['total'],
+            'successful': job['progress'][SUCCESS],
+            'failed': job['progress'][FAILED],
+            'successful_pages': [page_id for page_id, result in results.items() if result['success']],
+            'failed_pages': [page_id for page_id, result in results.items() if result['success'] is False],
+            'timings': summarize_timings(results)
+        }
+    }
@@ -0,0 +1,188 @@
+"""
+Application Settings Service
+
+The .env file at the repository root holds the Facebook credentials and
+application settings. It is parsed once and the values are served from
+memory. The file's mtime and size are checked at most every
+FACEBOOK_SETTINGS_CHECK_INTERVAL seconds, and it is reloaded only when
+they change. Saving through the service (POST /api/settings) reloads
+immediately and notifies the registered listeners.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("facebook_api.settings")
+
+DEFAULT_SETTINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '.env')
+DEFAULT_CHECK_INTERVAL = 1.0
+
+
+def parse_env(content: str) -> Dict[str, str]:
+    """
+    Parse .env content into a dictionary
+
+    Args:
+        content: File content (KEY=value lines, # comments)
+
+    Returns:
+        Dictionary of settings
+    """
+    settings = {}
+    for line in content.splitlines():
+        if '=' in line and not line.startswith('#'):
+            key, value = line.strip().split('=', 1)
+            settings[key] = value
+    return settings
+
+
+class SettingsStore:
+    """
+    In-memory cache of the .env settings
+
+    Handles:
+    - Single parse of the file, shared by all requests and threads
+    - Reload when the file changes on disk (mtime/size, rate-limited stat)
+    - Atomic save with immediate reload
+    - Change listeners (e.g. to drop clients built with old credentials)
+    """
+
+    def __init__(self, settings_file: Optional[str] = None, check_interval: Optional[float] = None):
+        """
+        Initialize the store
+
+        Args:
+            settings_file: Path of the .env file (repository root if not provided)
+            check_interval: Minimum seconds between file change checks
+                (FACEBOOK_SETTINGS_CHECK_INTERVAL if not provided)
+        """
+        self.settings_file = os.path.abspath(settings_file or DEFAULT_SETTINGS_FILE)
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('FACEBOOK_SETTINGS_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+
+        self._lock = threading.Lock()
+        self._values: Dict[str, str] = {}
+        self._signature = None
+        self._checked_at = None
+        self._listeners: List[Callable[[], None]] = []
+        self.reloads = 0
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.settings_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self, force: bool = False) -> bool:
+        """
+        Reload the file if it changed since the last load
+
+        Returns:
+            True if the settings changed
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+
+            signature = self._file_signature()
+            if not force and signature == self._signature and self.reloads:
+                return False
+
+            values = {}
+            if signature is not None:
+                try:
+                    with open(self.settings_file, 'r') as f:
+                        values = parse_env(f.read())
+                except OSError as e:
+                    logger.warning(f"Could not read settings file: {e}")
+                    return False
+
+            changed = values != self._values
+            self._values = values
+            self._signature = signature
+            self.reloads += 1
+            listeners = list(self._listeners) if changed and self.reloads > 1 else []
+
+        if changed:
+            logger.info(f"Settings loaded from {self.settings_file}")
+        for listener in listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"Settings listener failed: {e}")
+        return changed
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get a setting value
+
+        Args:
+            key: Setting name (e.g. FACEBOOK_ACCESS_TOKEN)
+            default: Value returned when the setting is missing or empty
+
+        Returns:
+            The setting value or default
+        """
+        self._refresh()
+        return self._values.get(key) or default
+
+    def all(self) -> Dict[str, str]:
+        """Get a copy of all settings"""
+        self._refresh()
+        return dict(self._values)
+
+    def save(self, content: str):
+        """
+        Replace the settings file and reload it
+
+        Args:
+            content: New .env content
+        """
+        os.makedirs(os.path.dirname(self.settings_file), exist_ok=True)
+        tmp_path = f"{self.settings_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, self.settings_file)
+        self.invalidate()
+
+    def invalidate(self):
+        """Reload the settings now, notifying listeners if they changed"""
+        self._refresh(force=True)
+
+    def on_change(self, listener: Callable[[], None]):
+        """
+        Register a function called after the settings change
+
+        Args:
+            listener: Function without arguments
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+
+# Process-wide settings shared by the app and its blueprints
+_default_settings: Optional[SettingsStore] = None
+_default_settings_lock = threading.Lock()
+
+
+def get_settings() -> SettingsStore:
+    """Get or create the process-wide settings store"""
+    global _default_settings
+    if _default_settings is None:
+        with _default_settings_lock:
+            if _default_settings is None:
+                _default_settings = SettingsStore()
+    return _default_settings
+
+
+def reset_settings():
+    """Drop the process-wide store so the next call builds a fresh one"""
+    global _default_settings
+    with _default_settings_lock:
+        _default_settings = None
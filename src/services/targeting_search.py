@@ -0,0 +1,286 @@
+"""
+Targeting Search Service
+
+Answers interest searches from the Audiences page, where every keystroke
+sends a query:
+
+1. The local interest index is searched first; a query it fills is
+   answered without calling Facebook.
+2. Remote results (GET /search?type=adinterest) are cached per
+   normalized query ("Aménag" and "amenag" share an entry) for
+   FACEBOOK_TARGETING_SEARCH_TTL seconds.
+3. Remote lookups are debounced by a background flusher thread: once no
+   new query arrived for FACEBOOK_TARGETING_SEARCH_DEBOUNCE seconds,
+   every pending query is sent in one Graph batch. A query extended by a
+   later pending one ("bri" then "bric") is dropped from the batch. A
+   search only waits for its own lookup, at most a few seconds.
+4. Remote hits are added to the local index, so the same and similar
+   queries are then answered locally.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from services.interest_index import DEFAULT_LIMIT, InterestIndex, get_interest_index, normalize_interest, tokenize
+
+logger = logging.getLogger("facebook_api.targeting")
+
+DEFAULT_TTL = 6 * 3600          # Seconds remote results are reused
+DEFAULT_DEBOUNCE = 0.3          # Seconds without new query before a remote batch is sent
+DEFAULT_MAX_DELAY = 1.0         # Seconds a query waits for the burst to end, at most
+DEFAULT_WAIT = 3.0              # Seconds a search waits for its remote results
+DEFAULT_MAX_ENTRIES = 2000      # Queries kept in the cache
+FLUSHER_IDLE = 30.0             # Seconds the flusher thread waits for queries before exiting
+
+# Where the results of a search come from
+LOCAL = 'local'
+CACHE = 'cache'
+GRAPH = 'graph'
+
+
+def _env_seconds(name: str, default: float) -> float:
+    """Read a duration setting from the environment, falling back to default"""
+    try:
+        return max(0.0, float(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+class _Lookup:
+    """A pending remote query and its outcome"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.results: Optional[List[Dict]] = None
+
+
+class TargetingSearch:
+    """
+    Interest search over a local index with a cached, debounced Graph fallback
+
+    Handles:
+    - Local-first answers from the interest index
+    - TTL cache of remote results per normalized query (LRU bounded)
+    - Debounced remote lookups sent as one batch per burst of queries,
+      by a flusher thread started on demand
+    - Sharing of a pending lookup by identical concurrent queries
+    - Merging remote hits into the local index
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], Dict[str, List[Dict]]],
+                 index: Optional[InterestIndex] = None, ttl: Optional[float] = None,
+                 debounce: Optional[float] = None, max_delay: float = DEFAULT_MAX_DELAY,
+                 wait: float = DEFAULT_WAIT, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the service
+
+        Args:
+            fetch: Function searching Facebook for several queries at once
+                (e.g. FacebookAPI.search_interests), returning results by query
+            index: Local interest index (process-wide index if not provided)
+            ttl: Seconds remote results are cached (FACEBOOK_TARGETING_SEARCH_TTL if not provided)
+            debounce: Quiet period before a remote batch (FACEBOOK_TARGETING_SEARCH_DEBOUNCE if not provided)
+            max_delay: Longest time a query waits for the burst to end
+            wait: Seconds a search waits for its remote results before answering locally
+            max_entries: Maximum number of cached queries
+        """
+        self.fetch = fetch
+        self.index = index if index is not None else get_interest_index()
+        self.ttl = ttl if ttl is not None else _env_seconds("FACEBOOK_TARGETING_SEARCH_TTL", DEFAULT_TTL)
+        self.debounce = debounce if debounce is not None else _env_seconds(
+            "FACEBOOK_TARGETING_SEARCH_DEBOUNCE", DEFAULT_DEBOUNCE)
+        self.max_delay = max_delay
+        self.wait = wait
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, _Lookup] = {}
+        self._inflight: Dict[str, _Lookup] = {}
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher: Optional[threading.Thread] = None
+        self._stats = {'local': 0, 'cache_hits': 0, 'remote_queries': 0, 'remote_batches': 0, 'superseded': 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Cache key of a query (accent-folded words)"""
+        return ' '.join(tokenize(query))
+
+    # --- Cache -----------------------------------------------------------
+
+    def _cached(self, key: str) -> Optional[List[Dict]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return results
+
+    def _remember(self, key: str, results: List[Dict]):
+        self._cache[key] = (time.monotonic() + self.ttl, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    # --- Search ----------------------------------------------------------
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, remote: bool = True) -> Dict:
+        """
+        Find interests matching a query
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results
+            remote: Search Facebook when the local index does not fill the results
+
+        Returns:
+            Dictionary with 'interests' (best match first) and 'source'
+            ('local', 'cache' or 'graph')
+        """
+        local = self.index.search(query, limit=limit)
+        key = self.normalize(query)
+        if len(local) >= limit or not remote or not key:
+            with self._lock:
+                self._stats['local'] += 1
+            return {'interests': local, 'source': LOCAL}
+
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                self._stats['cache_hits'] += 1
+                return {'interests': self._merge(local, cached, limit), 'source': CACHE}
+
+            lookup = self._pending.get(key) or self._inflight.get(key)
+            if lookup is None:
+                lookup = self._pending[key] = _Lookup(query)
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush, name="targeting-search-flusher",
+                                                     daemon=True)
+                    self._flusher.start()
+                self._wakeup.notify()
+
+        lookup.done.wait(self.wait)
+
+        if lookup.results is None:
+            # Superseded, failed or still running: the local matches are the answer
+            return {'interests': local, 'source': LOCAL}
+        return {'interests': self._merge(self.index.search(query, limit=limit), lookup.results, limit),
+                'source': GRAPH}
+
+    @staticmethod
+    def _merge(local: List[Dict], remote: List[Dict], limit: int) -> List[Dict]:
+        """Local matches first, then remote hits not already listed"""
+        seen = {interest['id'] for interest in local}
+        merged = list(local)
+        for interest in remote:
+            if len(merged) >= limit:
+                break
+            if interest['id'] not in seen:
+                seen.add(interest['id'])
+                merged.append(dict(interest))
+        return merged
+
+    def _flush(self):
+        """Flusher thread: send the pending queries once each burst is over"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._wakeup.wait(FLUSHER_IDLE)
+                    if not self._pending:
+                        # Idle: the next remote lookup starts a new flusher
+                        self._flusher = None
+                        return
+                now = time.monotonic()
+                last = max(lookup.enqueued_at for lookup in self._pending.values())
+                first = min(lookup.enqueued_at for lookup in self._pending.values())
+                delay = min(last + self.debounce, first + self.max_delay) - now
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+                batch, self._pending = self._pending, {}
+                self._inflight.update(batch)
+            try:
+                self._send(batch)
+            except Exception as e:
+                # Keep the flusher alive: the waiting searches answer locally
+                logger.error(f"Remote interest batch failed: {str(e)}")
+                with self._lock:
+                    for key, lookup in batch.items():
+                        self._inflight.pop(key, None)
+                        lookup.done.set()
+
+    def _send(self, batch: Dict[str, _Lookup]):
+        """Search Facebook for a batch of pending queries"""
+        # A query extended by another one of the burst was typed over
+        superseded = [key for key in batch if any(other != key and other.startswith(key) for other in batch)]
+        with self._lock:
+            for key in superseded:
+                self._inflight.pop(key, None)
+                batch.pop(key).done.set()
+
+        try:
+            results = self.fetch([lookup.query for lookup in batch.values()]) if batch else {}
+        except Exception as e:
+            logger.error(f"Remote interest search failed: {str(e)}")
+            results = {}
+
+        added = 0
+        with self._lock:
+            self._stats['superseded'] += len(superseded)
+            self._stats['remote_queries'] += len(batch)
+            self._stats['remote_batches'] += 1 if batch else 0
+            for key, lookup in batch.items():
+                self._inflight.pop(key, None)
+                if lookup.query not in results:
+                    continue
+                interests = [interest for interest in map(normalize_interest, results[lookup.query]) if interest]
+                self._remember(key, interests)
+                lookup.results = interests
+        for lookup in batch.values():
+            if lookup.results:
+                added += self.index.add(lookup.results)
+            lookup.done.set()
+        if added:
+            logger.info(f"Added {added} interests from Facebook to the local index")
+
+    def stats(self) -> Dict:
+        """Counters of local answers, cache hits, remote queries and batches"""
+        with self._lock:
+            return dict(self._stats, cached_queries=len(self._cache), index_size=len(self.index))
+
+
+# Process-wide service shared by the routes
+_default_search: Optional[TargetingSearch] = None
+_default_search_lock = threading.Lock()
+
+
+def get_targeting_search(fetch: Callable[[List[str]], Dict[str, List[Dict]]]) -> TargetingSearch:
+    """
+    Get or create the process-wide service
+
+    Args:
+        fetch: Remote search function, used when the service is created
+    """
+    global _default_search
+    if _default_search is None:
+        with _default_search_lock:
+            if _default_search is None:
+                _default_search = TargetingSearch(fetch)
+    return _default_search
+
+
+def reset_targeting_search():
+    """Drop the process-wide service so the next call creates it again"""
+    global _default_search
+    with _default_search_lock:
+        _default_search = None
@@ -0,0 +1,84 @@
+"""
+Tests for the memoized audience size estimator
+"""
+
+import unittest
+import os
+import sys
+from flask import Flask
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.audience_estimator import AudienceEstimator, calculate_audience_size, canonical_spec
+from services import audience_estimator
+from routes.audiences_routes import audiences_bp
+
+TARGETING = {'location': 'FR', 'age_min': 25, 'age_max': 55, 'gender': 'all',
+             'interests': ['Bricolage', 'Jardinage']}
+
+
+class TestAudienceEstimator(unittest.TestCase):
+    """Test cases for AudienceEstimator and the batch estimate route"""
+
+    def test_equivalent_specs_share_a_key(self):
+        """Interest order, case, duplicates and number types do not change the key"""
+        variant = {'location': ' fr', 'age_min': '25', 'age_max': 55.0, 'gender': 'ALL',
+                   'interests': ['jardinage', {'name': 'Bricolage'}, 'Jardinage']}
+
+        self.assertEqual(canonical_spec(variant), canonical_spec(TARGETING))
+        self.assertNotEqual(canonical_spec(dict(TARGETING, gender='female')), canonical_spec(TARGETING))
+        self.assertEqual(calculate_audience_size(TARGETING), 525000)
+        self.assertEqual(calculate_audience_size({}, 'lookalike'), 28000)
+        with self.assertRaises(ValueError):
+            canonical_spec({'age_min': 'adult', 'age_max': 30})
+
+    def test_batch_is_memoized(self):
+        """Specs already estimated are served from the cache, in input order"""
+        estimator = AudienceEstimator(max_entries=2)
+        small = {'location': 'CH', 'age_min': 25, 'age_max': 30, 'gender': 'female', 'interests': ['Pergola']}
+
+        first = estimator.estimate_many([(TARGETING, 'custom'), (small, 'custom'), (TARGETING, 'custom')])
+        second = estimator.estimate_many([({'interests': ['Jardinage', 'Bricolage'], 'age_min': 25, 'age_max': 55,
+                                            'location': 'FR'}, 'custom'), ({}, 'lookalike')])
+
+        self.assertEqual([estimate['size'] for estimate in first], [525000, 6906, 525000])
+        self.assertEqual(first[1]['recommendations'][0]['type'], 'warning')
+        self.assertEqual([estimate['size'] for estimate in second], [525000, 28000])
+        self.assertEqual(estimator.stats(), {'hits': 1, 'computed': 3, 'cached': 2})
+
+        first[0]['size'] = 0
+        self.assertEqual(estimator.estimate(TARGETING)['size'], 525000)
+
+    def test_batch_matches_single_specs(self):
+        """Sizes computed column-wise for a batch are identical to one spec at a time"""
+        specs = [({'location': location, 'age_min': 18, 'age_max': 18 + span, 'gender': gender,
+                   'interests': [str(i) for i in range(count)]}, 'custom')
+                 for location in ['FR', 'BE', 'US', ['FR', 'BE']] for span in [1, 7, 33, 50]
+                 for gender in ['all', 'male'] for count in [0, 3, 9]]
+
+        self.assertEqual([estimate['size'] for estimate in AudienceEstimator().estimate_many(specs)],
+                         [calculate_audience_size(targeting, audience_type) for targeting, audience_type in specs])
+
+    def test_batch_route(self):
+        """The batch endpoint estimates every spec in one response"""
+        audience_estimator.reset_audience_estimator()
+        app = Flask(__name__)
+        app.register_blueprint(audiences_bp)
+        client = app.test_client()
+
+        response = client.post('/api/facebook/audiences/estimate/batch', json={'specs': [
+            {'targeting': TARGETING}, {'targeting': {}, 'type': 'lookalike'}]})
+        invalid = client.post('/api/facebook/audiences/estimate/batch', json={'specs': [{'type': 'custom'}]})
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([estimate['size'] for estimate in data['estimates']], [525000, 28000])
+        self.assertIn('cost_estimate', data['estimates'][0])
+        self.assertEqual(invalid.status_code, 400)
+        audience_estimator.reset_audience_estimator()
+
+
+if __name__ == '__main__':
+    unittest.main()
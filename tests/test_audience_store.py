@@ -0,0 +1,116 @@
+"""
+Tests for the SQLite audience repository
+"""
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.audience_store import AudienceStore, get_audience_store, reset_audience_stores
+
+
+def _audience(audience_id, name='Audience'):
+    return {'id': audience_id, 'name': name, 'description': 'Test', 'type': 'custom',
+            'targeting': {'location': 'FR', 'age_min': 25, 'age_max': 55}, 'size': 1000}
+
+
+class TestAudienceStore(unittest.TestCase):
+    """Test cases for AudienceStore"""
+
+    def setUp(self):
+        """Create a temporary audience database"""
+        self.work_dir = tempfile.mkdtemp()
+        self.store = AudienceStore(os.path.join(self.work_dir, 'audiences.db'))
+
+    def tearDown(self):
+        """Remove the temporary database"""
+        reset_audience_stores()
+        shutil.rmtree(self.work_dir)
+
+    def test_crud(self):
+        """Audiences are listed in creation order, updated and deleted by ID"""
+        self.store.create(_audience('a2', 'Second'))
+        self.store.create(_audience('a1', 'First'))
+
+        updated = self.store.update('a1', lambda audience: audience.update(name='Renamed'))
+        deleted = self.store.delete('a2')
+
+        self.assertEqual(updated['name'], 'Renamed')
+        self.assertEqual(deleted['name'], 'Second')
+        self.assertEqual([audience['id'] for audience in self.store.list()], ['a1'])
+        self.assertEqual(self.store.get('a1')['name'], 'Renamed')
+        self.assertIsNone(self.store.get('a2'))
+        self.assertIsNone(self.store.update('a2', lambda audience: None))
+        self.assertIsNone(self.store.delete('a2'))
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.store.create(_audience('a1'))
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Read-modify-write updates from several threads all apply"""
+        self.store.create(dict(_audience('a1'), size=0))
+
+        def bump():
+            for _ in range(20):
+                self.store.update('a1', lambda audience: audience.update(size=audience['size'] + 1))
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.store.get('a1')['size'], 80)
+
+    def test_reads_are_served_from_memory(self):
+        """Lookups do not query the database until it changes"""
+        self.store.create(_audience('a1'))
+        self.store.list()
+
+        with patch.object(self.store, '_connect', side_effect=AssertionError('database read')):
+            self.assertEqual(self.store.get('a1')['name'], 'Audience')
+            self.assertEqual(self.store.count(), 1)
+            self.store.get('a1')['name'] = 'Changed by the caller'
+            self.assertEqual(self.store.list()[0]['name'], 'Audience')
+
+    def test_writes_of_other_workers_are_seen(self):
+        """Another store on the same file (another worker) invalidates the cached audiences"""
+        self.store.create(_audience('a1'))
+        other = AudienceStore(self.store.db_path)
+        self.assertEqual(other.count(), 1)
+
+        self.store.update('a1', lambda audience: audience.update(name='Renamed'))
+        self.store.create(_audience('a2'))
+        loads = other.cache_stats()['loads']
+
+        self.assertEqual(other.get('a1')['name'], 'Renamed')
+        self.assertEqual([audience['id'] for audience in other.list()], ['a1', 'a2'])
+        self.assertEqual(other.cache_stats()['loads'], loads + 1)
+
+        other.delete('a2')
+        self.assertIsNone(self.store.get('a2'))
+
+    def test_json_file_is_migrated_once(self):
+        """The former audiences.json is imported when the store is opened, then renamed"""
+        json_path = os.path.join(self.work_dir, 'audiences.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([_audience('a1', 'Propriétaires'), _audience('a2')], f, ensure_ascii=False)
+
+        store = get_audience_store(os.path.join(self.work_dir, 'migrated.db'), legacy_json=json_path)
+
+        self.assertEqual([audience['name'] for audience in store.list()], ['Propriétaires', 'Audience'])
+        self.assertFalse(os.path.exists(json_path))
+        self.assertTrue(os.path.exists(json_path + '.migrated'))
+        self.assertIs(get_audience_store(os.path.join(self.work_dir, 'migrated.db'), legacy_json=json_path), store)
+
+
+if __name__ == '__main__':
+    unittest.main()
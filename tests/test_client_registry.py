@@ -0,0 +1,80 @@
+"""
+Tests for the FacebookAPI client registry
+"""
+
+import unittest
+import os
+import sys
+import threading
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from client_registry import FacebookClientRegistry
+from page_tokens import PageTokenStore
+
+
+class TestFacebookClientRegistry(unittest.TestCase):
+    """Test cases for FacebookClientRegistry and the client page token cache"""
+
+    def setUp(self):
+        """Create a private registry with an in-memory page token store"""
+        self.registry = FacebookClientRegistry(max_clients=2, page_token_store=PageTokenStore(miss_refresh_interval=0))
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def test_one_client_per_credentials(self):
+        """The same credentials get the same client, from any thread"""
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(self.registry.get("token", "app", "secret")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIsNot(self.registry.get("other", "app", "secret"), clients[0])
+        self.assertEqual(self.registry.stats()["misses"], 2)
+        self.assertEqual(self.registry.stats()["hits"], 7)
+
+    def test_lru_bound_and_invalidation(self):
+        """Least recently used clients are evicted and invalidation drops clients"""
+        first = self.registry.get("t1", "app", "secret")
+        self.registry.get("t2", "app", "secret")
+        self.registry.get("t1", "app", "secret")
+        self.registry.get("t3", "app", "secret")  # Evicts t2
+
+        self.assertEqual(self.registry.stats()["evictions"], 1)
+        self.assertIs(self.registry.get("t1", "app", "secret"), first)
+
+        self.registry.invalidate("t1")
+        self.assertIsNot(self.registry.get("t1", "app", "secret"), first)
+        self.registry.clear()
+        self.assertEqual(self.registry.stats()["clients"], 0)
+
+    def test_missing_credentials(self):
+        """A client cannot be built without an access token"""
+        with self.assertRaises(ValueError):
+            self.registry.get(None, "app", "secret")
+
+    @responses.activate
+    def test_page_tokens_stay_warm(self):
+        """Page tokens are fetched once per user and refreshed on an unknown page"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts",
+                      json={"data": [{"id": "1", "access_token": "t1"}]}, status=200)
+        responses.add(responses.GET, f"{self.base_url}/me/accounts",
+                      json={"data": [{"id": "1", "access_token": "t1"}, {"id": "2", "access_token": "t2"}]},
+                      status=200)
+
+        client = self.registry.get("token", "app", "secret")
+        self.assertEqual(client._get_page_token("1"), "t1")
+        self.assertEqual(self.registry.get("token", "app", "secret")._get_page_token("1"), "t1")
+        self.assertEqual(len(responses.calls), 1)
+
+        self.assertEqual(client._get_page_token("2"), "t2")
+        self.assertEqual(len(responses.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Tests for the async Facebook API client
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import time
+import tempfile
+from urllib.parse import parse_qs
+import httpx
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPIError
+from facebook_api_async import AsyncFacebookAPI
+from rate_limit import RateLimitGovernor
+
+
+class FakeGraph:
+    """Async httpx handler answering a few Graph endpoints with a fixed latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+
+    async def __call__(self, request):
+        self.calls.append(request)
+        await asyncio.sleep(self.latency)
+        path = request.url.path.replace("/v18.0", "")
+
+        if path == "/me/accounts":
+            if request.url.params.get("after") == "p2":
+                return httpx.Response(200, json={"data": [{"id": "3", "access_token": "t3"}]})
+            return httpx.Response(200, json={
+                "data": [{"id": "1", "access_token": "t1"}, {"id": "2", "access_token": "t2"}],
+                "paging": {"cursors": {"after": "p2"}, "next": "https://graph.facebook.com/next"}
+            })
+        if path == "/2/feed":
+            return httpx.Response(403, json={"error": {"message": "Permission denied", "code": 200}})
+        if path.endswith("/feed"):
+            return httpx.Response(200, json={"id": f"{path.split('/')[1]}_10"})
+        if path.startswith("/act_1/"):
+            return httpx.Response(200, json={"id": path.rsplit("/", 1)[1]})
+        return httpx.Response(404, json={"error": {"message": "Unknown path", "code": 803}})
+
+
+class TestAsyncFacebookAPI(unittest.TestCase):
+    """Test cases for AsyncFacebookAPI"""
+
+    def make_api(self, graph):
+        return AsyncFacebookAPI(app_id="app", app_secret="secret", access_token="token",
+                                governor=RateLimitGovernor(app_rate=1000, page_rate=1000),
+                                transport=httpx.MockTransport(graph))
+
+    def test_get_all_pages_follows_pagination(self):
+        """All pages are returned across cursors"""
+        api = self.make_api(FakeGraph())
+        pages = api.sync.get_all_pages()
+        self.assertEqual([page["id"] for page in pages], ["1", "2", "3"])
+
+    def test_publish_to_multiple_pages_concurrently(self):
+        """Pages are published concurrently with per-page results"""
+        graph = FakeGraph(latency=0.1)
+        api = self.make_api(graph)
+
+        start = time.perf_counter()
+        results = api.sync.publish_to_multiple_pages(["3", "1", "2"], "Hello")
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(list(results), ["3", "1", "2"])
+        self.assertTrue(results["1"]["success"])
+        self.assertEqual(results["3"]["data"]["id"], "3_10")
+        self.assertFalse(results["2"]["success"])
+        self.assertIn("duration_ms", results["2"])
+        # Two /me/accounts calls for the tokens, then the three posts in parallel
+        self.assertLess(elapsed, 0.45)
+        feed_calls = [call for call in graph.calls if call.url.path.endswith("/feed")]
+        self.assertEqual(parse_qs(feed_calls[0].content.decode())["message"], ["Hello"])
+        self.assertEqual(feed_calls[0].url.params["access_token"], "t3")
+
+    def test_page_tokens_are_memoized(self):
+        """Page tokens are fetched once; an unknown page refreshes them at most once per interval"""
+        graph = FakeGraph()
+        api = self.make_api(graph)
+
+        async def run():
+            async with api:
+                await asyncio.gather(api.publish_post("1", "Hello"), api.publish_post("3", "Hello"))
+                await api.get_recent_posts("1")
+                await api.get_recent_posts("9")
+                api.miss_refresh_interval = 0
+                await api.get_recent_posts("9")
+
+        asyncio.run(run())
+
+        accounts = [call for call in graph.calls if call.url.path.endswith("/me/accounts")]
+        # One pass (two pages of accounts) shared by every call, one more for the unthrottled miss
+        self.assertEqual(len(accounts), 4)
+        feeds = [call for call in graph.calls if call.url.path.endswith("/feed")]
+        self.assertEqual([call.url.params["access_token"] for call in feeds[2:]], ["t1", "token", "token"])
+
+    def test_errors_raise_facebook_api_error(self):
+        """Graph errors are raised as FacebookAPIError from coroutines"""
+        api = self.make_api(FakeGraph())
+
+        async def publish():
+            async with api:
+                await api.publish_post("2", "Hello")
+
+        with self.assertRaises(FacebookAPIError) as context:
+            asyncio.run(publish())
+        self.assertEqual(context.exception.error_code, 200)
+
+    def test_create_boosted_post_ad(self):
+        """Boost creation chains campaign/creative, ad set and ad"""
+        graph = FakeGraph()
+        api = self.make_api(graph)
+
+        result = api.sync.create_boosted_post_ad("1", "10", "20", {"geo_locations": {"countries": ["FR"]}},
+                                                 5, "2025-07-01", "2025-07-10")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["ad_id"], "ads")
+        adset_call = next(call for call in graph.calls if call.url.path.endswith("/adsets"))
+        self.assertEqual(parse_qs(adset_call.content.decode())["daily_budget"], ["500"])
+
+    def test_upload_photo_sends_file(self):
+        """Photo uploads are sent as multipart with the file content"""
+        received = []
+
+        async def handler(request):
+            received.append(request.read())
+            return httpx.Response(200, json={"id": "photo_1"})
+
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as photo:
+            photo.write(b"jpeg-bytes")
+            photo.flush()
+            response = self.make_api(handler).sync.upload_photo("1", photo.name, page_access_token="t1")
+
+        self.assertEqual(response["id"], "photo_1")
+        self.assertIn(b"jpeg-bytes", received[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Tests for the concurrent fan-out executor
+"""
+
+import unittest
+import os
+import sys
+import time
+import threading
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fanout import ANALYTICS_POOL, FanoutExecutor, get_fanout_executor, summarize_timings
+from facebook_api import FacebookAPI
+
+
+class TestFanoutExecutor(unittest.TestCase):
+    """Test cases for FanoutExecutor"""
+
+    def setUp(self):
+        """Create a private executor"""
+        self.executor = FanoutExecutor(max_in_flight=4, max_per_key=1, name="test")
+
+    def tearDown(self):
+        """Stop worker threads"""
+        self.executor.shutdown()
+
+    def test_results_keep_input_order(self):
+        """Results are keyed in input order and duplicates run once"""
+        results = self.executor.run(lambda key: key.upper(), ["c", "a", "b", "a"])
+
+        self.assertEqual(list(results), ["c", "a", "b"])
+        self.assertEqual(results["a"]["result"], "A")
+        self.assertIsNone(results["a"]["error"])
+        self.assertIn("duration_ms", results["b"])
+
+    def test_runs_concurrently(self):
+        """Keys are processed in parallel up to max_in_flight"""
+        start = time.perf_counter()
+        self.executor.run(lambda key: time.sleep(0.1), ["1", "2", "3", "4"])
+        self.assertLess(time.perf_counter() - start, 0.3)
+
+    def test_errors_are_captured(self):
+        """An exception for one key does not affect the others"""
+        def work(key):
+            if key == "bad":
+                raise ValueError("boom")
+            return key
+
+        results = self.executor.run(work, ["ok", "bad"])
+
+        self.assertEqual(results["ok"]["result"], "ok")
+        self.assertIsInstance(results["bad"]["error"], ValueError)
+
+    def test_per_key_limit(self):
+        """Concurrent runs never exceed max_per_key for the same key"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(key):
+            with lock:
+                active.append(key)
+                peak.append(active.count(key))
+            time.sleep(0.05)
+            with lock:
+                active.remove(key)
+
+        threads = [threading.Thread(target=self.executor.run, args=(work, ["page"])) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 1)
+
+    def test_summarize_timings(self):
+        """Timing summary aggregates per-key durations"""
+        summary = summarize_timings({"a": {"duration_ms": 10}, "b": {"duration_ms": 30}})
+        self.assertEqual(summary["max_ms"], 30)
+        self.assertEqual(summary["avg_ms"], 20)
+
+    def test_pools_are_separate(self):
+        """The analytics pool of an app does not share workers with its publishing pool"""
+        publishing = get_fanout_executor("pool_test")
+
+        self.assertIs(get_fanout_executor("pool_test"), publishing)
+        self.assertIsNot(get_fanout_executor("pool_test", pool=ANALYTICS_POOL), publishing)
+
+
+class TestPublishToMultiplePages(unittest.TestCase):
+    """Test cases for FacebookAPI.publish_to_multiple_pages"""
+
+    def setUp(self):
+        """Set up API instance"""
+        self.api = FacebookAPI(app_id="app", app_secret="secret", access_token="token")
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    @responses.activate
+    def test_publish_to_multiple_pages(self):
+        """Each page gets its own result with timing, in input order"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [
+            {"id": "1", "access_token": "t1"},
+            {"id": "2", "access_token": "t2"}
+        ]}, status=200)
+        responses.add(responses.POST, f"{self.base_url}/1/feed", json={"id": "1_10"}, status=200)
+        responses.add(responses.POST, f"{self.base_url}/2/feed",
+                      json={"error": {"message": "Permission denied", "code": 200}}, status=403)
+
+        results = self.api.publish_to_multiple_pages(["2", "1"], "Hello", use_batch=False)
+
+        self.assertEqual(list(results), ["2", "1"])
+        self.assertTrue(results["1"]["success"])
+        self.assertEqual(results["1"]["data"]["id"], "1_10")
+        self.assertFalse(results["2"]["success"])
+        self.assertIn("duration_ms", results["2"])
+        # Page tokens are resolved with a single /me/accounts call
+        self.assertEqual(sum(1 for c in responses.calls if "/me/accounts" in c.request.url), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Tests for Graph API batch requests
+"""
+
+import unittest
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+from urllib.parse import parse_qs
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI, FacebookAPIError
+from graph_batch import GraphBatch, MAX_BATCH_SIZE
+
+
+def batch_callback(request):
+    """Answer every sub-request of a batch call with its relative URL"""
+    form = parse_qs(request.body)
+    batch = json.loads(form["batch"][0])
+    answers = []
+    for item in batch:
+        if "fail" in item["relative_url"]:
+            body = {"error": {"message": "Unsupported get request", "code": 100}}
+            answers.append({"code": 400, "body": json.dumps(body)})
+        else:
+            answers.append({"code": 200, "body": json.dumps({"url": item["relative_url"]})})
+    return (200, {}, json.dumps(answers))
+
+
+class TestGraphBatch(unittest.TestCase):
+    """Test cases for GraphBatch"""
+
+    def setUp(self):
+        """Set up API instance"""
+        self.api = FacebookAPI(app_id="app", app_secret="secret", access_token="token")
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    @responses.activate
+    def test_results_and_errors_are_mapped(self):
+        """Each operation receives its own response or error"""
+        responses.add_callback(responses.POST, f"{self.base_url}/", callback=batch_callback)
+
+        batch = self.api.batch()
+        good = batch.add("GET", "/123/posts", params={"limit": 5}, access_token="page_token")
+        bad = batch.add("GET", "/fail")
+        batch.execute()
+
+        self.assertTrue(good.ok)
+        self.assertEqual(good.result()["url"], "123/posts?limit=5&access_token=page_token")
+        self.assertFalse(bad.ok)
+        with self.assertRaises(FacebookAPIError) as context:
+            bad.result()
+        self.assertEqual(context.exception.error_code, 100)
+
+    @responses.activate
+    def test_chunks_of_fifty(self):
+        """N operations are sent in ceil(N/50) calls"""
+        responses.add_callback(responses.POST, f"{self.base_url}/", callback=batch_callback)
+
+        batch = self.api.batch()
+        operations = [batch.add("GET", f"/{i}") for i in range(MAX_BATCH_SIZE * 2 + 1)]
+        batch.execute()
+
+        self.assertEqual(len(responses.calls), 3)
+        self.assertTrue(all(operation.ok for operation in operations))
+        self.assertEqual(operations[-1].data["url"], str(MAX_BATCH_SIZE * 2))
+
+    def test_dependent_operations_stay_together(self):
+        """Operations referencing each other are never split across chunks"""
+        batch = GraphBatch("token")
+        for i in range(MAX_BATCH_SIZE - 1):
+            batch.add("GET", f"/{i}")
+        batch.add("POST", "/act_1/campaigns", data={"name": "c"}, name="campaign")
+        batch.add("POST", "/act_1/adsets", params={"campaign_id": "{result=campaign:$.id}"})
+
+        chunks = batch._chunks()
+
+        self.assertEqual([len(chunk) for chunk in chunks], [MAX_BATCH_SIZE - 1, 2])
+        self.assertIn("{result=campaign:$.id}", chunks[1][1].relative_url)
+
+    def test_body_text_is_not_a_reference(self):
+        """Braces and dollars in body text are escaped instead of read as JSONPath"""
+        batch = GraphBatch("token")
+        operation = batch.add("POST", "/1/feed", data={"message": "Save ${result=x:$.id} {}"})
+
+        self.assertEqual(operation.references, [])
+        self.assertNotIn("{", operation.body)
+        self.assertEqual(parse_qs(operation.body)["message"], ["Save ${result=x:$.id} {}"])
+
+    @responses.activate
+    def test_failed_batch_call_marks_operations(self):
+        """A top-level error is reported on every operation of the chunk"""
+        responses.add(responses.POST, f"{self.base_url}/",
+                      json={"error": {"message": "Invalid OAuth access token.", "code": 190}}, status=400)
+
+        batch = self.api.batch()
+        operation = batch.add("GET", "/me")
+        batch.execute()
+
+        self.assertFalse(operation.ok)
+        self.assertEqual(operation.error.error_code, 190)
+
+    @responses.activate
+    def test_unexpected_batch_body_fails_every_operation(self):
+        """A body that is not a list of sub-responses fails the operations it does not answer"""
+        responses.add(responses.POST, f"{self.base_url}/", json={"data": []})
+        responses.add(responses.POST, f"{self.base_url}/", json=[{"code": 200, "body": "{}"}])
+
+        first = self.api.batch()
+        operations = [first.add("GET", "/1"), first.add("GET", "/2")]
+        first.execute()
+        second = self.api.batch()
+        answered, missing = second.add("GET", "/1"), second.add("GET", "/2")
+        second.execute()
+
+        self.assertTrue(all(operation.executed and not operation.ok for operation in operations))
+        self.assertTrue(answered.ok)
+        self.assertFalse(missing.ok)
+
+    @responses.activate
+    def test_missing_page_tokens_are_resolved_once(self):
+        """Pages missing from the stored tokens cost one /me/accounts refresh, not one lookup each"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [{"id": "1", "access_token": "t1"}]})
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [
+            {"id": "1", "access_token": "t1"},
+            {"id": "2", "access_token": "t2"}
+        ]})
+        responses.add_callback(responses.POST, f"{self.base_url}/", callback=batch_callback)
+
+        self.api.page_tokens.get_all(self.api)
+        # Past the miss interval, so the first unknown page refreshes the tokens
+        with patch("page_tokens.time.time", return_value=time.time() + 120):
+            results = self.api.publish_to_multiple_pages(["1", "2", "3", "4"], "Hello")
+
+        self.assertEqual([call.request.method for call in responses.calls], ["GET", "GET", "POST"])
+        batch = json.loads(parse_qs(responses.calls[2].request.body)["batch"][0])
+        self.assertIn("access_token=t2", batch[1]["body"])
+        self.assertIn("access_token=token", batch[3]["body"])
+        self.assertTrue(all(result["success"] for result in results.values()))
+
+    @responses.activate
+    def test_missing_page_tokens_respect_miss_throttle(self):
+        """Pages missing right after a fetch do not refresh the tokens again"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [{"id": "1", "access_token": "t1"}]})
+        responses.add_callback(responses.POST, f"{self.base_url}/", callback=batch_callback)
+
+        self.api.publish_to_multiple_pages(["1", "2"], "Hello")
+
+        self.assertEqual([call.request.method for call in responses.calls], ["GET", "POST"])
+        batch = json.loads(parse_qs(responses.calls[1].request.body)["batch"][0])
+        self.assertIn("access_token=token", batch[1]["body"])
+
+    @responses.activate
+    def test_publish_to_multiple_pages_uses_batch(self):
+        """Text posts to several pages go out in a single batch call"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [
+            {"id": "1", "access_token": "t1"},
+            {"id": "2", "access_token": "t2"}
+        ]}, status=200)
+        responses.add_callback(responses.POST, f"{self.base_url}/", callback=batch_callback)
+
+        results = self.api.publish_to_multiple_pages(["1", "2"], "Hello")
+
+        self.assertEqual(len(responses.calls), 2)
+        self.assertTrue(results["1"]["success"])
+        self.assertEqual(results["2"]["data"]["url"], "2/feed")
+
+
+if __name__ == '__main__':
+    unittest.main()
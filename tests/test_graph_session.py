@@ -0,0 +1,72 @@
+"""
+Tests for the shared Graph API HTTP session pool
+"""
+
+import unittest
+import os
+import sys
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from graph_session import GraphSessionPool, get_session_pool, reset_session_pool
+from facebook_api import FacebookAPI
+
+
+class TestGraphSessionPool(unittest.TestCase):
+    """Test cases for GraphSessionPool"""
+
+    def setUp(self):
+        """Set up a private pool for each test"""
+        self.pool = GraphSessionPool(pool_maxsize=4, connect_timeout=2, read_timeout=7)
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def tearDown(self):
+        """Close pooled connections"""
+        self.pool.close()
+        reset_session_pool()
+
+    def test_session_is_reused(self):
+        """The same session object is returned on every access"""
+        self.assertIs(self.pool.session, self.pool.session)
+
+    def test_graph_host_has_dedicated_adapter(self):
+        """graph.facebook.com is served by its own sized adapter"""
+        adapter = self.pool.session.get_adapter(f"{self.base_url}/me")
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertIs(adapter, self.pool._adapters["graph.facebook.com"])
+
+    @responses.activate
+    def test_default_timeout_and_stats(self):
+        """Default timeouts are applied and requests are counted per host"""
+        responses.add(responses.GET, f"{self.base_url}/me", json={"id": "1"}, status=200)
+
+        response = self.pool.get(f"{self.base_url}/me")
+
+        self.assertEqual(response.json()["id"], "1")
+        self.assertEqual(responses.calls[0].request.req_kwargs["timeout"], (2, 7))
+        self.assertEqual(self.pool.stats()["requests"]["graph.facebook.com"], 1)
+
+    def test_process_wide_pool_is_singleton(self):
+        """get_session_pool returns the same pool until reset"""
+        pool = get_session_pool()
+        self.assertIs(pool, get_session_pool())
+        reset_session_pool()
+        self.assertIsNot(pool, get_session_pool())
+
+    @responses.activate
+    def test_facebook_api_uses_pool(self):
+        """FacebookAPI sends its calls through the given pool"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": []}, status=200)
+
+        api = FacebookAPI(app_id="app", app_secret="secret", access_token="token",
+                          session_pool=self.pool)
+        api.get_user_pages()
+
+        self.assertIs(api.http, self.pool)
+        self.assertEqual(self.pool.stats()["requests"]["graph.facebook.com"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Tests for the local insights time-series store
+"""
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import responses
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from fanout import FanoutExecutor
+from flask import Flask
+from services.insights_store import InsightsStore, sync_insights
+from routes.dashboard import dashboard_bp
+
+BASE_URL = "https://graph.facebook.com/v18.0"
+PAGE = {'id': '1', 'name': 'Page 1'}
+
+
+def _post(post_id, impressions, likes, created=None):
+    created = created or datetime.now().strftime('%Y-%m-%dT10:00:00+0000')
+    return {'id': post_id, 'message': 'Hello', 'created_time': created,
+            'insights': {'data': [{'name': 'post_impressions', 'values': [{'value': impressions}]},
+                                  {'name': 'post_reactions_like_total', 'values': [{'value': likes}]}]}}
+
+
+def _page_insights(metric, values):
+    return {'name': metric, 'period': 'day',
+            'values': [{'value': value, 'end_time': f'{day}T07:00:00+0000'} for day, value in values]}
+
+
+class TestInsightsStore(unittest.TestCase):
+    """Test cases for InsightsStore and sync_insights"""
+
+    def setUp(self):
+        """Create a temporary insights database"""
+        self.work_dir = tempfile.mkdtemp()
+        self.store = InsightsStore(os.path.join(self.work_dir, 'insights.db'))
+
+    def tearDown(self):
+        """Remove the temporary database"""
+        shutil.rmtree(self.work_dir)
+
+    def test_latest_post_snapshot(self):
+        """Posts are served from their most recent daily snapshot"""
+        self.store.ingest_posts([(PAGE, [_post('1_1', 100, 3), _post('1_2', 50, 1)])], day='2025-06-20')
+        self.store.ingest_posts([(PAGE, [_post('1_1', 400, 9)])], coverage={'complete': True}, day='2025-06-21')
+
+        performance = self.store.posts_performance()
+
+        self.assertEqual([post['id'] for post in performance['posts']], ['1_1', '1_2'])
+        self.assertEqual(performance['posts'][0]['reach'], 400)
+        self.assertEqual(performance['posts'][0]['page_name'], 'Page 1')
+        self.assertEqual(performance['stats']['total_reach'], 450)
+        self.assertEqual(performance['coverage'], {'complete': True})
+        self.assertEqual(self.store.stats()['post_metrics'], 6)
+
+    def test_old_posts_are_left_out(self):
+        """Only posts created within the requested days are returned"""
+        old = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%dT10:00:00+0000')
+        self.store.ingest_posts([(PAGE, [_post('1_1', 100, 3), _post('1_0', 900, 90, created=old)])])
+
+        self.assertEqual([post['id'] for post in self.store.posts_performance(days=30)['posts']], ['1_1'])
+        self.assertEqual(len(self.store.posts_performance(days=90)['posts']), 2)
+
+    def test_page_series_by_day(self):
+        """Daily page values are stored for the day they cover and summed over pages"""
+        self.store.ingest_page_insights([
+            (PAGE, {'data': [_page_insights('page_impressions', [('2025-06-21', 10), ('2025-06-22', 20)]),
+                             {'name': 'page_impressions', 'period': 'week', 'values': [
+                                 {'value': 999, 'end_time': '2025-06-22T07:00:00+0000'}]}]}),
+            ({'id': '2', 'name': 'Page 2'},
+             {'data': [_page_insights('page_impressions', [('2025-06-21', 5)])]})
+        ])
+
+        self.assertEqual(self.store.page_series('page_impressions', '2025-06-20', '2025-06-21'),
+                         {'2025-06-20': 15, '2025-06-21': 20})
+        self.assertEqual(self.store.page_series('page_impressions', '2025-06-01', '2025-06-30', page_id='2'),
+                         {'2025-06-20': 5})
+        self.assertEqual(self.store.page_totals('page_impressions', '2025-06-01', '2025-06-30')['1'],
+                         {'name': 'Page 1', 'value': 30})
+
+    def test_rollups_follow_updates(self):
+        """Day and week rollups stay equal to the raw values when days are read again"""
+        # 2025-06-16 is a Monday; end_time is the day after the value's day
+        self.store.ingest_page_insights([(PAGE, {'data': [_page_insights('page_impressions', [
+            ('2025-06-17', 10), ('2025-06-18', 20), ('2025-06-24', 5)])]})])
+        self.store.ingest_page_insights([(PAGE, {'data': [_page_insights('page_impressions', [
+            ('2025-06-18', 25), ('2025-06-18', 25)])]})])
+
+        self.assertEqual(self.store.page_series('page_impressions', '2025-06-16', '2025-06-23'),
+                         {'2025-06-16': 10, '2025-06-17': 25, '2025-06-23': 5})
+        self.assertEqual(self.store.page_series('page_impressions', '2025-06-16', '2025-06-23', grain='week'),
+                         {'2025-06-16': 35, '2025-06-23': 5})
+        self.assertEqual(self.store.page_series('page_impressions', '2025-06-18', '2025-06-30', page_id='1',
+                                                grain='week'), {'2025-06-16': 35, '2025-06-23': 5})
+
+    def test_totals_from_weeks_and_edge_days(self):
+        """Per-page totals over a range match the sum of the daily values"""
+        days = [(datetime(2025, 6, 1) + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(60)]
+        end_days = [(datetime(2025, 6, 2) + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(60)]
+        self.store.ingest_page_insights([(PAGE, {'data': [_page_insights(
+            'page_impressions', [(end_day, offset + 1) for offset, end_day in enumerate(end_days)])]})])
+
+        for since, until in [('2025-06-04', '2025-07-20'), ('2025-06-09', '2025-06-22'), ('2025-06-10', '2025-06-12')]:
+            expected = sum(offset + 1 for offset, day in enumerate(days) if since <= day <= until)
+            self.assertEqual(self.store.page_totals('page_impressions', since, until)['1']['value'], expected)
+
+    def test_weekly_analytics_stay_in_period(self):
+        """Week buckets of the dashboard only count days of the period, pages keep their 7-day columns"""
+        today = datetime.now().date()
+        self.store.ingest_page_insights([(PAGE, {'data': [_page_insights('page_impressions', [
+            ((today - timedelta(days=offset)).isoformat(), 1) for offset in range(20)])]})])
+        pages_file = os.path.join(self.work_dir, 'facebook_pages.json')
+        with open(pages_file, 'w') as f:
+            json.dump([{'id': '1', 'name': 'Page 1', 'fan_count': 2340}], f)
+        app = Flask(__name__)
+        app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+
+        with patch('routes.dashboard.get_insights_store', return_value=self.store), \
+                patch('routes.dashboard.PAGES_FILE', pages_file):
+            data = app.test_client().get('/api/dashboard/analytics?period=7d&granularity=week').get_json()['data']
+
+        self.assertEqual(sum(data['reach_chart']['data']), 7)
+        self.assertEqual(data['totals']['reach'], 7)
+        self.assertEqual(data['page_performance'], [{'page_id': '1', 'name': 'Page 1', 'followers': 2340,
+                                                     'reach_7d': 7, 'engagement_7d': 0}])
+
+    def test_existing_database_is_rolled_up(self):
+        """Opening a database without rollups aggregates its daily values once"""
+        self.store.ingest_page_insights([(PAGE, {'data': [_page_insights('page_impressions', [('2025-06-17', 10)])]})])
+        with self.store._connect() as conn:
+            conn.execute("DELETE FROM page_rollups")
+
+        reopened = InsightsStore(self.store.db_path)
+
+        self.assertEqual(reopened.page_series('page_impressions', '2025-06-16', '2025-06-16'), {'2025-06-16': 10})
+
+    @responses.activate
+    def test_sync_records_posts_and_pages(self):
+        """A sync snapshots the posts of every page and their daily page insights"""
+        end_day = datetime.now().strftime('%Y-%m-%d')
+        responses.add(responses.GET, f"{BASE_URL}/me/accounts",
+                      json={'data': [{'id': '1', 'name': 'Page 1', 'access_token': 't1'}]})
+        responses.add(responses.GET, f"{BASE_URL}/1/posts", json={'data': [_post('1_1', 100, 3)]})
+        responses.add(responses.GET, f"{BASE_URL}/1/insights",
+                      json={'data': [_page_insights('page_engaged_users', [(end_day, 7)])]})
+        api = FacebookAPI(app_id="insights_test", app_secret="secret", access_token="user_token")
+        executor = FanoutExecutor(max_in_flight=2, name="insights_test")
+
+        try:
+            with patch("services.posts_performance.get_fanout_executor", return_value=executor), \
+                    patch("services.insights_store.get_fanout_executor", return_value=executor):
+                result = sync_insights(api, self.store, page_days=3, budget=5)
+        finally:
+            executor.shutdown()
+
+        self.assertTrue(result['posts']['complete'])
+        self.assertEqual(result['pages']['values'], 1)
+        self.assertEqual(self.store.posts_performance()['posts'][0]['id'], '1_1')
+        self.assertIsNotNone(self.store.last_ingest('pages'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the interest search index
+"""
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.interest_index import InterestIndex, DEFAULT_INTERESTS, OVERLAY_MIN, fold, load_taxonomy
+
+
+class TestInterestIndex(unittest.TestCase):
+    """Test cases for InterestIndex"""
+
+    def setUp(self):
+        """Index the built-in interests"""
+        self.index = InterestIndex(DEFAULT_INTERESTS)
+
+    def _names(self, query, **kwargs):
+        return [interest['name'] for interest in self.index.search(query, **kwargs)]
+
+    def test_accents_and_case_are_folded(self):
+        """Queries match names whatever their accents and case"""
+        self.assertEqual(fold('Clôture ÉTÉ'), 'cloture ete')
+        self.assertEqual(self._names('amenagement'), ['Aménagement extérieur'])
+        self.assertEqual(self._names('AMÉNAG'), ['Aménagement extérieur'])
+        self.assertEqual(self._names('clot'), ['Clôture'])
+
+    def test_ranking(self):
+        """Exact names come first, then name prefixes, word prefixes and substrings"""
+        self.index.add([{'id': 'jardin', 'name': 'Jardin'}])
+
+        self.assertEqual(self._names('jardin'), ['Jardin', 'Jardinage', 'Mobilier de jardin'])
+        self.assertEqual(self._names('jardin mob'), ['Mobilier de jardin'])
+        self.assertEqual(self._names('ardin'), ['Jardin', 'Jardinage', 'Mobilier de jardin'])
+        self.assertEqual(self._names('jardin', limit=1), ['Jardin'])
+        self.assertEqual(self._names('xyz'), [])
+
+    def test_audience_size_breaks_ties(self):
+        """Among matches of the same rank, larger audiences come first"""
+        index = InterestIndex([{'id': '1', 'name': 'Bois flotté', 'audience_size': 1000},
+                               {'id': '2', 'name': 'Bois de chauffage', 'audience_size_upper_bound': 90000},
+                               {'id': '1', 'name': 'Duplicate'}])
+
+        self.assertEqual([interest['id'] for interest in index.search('bois')], ['2', '1'])
+        self.assertEqual(len(index), 2)
+
+    def test_added_interests_are_searched_before_and_after_merge(self):
+        """Interests added later are found from the overlay, then once merged into the base"""
+        self.index.add([{'id': 'r0', 'name': 'Jardin vertical'}])
+
+        self.assertEqual(self._names('jardin v'), ['Jardin vertical'])
+        self.assertEqual(self._names('vertical'), ['Jardin vertical'])
+        self.assertEqual(self._names('din vert'), ['Jardin vertical'])
+
+        self.index.add([{'id': f'r{i}', 'name': f'Abri {i}'} for i in range(1, OVERLAY_MIN + 1)])
+
+        self.assertEqual(len(self.index), len(DEFAULT_INTERESTS) + OVERLAY_MIN + 1)
+        self.assertEqual(self._names('jardin v'), ['Jardin vertical'])
+        self.assertEqual(self._names('abri 256'), ['Abri 256'])
+        self.assertEqual(self._names('terr'), ['Terrasse'])
+        self.assertEqual(self.index.add([{'id': 'r0', 'name': 'Jardin vertical'}]), 0)
+
+    def test_load_taxonomy(self):
+        """Graph responses and JSON lines dumps are loaded"""
+        work_dir = tempfile.mkdtemp()
+        try:
+            graph = os.path.join(work_dir, 'taxonomy.json')
+            with open(graph, 'w', encoding='utf-8') as f:
+                json.dump({'data': [{'id': 6003, 'name': 'Woodworking', 'path': ['Hobbies', 'Woodworking'],
+                                     'audience_size_upper_bound': 5000}]}, f)
+            lines = os.path.join(work_dir, 'taxonomy.jsonl')
+            with open(lines, 'w', encoding='utf-8') as f:
+                f.write('{"id": "1", "name": "Élagage", "topic": "Garden"}\n{"name": "No id"}\n')
+
+            self.assertEqual(load_taxonomy(graph), [{'id': '6003', 'name': 'Woodworking', 'category': 'Hobbies',
+                                                     'audience_size': 5000}])
+            self.assertEqual(InterestIndex(load_taxonomy(lines)).search('elag')[0]['category'], 'Garden')
+        finally:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
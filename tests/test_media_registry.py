@@ -0,0 +1,109 @@
+"""
+Tests for the content-hash media registry
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from urllib.parse import parse_qs
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from media_registry import MediaRegistry
+
+
+class TestMediaRegistry(unittest.TestCase):
+    """Test cases for MediaRegistry and its use by FacebookAPI"""
+
+    def setUp(self):
+        """Create test images and an API instance with a private registry"""
+        self.work_dir = tempfile.mkdtemp()
+        self.photo = os.path.join(self.work_dir, "photo.jpg")
+        with open(self.photo, "wb") as f:
+            f.write(b"jpeg-content")
+        self.copy = os.path.join(self.work_dir, "copy.jpg")
+        shutil.copy(self.photo, self.copy)
+
+        self.registry = MediaRegistry(registry_file=os.path.join(self.work_dir, "registry.json"))
+        self.api = FacebookAPI(app_id="app", app_secret="secret", access_token="token",
+                               media_registry=self.registry)
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def tearDown(self):
+        """Remove test files"""
+        shutil.rmtree(self.work_dir)
+
+    def test_file_is_read_once(self):
+        """Loading the same file again is served from the buffer cache"""
+        first = self.registry.load(self.photo)
+        second = self.registry.load(self.photo)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.stats()["reads"], 1)
+        # Same content under another name has the same hash
+        self.assertEqual(self.registry.load(self.copy).sha256, first.sha256)
+
+    @responses.activate
+    def test_media_uploaded_once_per_page(self):
+        """A photo is uploaded once per page and reused by later posts"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts", json={"data": [
+            {"id": "1", "access_token": "t1"}, {"id": "2", "access_token": "t2"}
+        ]}, status=200)
+        for page_id in ("1", "2"):
+            responses.add(responses.POST, f"{self.base_url}/{page_id}/photos",
+                          json={"id": f"photo_{page_id}"}, status=200)
+            responses.add(responses.POST, f"{self.base_url}/{page_id}/feed",
+                          json={"id": f"{page_id}_10"}, status=200)
+
+        first = self.api.publish_to_multiple_pages(["1", "2"], "Hello", media_paths=[self.photo])
+        second = self.api.publish_to_multiple_pages(["1", "2"], "Again", media_paths=[self.copy])
+
+        self.assertTrue(all(result["success"] for result in list(first.values()) + list(second.values())))
+        photo_calls = [call for call in responses.calls if call.request.url.split("?")[0].endswith("/photos")]
+        self.assertEqual(len(photo_calls), 2)
+        self.assertEqual(self.registry.stats()["reads"], 2)  # photo.jpg and copy.jpg
+        feed_bodies = [parse_qs(call.request.body) for call in responses.calls
+                       if call.request.url.endswith("/2/feed")]
+        self.assertEqual(feed_bodies[-1]["attached_media"], ['[{"media_fbid": "photo_2"}]'])
+
+        # The registry survives a restart
+        reloaded = MediaRegistry(registry_file=self.registry.registry_file)
+        self.assertEqual(reloaded.get_uploaded("1", self.registry.load(self.photo).sha256, "media_fbid"),
+                         "photo_1")
+
+    @responses.activate
+    def test_rejected_media_is_uploaded_again(self):
+        """A cached media_fbid refused by Facebook is forgotten and re-uploaded"""
+        sha256 = self.registry.load(self.photo).sha256
+        self.registry.remember("1", sha256, "media_fbid", "stale_photo")
+        responses.add(responses.POST, f"{self.base_url}/1/feed",
+                      json={"error": {"message": "Invalid media", "code": 100}}, status=400)
+        responses.add(responses.POST, f"{self.base_url}/1/photos", json={"id": "fresh_photo"}, status=200)
+        responses.add(responses.POST, f"{self.base_url}/1/feed", json={"id": "1_10"}, status=200)
+
+        result = self.api._publish_to_page("1", "Hello", [self.photo], None, "t1")
+
+        self.assertEqual(result["id"], "1_10")
+        self.assertEqual(self.registry.get_uploaded("1", sha256, "media_fbid"), "fresh_photo")
+
+    @responses.activate
+    def test_ad_image_hash_is_cached(self):
+        """Ad images are uploaded once per ad account"""
+        responses.add(responses.POST, f"{self.base_url}/act_9/adimages",
+                      json={"images": {"photo.jpg": {"hash": "abc123", "url": "https://x"}}}, status=200)
+
+        first = self.api.upload_image("9", self.photo)
+        second = self.api.upload_image("9", self.copy)
+
+        self.assertEqual(first["image_hash"], "abc123")
+        self.assertEqual(second["image_hash"], "abc123")
+        self.assertEqual(len(responses.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for the columnar post metrics engine
+"""
+
+import unittest
+import os
+import sys
+import random
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.metrics_engine import MetricsEngine, format_post
+
+PAGES = [{'id': '1', 'name': 'Page 1'}, {'id': '2', 'name': 'Page 2'}]
+
+
+def _rows(count, seed=7):
+    """Posts with distinct engagement spread over two pages"""
+    rng = random.Random(seed)
+    engagement = rng.sample(range(count * 10), count)
+    for index in range(count):
+        metrics = {'post_impressions': rng.randint(0, 3000), 'post_reactions_like_total': engagement[index],
+                   'post_comments': 0, 'post_shares': 0}
+        yield ({'id': f'p{index}', 'message': 'Hello', 'created_time': '2025-06-20T10:00:00+0000'},
+               PAGES[index % 2], metrics)
+
+
+class TestMetricsEngine(unittest.TestCase):
+    """Test cases for MetricsEngine"""
+
+    def _engine(self, rows):
+        return MetricsEngine().extend(rows)
+
+    def test_totals_and_breakdown(self):
+        """Totals, rates and per-page figures add up the metric columns"""
+        engine = self._engine([
+            ({'id': 'a'}, PAGES[0], {'post_impressions': 2000, 'post_reactions_like_total': 10,
+                                     'post_reactions_love_total': 5, 'post_comments': 3, 'post_shares': 2}),
+            ({'id': 'b'}, PAGES[1], {'post_impressions': 500, 'post_shares': 5}),
+            ({'id': 'c'}, PAGES[0], {'post_impressions': 500, 'post_comments': {'unexpected': 1}}),
+        ])
+
+        self.assertEqual(engine.engagement(), [20, 5, 0])
+        self.assertEqual(engine.totals(), {'total_reach': 3000, 'total_engagement': 25, 'total_shares': 7,
+                                           'boosted_posts_count': 1, 'posts_count': 3,
+                                           'engagement_rate': round(25 / 3000, 4)})
+        first = engine.by_page()[0]
+        self.assertEqual((first['page_id'], first['posts_count'], first['reach'], first['engagement']),
+                         ('1', 2, 2500, 20))
+
+    def test_top_matches_full_sort(self):
+        """Top-K returns the same rows as sorting every post"""
+        rows = list(_rows(500))
+        expected = sorted((format_post(post, page, metrics) for post, page, metrics in rows),
+                          key=lambda row: row['engagement'], reverse=True)[:50]
+
+        self.assertEqual(self._engine(rows).top(50), expected)
+        self.assertEqual(len(self._engine(rows[:3]).top(50)), 3)
+        self.assertEqual(MetricsEngine().top(10), [])
+
+    def test_only_top_candidates_keep_their_fields(self):
+        """Posts outside the keep_top best are aggregated without holding their text"""
+        rows = list(_rows(1000))
+        engine = MetricsEngine(keep_top=5).extend(rows)
+
+        self.assertEqual(len(engine._top), 5)
+        self.assertEqual(engine.top(10), self._engine(rows).top(5))
+        self.assertEqual(engine.totals(), self._engine(rows).totals())
+
+    def test_streamed_rows(self):
+        """Rows are consumed from a generator"""
+        engine = self._engine(_rows(1000))
+
+        self.assertEqual(len(engine), 1000)
+        self.assertEqual(sum(page['posts_count'] for page in engine.by_page()), 1000)
+
+    def test_aggregations_match_rows(self):
+        """Vectorized totals and page breakdowns match summing the formatted rows"""
+        rows = list(_rows(20000))
+        formatted = [format_post(post, page, metrics) for post, page, metrics in rows]
+        engine = self._engine(rows)
+
+        totals = engine.totals()
+        self.assertEqual(totals['total_reach'], sum(row['reach'] for row in formatted))
+        self.assertEqual(totals['total_engagement'], sum(row['engagement'] for row in formatted))
+        self.assertEqual(totals['boosted_posts_count'], sum(row['status'] == 'boosted' for row in formatted))
+        self.assertEqual({page['page_id']: page['reach'] for page in engine.by_page()},
+                         {page['id']: sum(row['reach'] for row in formatted if row['page_id'] == page['id'])
+                          for page in PAGES})
+
+    def test_top_ties_keep_insertion_order(self):
+        """Posts with the same engagement are ranked in insertion order"""
+        values = [5, 9, 5, 1, 9, 5, 5, 0, 9, 5]
+        rows = [({'id': f'p{index}'}, PAGES[0], {'post_reactions_like_total': value})
+                for index, value in enumerate(values)]
+        engine = self._engine(rows)
+
+        self.assertEqual([row['id'] for row in engine.top(5)], ['p1', 'p4', 'p8', 'p0', 'p2'])
+        self.assertEqual([row['id'] for row in engine.top(3)], ['p1', 'p4', 'p8'])
+        self.assertEqual(len(engine.top(10)), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Tests for the page synchronization service
+"""
+
+import unittest
+import json
+import os
+import sys
+import shutil
+import tempfile
+from urllib.parse import parse_qs, urlsplit
+import responses
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.page_sync import (GRAPH_URL, RECENT_POSTS_FIELD, PageSyncError, PageSyncWorker,
+                                fetch_all_pages, attach_recent_posts, format_page,
+                                apply_incremental_sync, read_sync_state)
+
+POSTS = {'data': [{'created_time': '2025-06-20T10:00:00+0000', 'message': 'Hello'}]}
+
+
+class TestPageSync(unittest.TestCase):
+    """Test cases for fetch_all_pages / attach_recent_posts"""
+
+    @responses.activate
+    def test_posts_are_expanded_inline(self):
+        """Recent posts come with /me/accounts, no per-page request"""
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts", json={
+            'data': [{'id': '1', 'name': 'Page 1', 'posts': POSTS},
+                     {'id': '2', 'name': 'Page 2'}]
+        }, status=200)
+
+        pages, iterations, _ = fetch_all_pages('token')
+
+        fields = parse_qs(urlsplit(responses.calls[0].request.url).query)['fields'][0]
+        self.assertIn(RECENT_POSTS_FIELD, fields)
+        self.assertEqual(iterations, 1)
+        self.assertEqual(len(responses.calls), 1)
+
+        # A page without published posts has no 'posts' key and gets probed
+        responses.add(responses.POST, f"{GRAPH_URL}/",
+                      json=[{'code': 200, 'body': json.dumps({'data': []})}], status=200)
+        self.assertEqual(attach_recent_posts(pages, 'token'), 1)
+
+        formatted = [format_page(page) for page in pages]
+        self.assertEqual(formatted[0]['posts_count'], 1)
+        self.assertEqual(formatted[0]['last_post'], 'Récemment')
+        self.assertEqual(formatted[1]['posts_count'], 0)
+
+    @responses.activate
+    def test_expansion_rejected_falls_back(self):
+        """When the nested posts edge is refused the sync retries without it"""
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts",
+                      json={'error': {'message': 'Permissions error', 'code': 10}}, status=400)
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts",
+                      json={'data': [{'id': '1', 'name': 'Page 1'}]}, status=200)
+
+        pages, _, _ = fetch_all_pages('token')
+
+        fields = parse_qs(urlsplit(responses.calls[1].request.url).query)['fields'][0]
+        self.assertNotIn('posts', fields)
+        self.assertEqual(len(pages), 1)
+
+    @responses.activate
+    def test_token_error_raises(self):
+        """An invalid token is reported as a PageSyncError"""
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts",
+                      json={'error': {'message': 'Invalid OAuth access token.', 'code': 190}}, status=400)
+
+        with self.assertRaises(PageSyncError) as context:
+            fetch_all_pages('token')
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.payload['facebook_error']['code'], 190)
+
+
+
+class TestIncrementalSync(unittest.TestCase):
+    """Test cases for apply_incremental_sync"""
+
+    def setUp(self):
+        """Use a temporary data directory"""
+        self.data_dir = tempfile.mkdtemp()
+        self.pages_file = os.path.join(self.data_dir, 'facebook_pages.json')
+        self.state_file = os.path.join(self.data_dir, 'page_sync_state.json')
+
+    def tearDown(self):
+        """Remove the temporary data directory"""
+        shutil.rmtree(self.data_dir)
+
+    def page(self, page_id, **overrides):
+        page = format_page({'id': page_id, 'name': f'Page {page_id}', 'fan_count': 10,
+                            'access_token': f'token_{page_id}'})
+        page.update(overrides)
+        return page
+
+    def test_delta_is_reported(self):
+        """Added, removed and changed pages are detected from fingerprints"""
+        first = apply_incremental_sync([self.page('1'), self.page('2')], self.pages_file, self.state_file)
+        self.assertEqual(first['changes']['added'], ['1', '2'])
+
+        second = apply_incremental_sync([self.page('1', fan_count=11), self.page('3')],
+                                        self.pages_file, self.state_file)
+        self.assertEqual(second['changes']['added'], ['3'])
+        self.assertEqual(second['changes']['removed'], ['2'])
+        self.assertEqual(second['changes']['changed'], ['1'])
+
+        with open(self.pages_file) as f:
+            stored = json.load(f)
+        self.assertEqual([page['id'] for page in stored], ['1', '3'])
+        self.assertEqual(stored[0]['fan_count'], 11)
+
+    def test_unchanged_sync_does_not_rewrite(self):
+        """A sync with no change leaves the snapshot file untouched"""
+        apply_incremental_sync([self.page('1')], self.pages_file, self.state_file)
+        mtime = os.stat(self.pages_file).st_mtime_ns
+
+        result = apply_incremental_sync([self.page('1')], self.pages_file, self.state_file)
+
+        self.assertFalse(result['changes']['written'])
+        self.assertEqual(result['changes']['unchanged'], 1)
+        self.assertEqual(os.stat(self.pages_file).st_mtime_ns, mtime)
+        self.assertIsNotNone(read_sync_state(self.state_file)['last_sync'])
+
+    def test_token_is_not_persisted_in_state(self):
+        """The sync state only keeps a hash of page tokens"""
+        apply_incremental_sync([self.page('1')], self.pages_file, self.state_file)
+        changed = apply_incremental_sync([self.page('1', access_token='new_token')],
+                                         self.pages_file, self.state_file)
+
+        self.assertEqual(changed['changes']['changed'], ['1'])
+        with open(self.state_file) as f:
+            self.assertNotIn('new_token', f.read())
+
+    def test_worker_skips_while_a_manual_sync_holds_the_lock(self):
+        """Syncs run outside the worker share its lock"""
+        worker = PageSyncWorker(lambda: 'user_token', self.pages_file, self.state_file)
+
+        with worker.sync_lock:
+            self.assertIsNone(worker.sync_now())
+
+        self.assertIsNone(worker.last_error)
+        self.assertFalse(os.path.exists(self.pages_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the shared page token store
+"""
+
+import unittest
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import patch
+import responses
+from responses import matchers
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from page_tokens import PageTokenStore, TokenCipher
+
+
+class TestPageTokenStore(unittest.TestCase):
+    """Test cases for PageTokenStore"""
+
+    def setUp(self):
+        """Create a temporary token database"""
+        self.work_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.work_dir, "page_tokens.db")
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def tearDown(self):
+        """Remove the temporary database"""
+        shutil.rmtree(self.work_dir)
+
+    def _api(self, store):
+        return FacebookAPI(app_id="app", app_secret="secret", access_token="user_token", page_token_store=store)
+
+    def _add_accounts(self, pages=250, prefix="token"):
+        """Register /me/accounts pages of 100 with cursor pagination"""
+        for start in range(0, pages, 100):
+            body = {"data": [{"id": str(i), "name": f"Page {i}", "access_token": f"{prefix}_{i}"}
+                             for i in range(start, min(start + 100, pages))]}
+            if start + 100 < pages:
+                body["paging"] = {"cursors": {"after": f"c{start + 100}"},
+                                  "next": f"{self.base_url}/me/accounts?after=c{start + 100}"}
+            match = [matchers.query_param_matcher({"after": f"c{start}"}, strict_match=False)] if start else []
+            responses.add(responses.GET, f"{self.base_url}/me/accounts", json=body, match=match)
+
+    def test_cipher_round_trip(self):
+        """Tokens decrypt with the same secret only"""
+        encrypted = TokenCipher("secret").encrypt("EAAB-token")
+
+        self.assertNotIn("EAAB", encrypted)
+        self.assertEqual(TokenCipher("secret").decrypt(encrypted), "EAAB-token")
+        with self.assertRaises(ValueError):
+            TokenCipher("other").decrypt(encrypted)
+
+    @responses.activate
+    def test_full_pagination_and_lookup(self):
+        """Every page of /me/accounts is fetched once and looked up by ID"""
+        self._add_accounts(pages=250)
+        responses.add(responses.GET, f"{self.base_url}/debug_token",
+                      json={"data": {"is_valid": True, "expires_at": 0}})
+        store = PageTokenStore(db_path=self.db_path)
+        api = self._api(store)
+
+        self.assertEqual(api._get_page_token("249"), "token_249")
+        self.assertEqual(api._get_page_token("0"), "token_0")
+        self.assertEqual(len(api._get_page_tokens()), 250)
+        self.assertEqual(store.stats()["refreshes"], 1)
+
+        # Tokens are encrypted at rest
+        with sqlite3.connect(self.db_path) as conn:
+            stored = [row[0] for row in conn.execute("SELECT token FROM page_tokens")]
+        self.assertEqual(len(stored), 250)
+        self.assertFalse(any("token_" in token for token in stored))
+
+    @responses.activate
+    def test_shared_between_workers(self):
+        """A second process reads the tokens from the database without calling Facebook"""
+        self._add_accounts(pages=3)
+        responses.add(responses.GET, f"{self.base_url}/debug_token", json={"data": {"is_valid": True}})
+        self._api(PageTokenStore(db_path=self.db_path))._get_page_tokens()
+        calls = len(responses.calls)
+
+        other_worker = PageTokenStore(db_path=self.db_path)
+        self.assertEqual(self._api(other_worker)._get_page_token("2"), "token_2")
+        self.assertEqual(len(responses.calls), calls)
+        self.assertEqual(other_worker.stats()["loads"], 1)
+
+    @responses.activate
+    def test_refresh_ahead_of_expiry(self):
+        """Tokens are fetched again before the user token expires, as reported by debug_token"""
+        self._add_accounts(pages=1, prefix="old")
+        responses.add(responses.GET, f"{self.base_url}/debug_token",
+                      json={"data": {"is_valid": True, "expires_at": int(time.time()) + 600}})
+        store = PageTokenStore(db_path=self.db_path, refresh_margin=3600, miss_refresh_interval=0)
+        api = self._api(store)
+
+        self.assertEqual(api._get_page_token("0"), "old_0")
+        self.assertEqual(store.stats()["refreshes"], 1)
+
+        responses.replace(responses.GET, f"{self.base_url}/me/accounts",
+                          json={"data": [{"id": "0", "access_token": "new_0"}]})
+        # The token expires within the margin: kept for the minimum interval, then refreshed
+        with patch("page_tokens.time.time", return_value=time.time() + 30):
+            self.assertEqual(api._get_page_token("0"), "old_0")
+        with patch("page_tokens.time.time", return_value=time.time() + 120):
+            self.assertEqual(api._get_page_token("0"), "new_0")
+        self.assertEqual(store.stats()["refreshes"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Tests for the posts performance crawl
+"""
+
+import unittest
+import os
+import sys
+import json
+import time
+from unittest.mock import MagicMock, patch
+import responses
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from fanout import FanoutExecutor
+from services.posts_performance import MIN_BUDGET, crawl_posts_performance
+from services.metrics_engine import format_post
+
+BASE_URL = "https://graph.facebook.com/v18.0"
+
+
+def _post(post_id, impressions, likes):
+    return {'id': post_id, 'message': 'Hello', 'created_time': '2025-06-20T10:00:00+0000',
+            'insights': {'data': [{'name': 'post_impressions', 'values': [{'value': impressions}]},
+                                  {'name': 'post_reactions_like_total', 'values': [{'value': likes}]},
+                                  {'name': 'post_shares', 'values': [{'value': 1}]}]}}
+
+
+class TestPostsPerformance(unittest.TestCase):
+    """Test cases for crawl_posts_performance"""
+
+    def setUp(self):
+        """Create a client and a private fan-out executor"""
+        self.api = FacebookAPI(app_id="analytics_test", app_secret="secret", access_token="user_token")
+        self.executor = FanoutExecutor(max_in_flight=4, name="analytics_test")
+
+    def tearDown(self):
+        """Stop worker threads"""
+        self.executor.shutdown()
+
+    def _crawl(self, **kwargs):
+        with patch("services.posts_performance.get_fanout_executor", return_value=self.executor):
+            return crawl_posts_performance(self.api, **kwargs)
+
+    def test_format_post(self):
+        """Reactions, comments and shares add up to the engagement"""
+        row = format_post(_post('1_1', 1500, 10), {'id': '1', 'name': 'Page 1'})
+
+        self.assertEqual(row['reach'], 1500)
+        self.assertEqual(row['engagement'], 11)
+        self.assertEqual(row['status'], 'boosted')
+
+    @responses.activate
+    def test_every_page_is_crawled(self):
+        """All pages are fetched, beyond the first ten, with per-page latency"""
+        responses.add(responses.GET, f"{BASE_URL}/me/accounts", json={
+            'data': [{'id': str(i), 'name': f'Page {i}', 'access_token': f't{i}'} for i in range(12)]})
+        for i in range(12):
+            responses.add(responses.GET, f"{BASE_URL}/{i}/posts", json={'data': [_post(f'{i}_1', 100, i)]})
+
+        result = self._crawl(budget=10)
+
+        self.assertEqual(result['stats']['posts_count'], 12)
+        self.assertEqual(result['posts'][0]['id'], '11_1')
+        self.assertTrue(result['coverage']['complete'])
+        self.assertEqual(result['coverage']['pages_crawled'], 12)
+        self.assertEqual(len(result['timings']['per_page_ms']), 12)
+
+    @responses.activate
+    def test_partial_results_when_budget_is_hit(self):
+        """Pages not fetched within the budget are reported, the others are returned"""
+        responses.add(responses.GET, f"{BASE_URL}/me/accounts", json={
+            'data': [{'id': '1', 'name': 'Fast', 'access_token': 't1'},
+                     {'id': '2', 'name': 'Slow', 'access_token': 't2'},
+                     {'id': '3', 'name': 'Broken', 'access_token': 't3'}]})
+        responses.add(responses.GET, f"{BASE_URL}/1/posts", json={'data': [_post('1_1', 100, 5)]})
+
+        def slow(request):
+            time.sleep(1.5)
+            return (200, {}, '{"data": []}')
+        responses.add_callback(responses.GET, f"{BASE_URL}/2/posts", callback=slow)
+        responses.add(responses.GET, f"{BASE_URL}/3/posts", json={'error': {'message': 'Denied', 'code': 10}},
+                      status=400)
+
+        result = self._crawl(budget=-5)  # Clamped to MIN_BUDGET
+        coverage = result['coverage']
+
+        self.assertEqual([post['id'] for post in result['posts']], ['1_1'])
+        self.assertEqual(coverage['pages_timed_out'], ['2'])
+        self.assertEqual(coverage['pages_failed'], ['3'])
+        self.assertFalse(coverage['complete'])
+        self.assertIsNone(result['timings']['per_page_ms']['2'])
+        self.assertEqual(coverage['budget_s'], MIN_BUDGET)
+        time.sleep(0.6)  # Let the slow call finish before responses is deactivated
+
+
+    @responses.activate
+    def test_iter_posts_follows_paging(self):
+        """Posts are read across paging.next, lazily, up to max_items"""
+        feed = {
+            None: {'data': [{'id': '1_1'}, {'id': '1_2'}],
+                   'paging': {'next': f"{BASE_URL}/1/posts?access_token=t1&limit=2&after=c1"}},
+            'c1': {'data': [{'id': '1_3'}, {'id': '1_4'}],
+                   'paging': {'next': f"{BASE_URL}/1/posts?access_token=t1&limit=2&after=c2"}},
+            'c2': {'data': [{'id': '1_5'}]}
+        }
+        responses.add_callback(responses.GET, f"{BASE_URL}/1/posts",
+                               callback=lambda request: (200, {}, json.dumps(feed[request.params.get('after')])))
+
+        posts = list(self.api.iter_posts('1', since='2025-06-01', page_size=2, page_access_token='t1'))
+
+        self.assertEqual([post['id'] for post in posts], ['1_1', '1_2', '1_3', '1_4', '1_5'])
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(responses.calls[0].request.params['since'], '2025-06-01')
+        self.assertEqual(responses.calls[2].request.params['access_token'], 't1')
+
+        responses.calls.reset()
+        posts = list(self.api.iter_posts('1', max_items=3, page_size=2, page_access_token='t1'))
+
+        self.assertEqual([post['id'] for post in posts], ['1_1', '1_2', '1_3'])
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_crawl_reads_beyond_first_page(self):
+        """A page's posts are followed past the first response, up to max_posts"""
+        responses.add(responses.GET, f"{BASE_URL}/me/accounts",
+                      json={'data': [{'id': '1', 'name': 'Page 1', 'access_token': 't1'}]})
+
+        def feed(request):
+            start = int(request.params.get('after', 0))
+            body = {'data': [_post(f'1_{i}', 100, i) for i in range(start, min(start + 25, 60))]}
+            if start + 25 < 60:
+                body['paging'] = {'next': f"{BASE_URL}/1/posts?limit=25&after={start + 25}"}
+            return (200, {}, json.dumps(body))
+        responses.add_callback(responses.GET, f"{BASE_URL}/1/posts", callback=feed)
+
+        result = self._crawl(budget=10)
+
+        self.assertEqual(result['stats']['posts_count'], 60)
+        self.assertEqual(result['posts'][0]['id'], '1_59')
+        self.assertEqual(result['coverage']['pages_truncated'], [])
+
+        result = self._crawl(budget=10, max_posts=30)
+
+        self.assertEqual(result['stats']['posts_count'], 30)
+        self.assertEqual(result['coverage']['pages_truncated'], ['1'])
+
+    @responses.activate
+    def test_store_matches_answer_when_budget_is_hit(self):
+        """Posts of a page cut by the budget are stored exactly when they are part of the answer"""
+        responses.add(responses.GET, f"{BASE_URL}/me/accounts",
+                      json={'data': [{'id': '1', 'name': 'Page 1', 'access_token': 't1'}]})
+
+        def feed(request):
+            start = int(request.params.get('after', 0))
+            if start:
+                time.sleep(1.5)
+            body = {'data': [_post(f'1_{i}', 100, i) for i in range(start, start + 30)],
+                    'paging': {'next': f"{BASE_URL}/1/posts?limit=25&after={start + 30}"}}
+            return (200, {}, json.dumps(body))
+        responses.add_callback(responses.GET, f"{BASE_URL}/1/posts", callback=feed)
+
+        store = MagicMock()
+        store.ingest_posts.side_effect = lambda pages_posts, log: sum(len(posts) for _, posts in pages_posts)
+        with patch("services.posts_performance.STORE_CHUNK", 25):
+            result = self._crawl(budget=1, store=store)
+        time.sleep(0.8)  # Let the slow call finish and its chunk be refused
+
+        self.assertEqual(result['coverage']['pages_timed_out'], ['1'])
+        self.assertEqual(result['stats']['posts_count'], 25)
+        self.assertEqual(store.ingest_posts.call_count, 1)
+        self.assertEqual(store.log_posts_ingest.call_args[0][0], 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Tests for the durable publish job queue
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+
+# Add src directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.publish_jobs import PublishJobStore, PublishJobQueue, job_results
+
+
+class TestPublishJobQueue(unittest.TestCase):
+    """Test cases for PublishJobStore and PublishJobQueue"""
+
+    def setUp(self):
+        """Create a temporary job database"""
+        self.work_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.work_dir, "jobs.db")
+        self.store = PublishJobStore(self.db_path)
+
+    def tearDown(self):
+        """Remove the temporary database"""
+        shutil.rmtree(self.work_dir)
+
+    def test_job_runs_every_page(self):
+        """Each page task is executed once and the job completes with results"""
+        published = []
+        lock = threading.Lock()
+
+        def handler(task):
+            if task["page_id"] == "3":
+                raise RuntimeError("Page refused")
+            with lock:
+                published.append(task["page_id"])
+            return {"post_id": f"{task['page_id']}_1"}
+
+        completed = []
+        queue = PublishJobQueue(self.store, handler, workers=3, poll_interval=0.05,
+                                on_job_completed=completed.append)
+        try:
+            job_id = queue.enqueue(["1", "2", "3", "2"], "Hello", link="https://example.com")
+            job = queue.wait(job_id, timeout=5)
+        finally:
+            queue.stop()
+
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(sorted(published), ["1", "2"])
+        self.assertEqual(job["progress"]["total"], 3)
+        self.assertEqual(job["progress"]["success"], 2)
+        self.assertEqual(job["progress"]["failed"], 1)
+        self.assertEqual(job["progress"]["percent"], 100.0)
+        tasks = {task["page_id"]: task for task in job["tasks"]}
+        self.assertEqual(tasks["1"]["result"], {"post_id": "1_1"})
+        self.assertEqual(tasks["3"]["error"], "Page refused")
+        self.assertEqual(completed, [job_id])
+        summary = job_results(job)["summary"]
+        self.assertEqual(summary["total_pages"], 3)
+        self.assertEqual(summary["successful_pages"], ["1", "2"])
+        self.assertEqual(summary["failed_pages"], ["3"])
+        self.assertEqual(sorted(summary["timings"]["per_page_ms"]), ["1", "2", "3"])
+
+    def test_progress_of_pending_job(self):
+        """A queued job reports its per-page progress before any worker runs"""
+        job_id = self.store.create_job(["1", "2"], "Hello")
+
+        job = self.store.get_job(job_id)
+
+        self.assertEqual(job["status"], "pending")
+        self.assertEqual(job["progress"]["pending"], 2)
+        self.assertEqual(job["progress"]["percent"], 0.0)
+        self.assertEqual(self.store.list_jobs()[0]["total"], 2)
+        self.assertIsNone(self.store.get_job("unknown"))
+
+    def test_restart_resumes_pending_tasks(self):
+        """After a restart, running tasks are reported interrupted and pending ones resume"""
+        job_id = self.store.create_job(["1", "2", "3"], "Hello")
+        self.store.claim_task()
+        # Simulate a task left running by a process that stopped sending heartbeats
+        conn = self.store._connect()
+        conn.execute("UPDATE publish_tasks SET updated_at = '2000-01-01T00:00:00' WHERE page_id = '1'")
+        conn.close()
+
+        published = []
+        restarted = PublishJobQueue(PublishJobStore(self.db_path),
+                                    lambda task: published.append(task["page_id"]) or {"post_id": "x"},
+                                    workers=1, poll_interval=0.05)
+        restarted.start()
+        try:
+            job = restarted.wait(job_id, timeout=5)
+        finally:
+            restarted.stop()
+
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(published, ["2", "3"])
+        tasks = {task["page_id"]: task for task in job["tasks"]}
+        self.assertEqual(tasks["1"]["status"], "failed")
+        self.assertIn("interrompue", tasks["1"]["error"])
+
+    def test_lease_is_checked_when_claiming(self):
+        """A running task is interrupted once its lease expires, unless its worker sends heartbeats"""
+        store = PublishJobStore(self.db_path, lease=0.2)
+        job_id = store.create_job(["1", "2", "3"], "Hello")
+        first = store.claim_task()
+        second = store.claim_task()
+
+        time.sleep(0.3)
+        store.heartbeat([(second["job_id"], second["page_id"])])
+        third = store.claim_task()
+
+        tasks = {task["page_id"]: task for task in store.get_job(job_id)["tasks"]}
+        self.assertEqual(third["page_id"], "3")
+        self.assertEqual(tasks["1"]["status"], "failed")
+        self.assertEqual(tasks["2"]["status"], "running")
+        # The late outcome of the interrupted task does not complete the job twice
+        self.assertFalse(store.finish_task(job_id, first["page_id"], {"post_id": "late"}))
+        self.assertFalse(store.finish_task(job_id, "2", {"post_id": "2_1"}))
+        self.assertTrue(store.finish_task(job_id, "3", {"post_id": "3_1"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
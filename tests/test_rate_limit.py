@@ -0,0 +1,142 @@
+"""
+Tests for the Graph API rate-limit governor
+"""
+
+import unittest
+import json
+import os
+import sys
+import time
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rate_limit import RateLimitGovernor, RateLimitExceeded
+from graph_session import GraphSessionPool
+from facebook_api import FacebookAPI, FacebookAPIError
+from services.page_sync import GRAPH_URL, fetch_all_pages
+
+
+class TestRateLimitGovernor(unittest.TestCase):
+    """Test cases for RateLimitGovernor"""
+
+    def setUp(self):
+        """Create a private governor"""
+        self.governor = RateLimitGovernor(app_rate=100, page_rate=10, burst=1,
+                                          soft_limit=50, cooldown=0.1, max_wait=0.5)
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def test_scopes_for_url(self):
+        """Calls are charged to the app and to the page or ad account they target"""
+        self.assertEqual(self.governor.scopes_for_url(f"{self.base_url}/me/accounts"), ["app"])
+        self.assertEqual(self.governor.scopes_for_url(f"{self.base_url}/123/feed"), ["app", "page:123"])
+        self.assertEqual(self.governor.scopes_for_url(f"{self.base_url}/123_456/insights"), ["app", "page:123"])
+        self.assertEqual(self.governor.scopes_for_url(f"{self.base_url}/act_9/campaigns"), ["app", "account:9"])
+        self.assertEqual(self.governor.scopes_for_url(f"{self.base_url}/"), ["app"])
+
+    def test_batch_is_charged_per_operation(self):
+        """A batch call costs one app call per sub-request plus one call to each targeted page"""
+        batch = json.dumps([{"method": "POST", "relative_url": "1/feed"}, {"method": "POST", "relative_url": "1/feed"},
+                            {"method": "GET", "relative_url": "act_9/campaigns?limit=5"}, {"method": "GET"}])
+
+        scopes = self.governor.scopes_for_request(f"{self.base_url}/", {"batch": batch})
+        self.governor.acquire(scopes)
+
+        self.assertEqual(sorted(scopes), ["account:9", "app", "app", "app", "app", "page:1", "page:1"])
+        self.assertEqual(self.governor.scopes_for_request(f"{self.base_url}/", {"batch": "not json"}), ["app"])
+        self.assertEqual(self.governor.scopes_for_request(f"{self.base_url}/1/feed", {"message": "hi"}),
+                         ["app", "page:1"])
+        stats = self.governor.stats()
+        self.assertAlmostEqual(stats["app"]["tokens"], 96, delta=0.5)
+        self.assertAlmostEqual(stats["page:1"]["tokens"], 8, delta=0.5)
+
+    def test_batch_larger_than_bucket_waits_for_full_bucket(self):
+        """A batch costing more than the bucket holds starts once it is full and leaves a debt"""
+        self.governor.acquire(["page:1"] * 25)
+        self.assertLess(self.governor.stats()["page:1"]["tokens"], -14)
+        with self.assertRaises(RateLimitExceeded):
+            self.governor.acquire(["page:1"])
+
+    def test_bucket_paces_calls(self):
+        """Once the burst is spent, calls wait for the bucket to refill"""
+        for _ in range(10):
+            self.governor.acquire(["page:1"])
+        start = time.monotonic()
+        waited = self.governor.acquire(["page:1"])
+        self.assertGreater(waited, 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_usage_headers_slow_refill(self):
+        """Reported usage above the soft limit reduces the refill rate"""
+        self.governor.record_usage("page:1", 20)
+        self.assertEqual(self.governor.stats()["page:1"]["refill_rate"], 10)
+        self.governor.record_usage("page:1", 90)
+        self.assertLess(self.governor.stats()["page:1"]["refill_rate"], 10)
+
+    @responses.activate
+    def test_throttling_error_blocks_scope(self):
+        """A throttling error pauses the budget and waits are bounded by max_wait"""
+        responses.add(responses.GET, f"{self.base_url}/1/feed",
+                      json={"error": {"message": "Page request limit reached", "code": 32}}, status=400,
+                      headers={"X-Page-Usage": json.dumps({"call_count": 100, "total_cputime": 10,
+                                                           "total_time": 10})})
+        pool = GraphSessionPool(governor=self.governor)
+        pool.get(f"{self.base_url}/1/feed")
+
+        self.assertGreater(self.governor.stats()["page:1"]["blocked_for"], 0)
+        with self.assertRaises(RateLimitExceeded) as context:
+            self.governor.acquire(["app", "page:1"], max_wait=0)
+        self.assertEqual(context.exception.scope, "page:1")
+        # Other pages are not affected
+        self.assertEqual(self.governor.acquire(["app", "page:2"], max_wait=0), 0)
+        pool.close()
+
+    @responses.activate
+    def test_business_use_case_header(self):
+        """X-Business-Use-Case-Usage updates the ad account budget"""
+        usage = {"9": [{"type": "ads_management", "call_count": 95, "total_cputime": 5,
+                        "total_time": 5, "estimated_time_to_regain_access": 0}]}
+        responses.add(responses.GET, f"{self.base_url}/act_9/campaigns", json={"data": []}, status=200,
+                      headers={"X-Business-Use-Case-Usage": json.dumps(usage),
+                               "X-App-Usage": json.dumps({"call_count": 12})})
+        pool = GraphSessionPool(governor=self.governor)
+        pool.get(f"{self.base_url}/act_9/campaigns")
+
+        stats = pool.stats()["rate_limits"]
+        self.assertEqual(stats["account:9"]["usage"], 95)
+        self.assertEqual(stats["app"]["usage"], 12)
+        pool.close()
+
+    @responses.activate
+    def test_exhausted_budget_raises_api_error(self):
+        """FacebookAPI reports an exhausted budget as error code 4"""
+        self.governor.throttle("app", 5)
+        api = FacebookAPI(app_id="app", app_secret="secret", access_token="token",
+                          session_pool=GraphSessionPool(governor=self.governor))
+
+        with self.assertRaises(FacebookAPIError) as context:
+            api.get_user_pages()
+        self.assertEqual(context.exception.error_code, 4)
+        self.assertEqual(len(responses.calls), 0)
+
+    @responses.activate
+    def test_page_sync_retries_after_throttling(self):
+        """Page sync retries a throttled call once the budget is back"""
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts",
+                      json={"error": {"message": "Application request limit reached", "code": 4}}, status=400)
+        responses.add(responses.GET, f"{GRAPH_URL}/me/accounts",
+                      json={"data": [{"id": "1", "name": "Page 1"}]}, status=200)
+        pool = GraphSessionPool(governor=self.governor)
+
+        start = time.monotonic()
+        pages, _, _ = fetch_all_pages("token", http=pool)
+
+        self.assertEqual(len(pages), 1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests for the Graph API response cache
+"""
+
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from response_cache import ResponseCache, MemoryBackend, DiskBackend
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache and its use by FacebookAPI"""
+
+    def setUp(self):
+        """Create a client with a private cache"""
+        self.cache = ResponseCache(MemoryBackend())
+        self.api = FacebookAPI(app_id="app", app_secret="secret", access_token="user_token",
+                               response_cache=self.cache)
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    @responses.activate
+    def test_ttl_hit_without_token_in_key(self):
+        """Cached endpoints are served from the cache until their TTL, other endpoints are not cached"""
+        responses.add(responses.GET, f"{self.base_url}/me/adaccounts", json={"data": [{"id": "act_1"}]})
+        responses.add(responses.GET, f"{self.base_url}/me", json={"id": "1"})
+
+        self.assertEqual(self.api.get_ad_accounts(), [{"id": "act_1"}])
+        accounts = self.api.get_ad_accounts()
+        accounts.append({"id": "mutated"})
+        self.assertEqual(self.api.get_ad_accounts(), [{"id": "act_1"}])
+        self.api._make_request("GET", "/me")
+        self.api._make_request("GET", "/me")
+        self.assertEqual(len(responses.calls), 3)
+
+        # Another user does not see these entries
+        other = FacebookAPI(app_id="app", app_secret="secret", access_token="other_token",
+                            response_cache=self.cache)
+        other.get_ad_accounts()
+        self.assertEqual(len(responses.calls), 4)
+        self.assertNotIn("user_token", str(self.cache.backend._items))
+
+        with patch("response_cache.time.time", return_value=time.time() + 7200):
+            self.api.get_ad_accounts()
+        self.assertEqual(len(responses.calls), 5)
+
+    def test_memory_backend_byte_bound(self):
+        """Least recently used entries are evicted once the byte bound is reached"""
+        backend = MemoryBackend(max_bytes=25)
+        backend.set("a", b"1" * 10)
+        backend.set("b", b"2" * 10)
+        backend.get("a")
+        backend.set("c", b"3" * 10)  # Evicts b
+
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), b"1" * 10)
+        self.assertLessEqual(backend.bytes, 25)
+        backend.set("big", b"x" * 30)
+        self.assertIsNone(backend.get("big"))
+
+    def test_stale_while_revalidate(self):
+        """A stale entry is served at once and refreshed in the background"""
+        values = iter([{"data": "old"}, {"data": "new"}])
+        fetch = lambda: next(values)
+        self.cache.get_or_fetch("scope", "/1/feed", {}, fetch)
+
+        with patch("response_cache.time.time", return_value=time.time() + 150):
+            self.assertEqual(self.cache.get_or_fetch("scope", "/1/feed", {}, fetch), {"data": "old"})
+        deadline = time.time() + 2
+        while self.cache.stats()["stores"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get_or_fetch("scope", "/1/feed", {}, fetch), {"data": "new"})
+        self.assertEqual(self.cache.stats()["stale_hits"], 1)
+
+    @responses.activate
+    def test_write_invalidates_object(self):
+        """Publishing to a page drops its cached feed, other pages stay cached"""
+        responses.add(responses.GET, f"{self.base_url}/me/accounts",
+                      json={"data": [{"id": "1", "access_token": "t1"}, {"id": "2", "access_token": "t2"}]})
+        for page_id in ("1", "2"):
+            responses.add(responses.GET, f"{self.base_url}/{page_id}/feed", json={"data": [{"id": f"{page_id}_1"}]})
+        responses.add(responses.POST, f"{self.base_url}/1/feed", json={"id": "1_2"})
+
+        self.api.get_recent_posts("1")
+        self.api.get_recent_posts("2")
+        self.api.publish_post("1", "Hello", page_access_token="page_token")
+        self.api.get_recent_posts("1")
+        self.api.get_recent_posts("2")
+
+        feed_reads = [call for call in responses.calls if call.request.method == "GET" and "/feed" in call.request.url]
+        self.assertEqual(len(feed_reads), 3)
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_disk_backend_shared(self):
+        """Entries written by one process are read by another through the cache directory"""
+        directory = tempfile.mkdtemp()
+        try:
+            ResponseCache(DiskBackend(directory)).store("scope", "/me/accounts", {"limit": 10}, {"data": [1]})
+            other = ResponseCache(DiskBackend(directory))
+
+            self.assertEqual(other.lookup("scope", "/me/accounts", {"limit": 10}), ("fresh", {"data": [1]}))
+            other.invalidate("/me/accounts")
+            self.assertEqual(other.lookup("scope", "/me/accounts", {"limit": 10}), (None, None))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the cached settings service
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add src directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.settings import SettingsStore, parse_env
+
+
+class TestSettingsStore(unittest.TestCase):
+    """Test cases for SettingsStore"""
+
+    def setUp(self):
+        """Create a temporary .env file"""
+        self.work_dir = tempfile.mkdtemp()
+        self.env_file = os.path.join(self.work_dir, ".env")
+        with open(self.env_file, "w") as f:
+            f.write("# Facebook API Configuration\nFACEBOOK_ACCESS_TOKEN=token1\nFACEBOOK_APP_ID=app\n")
+
+    def tearDown(self):
+        """Remove the temporary file"""
+        shutil.rmtree(self.work_dir)
+
+    def test_parse_env(self):
+        """Comments and lines without '=' are ignored, values keep their '='"""
+        self.assertEqual(parse_env("# A=1\nB=2\n\nC=x=y\n"), {"B": "2", "C": "x=y"})
+
+    def test_file_is_parsed_once(self):
+        """Concurrent reads are served from memory after a single load"""
+        store = SettingsStore(self.env_file, check_interval=60)
+        values = []
+        threads = [threading.Thread(target=lambda: values.append(store.get("FACEBOOK_ACCESS_TOKEN")))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(values, ["token1"] * 10)
+        self.assertEqual(store.reloads, 1)
+        self.assertIsNone(store.get("MISSING"))
+
+    def test_file_change_is_detected(self):
+        """An edit of the file is picked up at the next check"""
+        store = SettingsStore(self.env_file, check_interval=0)
+        self.assertEqual(store.get("FACEBOOK_ACCESS_TOKEN"), "token1")
+        store.get("FACEBOOK_APP_ID")
+        self.assertEqual(store.reloads, 1)  # Unchanged file is not read again
+
+        with open(self.env_file, "w") as f:
+            f.write("FACEBOOK_ACCESS_TOKEN=token2\n")
+        os.utime(self.env_file, ns=(1, 1))
+
+        self.assertEqual(store.get("FACEBOOK_ACCESS_TOKEN"), "token2")
+        self.assertIsNone(store.get("FACEBOOK_APP_ID"))
+
+    def test_save_notifies_listeners(self):
+        """Saving reloads immediately and calls the change listeners"""
+        store = SettingsStore(self.env_file, check_interval=60)
+        store.get("FACEBOOK_ACCESS_TOKEN")
+        changes = []
+        store.on_change(lambda: changes.append(store.get("FACEBOOK_ACCESS_TOKEN")))
+
+        store.save("FACEBOOK_ACCESS_TOKEN=token3\n")
+        store.save("FACEBOOK_ACCESS_TOKEN=token3\n")
+
+        self.assertEqual(changes, ["token3"])
+        with open(self.env_file) as f:
+            self.assertEqual(f.read(), "FACEBOOK_ACCESS_TOKEN=token3\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
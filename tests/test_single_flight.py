@@ -0,0 +1,113 @@
+"""
+Tests for the single-flight coalescing of Graph API reads
+"""
+
+import unittest
+import os
+import sys
+import time
+import threading
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI, FacebookAPIError
+from single_flight import SingleFlight, endpoint_label
+
+
+def wait_for(condition, timeout=5):
+    """Poll until condition() is true"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def run_threads(target, count):
+    """Run target in count threads and wait for them"""
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for SingleFlight and its use by FacebookAPI"""
+
+    def setUp(self):
+        """Create a private single-flight layer"""
+        self.flight = SingleFlight()
+        self.base_url = "https://graph.facebook.com/v18.0"
+
+    def _coalesced(self, label):
+        return self.flight.stats()["endpoints"].get(label, {}).get("coalesced", 0)
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Waiting callers get a copy of the leader's result"""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            wait_for(lambda: self._coalesced("test") == 4)
+            return {"data": [1, 2]}
+
+        results = []
+        run_threads(lambda: results.append(self.flight.do("key", fetch, label="test")), 5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"data": [1, 2]}] * 5)
+        self.assertEqual(len({id(result) for result in results}), 5)
+        self.assertEqual(self.flight.stats()["endpoints"]["test"]["coalesced_ratio"], 0.8)
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+
+        # Nothing is cached once the call completed
+        self.flight.do("key", fetch, label="test")
+        self.assertEqual(len(calls), 2)
+
+    def test_error_is_shared(self):
+        """Every caller of a failed call gets the error"""
+        def fail():
+            wait_for(lambda: self._coalesced("test") == 2)
+            raise FacebookAPIError("Boom", 1)
+
+        errors = []
+
+        def call():
+            try:
+                self.flight.do("key", fail, label="test")
+            except FacebookAPIError as e:
+                errors.append(e.error_code)
+
+        run_threads(call, 3)
+        self.assertEqual(errors, [1, 1, 1])
+
+    def test_endpoint_label(self):
+        """IDs are grouped under placeholders"""
+        self.assertEqual(endpoint_label("/123/posts"), "/{id}/posts")
+        self.assertEqual(endpoint_label("act_42/campaigns"), "/{id}/campaigns")
+        self.assertEqual(endpoint_label("/123_456/insights"), "/{id}/insights")
+        self.assertEqual(endpoint_label("/me/accounts"), "/me/accounts")
+
+    @responses.activate
+    def test_identical_graph_reads_are_coalesced(self):
+        """Concurrent get_all_pages calls send one /me/accounts request"""
+        def accounts(request):
+            wait_for(lambda: self._coalesced("/me/accounts") == 3)
+            return (200, {}, '{"data": [{"id": "1", "name": "Page"}]}')
+
+        responses.add_callback(responses.GET, f"{self.base_url}/me/accounts", callback=accounts)
+        api = FacebookAPI(app_id="app", app_secret="secret", access_token="token", single_flight=self.flight)
+
+        results = []
+        run_threads(lambda: results.append(api.get_all_pages()), 4)
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(results, [[{"id": "1", "name": "Page"}]] * 4)
+
+        self.assertEqual(self.flight.stats()["endpoints"]["/me/accounts"],
+                         {"executed": 1, "coalesced": 3, "coalesced_ratio": 0.75})
+
+
+if __name__ == '__main__':
+    unittest.main()
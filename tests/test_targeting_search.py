@@ -0,0 +1,137 @@
+"""
+Tests for the cached, debounced targeting search
+"""
+
+import unittest
+import os
+import sys
+import json
+import time
+import threading
+import responses
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI
+from services.interest_index import InterestIndex, DEFAULT_INTERESTS
+from services.targeting_search import TargetingSearch, LOCAL, CACHE, GRAPH
+
+BASE_URL = "https://graph.facebook.com/v18.0"
+
+REMOTE = {
+    'wood': [{'id': '6003', 'name': 'Woodworking', 'audience_size_upper_bound': 90000},
+             {'id': '6004', 'name': 'Wood flooring', 'audience_size_upper_bound': 5000}],
+    'terrasse': [{'id': '6100', 'name': 'Terrasse en bois'}]
+}
+
+
+class TestTargetingSearch(unittest.TestCase):
+    """Test cases for TargetingSearch"""
+
+    def setUp(self):
+        """Create a service over the built-in interests with a recording remote search"""
+        self.calls = []
+        self.search = TargetingSearch(self._fetch, index=InterestIndex(DEFAULT_INTERESTS), debounce=0.05)
+
+    def _fetch(self, queries):
+        self.calls.append(sorted(queries))
+        return {query: REMOTE.get(query.lower(), []) for query in queries}
+
+    def test_local_results_do_not_leave_the_process(self):
+        """A query filled by the local index is not sent to Facebook"""
+        result = self.search.search('jardin', limit=2)
+
+        self.assertEqual(result['source'], LOCAL)
+        self.assertEqual(len(result['interests']), 2)
+        self.assertEqual(self.calls, [])
+
+    def test_remote_results_are_cached_and_indexed(self):
+        """Remote hits are cached per normalized query and added to the local index"""
+        first = self.search.search('Terrasse')
+        second = self.search.search('  TERRASSE ')
+
+        self.assertEqual(first['source'], GRAPH)
+        self.assertEqual([interest['name'] for interest in first['interests']], ['Terrasse', 'Terrasse en bois'])
+        self.assertEqual(second['source'], CACHE)
+        self.assertEqual(second['interests'], first['interests'])
+        self.assertEqual(self.calls, [['Terrasse']])
+        self.assertEqual(self.search.index.search('en bois')[0]['id'], '6100')
+        self.assertEqual(self.search.search('woodw', remote=False)['interests'], [])
+
+    def test_expired_results_are_fetched_again(self):
+        """Cached results are reused for the TTL only"""
+        self.search.ttl = 0
+        self.search.search('wood')
+        self.search.search('wood')
+
+        self.assertEqual(self.calls, [['wood'], ['wood']])
+
+    def test_burst_is_sent_as_one_batch(self):
+        """Queries typed in a burst are sent together, without the ones typed over"""
+        results = {}
+
+        def search(query):
+            results[query] = self.search.search(query)
+
+        threads = [threading.Thread(target=search, args=(query,)) for query in ['wo', 'woo', 'wood', 'pisc']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, [['pisc', 'wood']])
+        self.assertEqual(results['wo']['source'], LOCAL)
+        self.assertEqual(results['wood']['source'], GRAPH)
+        self.assertEqual([interest['id'] for interest in results['wood']['interests']], ['6003', '6004'])
+        self.assertEqual(self.search.stats()['superseded'], 2)
+
+    def test_steady_typing_does_not_hold_a_search(self):
+        """Each search waits for its own lookup only, while batches keep being sent in the background"""
+        def slow_fetch(queries):
+            time.sleep(0.2)
+            return self._fetch(queries)
+        search = TargetingSearch(slow_fetch, index=InterestIndex(DEFAULT_INTERESTS), debounce=0.05, wait=0.3)
+        durations = []
+
+        def type_query(query):
+            start = time.monotonic()
+            search.search(query)
+            durations.append(time.monotonic() - start)
+
+        threads = []
+        for query in ['terr', 'terra', 'terras', 'terrass', 'terrasse', 'terrasse b']:
+            threads.append(threading.Thread(target=type_query, args=(query,)))
+            threads[-1].start()
+            time.sleep(0.1)
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(max(durations), 0.5)
+        self.assertGreaterEqual(len(self.calls), 2)
+
+    def test_failed_remote_search_falls_back_to_local(self):
+        """Queries Facebook did not answer are answered locally and not cached"""
+        self.search.fetch = lambda queries: {}
+
+        self.assertEqual(self.search.search('bois')['source'], LOCAL)
+        self.assertEqual(self.search.stats()['cached_queries'], 0)
+
+    @responses.activate
+    def test_graph_search_interests(self):
+        """One query is a plain GET, several are one batch request"""
+        api = FacebookAPI(app_id="targeting_test", app_secret="secret", access_token="user_token")
+        responses.add(responses.GET, f"{BASE_URL}/search", json={'data': REMOTE['wood']})
+        responses.add(responses.POST, f"{BASE_URL}/", json=[
+            {'code': 200, 'body': json.dumps({'data': REMOTE['terrasse']})},
+            {'code': 400, 'body': json.dumps({'error': {'message': 'Invalid', 'code': 100}})}
+        ])
+
+        self.assertEqual(api.search_interests(['wood']), {'wood': REMOTE['wood']})
+        self.assertEqual(responses.calls[0].request.params['type'], 'adinterest')
+        self.assertEqual(api.search_interests(['terrasse', '?']), {'terrasse': REMOTE['terrasse']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the resumable chunked video upload
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+import responses
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from facebook_api import FacebookAPI, FacebookAPIError
+from graph_session import GraphSessionPool
+from rate_limit import RateLimitGovernor
+from video_upload import ResumableVideoUploader, UploadMetrics
+
+VIDEO_SIZE = 10 * 1024
+
+
+class FakeUploadSession:
+    """Callback implementing the start/transfer/finish phases of /videos"""
+
+    def __init__(self, fail_at_offset=None, failures=0):
+        self.fail_at_offset = fail_at_offset
+        self.failures = failures
+        self.phases = []
+        self.received = b""
+
+    def __call__(self, request):
+        body = request.body if isinstance(request.body, bytes) else request.body.encode()
+        if b'name="upload_phase"' in body:
+            phase = body.split(b'name="upload_phase"\r\n\r\n', 1)[1].split(b"\r\n", 1)[0].decode()
+        else:
+            phase = dict(item.split("=", 1) for item in body.decode().split("&"))["upload_phase"]
+        self.phases.append(phase)
+
+        if phase == "start":
+            return (200, {}, '{"video_id": "v1", "upload_session_id": "s1", '
+                             '"start_offset": "0", "end_offset": "4096"}')
+        if phase == "finish":
+            return (200, {}, '{"success": true}')
+
+        offset = len(self.received)
+        if offset == self.fail_at_offset and self.failures > 0:
+            self.failures -= 1
+            return (503, {}, '{"error": {"message": "Service unavailable", "code": 2}}')
+        chunk = body.split(b'filename="', 1)[1].split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n--", 1)[0]
+        self.received += chunk
+        end = min(len(self.received) + 4096, VIDEO_SIZE)
+        return (200, {}, f'{{"start_offset": "{len(self.received)}", "end_offset": "{end}"}}')
+
+
+class TestResumableVideoUploader(unittest.TestCase):
+    """Test cases for ResumableVideoUploader"""
+
+    def setUp(self):
+        """Create a test video, a checkpoint directory and an API instance"""
+        self.work_dir = tempfile.mkdtemp()
+        self.video_path = os.path.join(self.work_dir, "video.mp4")
+        self.content = os.urandom(VIDEO_SIZE)
+        with open(self.video_path, "wb") as f:
+            f.write(self.content)
+
+        pool = GraphSessionPool(governor=RateLimitGovernor(app_rate=1000, page_rate=1000))
+        self.api = FacebookAPI(app_id="app", app_secret="secret", access_token="token", session_pool=pool)
+        self.metrics = UploadMetrics()
+        self.uploader = ResumableVideoUploader(self.api, chunk_size=3000,
+                                               checkpoint_dir=os.path.join(self.work_dir, "checkpoints"),
+                                               metrics=self.metrics)
+        self.url = "https://graph.facebook.com/v18.0/1/videos"
+
+    def tearDown(self):
+        """Remove test files"""
+        shutil.rmtree(self.work_dir)
+
+    @responses.activate
+    def test_upload_in_chunks(self):
+        """The file is sent in chunk_size pieces and the session is finished"""
+        session = FakeUploadSession()
+        responses.add_callback(responses.POST, self.url, callback=session)
+
+        result = self.uploader.upload("1", self.video_path, description="Hello", page_access_token="t1")
+
+        self.assertEqual(result["id"], "v1")
+        self.assertEqual(session.received, self.content)
+        self.assertEqual(session.phases[0], "start")
+        self.assertEqual(session.phases[-1], "finish")
+        self.assertEqual(result["chunks"], 4)  # Capped at chunk_size: 3000 + 3000 + 3000 + 1240
+        self.assertFalse(os.listdir(self.uploader.checkpoint_dir))
+        self.assertEqual(self.metrics.stats()["1"]["bytes"], VIDEO_SIZE)
+
+    @responses.activate
+    def test_interrupted_upload_resumes(self):
+        """After a failure the next call resumes from the checkpointed offset"""
+        # One more failure than FacebookAPI retries
+        session = FakeUploadSession(fail_at_offset=3000, failures=4)
+        responses.add_callback(responses.POST, self.url, callback=session)
+
+        with patch("facebook_api.time.sleep"):
+            with self.assertRaises(FacebookAPIError):
+                self.uploader.upload("1", self.video_path, page_access_token="t1")
+        self.assertEqual(len(os.listdir(self.uploader.checkpoint_dir)), 1)
+
+        result = self.uploader.upload("1", self.video_path, page_access_token="t1")
+
+        self.assertTrue(result["resumed"])
+        self.assertEqual(session.phases.count("start"), 1)
+        self.assertEqual(session.received, self.content)
+        self.assertEqual(result["bytes_sent"], VIDEO_SIZE - 3000)
+
+    @responses.activate
+    def test_large_video_uses_chunked_upload(self):
+        """upload_video switches to the resumable protocol above the threshold"""
+        session = FakeUploadSession()
+        responses.add_callback(responses.POST, self.url, callback=session)
+
+        with patch.dict(os.environ, {"FACEBOOK_VIDEO_CHUNKED_THRESHOLD": "1024",
+                                     "FACEBOOK_UPLOAD_CHECKPOINT_DIR": self.uploader.checkpoint_dir}):
+            response = self.api.upload_video("1", self.video_path, page_access_token="t1")
+
+        self.assertEqual(response["id"], "v1")
+        self.assertEqual(session.phases[0], "start")
+
+
+if __name__ == '__main__':
+    unittest.main()
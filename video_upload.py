@@ -0,0 +1,340 @@
+"""
+Resumable Video Upload Module
+
+This module uploads large videos with the Graph API resumable upload
+protocol (upload_phase=start/transfer/finish) instead of one multipart
+body. The file is sent in chunks, each chunk is retried on its own, and
+the current offset is checkpointed on disk after every chunk so that an
+upload interrupted by a network error or a crash resumes where it stopped
+instead of restarting from zero.
+
+Chunks of one upload session are sent in sequence, since Facebook returns
+the offsets of the next chunk in each transfer response; uploads to
+several pages run in parallel through the fan-out executor.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from facebook_api import FacebookAPIError
+from fanout import get_fanout_executor
+
+logger = logging.getLogger("facebook_api.video_upload")
+
+# Defaults, overridable through environment variables
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024          # Bytes per transfer request
+DEFAULT_CHUNKED_THRESHOLD = 16 * 1024 * 1024  # Videos from this size use the resumable protocol
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "upload_checkpoints")
+
+FINGERPRINT_SAMPLE = 1024 * 1024  # Bytes hashed at the start and end of the file
+
+# Errors that do not mean the upload session expired (network failure, rate limits)
+NON_SESSION_ERROR_CODES = [None, 4, 17, 32, 613]
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default"""
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+def get_chunked_threshold() -> int:
+    """File size from which videos are uploaded with the resumable protocol"""
+    return _env_int("FACEBOOK_VIDEO_CHUNKED_THRESHOLD", DEFAULT_CHUNKED_THRESHOLD)
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Identify a video file by its size and the hash of its first and last MiB
+
+    The same content uploaded again from another temporary path maps to
+    the same checkpoint.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE))
+        if size > FINGERPRINT_SAMPLE:
+            f.seek(max(FINGERPRINT_SAMPLE, size - FINGERPRINT_SAMPLE))
+            digest.update(f.read(FINGERPRINT_SAMPLE))
+    return digest.hexdigest()
+
+
+class UploadMetrics:
+    """
+    Per-page video upload throughput
+
+    Handles:
+    - Uploaded bytes, transfer time and chunk counts per page
+    - Average and last throughput in MB/s
+    - Resumed upload counters
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Dict] = {}
+
+    def record(self, page_id: str, bytes_sent: int, seconds: float, chunks: int, resumed: bool):
+        """
+        Record a completed upload
+
+        Args:
+            page_id: ID of the Facebook page
+            bytes_sent: Bytes transferred by this run (resumed bytes excluded)
+            seconds: Transfer duration
+            chunks: Number of chunks sent
+            resumed: Whether the upload resumed from a checkpoint
+        """
+        throughput = (bytes_sent / 1024 / 1024) / seconds if seconds > 0 else 0.0
+        with self._lock:
+            page = self._pages.setdefault(page_id, {
+                "uploads": 0, "bytes": 0, "seconds": 0.0, "chunks": 0, "resumed": 0
+            })
+            page["uploads"] += 1
+            page["bytes"] += bytes_sent
+            page["seconds"] += seconds
+            page["chunks"] += chunks
+            page["resumed"] += 1 if resumed else 0
+            page["last_throughput_mbps"] = round(throughput, 3)
+            page["last_upload"] = datetime.now().isoformat()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Get throughput per page
+
+        Returns:
+            Dictionary keyed by page ID with totals, average and last
+            throughput in MB/s
+        """
+        with self._lock:
+            result = {}
+            for page_id, page in self._pages.items():
+                average = (page["bytes"] / 1024 / 1024) / page["seconds"] if page["seconds"] > 0 else 0.0
+                result[page_id] = dict(page, seconds=round(page["seconds"], 3),
+                                       throughput_mbps=round(average, 3))
+            return result
+
+
+_metrics = UploadMetrics()
+
+
+def get_upload_metrics() -> UploadMetrics:
+    """Get the process-wide upload metrics"""
+    return _metrics
+
+
+class ResumableVideoUploader:
+    """
+    Chunked, resumable video upload to Facebook pages
+
+    Handles:
+    - The start/transfer/finish upload phases
+    - Configurable chunk size, each chunk retried by FacebookAPI
+    - Offsets checkpointed on disk after every chunk
+    - Resuming an interrupted upload, or restarting it if the session expired
+    - Throughput metrics per page
+    """
+
+    def __init__(self, api, chunk_size: Optional[int] = None, checkpoint_dir: Optional[str] = None,
+                 metrics: Optional[UploadMetrics] = None):
+        """
+        Initialize the uploader
+
+        Args:
+            api: FacebookAPI instance used to send the requests
+            chunk_size: Maximum bytes per transfer (FACEBOOK_VIDEO_CHUNK_SIZE if not provided)
+            checkpoint_dir: Checkpoint directory (FACEBOOK_UPLOAD_CHECKPOINT_DIR if not provided)
+            metrics: Metrics collector (process-wide collector if not provided)
+        """
+        self.api = api
+        self.chunk_size = chunk_size or _env_int("FACEBOOK_VIDEO_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+        self.checkpoint_dir = checkpoint_dir or os.getenv("FACEBOOK_UPLOAD_CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR)
+        self.metrics = metrics or get_upload_metrics()
+
+    # --- Checkpoints ----------------------------------------------------
+
+    def _checkpoint_path(self, page_id: str, fingerprint: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{page_id}_{fingerprint[:32]}.json")
+
+    def _load_checkpoint(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_checkpoint(self, path: str, checkpoint: Dict):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self, path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+    # --- Upload ---------------------------------------------------------
+
+    def _start(self, page_id: str, file_size: int, page_access_token: Optional[str]) -> Dict:
+        """Open an upload session and return its first checkpoint"""
+        response = self.api._make_request(
+            "POST", f"/{page_id}/videos",
+            data={"upload_phase": "start", "file_size": str(file_size)},
+            access_token=page_access_token
+        )
+        return {
+            "page_id": page_id,
+            "video_id": response["video_id"],
+            "upload_session_id": response["upload_session_id"],
+            "start_offset": int(response["start_offset"]),
+            "end_offset": int(response["end_offset"]),
+            "file_size": file_size,
+            "created": datetime.now().isoformat()
+        }
+
+    def upload(self, page_id: str, video_path: str, title: Optional[str] = None,
+               description: Optional[str] = None, page_access_token: Optional[str] = None) -> Dict:
+        """
+        Upload a video to a Facebook page with the resumable protocol
+
+        Args:
+            page_id: ID of the Facebook page
+            video_path: Path to the video file
+            title: Optional video title
+            description: Optional video description
+            page_access_token: Page-specific access token
+
+        Returns:
+            Dictionary with the video "id", bytes sent, duration,
+            throughput and whether the upload was resumed
+
+        Raises:
+            FacebookAPIError: If a phase fails (the checkpoint is kept so
+                the next call resumes)
+        """
+        file_size = os.path.getsize(video_path)
+        checkpoint_path = self._checkpoint_path(page_id, file_fingerprint(video_path))
+        checkpoint = self._load_checkpoint(checkpoint_path)
+
+        resumed = checkpoint is not None and checkpoint.get("file_size") == file_size
+        if resumed:
+            resume_offset = checkpoint["start_offset"]
+            logger.info(f"Resuming upload of {video_path} to page {page_id} at offset {resume_offset}")
+            try:
+                return self._transfer(checkpoint, checkpoint_path, video_path, title, description,
+                                      page_access_token, resumed=True)
+            except FacebookAPIError as e:
+                # Network errors, rate limits or progress made: the session is still usable
+                if e.error_code in NON_SESSION_ERROR_CODES or checkpoint["start_offset"] != resume_offset:
+                    raise
+                logger.warning(f"Upload session {checkpoint['upload_session_id']} could not be resumed "
+                               f"({e.message}), starting a new one")
+                self._clear_checkpoint(checkpoint_path)
+
+        checkpoint = self._start(page_id, file_size, page_access_token)
+        self._save_checkpoint(checkpoint_path, checkpoint)
+        return self._transfer(checkpoint, checkpoint_path, video_path, title, description,
+                              page_access_token, resumed=False)
+
+    def _transfer(self, checkpoint: Dict, checkpoint_path: str, video_path: str, title: Optional[str],
+                  description: Optional[str], page_access_token: Optional[str], resumed: bool) -> Dict:
+        """Send the remaining chunks, then finish the session"""
+        page_id = checkpoint["page_id"]
+        start_offset = checkpoint["start_offset"]
+        end_offset = checkpoint["end_offset"]
+        bytes_sent = 0
+        chunks = 0
+        start = time.perf_counter()
+
+        with open(video_path, "rb") as video_file:
+            # Facebook returns start_offset == end_offset once the file is complete
+            while start_offset < end_offset:
+                video_file.seek(start_offset)
+                chunk = video_file.read(min(end_offset - start_offset, self.chunk_size))
+                response = self.api._make_request(
+                    "POST", f"/{page_id}/videos",
+                    data={"upload_phase": "transfer",
+                          "upload_session_id": checkpoint["upload_session_id"],
+                          "start_offset": str(start_offset)},
+                    files={"video_file_chunk": (os.path.basename(video_path), chunk)},
+                    access_token=page_access_token
+                )
+                bytes_sent += len(chunk)
+                chunks += 1
+                start_offset = int(response["start_offset"])
+                end_offset = int(response["end_offset"])
+                checkpoint.update(start_offset=start_offset, end_offset=end_offset)
+                self._save_checkpoint(checkpoint_path, checkpoint)
+                logger.debug(f"Video chunk {chunks} sent to page {page_id}, offset {start_offset}/{checkpoint['file_size']}")
+
+        finish_data = {"upload_phase": "finish", "upload_session_id": checkpoint["upload_session_id"]}
+        if title:
+            finish_data["title"] = title
+        if description:
+            finish_data["description"] = description
+        self.api._make_request("POST", f"/{page_id}/videos", data=finish_data, access_token=page_access_token)
+
+        seconds = time.perf_counter() - start
+        self._clear_checkpoint(checkpoint_path)
+        self.metrics.record(page_id, bytes_sent, seconds, chunks, resumed)
+
+        throughput = (bytes_sent / 1024 / 1024) / seconds if seconds > 0 else 0.0
+        logger.info(f"Video {checkpoint['video_id']} uploaded to page {page_id}: {bytes_sent} bytes "
+                    f"in {chunks} chunks, {throughput:.2f} MB/s")
+        return {
+            "id": checkpoint["video_id"],
+            "success": True,
+            "bytes_sent": bytes_sent,
+            "chunks": chunks,
+            "duration_ms": round(seconds * 1000, 1),
+            "throughput_mbps": round(throughput, 3),
+            "resumed": resumed
+        }
+
+    def upload_to_pages(self, page_ids: List[str], video_path: str, title: Optional[str] = None,
+                        description: Optional[str] = None,
+                        page_tokens: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """
+        Upload the same video to several pages in parallel
+
+        Args:
+            page_ids: List of Facebook page IDs
+            video_path: Path to the video file
+            title: Optional video title
+            description: Optional video description
+            page_tokens: Page access tokens by page ID
+
+        Returns:
+            Dictionary with page_id as key and upload result (or
+            {"success": False, "error": ...}) as value
+        """
+        page_tokens = page_tokens or {}
+
+        def upload_one(page_id: str) -> Dict:
+            return self.upload(page_id, video_path, title, description, page_tokens.get(page_id))
+
+        results = {}
+        for page_id, outcome in get_fanout_executor(self.api.app_id).run(upload_one, page_ids).items():
+            if outcome["error"] is None:
+                results[page_id] = outcome["result"]
+            else:
+                logger.error(f"Failed to upload video to page {page_id}: {str(outcome['error'])}")
+                results[page_id] = {"success": False, "error": str(outcome["error"]),
+                                    "duration_ms": outcome["duration_ms"]}
+        return results